@@ -1,18 +1,21 @@
 import os
 import json
 import asyncio
-from datetime import datetime
+import logging
+from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 import sqlite3
 from database import DB_PATH
-from kubernetes import client, config
+from partitions import source
 import openai
 
+logger = logging.getLogger(__name__)
+
 class EventAnalyzer:
     def __init__(self):
         self.api_key = os.getenv('OPENAI_API_KEY')
         if not self.api_key:
-            print("[EVENT-AI][WARNING] OpenAI API key not found in environment")
+            logger.warning("OpenAI API key not found in environment")
             self.enabled = False
             self.client = None
         else:
@@ -20,9 +23,9 @@ class EventAnalyzer:
                 openai.api_key = self.api_key
                 self.client = openai
                 self.enabled = True
-                print("[EVENT-AI][INFO] Event Analyzer initialized successfully")
+                logger.info("Event Analyzer initialized successfully")
             except Exception as e:
-                print(f"[EVENT-AI][ERROR] Failed to initialize OpenAI client: {e}")
+                logger.error("Failed to initialize OpenAI client: %s", e)
                 self.enabled = False
                 self.client = None
 
@@ -56,7 +59,7 @@ class EventAnalyzer:
             }
             
         except Exception as e:
-            print(f"[EVENT-AI][ERROR] Event analysis failed: {e}")
+            logger.error("Event analysis failed: %s", e)
             return {
                 "error": f"Analysis failed: {str(e)}",
                 "cluster": cluster,
@@ -114,9 +117,9 @@ class EventAnalyzer:
                 max_tokens=1200,  # daha düşük token limiti
                 temperature=0.1
             )
-            print(f"[EVENT-AI][DEBUG] OpenAI raw response object: {response}")
             ai_content = response.choices[0].message.content if response.choices and response.choices[0].message else ""
-            print(f"[EVENT-AI][DEBUG] Raw AI response:\n{ai_content}")  # DEBUG: AI yanıtını logla
+            logger.info("AI analysis for %s completed, tokens used: %s", cluster, response.usage.total_tokens)
+            logger.debug("Raw AI response:\n%s", ai_content)  # DEBUG: AI yanıtını logla
             try:
                 analysis_result = json.loads(ai_content)
             except json.JSONDecodeError:
@@ -125,7 +128,7 @@ class EventAnalyzer:
             analysis_result["tokens_used"] = response.usage.total_tokens
             return analysis_result
         except Exception as e:
-            print(f"[EVENT-AI][ERROR] OpenAI API call failed: {e}")
+            logger.error("OpenAI API call failed: %s", e)
             return {"error": f"AI analysis failed: {str(e)}"}
 
     def _prepare_event_context(self, events: List[Dict], cluster: str) -> Dict:
@@ -164,9 +167,10 @@ class EventAnalyzer:
         try:
             with sqlite3.connect(DB_PATH) as conn:
                 c = conn.cursor()
+                since = datetime.utcnow() - timedelta(hours=hours)
                 c.execute(f"""
                     SELECT cluster, namespace, object_name, object_kind, event_type, reason, message, count, timestamp
-                    FROM events 
+                    FROM {source(c, "events", since)} 
                     WHERE cluster = ? AND datetime(timestamp) >= datetime('now', '-{hours} hours')
                     AND (event_type = 'Warning' OR event_type = 'Error' OR event_type = 'Critical')
                     ORDER BY timestamp DESC LIMIT ?
@@ -181,8 +185,7 @@ class EventAnalyzer:
                     for row in rows
                 ]
         except Exception as e:
-            print(f"[EVENT-AI][ERROR] Failed to get events: {e}")
+            logger.error("Failed to get events: %s", e)
             return []
 
-# Global Event Analyzer instance
-event_analyzer = EventAnalyzer()
+# Instance'ı plugins.get_plugin("ai") ilk kullanımda oluşturur
@@ -1,158 +1,374 @@
+import json
+import logging
+import re
 import sqlite3
 import os
 from datetime import datetime, timedelta
-from database import save_alert, get_alerts, DB_PATH
+from database import analytics_query, count_alerts_since, get_open_alerts, save_alert, get_alerts, update_alert_group, DB_PATH
+from metrics import ALERT_CHECK_SECONDS, timed_query
+from notifications import NOTIFY_CONFIG, receivers_for
+from partitions import source
+from anomaly import current_anomalies, find_rate_anomalies
+from correlation import correlate_alerts
+from usage import find_oom_risk
+
+logger = logging.getLogger(__name__)
 
 # Alert rules configuration
+# group_by: storm alert'leri namespace ya da workload (pod adından) bazında toplar
+# storm_threshold: bir grupta tek kontrolde bu kadar pod varsa tek aggregated alert açılır
+# rate_limit: rate_window_minutes içinde rule başına açılabilecek top-level alert sayısı
 ALERT_RULES = {
     'pod_restart_high': {
         'name': 'High Pod Restart Count',
         'description': 'Pod has restarted more than 5 times in 1 hour',
         'severity': 'warning',
         'threshold': 5,
-        'duration_minutes': 60
+        'duration_minutes': 60,
+        'group_by': 'workload',
+        'storm_threshold': 10,
+        'rate_limit': 50
     },
     'pod_crashloop': {
         'name': 'Pod CrashLoopBackOff',
         'description': 'Pod is in CrashLoopBackOff state',
         'severity': 'critical',
         'threshold': 1,
-        'duration_minutes': 5
+        'duration_minutes': 5,
+        'group_by': 'workload',
+        'storm_threshold': 10,
+        'rate_limit': 50
     },
     'pod_pending_long': {
         'name': 'Pod Pending Too Long',
         'description': 'Pod has been in Pending state for more than 10 minutes',
         'severity': 'warning',
         'threshold': 1,
-        'duration_minutes': 10
+        'duration_minutes': 10,
+        'group_by': 'workload',
+        'storm_threshold': 10,
+        'rate_limit': 50
     },
     'pod_image_pull_failed': {
         'name': 'Image Pull Failed',
         'description': 'Pod failed to pull container image',
         'severity': 'critical',
         'threshold': 1,
-        'duration_minutes': 5
+        'duration_minutes': 5,
+        'group_by': 'workload',
+        'storm_threshold': 10,
+        'rate_limit': 50
+    },
+    'pod_failed_event': {
+        'name': 'Failed Events',
+        'description': 'Object reported Failed/Error events',
+        'severity': 'warning',
+        'threshold': 1,
+        'duration_minutes': 10,
+        'group_by': 'namespace',
+        'storm_threshold': 10,
+        'rate_limit': 50
+    },
+    # threshold: memory/limit oranı; horizon_minutes içinde limite ulaşacak trend de alert açar
+    'pod_oom_risk': {
+        'name': 'Pod Near Memory Limit',
+        'description': 'Pod memory usage is close to its limit or trending to reach it',
+        'severity': 'warning',
+        'threshold': 0.9,
+        'critical_threshold': 0.97,
+        'horizon_minutes': 30,
+        'trend_samples': 12,
+        'trend_min_ratio': 0.5,
+        'duration_minutes': 5,
+        'group_by': 'workload',
+        'storm_threshold': 10,
+        'rate_limit': 50
+    },
+    # threshold: EWMA baseline'a göre z-score; min_rate (events/min) altındaki seriler alert açmaz
+    'event_rate_anomaly': {
+        'name': 'Event Rate Anomaly',
+        'description': 'Event rate of a reason in a namespace is far above its usual level',
+        'severity': 'warning',
+        'threshold': float(os.environ.get("KUBEMON_ANOMALY_Z", 4.0)),
+        'critical_threshold': 8.0,
+        'min_rate': 1.0,
+        'warmup': 6,
+        'duration_minutes': 10,
+        'group_by': 'namespace',
+        'storm_threshold': 10,
+        'rate_limit': 50
     }
 }
 
+ALERT_GROUPING = {
+    'rate_window_minutes': float(os.environ.get("KUBEMON_ALERT_RATE_WINDOW", 10)),
+    # Storm alert'i bu kadar süre yeni üye görmezse çözülür
+    'storm_quiet_minutes': float(os.environ.get("KUBEMON_ALERT_STORM_QUIET", 30)),
+    'max_members': 1000,
+}
+
+SEVERITY_RANK = {'info': 0, 'warning': 1, 'critical': 2}
+
+# Pod adından sahibi workload: Deployment (rs hash + suffix), StatefulSet (ordinal), DaemonSet/Job (suffix)
+_K8S_SUFFIX = "[bcdfghjklmnpqrstvwxz2456789]"
+WORKLOAD_PATTERNS = (
+    re.compile(rf"^(.+)-{_K8S_SUFFIX}{{6,10}}-{_K8S_SUFFIX}{{5}}$"),
+    re.compile(r"^(.+)-\d+$"),
+    re.compile(rf"^(.+)-{_K8S_SUFFIX}{{5}}$"),
+)
+
+def workload_name(pod_name):
+    """Best-effort owner workload of a pod, from its generated name"""
+    for pattern in WORKLOAD_PATTERNS:
+        match = pattern.match(pod_name)
+        if match:
+            return match.group(1)
+    return pod_name
+
+def group_key(rule_name, cluster, namespace, object_name):
+    parts = [rule_name, cluster, namespace]
+    if ALERT_RULES[rule_name].get('group_by') == 'workload':
+        parts.append(workload_name(object_name))
+    return "/".join(parts)
+
+def _alert_object(metadata):
+    """Object of a per-object alert from its metadata: 'pod=ns/name,...' (or 'object=') -> 'ns/name'"""
+    for item in (metadata or "").split(","):
+        key, _, value = item.partition("=")
+        if key in ("pod", "object"):
+            return value
+    return None
+
+def _storm_scope(rule_name, key):
+    """Human readable part of a storm alert's group key"""
+    parts = key.split("/")
+    if len(parts) == 2:
+        return f"{parts[1]} (rate limited)"
+    return " ".join([parts[1], "/".join(parts[2:])])
+
+def _merge_members(storm, names):
+    known = set(json.loads(storm['metadata'] or "{}").get('members', []))
+    return sorted(known | names)[:ALERT_GROUPING['max_members']]
+
+def _save_storm(rule_name, key, members, namespace=None, children=()):
+    severity = max((member[3] for member in members), key=lambda level: SEVERITY_RANK.get(level, 0))
+    names = sorted({f"{member[1]}/{member[2]}" for member in members})[:ALERT_GROUPING['max_members']]
+    save_alert(members[0][0], rule_name, severity, f"{ALERT_RULES[rule_name]['name']}: {len(names)} pods affected in {_storm_scope(rule_name, key)}",
+               json.dumps({'members': names}), namespace, receivers_for(severity), NOTIFY_CONFIG['window'],
+               group_key=key, member_count=len(names), children=children)
+    logger.warning("Alert storm for %s: %d pods collapsed into one alert", key, len(names))
+
+def raise_alerts(rule_name, candidates):
+    """Create alerts for `candidates` [(cluster, namespace, object_name, severity, message, metadata)].
+
+    Objects with an open alert are skipped (one lookup per rule). Candidates
+    are grouped by group_key(); a group that is already in storm mode or has
+    storm_threshold pods in this check gets one aggregated alert instead, with
+    the pods listed in its metadata and open per-pod alerts of the group
+    attached as children. Per-pod alerts beyond the rule's rate limit are
+    collapsed into one aggregated alert per rule and cluster. Returns the
+    number of alert rows written.
+    """
+    rule = ALERT_RULES[rule_name]
+    # Zaten açık olanlar dahil tüm adaylar: hâlâ ateşleyen cluster'lar incident'te kalır
+    correlate_alerts(rule_name, candidates)
+    now = datetime.utcnow()
+    existing = {}
+    storms = {}
+    for alert in get_open_alerts(rule_name, now - timedelta(hours=1)):
+        if alert['group_key']:
+            storms[alert['group_key']] = alert
+        else:
+            existing[(alert['cluster'], _alert_object(alert['metadata']))] = alert
+    
+    groups = {}
+    for candidate in candidates:
+        groups.setdefault(group_key(rule_name, *candidate[:3]), []).append(candidate)
+    
+    budget = rule['rate_limit'] - count_alerts_since(rule_name, now - timedelta(minutes=ALERT_GROUPING['rate_window_minutes']))
+    written = 0
+    overflow = {}
+    for key, members in groups.items():
+        cluster, namespace = members[0][:2]
+        names = {f"{member[1]}/{member[2]}" for member in members}
+        storm = storms.get(key)
+        if storm is not None:
+            # Grup zaten storm modunda: sadece üye listesi ve last_seen güncellenir
+            merged = _merge_members(storm, names)
+            update_alert_group(storm['id'], f"{rule['name']}: {len(merged)} pods affected in {_storm_scope(rule_name, key)}",
+                               json.dumps({'members': merged}), len(merged))
+            continue
+        new = [member for member in members if (member[0], f"{member[1]}/{member[2]}") not in existing]
+        if not new:
+            continue
+        if len(members) >= rule['storm_threshold']:
+            children = [existing[(cluster, name)]['id'] for name in names
+                        if (cluster, name) in existing and existing[(cluster, name)]['parent_id'] is None]
+            _save_storm(rule_name, key, members, namespace, children)
+            budget -= 1
+            written += 1
+        elif len(new) > budget:
+            overflow.setdefault(cluster, []).extend(new)
+        else:
+            for cluster, namespace, object_name, severity, message, metadata in new:
+                save_alert(cluster, rule_name, severity, message, metadata, namespace,
+                           receivers_for(severity), NOTIFY_CONFIG['window'])
+                logger.info("Created %s alert for %s/%s/%s", rule_name, cluster, namespace, object_name)
+            budget -= len(new)
+            written += len(new)
+    
+    # Rate limit aşıldı: kalan pod'lar cluster başına tek alert'te toplanır
+    for cluster, members in overflow.items():
+        key = f"{rule_name}/{cluster}"
+        storm = storms.get(key)
+        if storm is not None:
+            merged = _merge_members(storm, {f"{member[1]}/{member[2]}" for member in members})
+            update_alert_group(storm['id'], f"{rule['name']}: {len(merged)} pods affected in {_storm_scope(rule_name, key)}",
+                               json.dumps({'members': merged}), len(merged))
+        else:
+            _save_storm(rule_name, key, members)
+            written += 1
+    return written
+
 def check_pod_restart_alerts():
     """Check for pods with high restart counts"""
-    print("[ALERTS] Checking pod restart alerts...")
+    logger.info("Checking pod restart alerts...")
     
     threshold_time = datetime.utcnow() - timedelta(hours=1)
     
-    with sqlite3.connect(DB_PATH) as conn:
-        c = conn.cursor()
-        c.execute("""
-        SELECT cluster, namespace, pod_name, MAX(restarts) as max_restarts
-        FROM pod_status 
-        WHERE timestamp >= ? AND restarts >= ?
-        GROUP BY cluster, namespace, pod_name
-        HAVING max_restarts >= ?
-        """, (threshold_time, 5, 5))
-        
-        pods = c.fetchall()
-        
-    for pod in pods:
-        cluster, namespace, pod_name, restart_count = pod
-        
-        # Check if alert already exists for this pod
-        if not alert_exists(cluster, 'pod_restart_high', f"{namespace}/{pod_name}"):
-            message = f"Pod {namespace}/{pod_name} has restarted {restart_count} times in the last hour"
-            alert_id = save_alert(cluster, 'pod_restart_high', 'warning', message, 
-                                f"pod={namespace}/{pod_name},restarts={restart_count}")
-            print(f"[ALERTS] Created restart alert for {cluster}/{namespace}/{pod_name}: {restart_count} restarts")
+    # Son bir saatteki restart artışları (kümülatif sayaç değil)
+    pods = analytics_query("pod_restart_scan", """
+    SELECT cluster, namespace, pod_name, SUM(delta) as restarts
+    FROM {restart_deltas} 
+    WHERE timestamp >= ?
+    GROUP BY cluster, namespace, pod_name
+    HAVING SUM(delta) >= ?
+    """, (threshold_time, 5), since=threshold_time)
+    
+    raise_alerts('pod_restart_high', [
+        (cluster, namespace, pod_name, 'warning',
+         f"Pod {namespace}/{pod_name} has restarted {restart_count} times in the last hour",
+         f"pod={namespace}/{pod_name},restarts={restart_count}")
+        for cluster, namespace, pod_name, restart_count in pods
+    ])
 
 def check_crashloop_alerts():
     """Check for pods in CrashLoopBackOff state"""
-    print("[ALERTS] Checking CrashLoopBackOff alerts...")
+    logger.info("Checking CrashLoopBackOff alerts...")
     
     threshold_time = datetime.utcnow() - timedelta(minutes=5)
     
     with sqlite3.connect(DB_PATH) as conn:
         c = conn.cursor()
-        c.execute("""
+        timed_query(c, "crashloop_scan", f"""
         SELECT DISTINCT cluster, namespace, pod_name
-        FROM pod_status 
+        FROM {source(c, "pod_status", threshold_time)} 
         WHERE timestamp >= ? AND status = 'CrashLoopBackOff'
         """, (threshold_time,))
         
         pods = c.fetchall()
         
-    for pod in pods:
-        cluster, namespace, pod_name = pod
-        
-        if not alert_exists(cluster, 'pod_crashloop', f"{namespace}/{pod_name}"):
-            message = f"Pod {namespace}/{pod_name} is in CrashLoopBackOff state"
-            alert_id = save_alert(cluster, 'pod_crashloop', 'critical', message,
-                                f"pod={namespace}/{pod_name}")
-            print(f"[ALERTS] Created CrashLoopBackOff alert for {cluster}/{namespace}/{pod_name}")
+    raise_alerts('pod_crashloop', [
+        (cluster, namespace, pod_name, 'critical', f"Pod {namespace}/{pod_name} is in CrashLoopBackOff state", f"pod={namespace}/{pod_name}")
+        for cluster, namespace, pod_name in pods
+    ])
 
 def check_event_based_alerts():
     """Check for alerts based on recent events"""
-    print("[ALERTS] Checking event-based alerts...")
+    logger.info("Checking event-based alerts...")
     
     threshold_time = datetime.utcnow() - timedelta(minutes=10)
     
-    with sqlite3.connect(DB_PATH) as conn:
-        c = conn.cursor()
-        # Check for failed events
-        c.execute("""
-        SELECT cluster, namespace, object_name, reason, message, COUNT(*) as event_count
-        FROM events 
-        WHERE timestamp >= ? AND (reason LIKE '%Failed%' OR reason LIKE '%Error%' OR reason = 'ImagePullBackOff')
-        GROUP BY cluster, namespace, object_name, reason
-        """, (threshold_time,))
-        
-        events = c.fetchall()
-        
+    # Check for failed events
+    events = analytics_query("event_alert_scan", """
+    SELECT cluster, namespace, object_name, reason, MAX(message), COUNT(*) as event_count
+    FROM {events} 
+    WHERE timestamp >= ? AND (reason LIKE '%Failed%' OR reason LIKE '%Error%' OR reason = 'ImagePullBackOff')
+    GROUP BY cluster, namespace, object_name, reason
+    """, (threshold_time,), since=threshold_time)
+    
+    candidates = {}
     for event in events:
         cluster, namespace, object_name, reason, message, count = event
         
         rule_name = 'pod_image_pull_failed' if 'ImagePull' in reason else 'pod_failed_event'
         severity = 'critical' if 'ImagePull' in reason or 'Failed' in reason else 'warning'
         
-        if not alert_exists(cluster, rule_name, f"{namespace}/{object_name}"):
-            alert_message = f"Pod {namespace}/{object_name}: {reason} - {message}"
-            if count > 1:
-                alert_message += f" (occurred {count} times)"
-                
-            alert_id = save_alert(cluster, rule_name, severity, alert_message,
-                                f"pod={namespace}/{object_name},reason={reason}")
-            print(f"[ALERTS] Created event-based alert for {cluster}/{namespace}/{object_name}: {reason}")
+        alert_message = f"Pod {namespace}/{object_name}: {reason} - {message}"
+        if count > 1:
+            alert_message += f" (occurred {count} times)"
+        candidates.setdefault(rule_name, []).append(
+            (cluster, namespace, object_name, severity, alert_message, f"pod={namespace}/{object_name},reason={reason}"))
+    
+    for rule_name, rule_candidates in candidates.items():
+        raise_alerts(rule_name, rule_candidates)
 
-def alert_exists(cluster, rule_name, object_identifier):
-    """Check if an active alert already exists for the same issue"""
-    with sqlite3.connect(DB_PATH) as conn:
-        c = conn.cursor()
-        c.execute("""
-        SELECT id FROM alerts 
-        WHERE cluster = ? AND rule_name = ? AND message LIKE ? AND status = 'active'
-        AND created_at >= ?
-        """, (cluster, rule_name, f"%{object_identifier}%", datetime.utcnow() - timedelta(hours=1)))
-        
-        return c.fetchone() is not None
+def oom_risk_pods():
+    """{(cluster, 'namespace/pod'): (ratio, eta, memory, limit)} for pods the pod_oom_risk rule matches"""
+    rule = ALERT_RULES['pod_oom_risk']
+    return {(cluster, f"{namespace}/{pod}"): (ratio, eta, memory, limit)
+            for cluster, namespace, pod, ratio, eta, memory, limit
+            in find_oom_risk(rule['threshold'], rule['horizon_minutes'] * 60, rule['trend_samples'], rule['trend_min_ratio'])}
+
+def check_oom_risk_alerts():
+    """Check pods whose memory is near its limit or growing towards it (usage ring buffers)"""
+    logger.info("Checking OOM risk alerts...")
+    
+    rule = ALERT_RULES['pod_oom_risk']
+    candidates = []
+    for (cluster, name), (ratio, eta, memory, limit) in oom_risk_pods().items():
+        namespace, pod_name = name.split("/", 1)
+        severity = 'critical' if ratio >= rule['critical_threshold'] else 'warning'
+        message = f"Pod {name} memory at {ratio:.0%} of its limit ({memory / 2 ** 20:.0f}/{limit / 2 ** 20:.0f} MiB)"
+        if eta <= rule['horizon_minutes'] * 60:
+            message += f", limit reached in ~{max(eta, 0) / 60:.0f} min at the current trend"
+        candidates.append((cluster, namespace, pod_name, severity, message, f"pod={name},ratio={ratio:.2f}"))
+    raise_alerts('pod_oom_risk', candidates)
+
+def check_event_rate_alerts():
+    """Check event rates per (cluster, namespace, reason) against their EWMA baselines"""
+    logger.info("Checking event rate anomalies...")
+    
+    rule = ALERT_RULES['event_rate_anomaly']
+    candidates = []
+    for cluster, namespace, reason, rate, baseline, z in find_rate_anomalies(rule['threshold'], rule['min_rate'], rule['warmup']):
+        severity = 'critical' if z >= rule['critical_threshold'] else 'warning'
+        message = f"{reason} events in {namespace} at {rate:.1f}/min, usually {baseline:.1f}/min (z={z:.1f})"
+        candidates.append((cluster, namespace, reason, severity, message, f"object={namespace}/{reason},rate={rate:.1f},z={z:.1f}"))
+    raise_alerts('event_rate_anomaly', candidates)
 
 def auto_resolve_alerts():
     """Auto-resolve alerts when conditions are no longer met"""
-    print("[ALERTS] Checking for alerts to auto-resolve...")
+    logger.info("Checking for alerts to auto-resolve...")
     
-    # Get active alerts
-    active_alerts = get_alerts(status='active', hours=168)
+    # Get active alerts (acknowledged alert'ler yeniden değerlendirilmez)
+    active_alerts = get_alerts(status='active', hours=168, include_children=True)
+    quiet_since = (datetime.utcnow() - timedelta(minutes=ALERT_GROUPING['storm_quiet_minutes'])).strftime("%Y-%m-%d %H:%M:%S")
+    oom_risk = None
     
     for alert in active_alerts:
         should_resolve = False
         
+        # Storm alert'i: grupta bir süredir yeni/devam eden pod görülmediyse
+        if alert['group_key']:
+            should_resolve = (alert['last_seen_at'] or alert['created_at']) < quiet_since
         # Check if pod restart alert should be resolved
-        if alert['rule_name'] == 'pod_restart_high':
+        elif alert['rule_name'] == 'pod_restart_high':
             should_resolve = check_pod_restart_resolved(alert)
         elif alert['rule_name'] == 'pod_crashloop':
             should_resolve = check_crashloop_resolved(alert)
+        elif alert['rule_name'] == 'pod_oom_risk':
+            # Tüm buffer'lar tek seferde değerlendirilir
+            if oom_risk is None:
+                oom_risk = oom_risk_pods()
+            should_resolve = check_oom_risk_resolved(alert, oom_risk)
+        elif alert['rule_name'] == 'event_rate_anomaly':
+            should_resolve = check_event_rate_resolved(alert)
             
         if should_resolve:
             from database import resolve_alert
             if resolve_alert(alert['id']):
-                print(f"[ALERTS] Auto-resolved alert {alert['id']}: {alert['rule_name']}")
+                logger.info("Auto-resolved alert %s: %s", alert['id'], alert['rule_name'])
 
 def check_pod_restart_resolved(alert):
     """Check if pod restart alert should be resolved"""
@@ -168,10 +384,10 @@ def check_pod_restart_resolved(alert):
             
             with sqlite3.connect(DB_PATH) as conn:
                 c = conn.cursor()
-                c.execute("""
-                SELECT COUNT(*) FROM pod_status 
+                timed_query(c, "restart_resolved_check", f"""
+                SELECT COUNT(*) FROM {source(c, "restart_deltas", threshold_time)} 
                 WHERE cluster = ? AND namespace = ? AND pod_name = ? 
-                AND timestamp >= ? AND restarts > 0
+                AND timestamp >= ?
                 """, (alert['cluster'], namespace, pod_name, threshold_time))
                 
                 recent_restarts = c.fetchone()[0]
@@ -192,8 +408,8 @@ def check_crashloop_resolved(alert):
             
             with sqlite3.connect(DB_PATH) as conn:
                 c = conn.cursor()
-                c.execute("""
-                SELECT status FROM pod_status 
+                timed_query(c, "crashloop_resolved_check", f"""
+                SELECT status FROM {source(c, "pod_status", threshold_time)} 
                 WHERE cluster = ? AND namespace = ? AND pod_name = ? 
                 AND timestamp >= ?
                 ORDER BY timestamp DESC LIMIT 1
@@ -206,20 +422,44 @@ def check_crashloop_resolved(alert):
             return False
     return False
 
+def check_oom_risk_resolved(alert, oom_risk):
+    """Resolve when the pod no longer matches the OOM-risk rule (`oom_risk` from oom_risk_pods())"""
+    if "Pod " in alert['message']:
+        pod_info = alert['message'].split("Pod ")[1].split(" memory at")[0]
+        return (alert['cluster'], pod_info) not in oom_risk
+    return False
+
+def check_event_rate_resolved(alert):
+    """Resolve when the last anomaly check no longer flagged the series"""
+    if " events in " in alert['message']:
+        reason, rest = alert['message'].split(" events in ", 1)
+        return (alert['cluster'], f"{rest.split(' at ')[0]}/{reason}") not in current_anomalies()
+    return False
+
 def run_alert_checks():
     """Run all alert checks"""
-    print("[ALERTS] Starting alert check cycle...")
+    logger.info("Starting alert check cycle...")
     
     try:
-        check_pod_restart_alerts()
-        check_crashloop_alerts() 
-        check_event_based_alerts()
-        auto_resolve_alerts()
+        with ALERT_CHECK_SECONDS.labels("pod_restart").time():
+            check_pod_restart_alerts()
+        with ALERT_CHECK_SECONDS.labels("crashloop").time():
+            check_crashloop_alerts()
+        with ALERT_CHECK_SECONDS.labels("event_based").time():
+            check_event_based_alerts()
+        with ALERT_CHECK_SECONDS.labels("oom_risk").time():
+            check_oom_risk_alerts()
+        with ALERT_CHECK_SECONDS.labels("event_rate").time():
+            check_event_rate_alerts()
+        with ALERT_CHECK_SECONDS.labels("auto_resolve").time():
+            auto_resolve_alerts()
         
-        print("[ALERTS] Alert check cycle completed")
+        logger.info("Alert check cycle completed")
         
     except Exception as e:
-        print(f"[ALERTS][ERROR] Alert check failed: {e}")
+        logger.error("Alert check failed: %s", e)
 
 if __name__ == "__main__":
+    from logging_config import setup_logging
+    setup_logging("alerts")
     run_alert_checks()
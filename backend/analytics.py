@@ -0,0 +1,149 @@
+"""In-process DuckDB mirror of the partitioned tables for aggregate queries.
+
+Point writes and row lookups stay on SQLite. Aggregates (GROUP BY scans,
+trends, top-N) run on a columnar in-memory DuckDB copy of `events` and
+`pod_status` that every process keeps for itself and refreshes before each
+query, only for the day partitions the query's time range touches:
+
+- a partition whose fingerprint (row count, max id, max timestamp) is
+  unchanged is skipped;
+- otherwise rows with a newer id or timestamp are replaced (inserts and
+  dedupe updates); if the row count still differs (rows moved or deleted)
+  the partition is reloaded;
+- partitions dropped by retention are removed using their id range.
+
+The first full sync of every table runs in a background thread (`warm`);
+until it is done queries stay on SQLite instead of waiting for it.
+
+duckdb and pyarrow are optional; without them `AnalyticsMirror` is never
+created and database.analytics_query() runs on SQLite. Both are imported
+when the first mirror is created, not at startup.
+"""
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from partitions import ID_SPAN, PARTITIONED_TABLES, as_day, day_number, list_partitions, partition_day
+from plugins import module_available
+
+ANALYTICS_AVAILABLE = module_available("duckdb", "pyarrow")
+
+logger = logging.getLogger(__name__)
+
+
+def _duck_type(declared):
+    declared = (declared or "").upper()
+    if "INT" in declared:
+        return "BIGINT"
+    if "REAL" in declared or "FLOA" in declared or "DOUB" in declared:
+        return "DOUBLE"
+    # Timestamps SQLite'taki gibi metin kalır, karşılaştırmalar aynı sonucu verir
+    return "VARCHAR"
+
+
+class AnalyticsMirror:
+    def __init__(self, db_path):
+        import duckdb
+        self.db_path = db_path
+        self.duck = duckdb.connect(":memory:")
+        self.columns = {}
+        # table -> {partition name: (row count, max id, max timestamp)}
+        self.synced = {table: {} for table in PARTITIONED_TABLES}
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.warming = None
+
+    def _ensure_table(self, c, table, partition):
+        if table in self.columns:
+            return
+        info = c.execute(f"PRAGMA table_info({partition})").fetchall()
+        self.columns[table] = [row[1] for row in info]
+        self.duck.execute(f"CREATE TABLE {table} ({', '.join(f'{row[1]} {_duck_type(row[2])}' for row in info)})")
+
+    def _load(self, table, rows, replace=False):
+        """Insert rows; with `replace`, mirrored rows with the same ids are dropped first"""
+        if not rows:
+            return
+        import pyarrow as pa
+        columns = self.columns[table]
+        batch = pa.table({name: [row[i] for row in rows] for i, name in enumerate(columns)})
+        self.duck.register("_batch", batch)
+        try:
+            if replace:
+                self.duck.execute(f"DELETE FROM {table} WHERE id IN (SELECT id FROM _batch)")
+            self.duck.execute(f"INSERT INTO {table} SELECT {', '.join(columns)} FROM _batch")
+        finally:
+            self.duck.unregister("_batch")
+
+    def _id_range(self, day):
+        start = day_number(day) * ID_SPAN
+        return start, start + ID_SPAN
+
+    def _sync_partition(self, c, table, day, name):
+        # Ayrı alt sorgular: her biri kendi index'ini kullanır (birleşik hali tabloyu tarar)
+        fingerprint = c.execute(f"SELECT (SELECT COUNT(*) FROM {name}), (SELECT MAX(id) FROM {name}), "
+                                f"(SELECT MAX(timestamp) FROM {name})").fetchone()
+        previous = self.synced[table].get(name)
+        if previous == fingerprint:
+            return
+        columns = ", ".join(self.columns[table])
+        low, high = self._id_range(day)
+        if previous is not None:
+            # Insert'ler ve dedupe update'leri timestamp'i "şimdi" yapar
+            rows = c.execute(f"SELECT {columns} FROM {name} WHERE timestamp > ?", (previous[2] or "",)).fetchall()
+            self._load(table, rows, replace=True)
+            mirrored = self.duck.execute(f"SELECT COUNT(*) FROM {table} WHERE id >= ? AND id < ?", [low, high]).fetchone()[0]
+            if mirrored == fingerprint[0]:
+                self.synced[table][name] = fingerprint
+                return
+        # Yeni ya da satır silinmiş/taşınmış partition: baştan yükle
+        self.duck.execute(f"DELETE FROM {table} WHERE id >= ? AND id < ?", [low, high])
+        self._load(table, c.execute(f"SELECT {columns} FROM {name}").fetchall())
+        self.synced[table][name] = fingerprint
+
+    def sync(self, table, since=None):
+        """Bring the mirror of `table` up to date for partitions from `since` on"""
+        since_day = as_day(since)
+        # Salt okunur: arka plandaki warm-up DB dosyası yoksa (silinmişse) yeniden oluşturmasın
+        with sqlite3.connect(Path(self.db_path).absolute().as_uri() + "?mode=ro", uri=True) as conn:
+            c = conn.cursor()
+            partitions = list_partitions(c, table)
+            if not partitions:
+                return
+            self._ensure_table(c, table, partitions[-1][1])
+            current = {name for _, name in partitions}
+            for name in [name for name in self.synced[table] if name not in current]:
+                # Retention ile silinen partition
+                low, high = self._id_range(partition_day(name))
+                self.duck.execute(f"DELETE FROM {table} WHERE id >= ? AND id < ?", [low, high])
+                del self.synced[table][name]
+            for day, name in partitions:
+                if since_day is None or day >= since_day:
+                    self._sync_partition(c, table, day, name)
+
+    def warm(self):
+        """Start the first full sync of every table in a daemon thread; `ready` is set when it is done"""
+        def run():
+            start = time.perf_counter()
+            try:
+                with self.lock:
+                    for table in PARTITIONED_TABLES:
+                        self.sync(table)
+            except Exception as e:
+                # Mirror hazır olmaz, sorgular SQLite'ta kalır
+                logger.warning("Analytics mirror warm-up failed: %s", e)
+                return
+            self.ready.set()
+            logger.info("Analytics mirror warmed up in %.1fs", time.perf_counter() - start)
+
+        self.warming = threading.Thread(target=run, name="analytics-warmup", daemon=True)
+        self.warming.start()
+        return self.warming
+
+    def query(self, sql, params, tables, since=None):
+        with self.lock:
+            for table in tables:
+                self.sync(table, since)
+            return self.duck.execute(sql, list(params)).fetchall()
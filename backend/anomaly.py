@@ -0,0 +1,186 @@
+"""Event-rate anomaly detection.
+
+Every alert cycle the event occurrences ingested since the previous cycle
+are counted per (cluster, namespace, reason) in one grouped query over
+`event_rates`, which save_events() fills with each batch's new occurrences
+(events.count is a running total once a row is deduplicated, so it cannot
+be summed per window). Their rates
+(events/minute) are compared with each series' exponentially weighted mean
+and variance. Baselines are kept as NumPy arrays with one column per series,
+so scoring and updating tens of thousands of series is a few vector
+operations rather than a loop of per-series queries. A series that was not
+seen in a cycle gets a rate of 0, so its baseline decays.
+
+The z-score uses max(variance, mean) as the variance: event counts are at
+least as noisy as a Poisson process, which keeps rare reasons with a flat
+history from scoring high on a single event. A series is only scored after
+`warmup` cycles. Baselines live in the process that runs the alert checks
+and start over when it restarts.
+
+numpy is optional; without it the check is skipped.
+"""
+import logging
+import os
+import sqlite3
+from datetime import datetime
+
+try:
+    import numpy as np
+    ANOMALY_AVAILABLE = True
+except ImportError:
+    ANOMALY_AVAILABLE = False
+
+import database
+from metrics import timed_query
+
+logger = logging.getLogger(__name__)
+
+ANOMALY_CONFIG = {
+    'enabled': os.environ.get("KUBEMON_ANOMALY", "1") != "0" and ANOMALY_AVAILABLE,
+    # EWMA ağırlığı: 0.1 ile baseline yaklaşık son 10 cycle'ı yansıtır
+    'alpha': float(os.environ.get("KUBEMON_ANOMALY_ALPHA", 0.1)),
+    'max_series': int(os.environ.get("KUBEMON_ANOMALY_MAX_SERIES", 100000)),
+    # Varyansın alt sınırı (events/min)^2, hiç değişmeyen seriler sıfıra bölünmesin
+    'min_variance': float(os.environ.get("KUBEMON_ANOMALY_MIN_VARIANCE", 0.25)),
+}
+
+# Baseline'ı bunun altına düşmüş seri boşta sayılır, kapasite dolunca column'u yeniden kullanılır
+_IDLE_RATE = 1e-3
+
+
+class RateBaselines:
+    """EWMA mean/variance of many rate series, one array column per series"""
+
+    def __init__(self, alpha=None, max_series=None, capacity=1024):
+        self.alpha = alpha if alpha is not None else ANOMALY_CONFIG['alpha']
+        self.max_series = max_series or ANOMALY_CONFIG['max_series']
+        self.index = {}  # key -> column
+        self.keys = []
+        capacity = min(capacity, self.max_series)
+        self.mean = np.zeros(capacity)
+        self.var = np.zeros(capacity)
+        self.samples = np.zeros(capacity, dtype=np.int32)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _grow(self):
+        capacity = min(len(self.mean) * 2, self.max_series)
+        for name in ("mean", "var", "samples"):
+            array = getattr(self, name)
+            grown = np.zeros(capacity, dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+
+    def _assign(self, key, rate):
+        column = len(self.keys)
+        if column >= self.max_series:
+            # Kapasite dolu: boşta kalmış bir serinin column'u devralınır
+            column = int(np.argmin(self.mean[:column]))
+            if self.mean[column] >= _IDLE_RATE:
+                return None
+            del self.index[self.keys[column]]
+            self.keys[column] = key
+        else:
+            if column >= len(self.mean):
+                self._grow()
+            self.keys.append(key)
+        self.index[key] = column
+        # İlk örnek baseline olur, z-score warmup'tan sonra hesaplanır
+        self.mean[column] = rate
+        self.var[column] = 0.0
+        self.samples[column] = 0
+        return column
+
+    def observe(self, rates, min_variance=None):
+        """Score one cycle of `rates` {key: events/min} against the baselines, then update them.
+
+        Series missing from `rates` count as 0. Returns (z, rate, baseline,
+        samples) arrays aligned with `self.keys`, with the scores and
+        baselines from before this cycle.
+        """
+        min_variance = ANOMALY_CONFIG['min_variance'] if min_variance is None else min_variance
+        columns = []
+        values = []
+        dropped = 0
+        for key, rate in rates.items():
+            column = self.index.get(key)
+            if column is None:
+                column = self._assign(key, rate)
+                if column is None:
+                    dropped += 1
+                    continue
+            columns.append(column)
+            values.append(rate)
+        if dropped:
+            logger.warning("Event rate baselines full, %d series not tracked (KUBEMON_ANOMALY_MAX_SERIES=%d)",
+                           dropped, self.max_series)
+
+        n = len(self.keys)
+        x = np.zeros(n)
+        x[columns] = values
+        mean, var = self.mean[:n], self.var[:n]
+        baseline = mean.copy()
+        z = (x - mean) / np.sqrt(np.maximum(np.maximum(var, mean), min_variance))
+        samples = self.samples[:n].copy()
+
+        # EWMA güncellemesi (West 1979): varyans da aynı ağırlıkla
+        diff = x - mean
+        increment = self.alpha * diff
+        mean += increment
+        var[:] = (1 - self.alpha) * (var + diff * increment)
+        self.samples[:n] += 1
+        return z, x, baseline, samples
+
+
+_baselines = None
+_window_start = None
+_last_anomalies = set()
+
+
+def window_counts(start, end):
+    """{(cluster, namespace, reason): new occurrences} ingested in [start, end)"""
+    with sqlite3.connect(database.DB_PATH) as conn:
+        c = conn.cursor()
+        timed_query(c, "event_rate_scan", """
+        SELECT cluster, namespace, reason, SUM(count)
+        FROM event_rates
+        WHERE timestamp >= ? AND timestamp < ?
+        GROUP BY cluster, namespace, reason
+        """, (start, end))
+        rows = c.fetchall()
+    return {(cluster, namespace, reason): count for cluster, namespace, reason, count in rows}
+
+
+def find_rate_anomalies(threshold, min_rate, warmup, now=None):
+    """[(cluster, namespace, reason, rate, baseline, z)] for series whose rate this cycle is anomalous.
+
+    Call once per alert cycle: every call scores the events since the
+    previous call and moves the baselines forward. The first call only
+    starts the window.
+    """
+    global _baselines, _window_start, _last_anomalies
+    if not ANOMALY_CONFIG['enabled']:
+        return []
+    now = (now or datetime.utcnow()).replace(microsecond=0)
+    start = _window_start
+    if start is None or now <= start:
+        _window_start = now
+        return []
+    minutes = (now - start).total_seconds() / 60
+    counts = window_counts(start, now)
+    _window_start = now
+    if _baselines is None:
+        _baselines = RateBaselines()
+
+    z, rate, baseline, samples = _baselines.observe({key: count / minutes for key, count in counts.items()})
+    flagged = np.flatnonzero((samples >= warmup) & (z >= threshold) & (rate >= min_rate))
+    result = [(*_baselines.keys[i], float(rate[i]), float(baseline[i]), float(z[i])) for i in flagged]
+    _last_anomalies = {(cluster, f"{namespace}/{reason}") for cluster, namespace, reason, *_ in result}
+    logger.debug("Scored %d event rate series in %.1f min window, %d anomalous", len(_baselines), minutes, len(result))
+    return result
+
+
+def current_anomalies():
+    """{(cluster, 'namespace/reason')} flagged by the last find_rate_anomalies() call"""
+    return _last_anomalies
@@ -1,70 +1,139 @@
-from flask import Flask, jsonify, request
+import logging
+import time
+from flask import Flask, Response, g, jsonify, request
 from flask_cors import CORS
 import sqlite3
 import os
-from datetime import datetime, timedelta
+from datetime import datetime
 from cluster_config import should_include_namespace
+from cluster_registry import list_clusters
+from database import (ALERT_COLUMNS, EVENT_COLUMNS, get_cluster_health, get_current_pods, get_problem_pods,
+                      query_cache_stats, warm_analytics)
+from encoding import UnsupportedFormat, compress_response, encode_rows, negotiate_format
+from logging_config import setup_logging
+from metrics import API_REQUEST_SECONDS, CONTENT_TYPE_LATEST, register_process_exit, render_latest
+from plugins import get_plugin
+from snapshot import current_snapshot, invalidate_snapshot
+
+logger = logging.getLogger("api")
+if __name__ == "__main__":
+    setup_logging("api")
 
 app = Flask(__name__)
 CORS(app, origins=["*"], methods=["GET", "POST", "OPTIONS"], allow_headers=["Content-Type", "Authorization"])
-DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "pod_status.db"))
 
-# Import Event Analyzer service
-try:
-    from ai_service import event_analyzer
-    AI_ENABLED = True
-    print("[API][INFO] Event Analyzer service loaded successfully")
-except ImportError as e:
-    print(f"[API][WARNING] Event Analyzer not available: {e}")
-    AI_ENABLED = False
+# Event Analyzer (openai) ilk /api/events/analyze isteğinde yüklenir, bkz. plugins.py
+API_PORT = int(os.environ.get("KUBEMON_API_PORT", 8000))
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_latency(response):
+    start = g.pop("request_start", None)
+    if start is not None:
+        # Route kuralını kullan ki /api/alerts/<id> gibi path'ler tek seri olsun
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        API_REQUEST_SECONDS.labels(route, request.method, str(response.status_code)).observe(time.perf_counter() - start)
+    return response
+
+# after_request hook'ları ters sırada çalışır: sıkıştırma süresi de latency'ye dahil
+@app.after_request
+def compress(response):
+    return compress_response(response, request.accept_encodings)
+
+POD_COLUMNS = ("cluster", "namespace", "name", "status", "restarts", "timestamp")
+
+def rows_response(columns, rows):
+    """List endpoint response in the negotiated format (json, columnar or msgpack)"""
+    try:
+        fmt = negotiate_format(request.args, request.accept_mimetypes)
+    except UnsupportedFormat as e:
+        return jsonify({"error": str(e)}), e.status
+    body, mimetype = encode_rows(columns, rows, fmt)
+    return Response(body, mimetype=mimetype)
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(render_latest(), content_type=CONTENT_TYPE_LATEST)
 
 @app.route("/api/pods", methods=["GET"])
 def get_pods():
     cluster = request.args.get("cluster")
     hours = request.args.get("hours", default=24, type=int)
-    threshold = (datetime.utcnow() - timedelta(hours=hours)).strftime("%Y-%m-%d %H:%M:%S")
-    with sqlite3.connect(DB_PATH) as conn:
-        c = conn.cursor()
-        if cluster:
-            c.execute("SELECT cluster, namespace, pod_name, status, restarts, timestamp FROM pod_status WHERE cluster = ? AND timestamp >= ? AND (restarts > 0 OR status = ?) ORDER BY timestamp DESC", (cluster, threshold, "CrashLoopBackOff"))
+    if request.args.get("current", "false").lower() in ("1", "true", "yes"):
+        # current=1: pod başına sadece son durum, collector'ın snapshot'ından; yoksa aynı sorgu SQLite'ta
+        snapshot = current_snapshot()
+        if snapshot is not None and snapshot.hours == hours:
+            rows = snapshot.current_pods(cluster)
         else:
-            c.execute("SELECT cluster, namespace, pod_name, status, restarts, timestamp FROM pod_status WHERE timestamp >= ? AND (restarts > 0 OR status = ?) ORDER BY timestamp DESC", (threshold, "CrashLoopBackOff"))
-        rows = c.fetchall()
+            rows = get_current_pods(cluster=cluster, hours=hours)
+        return rows_response(POD_COLUMNS, [row for row in rows if should_include_namespace(row[0], row[1])])
+    rows = get_problem_pods(cluster=cluster, hours=hours)
     
     # Namespace filtering uygula
-    filtered_pods = []
-    for row in rows:
-        cluster_name = row[0]
-        namespace = row[1]
-        
-        # Bu namespace'i göster mi?
-        if should_include_namespace(cluster_name, namespace):
-            filtered_pods.append({
-                "cluster": row[0],
-                "namespace": row[1],
-                "name": row[2],
-                "status": row[3],
-                "restarts": row[4],
-                "timestamp": row[5],
-            })
+    filtered_pods = [row for row in rows if should_include_namespace(row[0], row[1])]
     
-    print(f"[API] Pods: {len(rows)} total -> {len(filtered_pods)} filtered for cluster {cluster}")
-    return jsonify(filtered_pods)
+    logger.debug("Pods: %s total -> %s filtered for cluster %s", len(rows), len(filtered_pods), cluster)
+    return rows_response(POD_COLUMNS, filtered_pods)
+
+@app.route("/api/summary", methods=["GET"])
+def get_summary_api():
+    """Pre-aggregated landing page data: pod health, namespaces, top restarting pods, alerts"""
+    from database import get_summary
+    cluster = request.args.get("cluster")
+    hours = request.args.get("hours", default=24, type=int)
+    top = request.args.get("top", default=10, type=int)
+    if hours <= 0:
+        return jsonify({"error": "hours must be positive"}), 400
+    # Negatif top listeyi sondan keser, çok büyük top snapshot'ın summary cache'ini şişirir
+    if not 1 <= top <= 100:
+        return jsonify({"error": "top must be between 1 and 100"}), 400
+    try:
+        # Snapshot'ın penceresiyle aynıysa SQLite'a hiç gidilmez
+        snapshot = current_snapshot()
+        if snapshot is not None and snapshot.hours == hours:
+            return jsonify(snapshot.summary(cluster, top, should_include_namespace))
+        # Namespace filtering uygula
+        summary = get_summary(cluster=cluster, hours=hours, top=top, include=should_include_namespace)
+        return jsonify(summary)
+    except Exception as e:
+        logger.error("Failed to build summary: %s", e)
+        return jsonify({"error": "Failed to fetch summary"}), 500
 
 @app.route("/api/clusters", methods=["GET"])
 def get_clusters():
-    cluster_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "clusters"))
+    snapshot = current_snapshot()
+    try:
+        health = snapshot.cluster_health() if snapshot is not None else get_cluster_health()
+    except sqlite3.Error as e:
+        # Collector henüz DB'yi oluşturmamış olabilir
+        logger.warning("Cluster health not available: %s", e)
+        health = {}
     clusters = []
-    for file in os.listdir(cluster_dir):
-        if file.startswith("admin-") and file.endswith(".conf"):
-            name = file.replace("admin-", "").replace(".conf", "").lower()
-            clusters.append({"label": name.capitalize(), "value": name})
+    for name, cluster in list_clusters().items():
+        cluster_health = health.get(name)
+        if cluster_health is None:
+            status = "unknown"
+        else:
+            status = "failing" if cluster_health["consecutive_failures"] else "ok"
+        clusters.append({
+            "label": cluster["label"],
+            "value": name,
+            "health": {"status": status, **(cluster_health or {})},
+        })
     clusters = sorted(clusters, key=lambda x: x["label"])
     return jsonify(clusters)
 
 @app.route("/api/healthz", methods=["GET"])
 def healthz():
-    return jsonify({"status": "ok", "port": 8000, "timestamp": datetime.utcnow().isoformat()}), 200
+    return jsonify({"status": "ok", "port": API_PORT, "timestamp": datetime.utcnow().isoformat()}), 200
+
+@app.route("/api/cache/stats", methods=["GET"])
+def get_cache_stats():
+    """Query result cache hit rate and size of this API process"""
+    return jsonify(query_cache_stats())
 
 @app.route("/healthz", methods=["GET"])
 def healthz_simple():
@@ -77,24 +146,111 @@ def get_events_api():
     hours = request.args.get("hours", default=24, type=int)
     limit = request.args.get("limit", default=100, type=int)
     
-    print(f"[API] Events request - cluster: {cluster}, category: {event_category}, hours: {hours}")
+    logger.debug("Events request - cluster: %s, category: %s, hours: %s", cluster, event_category, hours)
     
     try:
         from database import get_events_by_category
-        events = get_events_by_category(cluster=cluster, category=event_category, hours=hours, limit=limit)
+        events = get_events_by_category(cluster=cluster, category=event_category, hours=hours, limit=limit, as_rows=True)
         
-        # Namespace filtering uygula
-        filtered_events = []
-        for event in events:
-            if should_include_namespace(event.get('cluster'), event.get('namespace')):
-                filtered_events.append(event)
+        # Namespace filtering uygula (satırlar EVENT_COLUMNS sırasında)
+        filtered_events = [event for event in events if should_include_namespace(event[1], event[2])]
         
-        print(f"[API] Events: {len(events)} total -> {len(filtered_events)} filtered for cluster {cluster}")
-        return jsonify(filtered_events)
+        logger.debug("Events: %s total -> %s filtered for cluster %s", len(events), len(filtered_events), cluster)
+        return rows_response(EVENT_COLUMNS, filtered_events)
     except Exception as e:
-        print(f"[API][ERROR] Failed to get events: {e}")
+        logger.error("Failed to get events: %s", e)
         return jsonify({"error": "Failed to fetch events"}), 500
 
+@app.route("/api/events/trend", methods=["GET"])
+def get_event_trend_api():
+    """Hourly event totals per event type over the last `hours`"""
+    from database import get_event_trend
+    hours = request.args.get("hours", default=24, type=int)
+    if hours <= 0:
+        return jsonify({"error": "hours must be positive"}), 400
+    try:
+        return jsonify(get_event_trend(cluster=request.args.get("cluster"), hours=hours))
+    except Exception as e:
+        logger.error("Failed to get event trend: %s", e)
+        return jsonify({"error": "Failed to fetch event trend"}), 500
+
+@app.route("/api/events/top-reasons", methods=["GET"])
+def get_top_event_reasons_api():
+    """Most frequent (cluster, reason) pairs over the last `hours`"""
+    from database import get_top_event_reasons
+    hours = request.args.get("hours", default=24, type=int)
+    limit = request.args.get("limit", default=10, type=int)
+    if hours <= 0:
+        return jsonify({"error": "hours must be positive"}), 400
+    if not 1 <= limit <= 100:
+        return jsonify({"error": "limit must be between 1 and 100"}), 400
+    try:
+        return jsonify(get_top_event_reasons(hours=hours, limit=limit))
+    except Exception as e:
+        logger.error("Failed to get top event reasons: %s", e)
+        return jsonify({"error": "Failed to fetch top event reasons"}), 500
+
+@app.route("/api/restarts", methods=["GET"])
+def get_restarts_api():
+    """Restart-rate time series per cluster, namespace or pod"""
+    from database import RESTART_BUCKETS, RESTART_GROUPS, get_restart_series
+    bucket = request.args.get("bucket", default="hour")
+    group_by = request.args.get("group_by")
+    if bucket not in RESTART_BUCKETS:
+        return jsonify({"error": f"bucket must be one of {', '.join(RESTART_BUCKETS)}"}), 400
+    if group_by and group_by not in RESTART_GROUPS:
+        return jsonify({"error": f"group_by must be one of {', '.join(RESTART_GROUPS)}"}), 400
+    try:
+        series = get_restart_series(
+            cluster=request.args.get("cluster"),
+            namespace=request.args.get("namespace"),
+            pod=request.args.get("pod"),
+            hours=request.args.get("hours", default=24, type=int),
+            bucket=bucket,
+            group_by=group_by,
+            # Namespace filtering uygula
+            include=should_include_namespace,
+        )
+        return jsonify(series)
+    except Exception as e:
+        logger.error("Failed to get restart series: %s", e)
+        return jsonify({"error": "Failed to fetch restart series"}), 500
+
+@app.route("/api/usage", methods=["GET"])
+def get_usage_api():
+    """Recent CPU/memory series per pod, served from the collector's ring buffers"""
+    from usage import get_usage_series
+    try:
+        series = get_usage_series(
+            cluster=request.args.get("cluster"),
+            namespace=request.args.get("namespace"),
+            pod=request.args.get("pod"),
+            minutes=request.args.get("minutes", default=60, type=int),
+            include=should_include_namespace,
+        )
+        return jsonify(series)
+    except Exception as e:
+        logger.error("Failed to get usage series: %s", e)
+        return jsonify({"error": "Failed to fetch usage"}), 500
+
+@app.route("/api/usage/top", methods=["GET"])
+def get_top_usage_api():
+    """Pods with the highest latest cpu, memory or memory/limit ratio"""
+    from usage import USAGE_METRICS, get_top_usage
+    metric = request.args.get("metric", default="memory")
+    if metric not in USAGE_METRICS:
+        return jsonify({"error": f"metric must be one of {', '.join(USAGE_METRICS)}"}), 400
+    try:
+        return jsonify(get_top_usage(
+            cluster=request.args.get("cluster"),
+            metric=metric,
+            limit=request.args.get("limit", default=20, type=int),
+            include=should_include_namespace,
+        ))
+    except Exception as e:
+        logger.error("Failed to get top usage: %s", e)
+        return jsonify({"error": "Failed to fetch usage"}), 500
+
 @app.route("/api/alerts", methods=["GET"])
 def get_alerts_api():
     cluster = request.args.get("cluster")
@@ -102,23 +258,32 @@ def get_alerts_api():
     severity = request.args.get("severity")
     hours = request.args.get("hours", default=168, type=int)  # Default 7 days
     limit = request.args.get("limit", default=100, type=int)
+    # Storm alert'lerinin altındaki pod alert'leri sadece istenirse
+    parent_id = request.args.get("parent_id", type=int)
+    include_children = request.args.get("include_children", "false").lower() in ("1", "true", "yes")
     
-    print(f"[API] Alerts request - cluster: {cluster}, status: {status}, severity: {severity}, hours: {hours}")
+    logger.debug("Alerts request - cluster: %s, status: %s, severity: %s, hours: %s", cluster, status, severity, hours)
     
     try:
         from database import get_alerts
-        alerts = get_alerts(cluster=cluster, status=status, severity=severity, hours=hours, limit=limit)
+        snapshot = current_snapshot() if status == "active" else None
+        if snapshot is not None:
+            alerts = snapshot.alert_rows(cluster=cluster, severity=severity, hours=hours, limit=limit,
+                                         parent_id=parent_id, include_children=include_children)
+        else:
+            alerts = get_alerts(cluster=cluster, status=status, severity=severity, hours=hours, limit=limit, as_rows=True,
+                                parent_id=parent_id, include_children=include_children)
         
         # Namespace filtering uygula (alert mesajlarındaki pod bilgilerini kontrol et)
         filtered_alerts = []
         for alert in alerts:
             # Alert'in cluster'ı filtre ile eşleşmiyorsa skip et
-            if cluster and cluster != 'all' and alert.get('cluster') != cluster:
+            if cluster and cluster != 'all' and alert[1] != cluster:
                 continue
                 
-            # Alert mesajından namespace bilgisini çıkarmaya çalış
-            alert_message = alert.get('message', '')
-            alert_cluster = alert.get('cluster', '')
+            # Alert mesajından namespace bilgisini çıkarmaya çalış (satırlar ALERT_COLUMNS sırasında)
+            alert_message = alert[4] or ''
+            alert_cluster = alert[1] or ''
             
             # Pod: namespace/podname formatındaki mesajları kontrol et
             if 'Pod ' in alert_message and '/' in alert_message:
@@ -141,10 +306,10 @@ def get_alerts_api():
                 # Pod mesajı değilse alert'i ekle
                 filtered_alerts.append(alert)
         
-        print(f"[API] Alerts: {len(alerts)} total -> {len(filtered_alerts)} filtered for cluster {cluster}")
-        return jsonify(filtered_alerts)
+        logger.debug("Alerts: %s total -> %s filtered for cluster %s", len(alerts), len(filtered_alerts), cluster)
+        return rows_response(ALERT_COLUMNS, filtered_alerts)
     except Exception as e:
-        print(f"[API][ERROR] Failed to get alerts: {e}")
+        logger.error("Failed to get alerts: %s", e)
         return jsonify({"error": "Failed to fetch alerts"}), 500
 
 @app.route("/api/alerts/<int:alert_id>/resolve", methods=["POST"])
@@ -152,13 +317,60 @@ def resolve_alert_api(alert_id):
     try:
         from database import resolve_alert
         if resolve_alert(alert_id):
+            invalidate_snapshot()
             return jsonify({"message": "Alert resolved successfully"}), 200
         else:
             return jsonify({"error": "Alert not found or already resolved"}), 404
     except Exception as e:
-        print(f"[API][ERROR] Failed to resolve alert {alert_id}: {e}")
+        logger.error("Failed to resolve alert %s: %s", alert_id, e)
         return jsonify({"error": "Failed to resolve alert"}), 500
 
+@app.route("/api/alerts/<int:alert_id>/acknowledge", methods=["POST"])
+def acknowledge_alert_api(alert_id):
+    try:
+        from database import acknowledge_alert
+        if acknowledge_alert(alert_id):
+            invalidate_snapshot()
+            return jsonify({"message": "Alert acknowledged successfully"}), 200
+        else:
+            return jsonify({"error": "Alert not found or not active"}), 404
+    except Exception as e:
+        logger.error("Failed to acknowledge alert %s: %s", alert_id, e)
+        return jsonify({"error": "Failed to acknowledge alert"}), 500
+
+def bulk_alert_action(action):
+    """Body: {"ids": [...]} and/or filters (cluster, rule_name, severity, namespace, older_than_hours)"""
+    from database import ALERT_FILTERS, update_alerts
+    data = request.get_json(silent=True) or {}
+    ids = data.get("ids")
+    if ids is not None and (not isinstance(ids, list) or not ids or
+                            not all(isinstance(i, int) and not isinstance(i, bool) for i in ids)):
+        return jsonify({"error": "ids must be a non-empty list of integers"}), 400
+    older_than_hours = data.get("older_than_hours")
+    if older_than_hours is not None and (not isinstance(older_than_hours, (int, float)) or isinstance(older_than_hours, bool)):
+        return jsonify({"error": "older_than_hours must be a number"}), 400
+    try:
+        affected = update_alerts(action, ids=ids, older_than_hours=older_than_hours,
+                                 **{name: data.get(name) for name in ALERT_FILTERS})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error("Bulk alert %s failed: %s", action, e)
+        return jsonify({"error": f"Failed to {action} alerts"}), 500
+    logger.info("Bulk alert %s: %s alerts", action, affected)
+    if affected:
+        # Snapshot'taki aktif alert'ler eskidi, collector yenisini yazana kadar SQLite
+        invalidate_snapshot()
+    return jsonify({"action": action, "requested": len(ids) if ids is not None else None, "affected": affected}), 200
+
+@app.route("/api/alerts/resolve", methods=["POST"])
+def bulk_resolve_alerts_api():
+    return bulk_alert_action("resolve")
+
+@app.route("/api/alerts/acknowledge", methods=["POST"])
+def bulk_acknowledge_alerts_api():
+    return bulk_alert_action("acknowledge")
+
 @app.route("/api/alerts/stats", methods=["GET"])
 def get_alert_stats():
     try:
@@ -182,14 +394,44 @@ def get_alert_stats():
         
         return jsonify(stats)
     except Exception as e:
-        print(f"[API][ERROR] Failed to get alert stats: {e}")
+        logger.error("Failed to get alert stats: %s", e)
         return jsonify({"error": "Failed to fetch alert statistics"}), 500
 
+@app.route("/api/incidents", methods=["GET"])
+def get_incidents_api():
+    """Incidents correlated across clusters by event/alert signature"""
+    status = request.args.get("status")
+    hours = request.args.get("hours", default=24, type=int)
+    limit = request.args.get("limit", default=100, type=int)
+    min_clusters = request.args.get("min_clusters", type=int)
+    if status not in (None, "active", "resolved"):
+        return jsonify({"error": "status must be active or resolved"}), 400
+    try:
+        from correlation import get_incidents
+        return jsonify(get_incidents(status=status, hours=hours, limit=limit, min_clusters=min_clusters,
+                                     include=should_include_namespace))
+    except Exception as e:
+        logger.error("Failed to get incidents: %s", e)
+        return jsonify({"error": "Failed to fetch incidents"}), 500
+
+@app.route("/api/incidents/<int:incident_id>", methods=["GET"])
+def get_incident_api(incident_id):
+    try:
+        from correlation import get_incident
+        incident = get_incident(incident_id, include=should_include_namespace)
+    except Exception as e:
+        logger.error("Failed to get incident %s: %s", incident_id, e)
+        return jsonify({"error": "Failed to fetch incident"}), 500
+    if incident is None:
+        return jsonify({"error": "Incident not found"}), 404
+    return jsonify(incident)
+
 # Event AI Analyzer Endpoints
 @app.route("/api/events/analyze", methods=["POST"])
 def analyze_events():
     """Analyze events with AI for a specific cluster"""
-    if not AI_ENABLED or not event_analyzer.is_enabled():
+    event_analyzer = get_plugin("ai")
+    if event_analyzer is None or not event_analyzer.is_enabled():
         return jsonify({"error": "Event Analyzer not available"}), 503
     data = request.get_json()
     if not data or 'cluster' not in data:
@@ -201,13 +443,14 @@ def analyze_events():
         analysis = asyncio.run(event_analyzer.analyze_cluster_events(cluster, hours))
         return jsonify(analysis)
     except Exception as e:
-        print(f"[API][ERROR] Event analysis failed: {e}")
+        logger.error("Event analysis failed: %s", e)
         return jsonify({"error": f"Analysis failed: {str(e)}"}), 500
 
 @app.route("/api/events/ai-status", methods=["GET"])
 def events_ai_status():
     """Check Event Analyzer availability"""
-    if not AI_ENABLED:
+    event_analyzer = get_plugin("ai")
+    if event_analyzer is None:
         return jsonify({"available": False, "reason": "Event Analyzer not loaded"}), 503
     
     is_enabled = event_analyzer.is_enabled()
@@ -218,5 +461,8 @@ def events_ai_status():
     })
 
 if __name__ == "__main__":
-    print(f"[API] Starting Flask API on 0.0.0.0:8000")
-    app.run(host="0.0.0.0", port=8000, debug=False)
+    register_process_exit()
+    # DuckDB mirror'ın ilk tam senkronu arka planda, ilk istek beklemesin
+    warm_analytics()
+    logger.info("Starting Flask API on 0.0.0.0:%s", API_PORT)
+    app.run(host="0.0.0.0", port=API_PORT, debug=False)
@@ -0,0 +1,237 @@
+"""Cold-tier archive for rows that leave the hot SQLite tables.
+
+Expired event partitions and old resolved alerts are written to compressed
+Parquet segment files (zstd by default) instead of being deleted, and every
+segment's time range is recorded in the `archive_segments` table. Readers
+call `read_through()` with their time range: only segments overlapping it are
+opened, only the requested columns are decompressed, and the matching rows
+(only the newest ones for a limited query) are loaded into a TEMP table that
+the query unions with the hot data.
+
+pyarrow is optional. Without it nothing is archived (retention deletes as
+before) and read-through is a no-op. It is imported on the first export or
+segment read, not at startup.
+"""
+import logging
+import os
+import time
+
+from metrics import timed_query
+from plugins import module_available
+
+ARCHIVE_AVAILABLE = module_available("pyarrow")
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = os.environ.get("KUBEMON_ARCHIVE_DIR", os.path.join("data", "archive"))
+ARCHIVE_COMPRESSION = os.environ.get("KUBEMON_ARCHIVE_COMPRESSION", "zstd")
+ARCHIVE_ENABLED = os.environ.get("KUBEMON_ARCHIVE", "1") != "0" and ARCHIVE_AVAILABLE
+# Segment dosyaları bu kadar gün saklanır (0 = süresiz)
+ARCHIVE_RETENTION_DAYS = int(os.environ.get("KUBEMON_ARCHIVE_RETENTION_DAYS", 365))
+
+# Arşivlenen tablo -> segment zaman aralığını belirleyen kolon
+TIME_COLUMNS = {
+    "events": "timestamp",
+    "alerts": "created_at",
+}
+
+_BATCH_ROWS = 50000
+
+
+def init_archive(c):
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS archive_segments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT,
+        day TEXT,
+        path TEXT,
+        min_ts DATETIME,
+        max_ts DATETIME,
+        row_count INTEGER,
+        bytes INTEGER,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_archive_segments_range ON archive_segments (table_name, max_ts)")
+
+
+def _arrow_type(declared):
+    import pyarrow as pa
+    declared = (declared or "").upper()
+    if "INT" in declared or declared == "BOOLEAN":
+        return pa.int64()
+    if "REAL" in declared or "FLOA" in declared or "DOUB" in declared:
+        return pa.float64()
+    return pa.string()
+
+
+def _schema(c, source_table):
+    import pyarrow as pa
+    columns = c.execute(f"PRAGMA table_info({source_table})").fetchall()
+    return pa.schema([(column[1], _arrow_type(column[2])) for column in columns])
+
+
+def _as_text(value):
+    return value if value is None or isinstance(value, str) else str(value)
+
+
+def write_segment(c, table, source_table, day, where="1", params=()):
+    """Write rows of `source_table` matching `where` to a new segment file of `table`.
+
+    Rows are streamed in batches and nothing is written to the database, so
+    this can run outside the write transaction. Returns the segment for
+    register_segment(), or None when no rows matched.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = _schema(c, source_table)
+    time_column = TIME_COLUMNS[table]
+    string_columns = {field.name for field in schema if field.type == pa.string()}
+    directory = os.path.join(ARCHIVE_DIR, table)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{day:%Y%m%d}-{time.time_ns()}.parquet")
+    tmp_path = path + ".tmp"
+
+    rows_written = 0
+    min_ts = max_ts = None
+    timed_query(c, "archive_export", f"SELECT * FROM {source_table} WHERE {where} ORDER BY {time_column}", params)
+    writer = None
+    try:
+        while True:
+            rows = c.fetchmany(_BATCH_ROWS)
+            if not rows:
+                break
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, schema, compression=ARCHIVE_COMPRESSION)
+            columns = []
+            for i, field in enumerate(schema):
+                values = [row[i] for row in rows]
+                if field.name in string_columns:
+                    values = [_as_text(value) for value in values]
+                columns.append(pa.array(values, type=field.type))
+            writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+            times = [value for value in columns[schema.get_field_index(time_column)].to_pylist() if value]
+            if times:
+                min_ts = min(times) if min_ts is None else min(min_ts, min(times))
+                max_ts = max(times) if max_ts is None else max(max_ts, max(times))
+            rows_written += len(rows)
+    finally:
+        if writer is not None:
+            writer.close()
+    if not rows_written:
+        return None
+
+    os.replace(tmp_path, path)
+    return (day.isoformat(), path, min_ts, max_ts, rows_written, os.path.getsize(path))
+
+
+def register_segment(c, table, segment):
+    """Record a written segment in archive_segments (the caller commits); returns its row count"""
+    timed_query(c, "archive_segment_insert", """
+    INSERT INTO archive_segments (table_name, day, path, min_ts, max_ts, row_count, bytes)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, (table, *segment))
+    logger.info("Archived %d %s rows to %s", segment[4], table, segment[1])
+    return segment[4]
+
+
+def discard_segment(segment):
+    """Remove a written segment that was never registered"""
+    try:
+        os.remove(segment[1])
+    except FileNotFoundError:
+        pass
+
+
+def export_segment(c, table, source_table, day, where="1", params=()):
+    """write_segment() and register_segment() on the cursor's connection; returns the number of archived rows"""
+    segment = write_segment(c, table, source_table, day, where, params)
+    return register_segment(c, table, segment) if segment else 0
+
+
+def segments_for(c, table, since, until=None):
+    """Paths of the segments of `table` that may hold rows in [since, until]"""
+    query = "SELECT path FROM archive_segments WHERE table_name = ? AND max_ts >= ?"
+    params = [table, str(since)]
+    if until is not None:
+        query += " AND min_ts <= ?"
+        params.append(str(until))
+    timed_query(c, "archive_segments_lookup", query + " ORDER BY min_ts", params)
+    return [row[0] for row in c.fetchall()]
+
+
+def read_through(c, table, hot_source, columns, since, until=None, equals=None, limit=None):
+    """FROM clause fragment: `hot_source` plus the archived rows in the time range.
+
+    Only the overlapping segments and the given columns are read (columns a
+    segment predates read as NULL); `equals` ({column: value}, None for IS
+    NULL) is pushed down into the segment scan as well. With `limit` only
+    the `limit` newest archived rows are loaded, so pass it only when every
+    other condition of the query is in `equals`. Returns `hot_source`
+    unchanged when nothing archived is in range.
+    """
+    if not ARCHIVE_AVAILABLE:
+        return hot_source
+    paths = segments_for(c, table, since, until)
+    if not paths:
+        return hot_source
+
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    time_column = TIME_COLUMNS[table]
+    temp_table = f"archived_{table}"
+    column_list = ", ".join(columns)
+    c.execute(f"DROP TABLE IF EXISTS temp.{temp_table}")
+    c.execute(f"CREATE TEMP TABLE {temp_table} ({column_list})")
+
+    loaded = []
+    for path in paths:
+        try:
+            # Kolon sonradan eklendiyse eski segmentlerde yoktur, NULL okunur
+            names = pq.read_schema(path).names
+            if any(value is not None and column not in names for column, value in (equals or {}).items()):
+                continue
+            condition = pc.field(time_column) >= str(since)
+            if until is not None:
+                condition &= pc.field(time_column) <= str(until)
+            for column, value in (equals or {}).items():
+                if column in names:
+                    condition &= pc.field(column).is_null() if value is None else pc.field(column) == value
+            present = [name for name in columns if name in names]
+            segment = pq.read_table(path, columns=present, filters=condition)
+        except (OSError, ValueError, pa.ArrowException) as e:
+            logger.error("Failed to read archive segment %s: %s", path, e)
+            continue
+        if limit is not None and segment.num_rows > limit:
+            # Dış sorgu zamana göre sıralayıp keser; en yeni `limit` satır yeter
+            segment = segment.sort_by([(time_column, "descending")]).slice(0, limit)
+        loaded.append((present, segment))
+
+    if limit is not None and sum(segment.num_rows for _, segment in loaded) > limit:
+        newest = sorted((value for _, segment in loaded for value in segment.column(time_column).to_pylist()
+                         if value is not None), reverse=True)
+        cutoff = newest[limit - 1] if len(newest) >= limit else None
+        if cutoff is not None:
+            loaded = [(present, segment.filter(pc.greater_equal(segment.column(time_column), cutoff)))
+                      for present, segment in loaded]
+
+    insert = f"INSERT INTO temp.{temp_table} ({column_list}) VALUES ({', '.join('?' for _ in columns)})"
+    for present, segment in loaded:
+        missing = [None] * segment.num_rows
+        c.executemany(insert, zip(*(segment.column(name).to_pylist() if name in present else missing for name in columns)))
+    return f"(SELECT {column_list} FROM {hot_source} UNION ALL SELECT {column_list} FROM temp.{temp_table})"
+
+
+def delete_segments_before(c, table, threshold):
+    """Remove segments whose newest row is older than `threshold` (archive retention)"""
+    timed_query(c, "archive_segments_expired", "SELECT id, path FROM archive_segments WHERE table_name = ? AND max_ts < ?",
+                (table, str(threshold)))
+    expired = c.fetchall()
+    for segment_id, path in expired:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        c.execute("DELETE FROM archive_segments WHERE id = ?", (segment_id,))
+    return len(expired)
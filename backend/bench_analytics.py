@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Benchmark: aggregate queries on SQLite vs the DuckDB mirror
+
+Fills a temporary database with day-partitioned events and pod_status rows,
+then runs the same analytics_query() calls on both backends. The DuckDB
+numbers are split into the first (full) mirror sync, which the API runs in
+the background at startup, and steady state, where each query follows a
+small batch of new writes like a collector cycle.
+Short-range routing is disabled so both engines run every query.
+
+    python backend/bench_analytics.py --days 7 --events 200000 --pods 100000
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import database
+from partitions import ensure_partition
+
+REASONS = ("BackOff", "Unhealthy", "FailedMount", "Pulled", "Scheduled", "FailedScheduling", "ImagePullBackOff", "Killing")
+
+
+def fill(days, events_per_day, pods_per_day, clusters=8):
+    now = datetime.utcnow()
+    rng = random.Random(42)
+    with sqlite3.connect(database.DB_PATH) as conn:
+        c = conn.cursor()
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        for day in range(days - 1, -1, -1):
+            start = midnight - timedelta(days=day)
+            # Eski günler tüm gün, bugün şu ana kadar dolu
+            span = 86400 if day else (now - midnight).total_seconds()
+            events = ensure_partition(c, "events", start)
+            c.executemany(f"""
+            INSERT INTO {events} (cluster, namespace, object_name, object_kind, event_type, reason, message, count, first_timestamp, last_timestamp, timestamp)
+            VALUES (?, ?, ?, 'Pod', ?, ?, ?, ?, ?, ?, ?)
+            """, ((f"cluster-{i % clusters}", f"ns-{i % 40}", f"app-{rng.randrange(2000)}",
+                   "Warning" if i % 5 < 3 else "Normal", REASONS[rng.randrange(len(REASONS))],
+                   f"Back-off restarting failed container c{i % 4}", 1 + i % 7, str(ts), str(ts), ts)
+                  for i, ts in ((i, start + timedelta(seconds=span * i / events_per_day)) for i in range(events_per_day))))
+            pods = ensure_partition(c, "pod_status", start)
+            c.executemany(f"""
+            INSERT INTO {pods} (cluster, namespace, pod_name, status, restarts, timestamp) VALUES (?, ?, ?, ?, ?, ?)
+            """, ((f"cluster-{i % clusters}", f"ns-{i % 40}", f"app-{rng.randrange(5000)}",
+                   "CrashLoopBackOff" if i % 25 == 0 else "Running", rng.randrange(12),
+                   start + timedelta(seconds=span * i / pods_per_day))
+                  for i in range(pods_per_day)))
+            conn.commit()
+
+
+def write_cycle():
+    """A small collector-like batch: new events, a dedupe update and pod rows"""
+    rows = [(f"cluster-{i % 8}", "ns-1", f"app-{i}", "Pod", "Warning", "BackOff", "Back-off", "t", "t", 1) for i in range(200)]
+    database.save_events(rows)
+    for i in range(50):
+        database.save_pod_status(f"cluster-{i % 8}", "ns-1", f"app-{i}", "Running", 6)
+
+
+def _scan(name, sql, window):
+    # Aynı sorgu iki backend'de aynı eşikle çalışsın (satırlar sınırdan kaymasın)
+    def run(now):
+        threshold = now - window
+        return database.analytics_query(name, sql, [threshold], since=threshold)
+    return run
+
+
+QUERIES = {
+    "event_alert_scan (10m)": _scan("event_alert_scan", """
+        SELECT cluster, namespace, object_name, reason, MAX(message), COUNT(*) FROM {events}
+        WHERE timestamp >= ? AND (reason LIKE '%Failed%' OR reason LIKE '%Error%' OR reason = 'ImagePullBackOff')
+        GROUP BY cluster, namespace, object_name, reason
+        """, timedelta(minutes=10)),
+    "pod max restarts (1h)": _scan("pod_max_restarts", """
+        SELECT cluster, namespace, pod_name, MAX(restarts) FROM {pod_status}
+        WHERE timestamp >= ? AND restarts >= 5 GROUP BY cluster, namespace, pod_name HAVING MAX(restarts) >= 5
+        """, timedelta(hours=1)),
+    "reason stats (24h)": _scan("events_reason_stats", """
+        SELECT event_type, reason, COUNT(*) FROM {events} WHERE timestamp >= ? GROUP BY event_type, reason
+        """, timedelta(hours=24)),
+    # Veri 7 günden eski değil, eşik sonucu etkilemez
+    "event trend (7d)": lambda now: database.get_event_trend(hours=24 * 7),
+    "top reasons (7d)": lambda now: database.get_top_event_reasons(hours=24 * 7),
+}
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def normalize(result):
+    return sorted(tuple(row.values()) if isinstance(row, dict) else tuple(row) for row in result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite vs DuckDB aggregate benchmark")
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--events", type=int, default=200000, help="events per day")
+    parser.add_argument("--pods", type=int, default=100000, help="pod_status rows per day")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, "bench.db")
+        database.init_db()
+        start = time.perf_counter()
+        fill(args.days, args.events, args.pods)
+        print(f"{args.days} days x ({args.events} events + {args.pods} pod_status rows), "
+              f"filled in {time.perf_counter() - start:.1f}s, {os.path.getsize(database.DB_PATH) / 1024 / 1024:.0f} MiB")
+
+        # Motorları karşılaştırmak için kısa aralıklar da DuckDB'ye gitsin
+        database.ANALYTICS_MIN_RANGE = timedelta(0)
+        database.ANALYTICS_BACKEND = "duckdb"
+        first_sync, _ = timed(lambda: database.warm_analytics().join())
+        print(f"DuckDB first sync (background warm-up): {first_sync:.2f}s")
+
+        print(f"{'query':<26}{'sqlite':>10}{'duckdb':>10}{'speedup':>10}")
+        for name, query in QUERIES.items():
+            sqlite_times, duck_times = [], []
+            for _ in range(args.repeat):
+                write_cycle()
+                now = datetime.utcnow()
+                database.ANALYTICS_BACKEND = "sqlite"
+                seconds, sqlite_result = timed(lambda: query(now))
+                sqlite_times.append(seconds)
+                database.ANALYTICS_BACKEND = "duckdb"
+                seconds, duck_result = timed(lambda: query(now))
+                duck_times.append(seconds)
+                assert normalize(sqlite_result) == normalize(duck_result), name
+            sqlite_best, duck_best = min(sqlite_times), min(duck_times)
+            print(f"{name:<26}{sqlite_best:>9.3f}s{duck_best:>9.3f}s{sqlite_best / duck_best:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Collector cycle benchmark for KubeMon
+
+Runs load_and_process_cluster and collect_events_from_cluster against a
+synthetic cluster and reports the cycle time. The synthetic cluster is
+served through a fake urllib3 pool manager, so the whole kubernetes client
+path (request, deserialization) runs without a network.
+
+    python backend/bench_cycle.py --namespaces 20 --pods 50 --events 5000
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from unittest import mock
+from urllib.parse import urlparse
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import urllib3
+from kubernetes import client
+
+import database
+from logging_config import setup_logging, shutdown_logging
+
+
+def _iso(dt):
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def build_pod(namespace, i, containers=2):
+    now = _iso(datetime.now(timezone.utc))
+    restarts = 3 if i % 5 == 0 else 0
+    statuses = []
+    specs = []
+    for c in range(containers):
+        if i % 25 == 0:
+            state = {"waiting": {"reason": "CrashLoopBackOff", "message": "back-off 5m0s restarting failed container"}}
+        else:
+            state = {"running": {"startedAt": now}}
+        statuses.append({
+            "name": f"c{c}", "image": "registry.local/team/app:1.0.0", "imageID": "docker-pullable://registry.local/team/app@sha256:" + "a" * 64,
+            "containerID": "containerd://" + "b" * 64, "ready": True, "started": True,
+            "restartCount": restarts, "state": state,
+            "lastState": {"terminated": {"exitCode": 1, "reason": "Error", "startedAt": now, "finishedAt": now}} if restarts else {},
+        })
+        specs.append({
+            "name": f"c{c}", "image": "registry.local/team/app:1.0.0", "imagePullPolicy": "IfNotPresent",
+            "ports": [{"containerPort": 8080, "name": "http", "protocol": "TCP"}],
+            "env": [{"name": f"ENV_{k}", "value": f"value-{k}"} for k in range(10)],
+            "resources": {"limits": {"cpu": "500m", "memory": "512Mi"}, "requests": {"cpu": "100m", "memory": "128Mi"}},
+            "livenessProbe": {"httpGet": {"path": "/healthz", "port": 8080, "scheme": "HTTP"}, "periodSeconds": 10, "timeoutSeconds": 1},
+            "volumeMounts": [{"name": "config", "mountPath": "/etc/app"}, {"name": "kube-api-access", "mountPath": "/var/run/secrets/kubernetes.io/serviceaccount", "readOnly": True}],
+            "terminationMessagePath": "/dev/termination-log", "terminationMessagePolicy": "File",
+        })
+    return {
+        "metadata": {
+            "name": f"app-{namespace}-{i}", "namespace": namespace, "uid": f"uid-{namespace}-{i}",
+            "resourceVersion": str(100000 + i), "creationTimestamp": now,
+            "labels": {"app": "app", "pod-template-hash": "5d8f7c9b4"},
+            "ownerReferences": [{"apiVersion": "apps/v1", "kind": "ReplicaSet", "name": "app-5d8f7c9b4", "uid": "rs-uid", "controller": True}],
+        },
+        "spec": {
+            "containers": specs, "restartPolicy": "Always", "dnsPolicy": "ClusterFirst", "serviceAccountName": "default",
+            "nodeName": f"node-{i % 10}", "schedulerName": "default-scheduler", "terminationGracePeriodSeconds": 30,
+            "volumes": [{"name": "config", "configMap": {"name": "app-config", "defaultMode": 420}}],
+            "tolerations": [{"key": "node.kubernetes.io/not-ready", "operator": "Exists", "effect": "NoExecute", "tolerationSeconds": 300}],
+        },
+        "status": {
+            "phase": "Running", "hostIP": "10.0.0.1", "podIP": f"10.1.{i % 250}.{i % 200}", "startTime": now, "qosClass": "Burstable",
+            "conditions": [{"type": t, "status": "True", "lastTransitionTime": now} for t in ("Initialized", "Ready", "ContainersReady", "PodScheduled")],
+            "containerStatuses": statuses,
+        },
+    }
+
+
+def build_event(i):
+    now = _iso(datetime.now(timezone.utc))
+    reason = ("BackOff", "Unhealthy", "FailedMount", "Pulled", "Scheduled")[i % 5]
+    namespace = f"ns-{i % 20}"
+    return {
+        "metadata": {"name": f"app-{i % 500}.{i:016x}", "namespace": namespace, "uid": f"ev-uid-{i}",
+                     "resourceVersion": str(200000 + i), "creationTimestamp": now},
+        "involvedObject": {"kind": "Pod", "namespace": namespace, "name": f"app-{i % 500}", "uid": f"pod-uid-{i % 500}",
+                           "apiVersion": "v1", "resourceVersion": "12345", "fieldPath": "spec.containers{c0}"},
+        "reason": reason,
+        "message": f"{reason} for container c0 in pod app-{i % 500}",
+        "source": {"component": "kubelet", "host": f"node-{i % 10}"},
+        "firstTimestamp": now, "lastTimestamp": now, "count": 1 + i % 7,
+        "type": "Warning" if i % 5 < 3 else "Normal",
+        "reportingComponent": "kubelet", "reportingInstance": f"node-{i % 10}",
+    }
+
+
+def pod_list_json(namespaces, pods_per_namespace):
+    items = [build_pod(f"ns-{n}", i) for n in range(namespaces) for i in range(pods_per_namespace)]
+    return json.dumps({"kind": "PodList", "apiVersion": "v1", "metadata": {"resourceVersion": "1"}, "items": items}).encode()
+
+
+def event_list_json(count):
+    items = [build_event(i) for i in range(count)]
+    return json.dumps({"kind": "EventList", "apiVersion": "v1", "metadata": {"resourceVersion": "1"}, "items": items}).encode()
+
+
+class SyntheticPoolManager:
+    """Stands in for urllib3.PoolManager and serves fixed bodies by URL path"""
+
+    def __init__(self, routes):
+        self.routes = routes
+
+    def request(self, method, url, **kwargs):
+        body = self.routes[urlparse(url).path]
+        return urllib3.HTTPResponse(body=io.BytesIO(body), status=200, headers={"Content-Type": "application/json"},
+                                    preload_content=False)
+
+    def clear(self):
+        pass
+
+
+def synthetic_core_v1(routes):
+    api_client = client.ApiClient(client.Configuration(host="http://synthetic.local"))
+    api_client.rest_client.pool_manager = SyntheticPoolManager(routes)
+    return client.CoreV1Api(api_client=api_client)
+
+
+def synthetic_cluster(namespaces, pods_per_namespace, events):
+    return synthetic_core_v1({
+        "/api/v1/pods": pod_list_json(namespaces, pods_per_namespace),
+        "/api/v1/events": event_list_json(events),
+    })
+
+
+def run_cycle(v1):
+    from kube_client import load_and_process_cluster
+    from events import collect_events_from_cluster
+
+    with mock.patch("kube_client.get_core_v1", return_value=v1), \
+         mock.patch("events.get_core_v1", return_value=v1):
+        start = time.perf_counter()
+        load_and_process_cluster("bench.conf", "bench")
+        collect_events_from_cluster("bench.conf", "bench")
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="KubeMon collector cycle benchmark")
+    parser.add_argument("--namespaces", type=int, default=20)
+    parser.add_argument("--pods", type=int, default=50, help="pods per namespace")
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--cycles", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, "bench.db")
+        database.init_db()
+        v1 = synthetic_cluster(args.namespaces, args.pods, args.events)
+
+        # Collector stdout'u supervisord ile dosyaya gider, burada da dosyaya yaz
+        log_path = os.path.join(tmp, "monitor.log")
+        timings = []
+        with open(log_path, "w") as log_file, redirect_stdout(log_file):
+            setup_logging("bench", stream=log_file)
+            for _ in range(args.cycles):
+                timings.append(run_cycle(v1))
+            shutdown_logging()
+        log_size = os.path.getsize(log_path)
+
+    pods = args.namespaces * args.pods
+    print(f"pods={pods} events={args.events} cycles={args.cycles}")
+    print(f"cycle time: min={min(timings):.3f}s avg={sum(timings) / len(timings):.3f}s")
+    print(f"log output: {log_size / 1024:.1f} KiB ({log_size / args.cycles / 1024:.1f} KiB per cycle)")
+
+
+if __name__ == "__main__":
+    main()
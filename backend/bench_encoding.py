@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark: payload size and serialization time of the list response formats
+
+Builds synthetic event rows shaped like /api/events (EVENT_COLUMNS tuples)
+and encodes them the old way (a dict per row through the stdlib encoder, as
+jsonify did) and in every encoding.py format, then compresses each body.
+
+    python backend/bench_encoding.py --rows 5000
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import encoding
+from database import EVENT_COLUMNS
+
+REASONS = ("BackOff", "Unhealthy", "FailedMount", "Pulled", "Scheduled", "FailedScheduling", "ImagePullBackOff", "Killing")
+
+
+def build_rows(count, clusters=8):
+    rng = random.Random(42)
+    return [
+        (i, f"cluster-{i % clusters}", f"ns-{rng.randrange(40)}", f"app-{rng.randrange(2000)}-7d9f8b6c4-x2k9p", "Pod",
+         "Warning" if i % 5 < 3 else "Normal", REASONS[rng.randrange(len(REASONS))],
+         f"Back-off restarting failed container c{i % 4} in pod app-{i % 2000}", 1 + i % 7,
+         f"2024-05-01 {i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}.{i % 1000000:06d}")
+        for i in range(count)
+    ]
+
+
+def legacy(rows):
+    # Eski yol: satır başına dict + jsonify'ın stdlib encoder'ı
+    return json.dumps([dict(zip(EVENT_COLUMNS, row)) for row in rows], sort_keys=True).encode()
+
+
+ENCODERS = {
+    "legacy json (stdlib)": legacy,
+    "json (orjson)": lambda rows: encoding.encode_rows(EVENT_COLUMNS, rows, "json")[0],
+    "columnar json": lambda rows: encoding.encode_rows(EVENT_COLUMNS, rows, "columnar")[0],
+    "msgpack": lambda rows: encoding.encode_rows(EVENT_COLUMNS, rows, "msgpack")[0],
+}
+
+
+def best_of(repeat, func, *args):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List response encoding benchmark")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = build_rows(args.rows)
+    print(f"{args.rows} event rows; orjson={'yes' if encoding.orjson else 'no'} msgpack={'yes' if encoding.msgpack else 'no'} "
+          f"brotli={'yes' if encoding.brotli else 'no'}")
+    print(f"{'format':<22}{'encode':>10}{'raw KiB':>10}{'gzip KiB':>10}{'gzip ms':>10}{'br KiB':>10}{'br ms':>10}")
+    for name, encode in ENCODERS.items():
+        if name == "msgpack" and encoding.msgpack is None:
+            continue
+        seconds, body = best_of(args.repeat, encode, rows)
+        gzip_seconds, gzipped = best_of(args.repeat, gzip.compress, body, encoding.GZIP_LEVEL)
+        line = f"{name:<22}{seconds * 1000:>8.1f}ms{len(body) / 1024:>10.1f}{len(gzipped) / 1024:>10.1f}{gzip_seconds * 1000:>10.1f}"
+        if encoding.brotli is not None:
+            br_seconds, compressed = best_of(args.repeat, lambda data: encoding.brotli.compress(data, quality=encoding.BROTLI_QUALITY), body)
+            line += f"{len(compressed) / 1024:>10.1f}{br_seconds * 1000:>10.1f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
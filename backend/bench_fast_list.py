@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Benchmark: model-based vs raw-JSON fast path for pod and event listing
+
+    python backend/bench_fast_list.py --pods 5000 --events 20000
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bench_cycle import event_list_json, pod_list_json, synthetic_core_v1
+from fast_list import list_events, list_pods
+
+
+def measure(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(timings), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="fast_list benchmark")
+    parser.add_argument("--pods", type=int, default=5000)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pods_body = pod_list_json(1, args.pods)
+    events_body = event_list_json(args.events)
+    v1 = synthetic_core_v1({"/api/v1/pods": pods_body, "/api/v1/events": events_body})
+
+    print(f"pods: {args.pods} ({len(pods_body) / 1024 / 1024:.1f} MiB JSON), "
+          f"events: {args.events} ({len(events_body) / 1024 / 1024:.1f} MiB JSON)")
+    print(f"{'case':<16}{'time':>10}{'peak mem':>12}")
+    for name, func in (
+        ("pods model", lambda: list_pods(v1, fast=False)),
+        ("pods fast", lambda: list_pods(v1, fast=True)),
+        ("events model", lambda: list_events(v1, fast=False)),
+        ("events fast", lambda: list_events(v1, fast=True)),
+    ):
+        seconds, peak = measure(func, args.repeat)
+        print(f"{name:<16}{seconds:>9.3f}s{peak / 1024 / 1024:>10.1f}MiB")
+
+
+if __name__ == "__main__":
+    main()
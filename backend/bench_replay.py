@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Replay benchmark: recorded cluster traffic through ingest and alerting
+
+Replays recordings made with replay.py through load_and_process_cluster,
+collect_events_from_cluster and run_alert_checks, one recorded cycle at a
+time, against a fresh database. It reports ingest throughput and an alert
+fingerprint, which is a hash of the alerts the run raised without ids and
+timestamps. The same recording must give the same fingerprint on every run
+and in every version. With --baseline, the fingerprints are compared to a
+stored file and the run exits with status 1 if any alert differs. Use
+--update-baseline after an intended change to the alert rules.
+
+    python backend/bench_replay.py data/recordings/*.jsonl.gz --repeat 3 --baseline data/recordings/baseline.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from unittest import mock
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import alerts
+import anomaly
+import database
+import events
+import usage
+from logging_config import setup_logging, shutdown_logging
+from replay import ReplayPoolManager, load_recording, replay_core_v1
+
+
+def _items(body):
+    try:
+        return len(json.loads(body).get("items") or [])
+    except (ValueError, AttributeError):
+        return 0
+
+
+def alert_lines(rows):
+    """Alerts as sorted, comparable lines; storm children point to their parent's group key"""
+    groups = {row["id"]: row["group_key"] or "" for row in rows}
+    return sorted("|".join([row["cluster"], row["rule_name"], row["severity"], row["status"], row["group_key"] or "",
+                            str(row["member_count"] or ""), groups.get(row["parent_id"], ""), row["message"]])
+                  for row in rows)
+
+
+def fingerprint(lines):
+    return hashlib.sha256("\n".join(lines).encode()).hexdigest()[:16]
+
+
+def replay_recording(recording, speed=0, log_file=None):
+    """Run a recording through ingest and alerting in a temporary database.
+
+    Returns {'cycles', 'pods', 'events', 'bytes', 'ingest_seconds',
+    'alert_seconds', 'unused', 'alerts' (lines), 'fingerprint'}.
+    """
+    pool = ReplayPoolManager(recording, speed)
+    v1 = replay_core_v1(pool)
+    cluster = recording.cluster
+    kubeconfig = f"{cluster}.replay"
+    ingest_seconds = alert_seconds = 0.0
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "replay.db")
+        # alerts.py DB_PATH'i import ederken kopyalıyor, ikisi de yönlendirilir
+        with mock.patch.object(database, "DB_PATH", db_path), mock.patch.object(alerts, "DB_PATH", db_path), \
+             mock.patch.dict(events._event_index, clear=True), mock.patch.dict(usage._limits, clear=True), \
+             mock.patch.object(anomaly, "_baselines", None), mock.patch.object(anomaly, "_window_start", None), \
+             mock.patch.dict(usage.USAGE_CONFIG, {"dir": os.path.join(tmp, "usage")}), \
+             mock.patch("kube_client.get_core_v1", return_value=v1), mock.patch("events.get_core_v1", return_value=v1), \
+             redirect_stdout(log_file or sys.stdout):
+            from kube_client import load_and_process_cluster
+            database.init_db()
+            for _ in range(recording.cycles):
+                start = time.perf_counter()
+                load_and_process_cluster(kubeconfig, cluster)
+                events.collect_events_from_cluster(kubeconfig, cluster)
+                ingest_seconds += time.perf_counter() - start
+                start = time.perf_counter()
+                alerts.run_alert_checks()
+                alert_seconds += time.perf_counter() - start
+            lines = alert_lines(database.get_alerts(hours=24 * 365, limit=1000000, include_children=True))
+
+    paths = {}
+    for entry in recording.entries:
+        paths[entry["path"]] = paths.get(entry["path"], 0) + _items(entry["body"])
+    return {
+        'cycles': recording.cycles,
+        'pods': paths.get("/api/v1/pods", 0),
+        'events': paths.get("/api/v1/events", 0),
+        'bytes': pool.bytes,
+        'ingest_seconds': ingest_seconds,
+        'alert_seconds': alert_seconds,
+        # Okunmayan kayıtlı yanıt: bu sürüm kayıttakinden farklı istek yapıyor
+        'unused': pool.remaining(),
+        'alerts': lines,
+        'fingerprint': fingerprint(lines),
+    }
+
+
+def _diff(expected, actual):
+    missing = sorted(set(expected) - set(actual))
+    extra = sorted(set(actual) - set(expected))
+    return [f"  - {line}" for line in missing] + [f"  + {line}" for line in extra]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="KubeMon record-and-replay benchmark")
+    parser.add_argument("recordings", nargs="+")
+    parser.add_argument("--speed", type=float, default=0, help="0 = as fast as possible, N = N times the recorded rate")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--baseline", help="JSON file with the expected alerts per recording")
+    parser.add_argument("--update-baseline", action="store_true", help="write this run's alerts to --baseline")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp, open(os.path.join(tmp, "replay.log"), "w") as log_file:
+        # Collector logları ölçümü kirletmesin
+        setup_logging("bench", stream=log_file)
+        print(f"{'recording':<32}{'cycles':>7}{'pods/s':>10}{'events/s':>10}{'MiB/s':>8}{'alerts s':>10}{'alerts':>8}  fingerprint")
+        for path in args.recordings:
+            recording = load_recording(path)
+            name = os.path.basename(path)
+            runs = [replay_recording(recording, args.speed, log_file) for _ in range(args.repeat)]
+            best = min(runs, key=lambda run: run['ingest_seconds'])
+            seconds = best['ingest_seconds'] or float("nan")
+            print(f"{name:<32}{best['cycles']:>7}{best['pods'] / seconds:>10.0f}{best['events'] / seconds:>10.0f}"
+                  f"{best['bytes'] / 2 ** 20 / seconds:>8.1f}{best['alert_seconds']:>10.3f}{len(best['alerts']):>8}  {best['fingerprint']}")
+
+            if len({run['fingerprint'] for run in runs}) > 1:
+                failures.append(f"{name}: alerts differ between runs of the same recording")
+            if best['unused']:
+                failures.append(f"{name}: {best['unused']} recorded responses were never requested")
+            expected = baseline.get(name)
+            if args.update_baseline:
+                baseline[name] = {'fingerprint': best['fingerprint'], 'alerts': best['alerts']}
+            elif expected and expected['fingerprint'] != best['fingerprint']:
+                failures.append(f"{name}: alert fingerprint {best['fingerprint']} != baseline {expected['fingerprint']}\n"
+                                + "\n".join(_diff(expected['alerts'], best['alerts'])))
+        shutdown_logging()
+
+    if args.update_baseline and args.baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"baseline written to {args.baseline}")
+    for failure in failures:
+        print(f"REGRESSION: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
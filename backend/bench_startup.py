@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark: API and collector startup
+
+Measures, in fresh interpreters, the import time of `api` and `main` and
+which heavy optional dependencies they pull in, then starts `backend/api.py`
+on a free port and times the first /healthz 200. Exits with status 1 if a
+heavy module is imported at startup or a time exceeds its threshold, so it
+can guard against startup regressions in CI.
+
+    python backend/bench_startup.py --repeat 5 --max-import 1.0 --max-healthz 3.0
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BACKEND_DIR)
+
+# İlk kullanımda yüklenmesi gereken modüller (bkz. plugins.py)
+HEAVY_MODULES = ("openai", "kubernetes", "duckdb", "pyarrow", "aiohttp")
+
+_IMPORT_PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(elapsed)
+print(",".join(name for name in {heavy!r} if name in sys.modules))
+"""
+
+
+def measure_import(module):
+    """(seconds, [heavy modules loaded]) for `import module` in a fresh interpreter"""
+    result = subprocess.run([sys.executable, "-c", _IMPORT_PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                            cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+    seconds, loaded = result.stdout.splitlines()[-2:]
+    return float(seconds), [name for name in loaded.split(",") if name]
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_first_healthz(timeout=30):
+    """Seconds from starting backend/api.py (like supervisord does) to the first /healthz 200"""
+    port = _free_port()
+    env = {**os.environ, "KUBEMON_API_PORT": str(port)}
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, os.path.join("backend", "api.py")], cwd=ROOT_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - start < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"api.py exited with status {process.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/healthz", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError(f"/healthz did not answer within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API and collector startup benchmark")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-import", type=float, default=1.0, help="threshold for the median import time (seconds)")
+    parser.add_argument("--max-healthz", type=float, default=3.0, help="threshold for the median time to first /healthz (seconds)")
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'step':<24}{'median':>10}{'min':>10}  heavy modules")
+    for module in ("api", "main"):
+        results = [measure_import(module) for _ in range(args.repeat)]
+        times = [seconds for seconds, _ in results]
+        loaded = sorted({name for _, names in results for name in names})
+        print(f"{'import ' + module:<24}{statistics.median(times) * 1000:>8.0f}ms{min(times) * 1000:>8.0f}ms  {', '.join(loaded) or '-'}")
+        if loaded:
+            failures.append(f"import {module} loads {', '.join(loaded)}")
+        if statistics.median(times) > args.max_import:
+            failures.append(f"import {module} took {statistics.median(times):.2f}s (max {args.max_import}s)")
+
+    times = [measure_first_healthz() for _ in range(args.repeat)]
+    print(f"{'first /healthz 200':<24}{statistics.median(times) * 1000:>8.0f}ms{min(times) * 1000:>8.0f}ms")
+    if statistics.median(times) > args.max_healthz:
+        failures.append(f"first /healthz took {statistics.median(times):.2f}s (max {args.max_healthz}s)")
+
+    for failure in failures:
+        print(f"REGRESSION: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Registry of reusable Kubernetes API clients, one per kubeconfig.
+
+Pod and event collectors for the same cluster share one ApiClient, and the
+client survives across cycles so its urllib3 pool keeps connections (and TLS
+sessions) alive. A client is rebuilt only when its kubeconfig changes: the
+file's mtime is checked on every call and the content hash decides whether
+a touched file really changed.
+
+The kubernetes package is imported with the first client, so the collector
+starts (and a process with no clusters runs) without loading it.
+"""
+import hashlib
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Aynı cluster'a paralel istek sayısı (pods + events + metrics) için yeterli
+CLIENT_POOL_MAXSIZE = int(os.environ.get("KUBEMON_CLIENT_POOL_SIZE", 8))
+
+_clients = {}
+_lock = threading.Lock()
+
+
+class _CachedClient:
+    def __init__(self, api_client, mtime, digest):
+        self.api_client = api_client
+        self.mtime = mtime
+        self.digest = digest
+
+
+def _file_digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _build_api_client(kubeconfig_path):
+    from kubernetes import client, config
+    configuration = client.Configuration()
+    config.load_kube_config(config_file=kubeconfig_path, client_configuration=configuration, persist_config=False)
+    configuration.connection_pool_maxsize = CLIENT_POOL_MAXSIZE
+    return client.ApiClient(configuration)
+
+
+def get_api_client(kubeconfig_path):
+    """Return the cached ApiClient for a kubeconfig, rebuilding it if the file changed"""
+    path = os.path.abspath(kubeconfig_path)
+    mtime = os.stat(path).st_mtime_ns
+    cached = _clients.get(path)
+    if cached is not None and cached.mtime == mtime:
+        return cached.api_client
+
+    with _lock:
+        cached = _clients.get(path)
+        if cached is not None and cached.mtime == mtime:
+            return cached.api_client
+        digest = _file_digest(path)
+        if cached is not None and cached.digest == digest:
+            # Dosyaya dokunulmuş ama içerik aynı
+            cached.mtime = mtime
+            return cached.api_client
+
+        api_client = _build_api_client(path)
+        _clients[path] = _CachedClient(api_client, mtime, digest)
+        if cached is not None:
+            logger.info("Kubeconfig %s changed, rebuilt API client", path)
+            cached.api_client.close()
+        else:
+            logger.debug("Created API client for %s", path)
+        return api_client
+
+
+def get_core_v1(kubeconfig_path):
+    from kubernetes import client
+    return client.CoreV1Api(api_client=get_api_client(kubeconfig_path))
+
+
+def get_custom_objects(kubeconfig_path):
+    """CustomObjectsApi on the shared client, used for metrics.k8s.io"""
+    from kubernetes import client
+    return client.CustomObjectsApi(api_client=get_api_client(kubeconfig_path))
+
+
+def evict(kubeconfig_path):
+    """Drop and close the client for a kubeconfig, e.g. when the cluster is removed"""
+    with _lock:
+        cached = _clients.pop(os.path.abspath(kubeconfig_path), None)
+    if cached is not None:
+        cached.api_client.close()
+
+
+def close_all():
+    with _lock:
+        cached_clients = list(_clients.values())
+        _clients.clear()
+    for cached in cached_clients:
+        cached.api_client.close()
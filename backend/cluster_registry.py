@@ -0,0 +1,66 @@
+"""Single source of truth for the monitored clusters.
+
+Every kubeconfig named `*.conf` in the clusters directory is one cluster; an
+optional `admin-` prefix is dropped from the name (`admin-Prod.conf` -> `prod`).
+The directory is scanned once and re-scanned only when its mtime changes, so
+the API and the collector can call list_clusters() as often as they like.
+"""
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+CLUSTER_DIR = os.environ.get(
+    "KUBEMON_CLUSTER_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "clusters")),
+)
+
+_cache = {"mtime": None, "clusters": {}}
+_lock = threading.Lock()
+
+
+def cluster_name_from_file(filename):
+    name = filename[:-len(".conf")]
+    if name.startswith("admin-"):
+        name = name[len("admin-"):]
+    return name.lower()
+
+
+def _scan(cluster_dir):
+    clusters = {}
+    for filename in sorted(os.listdir(cluster_dir)):
+        if not filename.endswith(".conf"):
+            continue
+        name = cluster_name_from_file(filename)
+        if name in clusters:
+            logger.warning("Duplicate kubeconfig for cluster %s: %s ignored", name, filename)
+            continue
+        clusters[name] = {
+            "name": name,
+            "label": name.capitalize(),
+            "file": filename,
+            "path": os.path.join(cluster_dir, filename),
+        }
+    return clusters
+
+
+def list_clusters():
+    """Return {cluster_name: metadata} for every configured cluster"""
+    try:
+        mtime = os.stat(CLUSTER_DIR).st_mtime_ns
+    except FileNotFoundError:
+        logger.error("Cluster directory %s not found", CLUSTER_DIR)
+        return {}
+    if _cache["mtime"] == mtime:
+        return _cache["clusters"]
+    with _lock:
+        if _cache["mtime"] != mtime:
+            _cache["clusters"] = _scan(CLUSTER_DIR)
+            _cache["mtime"] = mtime
+            logger.info("Discovered %d clusters in %s", len(_cache["clusters"]), CLUSTER_DIR)
+        return _cache["clusters"]
+
+
+def get_cluster(name):
+    return list_clusters().get(name.lower() if name else name)
@@ -0,0 +1,33 @@
+"""Shared test helpers.
+
+The test modules also run on their own (python backend/test_x.py), so the
+temporary database is a context manager they import instead of a pytest
+fixture argument.
+"""
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from unittest import mock
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import alerts
+import database
+
+
+@contextmanager
+def temp_database(name="test.db", init=True):
+    """Initialized database in a temporary directory with an empty query cache; yields the directory.
+
+    With `init=False` the file starts empty, e.g. to create an old schema
+    before init_db() migrates it.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, name)
+        # alerts.py DB_PATH'i import ederken kopyalıyor, ikisi de yönlendirilir
+        with mock.patch.object(database, "DB_PATH", path), mock.patch.object(alerts, "DB_PATH", path), \
+             mock.patch.object(database, "query_cache", database.QueryCache()):
+            if init:
+                database.init_db()
+            yield tmp
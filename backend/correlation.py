@@ -0,0 +1,270 @@
+"""Cross-cluster incident correlation.
+
+Warning events and alert candidates are reduced to a signature at ingest:
+the event reason (or alert rule) plus its message with the cluster-specific
+parts (pod and object names, IPs, UIDs, digests, numbers) replaced with
+placeholders. Each batch is grouped by signature in memory and upserted into
+`correlation_members`, with one row per (signature, cluster) holding the
+current episode's first/last sighting and count. A member that was not seen
+for `window_minutes` starts a new episode.
+
+After a batch, only the signatures it touched are joined with their live
+members (a primary-key range, not a scan of the events table). When
+`min_clusters` clusters share a signature within the window, a
+`correlation_incidents` row is opened, or the open one is extended. An
+incident stays active while any member is still firing and is resolved
+`window_minutes` after the last sighting.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+from datetime import datetime, timedelta
+
+import database
+from database import bump_generations, cached_query
+from metrics import timed_query
+
+logger = logging.getLogger(__name__)
+
+CORRELATION_CONFIG = {
+    'enabled': os.environ.get("KUBEMON_CORRELATION", "1") != "0",
+    # Aynı imza bu süre içinde farklı cluster'larda görülürse tek olay sayılır
+    'window_minutes': float(os.environ.get("KUBEMON_CORRELATION_WINDOW", 15)),
+    'min_clusters': int(os.environ.get("KUBEMON_CORRELATION_MIN_CLUSTERS", 2)),
+    'retention_days': float(os.environ.get("KUBEMON_INCIDENT_RETENTION_DAYS", 30)),
+}
+
+INCIDENT_COLUMNS = ("id", "signature", "source", "reason", "template", "first_seen", "last_seen",
+                    "cluster_count", "occurrences", "clusters")
+
+_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+_K8S_SUFFIX = "[bcdfghjklmnpqrstvwxz2456789]"
+
+# Sıra önemli: önce uzun/özel kalıplar, sayılar en son
+_NORMALIZERS = (
+    (re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b", re.I), "<uid>"),
+    (re.compile(r"\b(?:\d{1,3}\.){3}\d{1,3}(?::\d+)?\b"), "<ip>"),
+    (re.compile(r"\b(?:sha256:)?[0-9a-f]{12,}\b", re.I), "<hex>"),
+    (re.compile(r'"[^"]*"|\'[^\']*\''), "<quoted>"),
+    # Workload pod'ları: deployment (rs hash + suffix), daemonset/job (suffix), statefulset (ordinal)
+    (re.compile(rf"\b[a-z0-9][a-z0-9.-]*-(?:{_K8S_SUFFIX}{{6,10}}-{_K8S_SUFFIX}{{5}}|{_K8S_SUFFIX}{{5}}|\d+)\b"), "<pod>"),
+    # namespace/name (alert mesajları)
+    (re.compile(r"\b[a-z0-9][a-z0-9-]+/(?:<pod>|[a-z0-9][a-z0-9.-]+)"), "<object>"),
+    (re.compile(r"\b\d[\w.%]*"), "<n>"),
+    (re.compile(r"\s+"), " "),
+)
+
+
+def message_template(message):
+    """Message with the cluster-specific parts replaced by placeholders"""
+    template = message or ""
+    for pattern, placeholder in _NORMALIZERS:
+        template = pattern.sub(placeholder, template)
+    return template.strip()[:200]
+
+
+def signature(source, reason, template):
+    return hashlib.blake2b(f"{source}\0{reason}\0{template}".encode(), digest_size=8).hexdigest()
+
+
+def _episode_start(now):
+    return (now - timedelta(minutes=CORRELATION_CONFIG['window_minutes'])).strftime(_TIME_FORMAT)
+
+
+def correlate(source, sightings, now=None):
+    """Record one batch of sightings and open or extend incidents; returns the incident ids touched.
+
+    `sightings` are (cluster, reason, message, count, sample) tuples, where
+    `sample` is the namespace/object that fired.
+    """
+    if not CORRELATION_CONFIG['enabled'] or not sightings:
+        return []
+    now = now or datetime.utcnow()
+    now_str = now.strftime(_TIME_FORMAT)
+    since = _episode_start(now)
+
+    # Batch içinde imzaya göre hash join: (imza, cluster) başına tek upsert
+    members = {}
+    details = {}
+    added = {}
+    for cluster, reason, message, count, sample in sightings:
+        template = message_template(message)
+        key = signature(source, reason, template)
+        details[key] = (reason, template)
+        occurrences, _ = members.get((key, cluster), (0, None))
+        members[(key, cluster)] = (occurrences + (count or 1), sample)
+        added[key] = added.get(key, 0) + (count or 1)
+
+    touched = []
+    try:
+        with sqlite3.connect(database.DB_PATH) as conn:
+            c = conn.cursor()
+            # Replica'lar aynı imzaya aynı anda incident açmasın
+            c.execute("BEGIN IMMEDIATE")
+            for (key, cluster), (occurrences, sample) in members.items():
+                timed_query(c, "correlation_member_upsert", """
+                INSERT INTO correlation_members (signature, cluster, first_seen, last_seen, occurrences, sample)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(signature, cluster) DO UPDATE SET
+                    first_seen = CASE WHEN last_seen < ? THEN excluded.first_seen ELSE first_seen END,
+                    occurrences = CASE WHEN last_seen < ? THEN excluded.occurrences ELSE occurrences + excluded.occurrences END,
+                    last_seen = excluded.last_seen, sample = excluded.sample
+                """, (key, cluster, now_str, now_str, occurrences, sample, since, since))
+
+            for key, (reason, template) in details.items():
+                timed_query(c, "correlation_members_live", """
+                SELECT cluster, first_seen, occurrences FROM correlation_members WHERE signature = ? AND last_seen >= ?
+                """, (key, since))
+                live = c.fetchall()
+                if len(live) < CORRELATION_CONFIG['min_clusters']:
+                    continue
+                clusters = {cluster for cluster, _, _ in live}
+                timed_query(c, "correlation_incident_open", """
+                SELECT id, clusters, occurrences FROM correlation_incidents WHERE signature = ? AND last_seen >= ?
+                ORDER BY id DESC LIMIT 1
+                """, (key, since))
+                incident = c.fetchone()
+                if incident is None:
+                    timed_query(c, "correlation_incident_insert", """
+                    INSERT INTO correlation_incidents (signature, source, reason, template, first_seen, last_seen,
+                                                       cluster_count, occurrences, clusters)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """, (key, source, reason, template, min(first_seen for _, first_seen, _ in live), now_str,
+                          len(clusters), sum(occurrences for _, _, occurrences in live), json.dumps(sorted(clusters))))
+                    touched.append(c.lastrowid)
+                    logger.warning("Correlated incident across %d clusters: %s %s", len(clusters), reason, template)
+                else:
+                    incident_id, known, total = incident
+                    clusters |= set(json.loads(known))
+                    timed_query(c, "correlation_incident_update", """
+                    UPDATE correlation_incidents SET last_seen = ?, cluster_count = ?, occurrences = ?, clusters = ? WHERE id = ?
+                    """, (now_str, len(clusters), total + added[key], json.dumps(sorted(clusters)), incident_id))
+                    touched.append(incident_id)
+            if touched:
+                bump_generations(c, "correlation_incidents")
+            conn.commit()
+    except sqlite3.Error as e:
+        # Korelasyon ingest'i durdurmamalı
+        logger.error("Correlation of %d %s sightings failed: %s", len(sightings), source, e)
+        return []
+    return touched
+
+
+def correlate_events(cluster, rows):
+    """Warning events of one save_events() batch (rows of save_event arguments)"""
+    return correlate("event", [(cluster, row[5], row[6], row[9], f"{row[1]}/{row[2]}")
+                               for row in rows if row[4] == 'Warning'])
+
+
+def correlate_alerts(rule_name, candidates):
+    """Alert candidates of one rule check, (cluster, namespace, object_name, severity, message, metadata)"""
+    return correlate("alert", [(cluster, rule_name, message, 1, f"{namespace}/{object_name}")
+                               for cluster, namespace, object_name, _, message, _ in candidates])
+
+
+def _hidden_clusters(members, include):
+    """Clusters whose member fired in a namespace `include(cluster, namespace)` rejects"""
+    hidden = set()
+    for cluster, sample in members:
+        namespace = sample.split('/', 1)[0] if sample and '/' in sample else None
+        if include is not None and namespace is not None and not include(cluster, namespace):
+            hidden.add(cluster)
+    return hidden
+
+
+@cached_query("correlation_incidents")
+def get_incidents(status=None, hours=24, limit=100, min_clusters=None, include=None):
+    """Correlated incidents seen in the last `hours`, newest first, with their status.
+
+    With `include`, clusters whose member sample is in an excluded namespace
+    are left out, and incidents with no cluster left are dropped.
+    """
+    now = datetime.utcnow()
+    since = _episode_start(now)
+    query = f"SELECT {', '.join(INCIDENT_COLUMNS)} FROM correlation_incidents WHERE last_seen >= ?"
+    params = [(now - timedelta(hours=hours)).strftime(_TIME_FORMAT)]
+    if status == 'active':
+        query += " AND last_seen >= ?"
+        params.append(since)
+    elif status == 'resolved':
+        query += " AND last_seen < ?"
+        params.append(since)
+    if min_clusters:
+        query += " AND cluster_count >= ?"
+        params.append(min_clusters)
+    query += " ORDER BY last_seen DESC, id DESC LIMIT ?"
+    params.append(limit)
+    with sqlite3.connect(database.DB_PATH) as conn:
+        c = conn.cursor()
+        timed_query(c, "correlation_incidents_list", query, params)
+        rows = c.fetchall()
+        members = {}
+        if include is not None and rows:
+            signatures = sorted({row[1] for row in rows})
+            timed_query(c, "correlation_incidents_members", f"""
+            SELECT signature, cluster, sample FROM correlation_members WHERE signature IN ({', '.join('?' for _ in signatures)})
+            """, signatures)
+            for key, cluster, sample in c.fetchall():
+                members.setdefault(key, []).append((cluster, sample))
+    incidents = []
+    for row in rows:
+        incident = dict(zip(INCIDENT_COLUMNS, row))
+        incident['clusters'] = json.loads(incident['clusters'])
+        if include is not None:
+            hidden = _hidden_clusters(members.get(incident['signature'], ()), include)
+            incident['clusters'] = [cluster for cluster in incident['clusters'] if cluster not in hidden]
+            if not incident['clusters']:
+                continue
+            incident['cluster_count'] = len(incident['clusters'])
+        incident['status'] = 'active' if incident['last_seen'] >= since else 'resolved'
+        incidents.append(incident)
+    return incidents
+
+
+def get_incident(incident_id, include=None):
+    """One incident with its per-cluster members (latest episode), or None if it does not exist.
+
+    `include` filters the members like get_incidents(); None is also
+    returned when no member is left.
+    """
+    with sqlite3.connect(database.DB_PATH) as conn:
+        c = conn.cursor()
+        timed_query(c, "correlation_incident_get", f"SELECT {', '.join(INCIDENT_COLUMNS)} FROM correlation_incidents WHERE id = ?",
+                    (incident_id,))
+        row = c.fetchone()
+        if row is None:
+            return None
+        incident = dict(zip(INCIDENT_COLUMNS, row))
+        incident['clusters'] = json.loads(incident['clusters'])
+        timed_query(c, "correlation_incident_members", f"""
+        SELECT cluster, first_seen, last_seen, occurrences, sample FROM correlation_members
+        WHERE signature = ? AND cluster IN ({', '.join('?' for _ in incident['clusters'])}) ORDER BY cluster
+        """, (incident['signature'], *incident['clusters']))
+        members = c.fetchall()
+    if include is not None:
+        hidden = _hidden_clusters([(member[0], member[4]) for member in members], include)
+        members = [member for member in members if member[0] not in hidden]
+        incident['clusters'] = [cluster for cluster in incident['clusters'] if cluster not in hidden]
+        if not incident['clusters']:
+            return None
+        incident['cluster_count'] = len(incident['clusters'])
+    incident['members'] = [dict(zip(("cluster", "first_seen", "last_seen", "occurrences", "sample"), member))
+                           for member in members]
+    incident['status'] = 'active' if incident['last_seen'] >= _episode_start(datetime.utcnow()) else 'resolved'
+    return incident
+
+
+def cleanup_correlations():
+    """Forget members whose episode ended and incidents past the retention"""
+    now = datetime.utcnow()
+    with sqlite3.connect(database.DB_PATH) as conn:
+        c = conn.cursor()
+        timed_query(c, "correlation_members_cleanup", "DELETE FROM correlation_members WHERE last_seen < ?",
+                    ((now - timedelta(days=1)).strftime(_TIME_FORMAT),))
+        timed_query(c, "correlation_incidents_cleanup", "DELETE FROM correlation_incidents WHERE last_seen < ?",
+                    ((now - timedelta(days=CORRELATION_CONFIG['retention_days'])).strftime(_TIME_FORMAT),))
+        if c.rowcount:
+            bump_generations(c, "correlation_incidents")
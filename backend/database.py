@@ -1,42 +1,189 @@
+import functools
+import inspect
+import json
+import logging
 import sqlite3
 import os
+import sys
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from analytics import ANALYTICS_AVAILABLE, AnalyticsMirror
+from archive import ARCHIVE_ENABLED, discard_segment, init_archive, read_through, register_segment, write_segment
+from metrics import DB_QUERY_SECONDS, QUERY_CACHE_REQUESTS, timed_query
+from partitions import (PARTITIONED_TABLES, drop_partitions_before, ensure_indexes, ensure_partition,
+                        expired_partitions, migrate_legacy_table, partition_for_id, source)
+
+logger = logging.getLogger(__name__)
 
 DB_PATH = os.path.join("data", "pod_status.db")
 
+EVENT_COLUMNS = ("id", "cluster", "namespace", "object_name", "object_kind", "event_type", "reason", "message", "count", "timestamp")
+ALERT_COLUMNS = ("id", "cluster", "rule_name", "severity", "message", "status", "created_at", "resolved_at",
+                 "parent_id", "member_count", "group_key", "last_seen_at")
+
+# Aggregate sorguları: "duckdb" (varsa) ya da "sqlite"
+ANALYTICS_BACKEND = os.environ.get("KUBEMON_ANALYTICS", "duckdb")
+# Bundan kısa zaman aralıkları SQLite'ta kalır, timestamp index'i onlar için daha hızlı
+ANALYTICS_MIN_RANGE = timedelta(hours=float(os.environ.get("KUBEMON_ANALYTICS_MIN_HOURS", 6)))
+
+_analytics_mirrors = {}
+_analytics_lock = threading.Lock()
+
+QUERY_CACHE_CONFIG = {
+    # Sorgu sonucu cache'inin bellek sınırı (yaklaşık), 0 cache'i kapatır
+    'max_bytes': int(float(os.environ.get("KUBEMON_QUERY_CACHE_MB", 32)) * 1024 * 1024),
+    # Bundan büyük tek sonuç cache'lenmez, bir dev cevap bütün cache'i boşaltmasın
+    'max_entry_fraction': float(os.environ.get("KUBEMON_QUERY_CACHE_MAX_ENTRY", 0.25)),
+}
+# Yazan fonksiyonların generation'ını artırdığı tablolar (cached_query bunlara bakar)
+GENERATION_TABLES = ("events", "pod_status", "restart_deltas", "alerts", "correlation_incidents")
+
+
+def _result_size(value):
+    """Approximate memory held by a query result (nested lists, tuples and dicts)"""
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_result_size(key) + _result_size(item) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_result_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class QueryCache:
+    """LRU of query results bounded by their approximate size in bytes"""
+
+    def __init__(self, config=QUERY_CACHE_CONFIG):
+        self.config = config
+        self._entries = OrderedDict()  # key -> (generations, size, result)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.evictions = 0
+        self.counts = {}  # function -> {'hits', 'misses'}
+
+    def get(self, name, key, generations):
+        """(True, result) if `key` was stored at these table generations, else (False, None)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            hit = entry is not None and entry[0] == generations
+            if hit:
+                self._entries.move_to_end(key)
+            elif entry is not None:
+                # Tablo yazılmış, eski sonuç bir daha işe yaramaz
+                self._remove(key)
+            counts = self.counts.setdefault(name, {'hits': 0, 'misses': 0})
+            counts['hits' if hit else 'misses'] += 1
+        QUERY_CACHE_REQUESTS.labels(name, "hit" if hit else "miss").inc()
+        return (True, entry[2]) if hit else (False, None)
+
+    def put(self, key, generations, result):
+        size = _result_size(result)
+        with self._lock:
+            if size > self.config['max_bytes'] * self.config['max_entry_fraction']:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (generations, size, result)
+            self.bytes += size
+            while self.bytes > self.config['max_bytes']:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        self.bytes -= self._entries.pop(key)[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            hits = sum(counts['hits'] for counts in self.counts.values())
+            misses = sum(counts['misses'] for counts in self.counts.values())
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_bytes': self.config['max_bytes'],
+                'evictions': self.evictions,
+                'hits': hits,
+                'misses': misses,
+                'hit_rate': round(hits / (hits + misses), 4) if hits + misses else None,
+                'functions': {name: dict(counts) for name, counts in sorted(self.counts.items())},
+            }
+
+
+query_cache = QueryCache()
+
+
+def query_cache_stats():
+    """Hit/miss counts (total and per function), size and evictions of this process' query cache"""
+    return query_cache.stats()
+
+
+def bump_generations(c, *tables):
+    """Mark `tables` as written; call inside the writing transaction so readers never see new rows with an old generation"""
+    timed_query(c, "table_generation_bump", f"""
+    UPDATE table_generations SET generation = generation + 1 WHERE name IN ({', '.join('?' for _ in tables)})
+    """, tables)
+
+
+def table_generations(tables):
+    """Current write generations of `tables`, in the given order"""
+    with sqlite3.connect(DB_PATH) as conn:
+        c = conn.cursor()
+        timed_query(c, "table_generations", f"""
+        SELECT name, generation FROM table_generations WHERE name IN ({', '.join('?' for _ in tables)})
+        """, tables)
+        generations = dict(c.fetchall())
+    return tuple(generations.get(table) for table in tables)
+
+
+def cached_query(*tables):
+    """Cache a read function's results until one of `tables` is written.
+
+    The key is the function and its arguments bound to the signature
+    (defaults filled in, so positional and keyword calls share entries), plus
+    the current minute: `hours` windows are relative to now, so a cached
+    result trails the sliding window edge by at most a minute. The
+    generations are stored in SQLite by the writers, so writes from the
+    collector process invalidate the API's cache too; each call costs one
+    small generation lookup. Results are shared between callers and must not
+    be modified.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if query_cache.config['max_bytes'] <= 0:
+                return func(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = (DB_PATH, func.__name__, tuple(bound.arguments.items()), int(time.time() // 60))
+            try:
+                hash(key)
+                generations = table_generations(tables)
+            except (TypeError, sqlite3.Error):
+                # Hashlenemeyen argüman ya da henüz oluşmamış DB: cache'siz çalış
+                return func(*args, **kwargs)
+            hit, result = query_cache.get(func.__name__, key, generations)
+            if hit:
+                return result
+            # Generation sorgudan önce okundu: arada yazılan satırlar bir sonraki çağrıda yenilenir
+            result = func(*args, **kwargs)
+            query_cache.put(key, generations, result)
+            return result
+
+        wrapper.uncached = func
+        return wrapper
+    return decorator
+
 def init_db():
     with sqlite3.connect(DB_PATH) as conn:
         c = conn.cursor()
-        # Pod status table (existing)
-        c.execute("""
-        CREATE TABLE IF NOT EXISTS pod_status (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            cluster TEXT,
-            namespace TEXT,
-            pod_name TEXT,
-            status TEXT,
-            restarts INTEGER,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-        """)
-        
-        # Events table (new)
-        c.execute("""
-        CREATE TABLE IF NOT EXISTS events (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            cluster TEXT,
-            namespace TEXT,
-            object_name TEXT,
-            object_kind TEXT,
-            event_type TEXT,
-            reason TEXT,
-            message TEXT,
-            count INTEGER DEFAULT 1,
-            first_timestamp DATETIME,
-            last_timestamp DATETIME,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-        """)
+        # Silinen partition'ların sayfaları dosyadan geri verilebilsin (yeni DB'lerde etkili)
+        c.execute("PRAGMA auto_vacuum = INCREMENTAL")
         
         # Alerts table (new)
         c.execute("""
@@ -49,9 +196,46 @@ def init_db():
             status TEXT DEFAULT 'active',
             created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
             resolved_at DATETIME NULL,
-            metadata TEXT NULL
+            metadata TEXT NULL,
+            namespace TEXT NULL,
+            acknowledged_at DATETIME NULL,
+            group_key TEXT NULL,
+            parent_id INTEGER NULL,
+            member_count INTEGER DEFAULT 1,
+            last_seen_at DATETIME NULL
+        )
+        """)
+        # Sonradan eklenen kolonlar, eski DB'lerde ALTER ile eklenir
+        alert_columns = {row[1] for row in c.execute("PRAGMA table_info(alerts)")}
+        if "namespace" not in alert_columns:
+            c.execute("ALTER TABLE alerts ADD COLUMN namespace TEXT NULL")
+            # metadata "pod=namespace/name,..." formatında
+            c.execute("UPDATE alerts SET namespace = substr(metadata, 5, instr(metadata, '/') - 5) WHERE metadata LIKE 'pod=%/%'")
+        for column, declaration in (("acknowledged_at", "DATETIME NULL"), ("group_key", "TEXT NULL"), ("parent_id", "INTEGER NULL"),
+                                    ("member_count", "INTEGER DEFAULT 1"), ("last_seen_at", "DATETIME NULL")):
+            if column not in alert_columns:
+                c.execute(f"ALTER TABLE alerts ADD COLUMN {column} {declaration}")
+        # Rule bazında açık alert'ler (dedupe, storm gruplama ve rate limit tek sorguda)
+        c.execute("CREATE INDEX IF NOT EXISTS idx_alerts_rule ON alerts (rule_name, status, created_at)")
+        # Aktif alert sayıları (summary) sadece bu index'ten okunur
+        c.execute("CREATE INDEX IF NOT EXISTS idx_alerts_status ON alerts (status, cluster, severity)")
+        
+        # Gönderilecek alert bildirimleri (transactional outbox, see notifications.py)
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS notification_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            receiver TEXT,
+            alert_id INTEGER,
+            payload TEXT,
+            status TEXT DEFAULT 'pending',
+            attempts INTEGER DEFAULT 0,
+            next_attempt_at DATETIME,
+            last_error TEXT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            sent_at DATETIME NULL
         )
         """)
+        c.execute("CREATE INDEX IF NOT EXISTS idx_notification_outbox_due ON notification_outbox (status, next_attempt_at)")
         
         # Alert rules table (new)
         c.execute("""
@@ -68,59 +252,638 @@ def init_db():
         )
         """)
         
+        # Cluster collection health (collector yazar, API okur)
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS cluster_health (
+            cluster TEXT PRIMARY KEY,
+            last_attempt DATETIME,
+            last_success DATETIME,
+            last_duration REAL,
+            consecutive_failures INTEGER DEFAULT 0,
+            last_error TEXT NULL
+        )
+        """)
+        
+        # Son görülen event count'ları (delta ingestion, sadece collector kullanır)
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS event_index (
+            cluster TEXT,
+            uid TEXT,
+            count INTEGER,
+            last_timestamp DATETIME,
+            PRIMARY KEY (cluster, uid)
+        ) WITHOUT ROWID
+        """)
+        
+        # Ingest başına yeni event sayısı (delta), anomaly.py rate'leri bundan okur;
+        # events.count dedupe'da kümülatif toplam olduğu için oradan hesaplanamaz
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS event_rates (
+            timestamp DATETIME,
+            cluster TEXT,
+            namespace TEXT,
+            reason TEXT,
+            count INTEGER,
+            PRIMARY KEY (timestamp, cluster, namespace, reason)
+        ) WITHOUT ROWID
+        """)
+        
+        # Son görülen kümülatif restart sayısı, restart_deltas bundan hesaplanır
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS pod_restart_state (
+            cluster TEXT,
+            namespace TEXT,
+            pod_name TEXT,
+            restarts INTEGER,
+            PRIMARY KEY (cluster, namespace, pod_name)
+        ) WITHOUT ROWID
+        """)
+        # Restart listing'i en az bir kez yapılmış cluster'lar; ilk listing sadece baseline
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS restart_listings (
+            cluster TEXT PRIMARY KEY,
+            listed_at TIMESTAMP
+        ) WITHOUT ROWID
+        """)
+        # Bu tablo eklenmeden önce listelenmiş cluster'lar yeniden baseline'a düşmesin
+        c.execute("INSERT OR IGNORE INTO restart_listings (cluster, listed_at) SELECT DISTINCT cluster, NULL FROM pod_restart_state")
+        
+        # Cross-cluster korelasyon: (imza, cluster) başına son episode ve açılan incident'ler (see correlation.py)
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS correlation_members (
+            signature TEXT,
+            cluster TEXT,
+            first_seen DATETIME,
+            last_seen DATETIME,
+            occurrences INTEGER,
+            sample TEXT,
+            PRIMARY KEY (signature, cluster)
+        ) WITHOUT ROWID
+        """)
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS correlation_incidents (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            signature TEXT,
+            source TEXT,
+            reason TEXT,
+            template TEXT,
+            first_seen DATETIME,
+            last_seen DATETIME,
+            cluster_count INTEGER,
+            occurrences INTEGER,
+            clusters TEXT
+        )
+        """)
+        c.execute("CREATE INDEX IF NOT EXISTS idx_correlation_incidents_signature ON correlation_incidents(signature, last_seen)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_correlation_incidents_last_seen ON correlation_incidents(last_seen)")
+        
+        # Tablo başına yazma sayacı, API'deki sorgu cache'i bununla geçersizlenir
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS table_generations (
+            name TEXT PRIMARY KEY,
+            generation INTEGER DEFAULT 0
+        ) WITHOUT ROWID
+        """)
+        for table in GENERATION_TABLES:
+            c.execute("INSERT OR IGNORE INTO table_generations (name) VALUES (?)", (table,))
+        
+        # Expired events / resolved alerts segment index (see archive.py)
+        init_archive(c)
+        
+        # Pod status and events are day-partitioned (see partitions.py)
+        migrated = 0
+        for table in PARTITIONED_TABLES:
+            migrated += migrate_legacy_table(c, table)
+            ensure_partition(c, table)
+            # Sonradan eklenen index'ler eski partition'larda da oluşsun
+            ensure_indexes(c, table)
+        
         conn.commit()
-        print("[DB] Database tables initialized successfully")
+        if migrated:
+            c.execute("PRAGMA auto_vacuum")
+            if c.fetchone()[0] == 0:
+                # Eski DB: auto_vacuum ancak VACUUM ile açılır, bir kereye mahsus
+                c.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                c.execute("VACUUM")
+        logger.info("Database tables initialized successfully")
 
 def save_pod_status(cluster, namespace, pod_name, status, restarts):
+    now = datetime.utcnow()
     with sqlite3.connect(DB_PATH) as conn:
         c = conn.cursor()
-        c.execute("""
-        INSERT INTO pod_status (cluster, namespace, pod_name, status, restarts, timestamp)
+        partition = ensure_partition(c, "pod_status", now)
+        timed_query(c, "pod_status_insert", f"""
+        INSERT INTO {partition} (cluster, namespace, pod_name, status, restarts, timestamp)
         VALUES (?, ?, ?, ?, ?, ?)
-        """, (cluster, namespace, pod_name, status, restarts, datetime.utcnow()))
+        """, (cluster, namespace, pod_name, status, restarts, now))
+        bump_generations(c, "pod_status")
+        conn.commit()
+
+def drop_old_partitions(table, hours, archive=False):
+    """Retention for a partitioned table: drop whole days older than `hours`.
+
+    With `archive`, each partition is written to the cold-tier archive first.
+    The Parquet files are written before the write lock is taken; the lock
+    only covers registering the segments, the DROPs and the view rebuild,
+    so readers never see a day both in the hot table and in the archive.
+    """
+    threshold = datetime.utcnow() - timedelta(hours=hours)
+    archive = archive and ARCHIVE_ENABLED
+    segments = {}
+    registered = []
+    with sqlite3.connect(DB_PATH) as conn:
+        c = conn.cursor()
+        if archive:
+            # Geçmiş günlerin partition'larına artık yazılmıyor, kilitsiz okunabilir
+            for day, name in expired_partitions(c, table, threshold):
+                segments[name] = write_segment(c, table, name, day)
+
+        def register(c, day, name):
+            # Export'tan sonra süresi dolan partition (nadiren) kilit içinde yazılır
+            segment = segments.pop(name) if name in segments else write_segment(c, table, name, day)
+            if segment:
+                register_segment(c, table, segment)
+                registered.append(segment)
+
+        try:
+            dropped = drop_partitions_before(c, table, threshold, register if archive else None)
+            if dropped:
+                bump_generations(c, table)
+            conn.commit()
+            registered.clear()
+        finally:
+            # Başka replica drop ettiyse ya da transaction geri alındıysa dosyalar kayıtsız kalmasın
+            for segment in [*segments.values(), *registered]:
+                if segment:
+                    discard_segment(segment)
+        if dropped:
+            # executescript pragma'yı sonuna kadar çalıştırır (execute tek sayfa boşaltıyor)
+            conn.executescript("PRAGMA incremental_vacuum")
+            logger.info("Dropped partitions: %s", ", ".join(dropped))
+    return dropped
+
+def cleanup_old_data(hours=24, restart_hours=168, usage_hours=168):
+    drop_old_partitions("pod_status", hours)
+    drop_old_partitions("restart_deltas", restart_hours)
+    drop_old_partitions("pod_usage", usage_hours)
+
+def save_pod_usage(cluster, rows, timestamp=None):
+    """Store one downsampled usage flush.
+
+    `rows` are (namespace, pod_name, cpu_avg, cpu_max, memory_avg, memory_max,
+    memory_limit, samples) tuples; all get the same `timestamp` (the end of
+    the flushed window).
+    """
+    if not rows:
+        return
+    timestamp = timestamp or datetime.utcnow()
+    with sqlite3.connect(DB_PATH) as conn:
+        c = conn.cursor()
+        partition = ensure_partition(c, "pod_usage", timestamp)
+        for row in rows:
+            timed_query(c, "pod_usage_insert", f"""
+            INSERT INTO {partition} (cluster, namespace, pod_name, cpu_avg, cpu_max, memory_avg, memory_max, memory_limit, samples, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (cluster, *row, timestamp))
+        conn.commit()
+
+def save_restart_samples(cluster, samples):
+    """Turn one full pod listing into restart deltas; returns the number of deltas stored.
+
+    `samples` is [(namespace, pod_name, cumulative restarts)] for every pod in
+    the cluster. Each count is compared with the previous listing and only
+    increases are written to restart_deltas. A pod seen for the first time
+    counts all its restarts, unless this is the first listing ever stored
+    for the cluster (then the counts are only a baseline); a cluster whose
+    previous listing was empty is not new. Pods that are gone are forgotten.
+    """
+    now = datetime.utcnow()
+    with sqlite3.connect(DB_PATH) as conn:
+        c = conn.cursor()
+        timed_query(c, "restart_listing_load", "SELECT 1 FROM restart_listings WHERE cluster = ?", (cluster,))
+        first_listing = c.fetchone() is None
+        timed_query(c, "restart_state_load", "SELECT namespace, pod_name, restarts FROM pod_restart_state WHERE cluster = ?", (cluster,))
+        previous = {(namespace, pod_name): restarts for namespace, pod_name, restarts in c.fetchall()}
+        deltas = []
+        changed = []
+        for namespace, pod_name, restarts in samples:
+            last = previous.pop((namespace, pod_name), None)
+            if last == restarts:
+                continue
+            changed.append((cluster, namespace, pod_name, restarts))
+            if last is None and first_listing:
+                continue
+            # Sayaç düştüyse container/pod yeniden oluşmuş, tamamı yeni restart
+            delta = restarts - last if last is not None and restarts >= last else restarts
+            if delta > 0:
+                deltas.append((cluster, namespace, pod_name, delta, restarts, now))
+        
+        if deltas:
+            partition = ensure_partition(c, "restart_deltas", now)
+            for delta in deltas:
+                timed_query(c, "restart_delta_insert", f"""
+                INSERT INTO {partition} (cluster, namespace, pod_name, delta, restarts, timestamp) VALUES (?, ?, ?, ?, ?, ?)
+                """, delta)
+            bump_generations(c, "restart_deltas")
+        for state in changed:
+            timed_query(c, "restart_state_upsert", """
+            INSERT INTO pod_restart_state (cluster, namespace, pod_name, restarts) VALUES (?, ?, ?, ?)
+            ON CONFLICT(cluster, namespace, pod_name) DO UPDATE SET restarts = excluded.restarts
+            """, state)
+        for namespace, pod_name in previous:
+            timed_query(c, "restart_state_delete", "DELETE FROM pod_restart_state WHERE cluster = ? AND namespace = ? AND pod_name = ?",
+                        (cluster, namespace, pod_name))
+        timed_query(c, "restart_listing_upsert", """
+        INSERT INTO restart_listings (cluster, listed_at) VALUES (?, ?)
+        ON CONFLICT(cluster) DO UPDATE SET listed_at = excluded.listed_at
+        """, (cluster, now))
         conn.commit()
+    return len(deltas)
 
-def cleanup_old_data(hours=24):
+RESTART_BUCKETS = {"minute": 16, "hour": 13, "day": 10}
+RESTART_GROUPS = ("cluster", "namespace", "pod")
+
+def get_restart_series(cluster=None, namespace=None, pod=None, hours=24, bucket="hour", group_by=None, include=None):
+    """Restart-rate series from restart_deltas.
+
+    Returns [{'cluster', 'namespace', 'pod', 'points': [{'time', 'restarts'}]}]
+    with one entry per cluster, namespace or pod (`group_by`, default: the
+    most specific filter given); keys finer than `group_by` are None.
+    `include(cluster, namespace)` can hide namespaces before the roll-up.
+    """
+    group_by = group_by or ("pod" if pod else "namespace" if namespace else "cluster")
     threshold = datetime.utcnow() - timedelta(hours=hours)
+    query = f"""
+    SELECT cluster, namespace, {"pod_name" if group_by == "pod" else "NULL"}, substr(timestamp, 1, {RESTART_BUCKETS[bucket]}) AS bucket, SUM(delta)
+    FROM {{restart_deltas}} WHERE timestamp >= ?
+    """
+    params = [threshold]
+    for column, value in (("cluster", cluster), ("namespace", namespace), ("pod_name", pod)):
+        if value:
+            query += f" AND {column} = ?"
+            params.append(value)
+    query += " GROUP BY 1, 2, 3, 4"
+    rows = analytics_query("restart_series", query, params, since=threshold)
+    
+    series = {}
+    for row_cluster, row_namespace, row_pod, row_bucket, restarts in rows:
+        if include and not include(row_cluster, row_namespace):
+            continue
+        key = (row_cluster, row_namespace if group_by != "cluster" else None, row_pod)
+        points = series.setdefault(key, {})
+        label = row_bucket + ":00" if bucket == "hour" else row_bucket
+        points[label] = points.get(label, 0) + restarts
+    return [
+        {'cluster': key[0], 'namespace': key[1], 'pod': key[2],
+         'points': [{'time': label, 'restarts': points[label]} for label in sorted(points)]}
+        for key, points in sorted(series.items(), key=lambda item: tuple(part or "" for part in item[0]))
+    ]
+
+def record_collection_result(cluster, success, duration, error=None):
+    """Store the outcome of one collection run for a cluster"""
+    now = datetime.utcnow()
     with sqlite3.connect(DB_PATH) as conn:
         c = conn.cursor()
-        c.execute("DELETE FROM pod_status WHERE timestamp < ?", (threshold,))
+        if success:
+            timed_query(c, "cluster_health_success", """
+            INSERT INTO cluster_health (cluster, last_attempt, last_success, last_duration, consecutive_failures, last_error)
+            VALUES (?, ?, ?, ?, 0, NULL)
+            ON CONFLICT(cluster) DO UPDATE SET last_attempt = excluded.last_attempt, last_success = excluded.last_success,
+                last_duration = excluded.last_duration, consecutive_failures = 0, last_error = NULL
+            """, (cluster, now, now, duration))
+        else:
+            timed_query(c, "cluster_health_failure", """
+            INSERT INTO cluster_health (cluster, last_attempt, last_duration, consecutive_failures, last_error)
+            VALUES (?, ?, ?, 1, ?)
+            ON CONFLICT(cluster) DO UPDATE SET last_attempt = excluded.last_attempt, last_duration = excluded.last_duration,
+                consecutive_failures = consecutive_failures + 1, last_error = excluded.last_error
+            """, (cluster, now, duration, error))
         conn.commit()
 
+def get_cluster_health():
+    """Return {cluster: health dict} for every cluster that has been collected at least once"""
+    with sqlite3.connect(DB_PATH) as conn:
+        c = conn.cursor()
+        timed_query(c, "cluster_health_list", """
+        SELECT cluster, last_attempt, last_success, last_duration, consecutive_failures, last_error FROM cluster_health
+        """)
+        rows = c.fetchall()
+    return {
+        row[0]: {
+            'last_attempt': row[1],
+            'last_success': row[2],
+            'last_duration': row[3],
+            'consecutive_failures': row[4],
+            'last_error': row[5],
+        }
+        for row in rows
+    }
+
+def _process_mirror():
+    if ANALYTICS_BACKEND != "duckdb" or not ANALYTICS_AVAILABLE:
+        return None
+    with _analytics_lock:
+        mirror = _analytics_mirrors.get(DB_PATH)
+        if mirror is None:
+            mirror = _analytics_mirrors[DB_PATH] = AnalyticsMirror(DB_PATH)
+            mirror.warm()
+        return mirror
+
+def warm_analytics():
+    """Create this process's DuckDB mirror and start its first full sync in the background.
+
+    Returns the warm-up thread, or None when the mirror is disabled.
+    """
+    mirror = _process_mirror()
+    return mirror.warming if mirror is not None else None
+
+def _analytics_mirror():
+    """The mirror once its first full sync is done; until then (or without DuckDB) None"""
+    mirror = _process_mirror()
+    return mirror if mirror is not None and mirror.ready.is_set() else None
+
+def analytics_query(name, sql, params=(), since=None):
+    """Run a read-only aggregate over the partitioned tables and return all rows.
+
+    `sql` names the tables as {events} / {pod_status} and must be valid on
+    both SQLite and DuckDB. It runs on the process's DuckDB mirror when
+    available and warmed up, otherwise (or if DuckDB fails) on SQLite with
+    partition pruning. `since` is the start of the query's time range;
+    ranges shorter than ANALYTICS_MIN_RANGE stay on SQLite.
+    """
+    tables = [table for table in PARTITIONED_TABLES if "{" + table + "}" in sql]
+    # DuckDB tarafında timestamp'ler metin, parametreler de SQLite formatında metin olmalı
+    params = [str(param) if isinstance(param, datetime) else param for param in params]
+    short_range = since is not None and since > datetime.utcnow() - ANALYTICS_MIN_RANGE
+    mirror = None if short_range else _analytics_mirror()
+    if mirror is not None:
+        start = time.perf_counter()
+        try:
+            return mirror.query(sql.format(**{table: table for table in tables}), params, tables, since)
+        except Exception as e:
+            logger.warning("DuckDB query %s failed, falling back to SQLite: %s", name, e)
+        finally:
+            DB_QUERY_SECONDS.labels(name).observe(time.perf_counter() - start)
+    with sqlite3.connect(DB_PATH) as conn:
+        c = conn.cursor()
+        sources = {table: source(c, table, since) for table in tables}
+        timed_query(c, name, sql.format(**sources), params)
+        return c.fetchall()
+
+def get_event_trend(cluster=None, hours=24):
+    """Hourly event totals per event type: [{'hour', 'event_type', 'count'}]"""
+    threshold = datetime.utcnow() - timedelta(hours=hours)
+    query = """
+    SELECT substr(timestamp, 1, 13) AS hour, event_type, SUM(count)
+    FROM {events} WHERE timestamp >= ?
+    """
+    params = [threshold]
+    if cluster:
+        query += " AND cluster = ?"
+        params.append(cluster)
+    query += " GROUP BY hour, event_type ORDER BY hour"
+    rows = analytics_query("event_trend", query, params, since=threshold)
+    return [{'hour': row[0] + ":00", 'event_type': row[1], 'count': row[2]} for row in rows]
+
+def get_top_event_reasons(hours=24, limit=10):
+    """Most frequent (cluster, reason) pairs across all clusters"""
+    threshold = datetime.utcnow() - timedelta(hours=hours)
+    rows = analytics_query("event_top_reasons", """
+    SELECT cluster, reason, SUM(count) AS total, COUNT(DISTINCT object_name)
+    FROM {events} WHERE timestamp >= ?
+    GROUP BY cluster, reason ORDER BY total DESC LIMIT ?
+    """, [threshold, limit], since=threshold)
+    return [{'cluster': row[0], 'reason': row[1], 'count': row[2], 'objects': row[3]} for row in rows]
+
+@cached_query("pod_status")
+def get_problem_pods(cluster=None, hours=24):
+    """Pod status rows in the window with restarts or in CrashLoopBackOff, newest first:
+    [(cluster, namespace, pod_name, status, restarts, timestamp)]"""
+    threshold = (datetime.utcnow() - timedelta(hours=hours)).strftime("%Y-%m-%d %H:%M:%S")
+    with sqlite3.connect(DB_PATH) as conn:
+        c = conn.cursor()
+        query = f"""
+        SELECT cluster, namespace, pod_name, status, restarts, timestamp
+        FROM {source(c, "pod_status", threshold)} WHERE timestamp >= ? AND (restarts > 0 OR status = ?)
+        """
+        params = [threshold, "CrashLoopBackOff"]
+        if cluster:
+            query += " AND cluster = ?"
+            params.append(cluster)
+        timed_query(c, "problem_pods", query + " ORDER BY timestamp DESC", params)
+        return c.fetchall()
+
+def summary_rows(cluster=None, hours=24):
+    """Rows behind a summary: ([(cluster, namespace, pod, status, restarts, timestamp, recent restarts)],
+    [(cluster, severity, active alerts)]), one pod row per pod by its latest row in the window"""
+    threshold = datetime.utcnow() - timedelta(hours=hours)
+    cluster_filter = " AND cluster = ?" if cluster else ""
+    params = [threshold] + ([cluster] if cluster else [])
+    # Pod başına son satır + pencere içindeki restart artışları, tek aggregate
+    rows = analytics_query("summary_pods", f"""
+    WITH latest AS (
+        SELECT cluster, namespace, pod_name, status, restarts, timestamp,
+               ROW_NUMBER() OVER (PARTITION BY cluster, namespace, pod_name ORDER BY timestamp DESC, id DESC) AS rn
+        FROM {{pod_status}} WHERE timestamp >= ?{cluster_filter}
+    ), recent AS (
+        SELECT cluster, namespace, pod_name, SUM(delta) AS delta
+        FROM {{restart_deltas}} WHERE timestamp >= ?{cluster_filter}
+        GROUP BY cluster, namespace, pod_name
+    )
+    SELECT l.cluster, l.namespace, l.pod_name, l.status, l.restarts, l.timestamp, COALESCE(r.delta, 0)
+    FROM latest l LEFT JOIN recent r
+        ON r.cluster = l.cluster AND r.namespace = l.namespace AND r.pod_name = l.pod_name
+    WHERE l.rn = 1
+    """, params + params, since=threshold)
+    
+    with sqlite3.connect(DB_PATH) as conn:
+        c = conn.cursor()
+        timed_query(c, "summary_alerts", f"""
+        SELECT cluster, severity, COUNT(*) FROM alerts WHERE status = 'active'{cluster_filter} GROUP BY cluster, severity
+        """, [cluster] if cluster else [])
+        alert_rows = c.fetchall()
+    # DuckDB ve SQLite aynı tipleri döndürsün (snapshot'a da bu haliyle yazılır)
+    return ([(row[0], row[1], row[2], row[3], row[4], str(row[5]), int(row[6])) for row in rows], alert_rows)
+
+@cached_query("pod_status", "restart_deltas")
+def get_current_pods(cluster=None, hours=24):
+    """Latest row of every pod seen in the window, newest first:
+    [(cluster, namespace, pod_name, status, restarts, timestamp)]"""
+    rows, _ = summary_rows(cluster, hours)
+    return sorted((row[:6] for row in rows), key=lambda row: row[5], reverse=True)
+
+def summarize(rows, alert_rows, cluster=None, hours=24, top=10, include=None, generated_at=None):
+    """Build the summary dict from summary_rows() output"""
+    clusters = {}
+    namespaces = {}
+    pods = []
+    for row_cluster, namespace, pod_name, status, restarts, timestamp, recent in rows:
+        if include and not include(row_cluster, namespace):
+            continue
+        pods.append({'cluster': row_cluster, 'namespace': namespace, 'name': pod_name, 'status': status,
+                     'restarts': restarts, 'recent_restarts': recent, 'timestamp': timestamp})
+        for totals in (clusters.setdefault(row_cluster, {'cluster': row_cluster, 'pods': 0, 'restarting': 0, 'crashloop': 0,
+                                                          'recent_restarts': 0, 'statuses': {}, 'alerts': {}}),
+                       namespaces.setdefault((row_cluster, namespace), {'cluster': row_cluster, 'namespace': namespace, 'pods': 0,
+                                                                         'restarting': 0, 'crashloop': 0, 'recent_restarts': 0})):
+            totals['pods'] += 1
+            totals['restarting'] += restarts > 0
+            totals['crashloop'] += status == "CrashLoopBackOff"
+            totals['recent_restarts'] += recent
+        statuses = clusters[row_cluster]['statuses']
+        statuses[status] = statuses.get(status, 0) + 1
+    
+    alerts = {'total_active': 0, 'critical': 0, 'warning': 0, 'info': 0}
+    for row_cluster, severity, count in alert_rows:
+        alerts['total_active'] += count
+        alerts[severity] = alerts.get(severity, 0) + count
+        if row_cluster in clusters:
+            clusters[row_cluster]['alerts'][severity] = count
+    
+    pods.sort(key=lambda pod: pod['timestamp'], reverse=True)
+    return {
+        'cluster': cluster,
+        'hours': hours,
+        'generated_at': (generated_at or datetime.utcnow()).isoformat(),
+        'totals': {
+            'pods': len(pods),
+            'restarting': sum(item['restarting'] for item in clusters.values()),
+            'crashloop': sum(item['crashloop'] for item in clusters.values()),
+            'recent_restarts': sum(item['recent_restarts'] for item in clusters.values()),
+        },
+        'clusters': sorted(clusters.values(), key=lambda item: item['cluster']),
+        'namespaces': sorted(namespaces.values(), key=lambda item: (-item['crashloop'], -item['restarting'], item['cluster'], item['namespace'])),
+        'top_restarting': sorted(pods, key=lambda pod: (-pod['restarts'], -pod['recent_restarts']))[:top],
+        'alerts': alerts,
+        'pods': pods,
+    }
+
+@cached_query("pod_status", "restart_deltas", "alerts")
+def get_summary(cluster=None, hours=24, top=10, include=None):
+    """Dashboard summary: per-cluster status counts, namespace breakdown, top restarting pods, active alerts.
+
+    Pods are counted once, by their latest row in the window. The result is
+    cached until the next pod status, restart or alert write, so repeated
+    page loads cost one small generation lookup. `include(cluster, namespace)`
+    hides namespaces and is part of the cache key.
+    """
+    rows, alert_rows = summary_rows(cluster, hours)
+    return summarize(rows, alert_rows, cluster, hours, top, include)
+
 # Events functions
+def _event_targets(c):
+    """(now, today's events partition, dedupe window start, FROM fragment for the window)"""
+    now = datetime.utcnow()
+    window = now - timedelta(minutes=5)
+    return now, ensure_partition(c, "events", now), window, source(c, "events", window)
+
+def _save_event(c, targets, cluster, namespace, object_name, object_kind, event_type, reason, message, first_timestamp, last_timestamp, count=1):
+    now, partition, window, recent = targets
+    # Check if similar event exists recently (deduplication)
+    timed_query(c, "event_dedupe_lookup", f"""
+    SELECT id, count FROM {recent}
+    WHERE cluster = ? AND namespace = ? AND object_name = ? AND reason = ? 
+    AND timestamp > ? 
+    ORDER BY timestamp DESC LIMIT 1
+    """, (cluster, namespace, object_name, reason, window))
+    
+    existing = c.fetchone()
+    if existing and partition_for_id("events", existing[0]) != partition:
+        # Dünkü partition'daki satır bugüne taşınır, timestamp ile partition uyumlu kalsın
+        old_partition = partition_for_id("events", existing[0])
+        timed_query(c, "event_move", f"""
+        INSERT INTO {partition} (cluster, namespace, object_name, object_kind, event_type, reason, message, count, first_timestamp, last_timestamp, timestamp)
+        SELECT cluster, namespace, object_name, object_kind, event_type, reason, message, ?, first_timestamp, ?, ?
+        FROM {old_partition} WHERE id = ?
+        """, (existing[1] + count, last_timestamp, now, existing[0]))
+        timed_query(c, "event_move_delete", f"DELETE FROM {old_partition} WHERE id = ?", (existing[0],))
+    elif existing:
+        # Update existing event count
+        timed_query(c, "event_update", f"""
+        UPDATE {partition} SET count = ?, last_timestamp = ?, timestamp = ?
+        WHERE id = ?
+        """, (existing[1] + count, last_timestamp, now, existing[0]))
+    else:
+        # Insert new event
+        timed_query(c, "event_insert", f"""
+        INSERT INTO {partition} (cluster, namespace, object_name, object_kind, event_type, reason, message, count, first_timestamp, last_timestamp, timestamp)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (cluster, namespace, object_name, object_kind, event_type, reason, message, count, first_timestamp, last_timestamp, now))
+
+def _save_event_rates(c, now, events):
+    """Add the new occurrences of a batch to event_rates, one row per (cluster, namespace, reason)"""
+    rates = {}
+    for event in events:
+        key = (event[0], event[1], event[5])
+        rates[key] = rates.get(key, 0) + (event[9] if len(event) > 9 else 1)
+    for (cluster, namespace, reason), count in rates.items():
+        timed_query(c, "event_rate_upsert", """
+        INSERT INTO event_rates (timestamp, cluster, namespace, reason, count) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(timestamp, cluster, namespace, reason) DO UPDATE SET count = count + excluded.count
+        """, (now, cluster, namespace, reason, count))
+
 def save_event(cluster, namespace, object_name, object_kind, event_type, reason, message, first_timestamp, last_timestamp, count=1):
     with sqlite3.connect(DB_PATH) as conn:
         c = conn.cursor()
-        # Check if similar event exists recently (deduplication)
-        c.execute("""
-        SELECT id, count FROM events 
-        WHERE cluster = ? AND namespace = ? AND object_name = ? AND reason = ? 
-        AND timestamp > ? 
-        ORDER BY timestamp DESC LIMIT 1
-        """, (cluster, namespace, object_name, reason, datetime.utcnow() - timedelta(minutes=5)))
-        
-        existing = c.fetchone()
-        if existing:
-            # Update existing event count
-            c.execute("""
-            UPDATE events SET count = ?, last_timestamp = ?, timestamp = ?
-            WHERE id = ?
-            """, (existing[1] + count, last_timestamp, datetime.utcnow(), existing[0]))
-        else:
-            # Insert new event
-            c.execute("""
-            INSERT INTO events (cluster, namespace, object_name, object_kind, event_type, reason, message, count, first_timestamp, last_timestamp, timestamp)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (cluster, namespace, object_name, object_kind, event_type, reason, message, count, first_timestamp, last_timestamp, datetime.utcnow()))
+        targets = _event_targets(c)
+        _save_event(c, targets, cluster, namespace, object_name, object_kind, event_type, reason, message, first_timestamp, last_timestamp, count)
+        _save_event_rates(c, targets[0], [(cluster, namespace, object_name, object_kind, event_type, reason, message, first_timestamp, last_timestamp, count)])
+        bump_generations(c, "events")
+        conn.commit()
+
+def save_events(events, index=None):
+    """Save a batch of events (tuples of save_event arguments) in one transaction.
+
+    `index` is a list of (cluster, uid, count, last_timestamp) high-watermarks
+    stored in the same transaction, so the event index never runs ahead of
+    the events table.
+    """
+    if not events and not index:
+        return
+    with sqlite3.connect(DB_PATH) as conn:
+        c = conn.cursor()
+        targets = _event_targets(c)
+        for event in events:
+            _save_event(c, targets, *event)
+        _save_event_rates(c, targets[0], events)
+        if events:
+            bump_generations(c, "events")
+        for entry in index or ():
+            timed_query(c, "event_index_upsert", """
+            INSERT INTO event_index (cluster, uid, count, last_timestamp) VALUES (?, ?, ?, ?)
+            ON CONFLICT(cluster, uid) DO UPDATE SET count = excluded.count, last_timestamp = excluded.last_timestamp
+            """, entry)
+        conn.commit()
+
+def load_event_index(cluster):
+    """Return {uid: (count, last_timestamp)} for the events last seen in a cluster"""
+    with sqlite3.connect(DB_PATH) as conn:
+        c = conn.cursor()
+        timed_query(c, "event_index_load", "SELECT uid, count, last_timestamp FROM event_index WHERE cluster = ?", (cluster,))
+        return {uid: (count, last_timestamp) for uid, count, last_timestamp in c.fetchall()}
+
+def prune_event_index(cluster, uids):
+    """Forget events that are no longer listed by the cluster"""
+    if not uids:
+        return
+    with sqlite3.connect(DB_PATH) as conn:
+        c = conn.cursor()
+        for uid in uids:
+            timed_query(c, "event_index_prune", "DELETE FROM event_index WHERE cluster = ? AND uid = ?", (cluster, uid))
         conn.commit()
 
-def get_events(cluster=None, event_type=None, hours=24, limit=100):
+def get_events(cluster=None, event_type=None, hours=24, limit=100, as_rows=False):
+    """Recent events as dicts, or with `as_rows` as tuples in EVENT_COLUMNS order"""
     threshold = datetime.utcnow() - timedelta(hours=hours)
     with sqlite3.connect(DB_PATH) as conn:
         c = conn.cursor()
-        query = """
+        # Tüm filtreler segment okumasına iner, arşivden en fazla `limit` satır gelir
+        pushed = {column: value for column, value in (("cluster", cluster), ("event_type", event_type)) if value}
+        events_source = read_through(c, "events", source(c, "events", threshold), EVENT_COLUMNS, threshold,
+                                     equals=pushed, limit=limit)
+        query = f"""
         SELECT id, cluster, namespace, object_name, object_kind, event_type, reason, message, count, timestamp
-        FROM events WHERE timestamp >= ?
+        FROM {events_source} WHERE timestamp >= ?
         """
         params = [threshold]
         
@@ -134,50 +897,44 @@ def get_events(cluster=None, event_type=None, hours=24, limit=100):
         query += " ORDER BY timestamp DESC LIMIT ?"
         params.append(limit)
         
-        c.execute(query, params)
+        timed_query(c, "events_list", query, params)
         rows = c.fetchall()
         
-    events = []
-    for row in rows:
-        events.append({
-            'id': row[0],
-            'cluster': row[1],
-            'namespace': row[2],
-            'object_name': row[3],
-            'object_kind': row[4],
-            'event_type': row[5],
-            'reason': row[6],
-            'message': row[7],
-            'count': row[8],
-            'timestamp': row[9]
-        })
-    return events
-
-def get_events_by_category(cluster=None, category=None, hours=24, limit=100):
-    """Get events filtered by problem categories"""
-    print(f"[DB] get_events_by_category called with: cluster={cluster}, category={category}, hours={hours}, limit={limit}")
+    if as_rows:
+        return rows
+    return [dict(zip(EVENT_COLUMNS, row)) for row in rows]
+
+@cached_query("events")
+def get_events_by_category(cluster=None, category=None, hours=24, limit=100, as_rows=False):
+    """Get events filtered by problem categories (tuples in EVENT_COLUMNS order with `as_rows`)"""
+    logger.debug("get_events_by_category called with: cluster=%s, category=%s, hours=%s, limit=%s", cluster, category, hours, limit)
     
     threshold = datetime.utcnow() - timedelta(hours=hours)
     
     with sqlite3.connect(DB_PATH) as conn:
         c = conn.cursor()
         
-        # First, let's see what events we have in total
-        c.execute("SELECT COUNT(*) FROM events WHERE timestamp >= ?", [threshold])
-        total_events = c.fetchone()[0]
-        print(f"[DB] Total events in time range: {total_events}")
-        
-        # Show event types and reasons
-        c.execute("SELECT event_type, reason, COUNT(*) FROM events WHERE timestamp >= ? GROUP BY event_type, reason", [threshold])
-        event_stats = c.fetchall()
-        print(f"[DB] Event statistics:")
-        for stat in event_stats:
-            print(f"[DB]   {stat[0]} - {stat[1]}: {stat[2]} events")
+        # İstatistik sorguları her istekte çalışmasın, sadece DEBUG seviyesinde
+        if logger.isEnabledFor(logging.DEBUG):
+            total_events = analytics_query("events_total_count", "SELECT COUNT(*) FROM {events} WHERE timestamp >= ?",
+                                           [threshold], since=threshold)[0][0]
+            logger.debug("Total events in time range: %s", total_events)
+            
+            # Show event types and reasons
+            event_stats = analytics_query("events_reason_stats", "SELECT event_type, reason, COUNT(*) FROM {events} WHERE timestamp >= ? GROUP BY event_type, reason",
+                                          [threshold], since=threshold)
+            logger.debug("Event statistics:")
+            for stat in event_stats:
+                logger.debug("%s - %s: %s events", stat[0], stat[1], stat[2])
         
         # Base query
-        query = """
+        # Kategori filtresi SQL, segment okumasına inmez: o zaman limit de inemez
+        events_source = read_through(c, "events", source(c, "events", threshold), EVENT_COLUMNS, threshold,
+                                     equals={"cluster": cluster} if cluster else None,
+                                     limit=None if category and category != 'all' else limit)
+        query = f"""
         SELECT id, cluster, namespace, object_name, object_kind, event_type, reason, message, count, timestamp
-        FROM events WHERE timestamp >= ?
+        FROM {events_source} WHERE timestamp >= ?
         """
         params = [threshold]
         
@@ -191,36 +948,24 @@ def get_events_by_category(cluster=None, category=None, hours=24, limit=100):
             category_filter = get_category_filter(category)
             if category_filter:
                 query += f" AND ({category_filter})"
-                print(f"[DB] Applied category filter for '{category}': {category_filter}")
+                logger.debug("Applied category filter for '%s': %s", category, category_filter)
             else:
-                print(f"[DB] No filter found for category: {category}")
+                logger.warning("No filter found for category: %s", category)
             
         query += " ORDER BY timestamp DESC LIMIT ?"
         params.append(limit)
         
-        print(f"[DB] Final query: {query}")
-        print(f"[DB] Parameters: {params}")
+        logger.debug("Final query: %s", query)
+        logger.debug("Parameters: %s", params)
         
-        c.execute(query, params)
+        timed_query(c, "events_by_category", query, params)
         rows = c.fetchall()
         
-    events = []
-    for row in rows:
-        events.append({
-            'id': row[0],
-            'cluster': row[1],
-            'namespace': row[2],
-            'object_name': row[3],
-            'object_kind': row[4],
-            'event_type': row[5],
-            'reason': row[6],
-            'message': row[7],
-            'count': row[8],
-            'timestamp': row[9]
-        })
     
-    print(f"[DB] Returning {len(events)} events for category: {category}")
-    return events
+    logger.debug("Returning %s events for category: %s", len(rows), category)
+    if as_rows:
+        return rows
+    return [dict(zip(EVENT_COLUMNS, row)) for row in rows]
 
 def get_category_filter(category):
     """Return SQL filter condition for event categories"""
@@ -244,24 +989,132 @@ def get_category_filter(category):
     return filters.get(category)
 
 # Alerts functions  
-def save_alert(cluster, rule_name, severity, message, metadata=None):
+def save_alert(cluster, rule_name, severity, message, metadata=None, namespace=None, receivers=(), notify_delay=0,
+               group_key=None, member_count=1, children=()):
+    """Insert an alert; with `receivers`, queue a notification per receiver in the same transaction.
+
+    Queued notifications become due `notify_delay` seconds later (the
+    dispatcher's coalescing window). A grouped (storm) alert has a
+    `group_key` and `member_count`; existing alerts in `children` get it as
+    their parent.
+    """
+    now = datetime.utcnow()
     with sqlite3.connect(DB_PATH) as conn:
         c = conn.cursor()
-        c.execute("""
-        INSERT INTO alerts (cluster, rule_name, severity, message, metadata)
-        VALUES (?, ?, ?, ?, ?)
-        """, (cluster, rule_name, severity, message, metadata))
+        timed_query(c, "alert_insert", """
+        INSERT INTO alerts (cluster, rule_name, severity, message, metadata, namespace, created_at, group_key, member_count, last_seen_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (cluster, rule_name, severity, message, metadata, namespace, now.strftime("%Y-%m-%d %H:%M:%S"),
+              group_key, member_count, now.strftime("%Y-%m-%d %H:%M:%S")))
+        alert_id = c.lastrowid
+        children = list(children)
+        if children:
+            timed_query(c, "alert_attach_children", f"UPDATE alerts SET parent_id = ? WHERE id IN ({', '.join('?' for _ in children)})",
+                        [alert_id, *children])
+        if receivers:
+            payload = json.dumps({'id': alert_id, 'cluster': cluster, 'namespace': namespace, 'rule_name': rule_name,
+                                  'severity': severity, 'message': message, 'created_at': now.isoformat(),
+                                  'member_count': member_count})
+            due = now + timedelta(seconds=notify_delay)
+            for receiver in receivers:
+                timed_query(c, "notification_enqueue", """
+                INSERT INTO notification_outbox (receiver, alert_id, payload, next_attempt_at, created_at) VALUES (?, ?, ?, ?, ?)
+                """, (receiver, alert_id, payload, due, now))
+        bump_generations(c, "alerts")
+        conn.commit()
+        return alert_id
+
+def get_open_alerts(rule_name, since):
+    """Active alerts of a rule created after `since`, plus every acknowledged or grouped open one.
+
+    Returns [{'id', 'cluster', 'namespace', 'metadata', 'group_key', 'parent_id'}];
+    one query replaces a per-object existence check.
+    """
+    with sqlite3.connect(DB_PATH) as conn:
+        c = conn.cursor()
+        timed_query(c, "alerts_open_for_rule", """
+        SELECT id, cluster, namespace, metadata, group_key, parent_id FROM alerts
+        WHERE rule_name = ? AND status IN ('active', 'acknowledged')
+        AND (created_at >= ? OR status = 'acknowledged' OR group_key IS NOT NULL)
+        """, (rule_name, since.strftime("%Y-%m-%d %H:%M:%S")))
+        rows = c.fetchall()
+    return [dict(zip(('id', 'cluster', 'namespace', 'metadata', 'group_key', 'parent_id'), row)) for row in rows]
+
+def count_alerts_since(rule_name, since):
+    """Top-level alerts of a rule created after `since` (rate limiting)"""
+    with sqlite3.connect(DB_PATH) as conn:
+        c = conn.cursor()
+        timed_query(c, "alerts_rule_rate", """
+        SELECT COUNT(*) FROM alerts WHERE rule_name = ? AND created_at >= ? AND parent_id IS NULL
+        """, (rule_name, since.strftime("%Y-%m-%d %H:%M:%S")))
+        return c.fetchone()[0]
+
+def update_alert_group(alert_id, message, metadata, member_count):
+    """Refresh a grouped alert's members; also marks the group as seen now"""
+    with sqlite3.connect(DB_PATH) as conn:
+        c = conn.cursor()
+        timed_query(c, "alert_group_update", """
+        UPDATE alerts SET message = ?, metadata = ?, member_count = ?, last_seen_at = ? WHERE id = ?
+        """, (message, metadata, member_count, datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"), alert_id))
+        bump_generations(c, "alerts")
         conn.commit()
-        return c.lastrowid
 
-def get_alerts(cluster=None, status=None, severity=None, hours=168, limit=100):
-    """Get alerts with optional filtering by cluster, status, severity"""
+def claim_notifications(limit=500):
+    """Pending notifications of every receiver that has at least one due.
+
+    A due receiver takes all its first-attempt rows with it, so alerts raised
+    during the coalescing window go out in the same batch; rows in retry
+    backoff wait for their own time. Returns [(id, receiver, attempts, payload)].
+    """
+    now = datetime.utcnow()
+    with sqlite3.connect(DB_PATH) as conn:
+        c = conn.cursor()
+        timed_query(c, "notification_claim", """
+        SELECT id, receiver, attempts, payload FROM notification_outbox
+        WHERE status = 'pending'
+        AND receiver IN (SELECT receiver FROM notification_outbox WHERE status = 'pending' AND next_attempt_at <= ?)
+        AND (attempts = 0 OR next_attempt_at <= ?)
+        ORDER BY id LIMIT ?
+        """, (now, now, limit))
+        return c.fetchall()
+
+def mark_notifications_sent(ids):
+    with sqlite3.connect(DB_PATH) as conn:
+        c = conn.cursor()
+        timed_query(c, "notification_sent", f"""
+        UPDATE notification_outbox SET status = 'sent', sent_at = ?, attempts = attempts + 1, last_error = NULL
+        WHERE id IN ({', '.join('?' for _ in ids)})
+        """, [datetime.utcnow(), *ids])
+        conn.commit()
+
+def mark_notifications_failed(ids, error, retry_at=None):
+    """Record a failed attempt: retry at `retry_at`, or give up (status 'failed') if it is None"""
+    with sqlite3.connect(DB_PATH) as conn:
+        c = conn.cursor()
+        timed_query(c, "notification_failed", f"""
+        UPDATE notification_outbox SET status = ?, attempts = attempts + 1, next_attempt_at = COALESCE(?, next_attempt_at), last_error = ?
+        WHERE id IN ({', '.join('?' for _ in ids)})
+        """, ['pending' if retry_at else 'failed', retry_at, error, *ids])
+        conn.commit()
+
+@cached_query("alerts")
+def get_alerts(cluster=None, status=None, severity=None, hours=168, limit=100, as_rows=False, parent_id=None, include_children=False):
+    """Get alerts with optional filtering by cluster, status, severity (tuples in ALERT_COLUMNS order with `as_rows`).
+
+    Alerts grouped under a storm alert are left out unless `include_children`
+    is set or their `parent_id` is asked for.
+    """
     threshold = datetime.utcnow() - timedelta(hours=hours)
     with sqlite3.connect(DB_PATH) as conn:
         c = conn.cursor()
-        query = """
-        SELECT id, cluster, rule_name, severity, message, status, created_at, resolved_at
-        FROM alerts WHERE created_at >= ?
+        # Çözülmüş eski alert'ler arşivde, hours hot pencereyi aşarsa oradan okunur
+        pushed = {column: value for column, value in (("cluster", cluster if cluster != 'all' else None),
+                                                      ("status", status), ("severity", severity)) if value}
+        if parent_id is not None or not include_children:
+            pushed["parent_id"] = parent_id
+        query = f"""
+        SELECT {', '.join(ALERT_COLUMNS)}
+        FROM {read_through(c, "alerts", "alerts", ALERT_COLUMNS, threshold, equals=pushed, limit=limit)} WHERE created_at >= ?
         """
         params = [threshold]
         
@@ -274,36 +1127,113 @@ def get_alerts(cluster=None, status=None, severity=None, hours=168, limit=100):
         if severity:
             query += " AND severity = ?"
             params.append(severity)
+        if parent_id is not None:
+            query += " AND parent_id = ?"
+            params.append(parent_id)
+        elif not include_children:
+            query += " AND parent_id IS NULL"
             
         query += " ORDER BY created_at DESC LIMIT ?"
         params.append(limit)
         
-        print(f"[DB] Alerts query: {query}")
-        print(f"[DB] Alerts params: {params}")
+        logger.debug("Alerts query: %s", query)
+        logger.debug("Alerts params: %s", params)
         
-        c.execute(query, params)
+        timed_query(c, "alerts_list", query, params)
         rows = c.fetchall()
         
-    alerts = []
-    for row in rows:
-        alerts.append({
-            'id': row[0],
-            'cluster': row[1],
-            'rule_name': row[2],
-            'severity': row[3],
-            'message': row[4],
-            'status': row[5],
-            'created_at': row[6],
-            'resolved_at': row[7]
-        })
-    return alerts
+    if as_rows:
+        return rows
+    return [dict(zip(ALERT_COLUMNS, row)) for row in rows]
+
+def get_active_alert_rows():
+    """Every active alert, storm children included, as tuples in ALERT_COLUMNS order plus namespace"""
+    with sqlite3.connect(DB_PATH) as conn:
+        c = conn.cursor()
+        timed_query(c, "alerts_active_all", f"SELECT {', '.join(ALERT_COLUMNS)}, namespace FROM alerts WHERE status = 'active'")
+        return c.fetchall()
+
+def get_clusters_with_active_alerts(severity='critical'):
+    """Return the set of clusters that currently have active alerts of the given severity"""
+    with sqlite3.connect(DB_PATH) as conn:
+        c = conn.cursor()
+        timed_query(c, "active_alert_clusters", """
+        SELECT DISTINCT cluster FROM alerts WHERE status = 'active' AND severity = ?
+        """, (severity,))
+        return {row[0] for row in c.fetchall()}
 
 def resolve_alert(alert_id):
+    return update_alerts("resolve", ids=[alert_id]) > 0
+
+def acknowledge_alert(alert_id):
+    return update_alerts("acknowledge", ids=[alert_id]) > 0
+
+# action -> (yeni status, zaman kolonu, hangi status'lardan geçilebilir)
+ALERT_ACTIONS = {
+    "resolve": ("resolved", "resolved_at", ("active", "acknowledged")),
+    "acknowledge": ("acknowledged", "acknowledged_at", ("active",)),
+}
+ALERT_FILTERS = ("cluster", "rule_name", "severity", "namespace")
+_ID_CHUNK = 500
+
+def update_alerts(action, ids=None, older_than_hours=None, **filters):
+    """Resolve or acknowledge alerts in one transaction; returns the number changed.
+
+    Alerts are selected by `ids` and/or by equality `filters` (cluster,
+    rule_name, severity, namespace) and `older_than_hours` (created before
+    now minus that). At least one criterion is required and `ids` must not
+    be empty. Alerts already in the target status (or resolved, for
+    acknowledge) are left alone. The children of a changed storm alert
+    (parent_id) get the same change; only the selected alerts are counted.
+    """
+    status, time_column, from_statuses = ALERT_ACTIONS[action]
+    unknown = set(filters) - set(ALERT_FILTERS)
+    if unknown:
+        raise ValueError(f"Unknown alert filter: {', '.join(sorted(unknown))}")
+    if ids is not None:
+        ids = list(ids)
+        if not ids:
+            # Boş liste "hiçbiri" mi "filtreye uyanların hepsi" mi belirsiz
+            raise ValueError("ids must not be empty")
+    filters = {column: value for column, value in filters.items() if value is not None}
+    if ids is None and older_than_hours is None and not filters:
+        raise ValueError("At least one of ids or a filter is required")
+    
+    now = datetime.utcnow()
+    query = f"""
+    UPDATE alerts SET status = ?, {time_column} = ?
+    WHERE status IN ({', '.join('?' for _ in from_statuses)})
+    """
+    params = [status, now, *from_statuses]
+    for column, value in filters.items():
+        query += f" AND {column} = ?"
+        params.append(value)
+    if older_than_hours is not None:
+        query += " AND created_at < ?"
+        params.append(now - timedelta(hours=older_than_hours))
+    
     with sqlite3.connect(DB_PATH) as conn:
         c = conn.cursor()
-        c.execute("""
-        UPDATE alerts SET status = 'resolved', resolved_at = ?
-        WHERE id = ? AND status = 'active'
-        """, (datetime.utcnow(), alert_id))
+        c.execute("BEGIN IMMEDIATE")
+        changed = []
+        if ids is None:
+            timed_query(c, f"alerts_bulk_{action}", query + " RETURNING id", params)
+            changed = [row[0] for row in c.fetchall()]
+        else:
+            # SQLite parametre limiti için id listesi parça parça, aynı transaction'da
+            for start in range(0, len(ids), _ID_CHUNK):
+                chunk = ids[start:start + _ID_CHUNK]
+                timed_query(c, f"alerts_bulk_{action}", query + f" AND id IN ({', '.join('?' for _ in chunk)}) RETURNING id",
+                            params + chunk)
+                changed += [row[0] for row in c.fetchall()]
+        # Storm alert'inin çocukları açık kalırsa summary'de sayılır, cluster critical poll'da kalır, yeniden alert'i engeller
+        for start in range(0, len(changed), _ID_CHUNK):
+            chunk = changed[start:start + _ID_CHUNK]
+            timed_query(c, f"alerts_bulk_{action}_children", f"""
+            UPDATE alerts SET status = ?, {time_column} = ?
+            WHERE status IN ({', '.join('?' for _ in from_statuses)}) AND parent_id IN ({', '.join('?' for _ in chunk)})
+            """, [status, now, *from_statuses, *chunk])
+        if changed:
+            bump_generations(c, "alerts")
         conn.commit()
-        return c.rowcount > 0
+    return len(changed)
@@ -0,0 +1,141 @@
+"""Response encodings for the list endpoints (/api/events, /api/pods, /api/alerts).
+
+The default format is unchanged: a JSON array with one object per row.
+Clients can opt into a compact format with `?format=` (or an Accept header):
+
+- `columnar`: JSON, field names listed once and one array per column;
+  low-cardinality columns (cluster, namespace, reason, ...) are
+  dictionary-encoded, the column holds indexes into `dictionaries[name]`.
+- `msgpack`: the same columnar document as MessagePack.
+
+An unknown `?format=` is a 400; a format the server cannot produce (an
+Accept header listing none of JSON/MessagePack, or msgpack not installed)
+is a 406.
+
+Independently of the format, responses of at least COMPRESS_MIN_BYTES are
+compressed with brotli or gzip when the client accepts it. orjson, msgpack and brotli are optional: without
+orjson the stdlib encoder is used, without brotli only gzip is offered and
+without msgpack that format is rejected.
+"""
+import gzip
+import json
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+FORMATS = ("json", "columnar", "msgpack")
+MSGPACK_MIMETYPE = "application/x-msgpack"
+DICTIONARY_COLUMNS = {"cluster", "namespace", "reason", "event_type", "object_kind", "status", "severity", "rule_name"}
+
+# Bundan küçük cevaplar sıkıştırılmaz, kazanç header'dan az
+COMPRESS_MIN_BYTES = int(os.environ.get("KUBEMON_COMPRESS_MIN_BYTES", 1024))
+# Dinamik cevaplar için hız/oran dengesi (11 çok yavaş)
+BROTLI_QUALITY = int(os.environ.get("KUBEMON_BROTLI_QUALITY", 4))
+GZIP_LEVEL = int(os.environ.get("KUBEMON_GZIP_LEVEL", 6))
+
+
+MIMETYPE_FORMATS = {"application/json": "json", MSGPACK_MIMETYPE: "msgpack", "application/msgpack": "msgpack"}
+
+
+class UnsupportedFormat(ValueError):
+    """The requested format can't be served; `status` is the HTTP status to answer with"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def dumps(obj):
+    """JSON-encode to bytes; values JSON has no type for are rendered with str()"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str)
+    return json.dumps(obj, default=str, separators=(",", ":")).encode()
+
+
+def columnar(columns, rows):
+    """{'columns', 'length', 'data': {name: values}, 'dictionaries': {name: distinct values}}"""
+    data = {}
+    dictionaries = {}
+    for i, name in enumerate(columns):
+        values = [row[i] for row in rows]
+        if name in DICTIONARY_COLUMNS:
+            index = {}
+            data[name] = [index.setdefault(value, len(index)) for value in values]
+            dictionaries[name] = list(index)
+        else:
+            data[name] = values
+    return {"columns": list(columns), "length": len(rows), "data": data, "dictionaries": dictionaries}
+
+
+def negotiate_format(args, accept_mimetypes):
+    """Pick the response format from ?format= or the Accept header (none or */* means JSON)"""
+    fmt = args.get("format")
+    if fmt is None and accept_mimetypes:
+        mimetype = accept_mimetypes.best_match(list(MIMETYPE_FORMATS))
+        if mimetype is None:
+            raise UnsupportedFormat(f"Accept must allow one of {', '.join(MIMETYPE_FORMATS)}", 406)
+        fmt = MIMETYPE_FORMATS[mimetype]
+    fmt = fmt or "json"
+    if fmt not in FORMATS:
+        raise UnsupportedFormat(f"format must be one of {', '.join(FORMATS)}")
+    if fmt == "msgpack" and msgpack is None:
+        raise UnsupportedFormat("msgpack is not available on this server", 406)
+    return fmt
+
+
+def encode_rows(columns, rows, fmt="json"):
+    """Serialize rows (tuples in `columns` order); returns (body bytes, mimetype)"""
+    if fmt == "msgpack":
+        return msgpack.packb(columnar(columns, rows), default=str, use_bin_type=True), MSGPACK_MIMETYPE
+    if fmt == "columnar":
+        return dumps(columnar(columns, rows)), "application/json"
+    return dumps([dict(zip(columns, row)) for row in rows]), "application/json"
+
+
+def choose_encoding(accept_encodings):
+    """'br', 'gzip' or None, by the client's Accept-Encoding preferences"""
+    candidates = (("br", "gzip") if brotli is not None else ("gzip",))
+    best = max(candidates, key=lambda encoding: accept_encodings.quality(encoding))
+    return best if accept_encodings.quality(best) > 0 else None
+
+
+def compress_response(response, accept_encodings):
+    """Compress a Flask response in place if it is large enough and the client accepts it.
+
+    Streamed, already encoded and small responses are returned as they are
+    without reading the body.
+    """
+    if (response.direct_passthrough or response.is_streamed or response.status_code < 200 or response.status_code >= 300
+            or "Content-Encoding" in response.headers):
+        return response
+    # Boyut header'dan ya da parçaların uzunluğundan, gövde birleştirilmeden
+    length = response.content_length
+    if length is None:
+        length = response.calculate_content_length()
+    if length is None or length < COMPRESS_MIN_BYTES:
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = choose_encoding(accept_encodings)
+    if encoding is None:
+        return response
+    body = response.get_data()
+    if encoding == "br":
+        body = brotli.compress(body, quality=BROTLI_QUALITY)
+    else:
+        body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    return response
@@ -1,71 +1,122 @@
-import os
-from kubernetes import client, config
-from database import save_event
+import logging
+from client_registry import get_core_v1
+from cluster_registry import list_clusters
+from correlation import correlate_events
+from database import load_event_index, prune_event_index, save_events
+from fast_list import iter_event_pages
+from metrics import CLUSTER_LIST_SECONDS, ROWS_WRITTEN
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
+# cluster -> {event uid: (count, last_timestamp)}, event_index tablosunun bellekteki kopyası
+_event_index = {}
+
+def _get_event_index(cluster_name):
+    index = _event_index.get(cluster_name)
+    if index is None:
+        index = _event_index[cluster_name] = load_event_index(cluster_name)
+    return index
+
 def collect_events_from_cluster(kubeconfig_path, cluster_name):
-    """Collect Kubernetes events from a cluster"""
-    print(f"[EVENTS] Collecting events from cluster: {cluster_name}")
+    """Collect Kubernetes events from a cluster, one API page at a time.
+
+    Events are keyed by UID; only new events and count increments since the
+    last cycle are written, unchanged events are skipped before any DB work.
+    """
+    logger.info("Collecting events from cluster: %s", cluster_name)
     
     try:
-        config.load_kube_config(config_file=kubeconfig_path)
-        v1 = client.CoreV1Api()
-        
-        # Get events from all namespaces
-        try:
-            events = v1.list_event_for_all_namespaces()
-        except Exception as e:
-            print(f"[EVENTS][ERROR] {cluster_name}: Failed to list events: {e}")
-            return
+        v1 = get_core_v1(kubeconfig_path)
+        index = _get_event_index(cluster_name)
+        seen = set()
         
+        # Get events from all namespaces, page by page (limit/_continue)
+        pages = iter_event_pages(v1)
+        listed_count = 0
         event_count = 0
-        for event in events.items:
+        page_count = 0
+        while True:
             try:
-                # Parse event details - namespace bilgisi involved_object'ten alınır
-                namespace = event.involved_object.namespace if event.involved_object and event.involved_object.namespace else 'default'
-                object_name = event.involved_object.name if event.involved_object else 'unknown'
-                object_kind = event.involved_object.kind if event.involved_object else 'unknown'
-                event_type = event.type or 'Normal'
-                reason = event.reason or 'Unknown'
-                message = event.message or 'No message'
-                count = event.count or 1
-                
-                # Parse timestamps
-                first_timestamp = event.first_timestamp or event.creation_timestamp
-                last_timestamp = event.last_timestamp or event.creation_timestamp
-                
-                # Convert to string format for database
-                first_ts_str = first_timestamp.strftime("%Y-%m-%d %H:%M:%S") if first_timestamp else datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-                last_ts_str = last_timestamp.strftime("%Y-%m-%d %H:%M:%S") if last_timestamp else datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-                
-                # Filter out routine events (optional)
-                if should_include_event(event_type, reason):
-                    save_event(
-                        cluster_name, 
-                        namespace, 
-                        object_name, 
-                        object_kind, 
-                        event_type, 
-                        reason, 
-                        message,
-                        first_ts_str,
-                        last_ts_str,
-                        count
-                    )
-                    event_count += 1
-                    
-                    # Log important events
-                    if event_type == 'Warning' or reason in ['Failed', 'BackOff', 'Unhealthy']:
-                        print(f"[EVENTS][WARNING] {cluster_name}/{namespace}/{object_name}: {reason} - {message}")
-                        
+                with CLUSTER_LIST_SECONDS.labels(cluster_name, "events").time():
+                    page = next(pages, None)
             except Exception as e:
-                print(f"[EVENTS][ERROR] {cluster_name}: Error processing event: {e}")
-                continue
+                logger.error("%s: Failed to list events (page %d): %s", cluster_name, page_count + 1, e)
+                return False
+            if page is None:
+                break
+            page_count += 1
+            listed_count += len(page)
+            
+            rows = []
+            marks = []
+            for event in page:
+                count = event.count or 1
+                if event.uid:
+                    seen.add(event.uid)
+                    mark = (count, event.last_timestamp)
+                    previous = index.get(event.uid)
+                    if previous == mark:
+                        continue
+                    # Kubernetes count kümülatif; sadece artışı yaz (count düştüyse event yeniden başlamış)
+                    if previous and count >= previous[0]:
+                        count -= previous[0]
+                    marks.append((cluster_name, event.uid) + mark)
+                if count:
+                    row = prepare_event(cluster_name, event, count)
+                    if row:
+                        rows.append(row)
+            
+            # Her sayfa tek transaction'da yazılır, sonra bellekten atılır
+            save_events(rows, marks)
+            # Aynı sayfa, events tablosu yeniden taranmadan korelasyona girer
+            correlate_events(cluster_name, rows)
+            for _, uid, mark_count, mark_timestamp in marks:
+                index[uid] = (mark_count, mark_timestamp)
+            event_count += len(rows)
         
-        print(f"[EVENTS] {cluster_name}: Collected {event_count} events")
+        # Artık listelenmeyen (expire olmuş) event'leri index'ten çıkar
+        stale = [uid for uid in index if uid not in seen]
+        prune_event_index(cluster_name, stale)
+        for uid in stale:
+            del index[uid]
+        
+        ROWS_WRITTEN.labels(cluster_name, "events").observe(event_count)
+        logger.info("%s: Listed %s events in %d pages, %s new or changed", cluster_name, listed_count, page_count, event_count)
+        return True
         
     except Exception as e:
-        print(f"[EVENTS][ERROR] Failed to collect events from cluster {cluster_name}: {e}")
+        logger.error("Failed to collect events from cluster %s: %s", cluster_name, e)
+        return False
+
+def prepare_event(cluster_name, event, count):
+    """Turn an EventRecord into save_event arguments, or None if it is filtered out"""
+    try:
+        # Parse event details - namespace bilgisi involved_object'ten alınır
+        namespace = event.namespace or 'default'
+        object_name = event.object_name or 'unknown'
+        object_kind = event.object_kind or 'unknown'
+        event_type = event.event_type or 'Normal'
+        reason = event.reason or 'Unknown'
+        message = event.message or 'No message'
+        
+        # Filter out routine events (optional)
+        if not should_include_event(event_type, reason):
+            return None
+        
+        # Timestamps fast_list tarafından DB formatına çevrilmiş geliyor
+        now_str = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        first_ts_str = event.first_timestamp or now_str
+        last_ts_str = event.last_timestamp or now_str
+        
+        # Log important events - INFO: warning seviyesi örneklenmez, her event satırı log'u boğar
+        if event_type == 'Warning' or reason in ['Failed', 'BackOff', 'Unhealthy']:
+            logger.info("%s/%s/%s: %s - %s", cluster_name, namespace, object_name, reason, message)
+        
+        return (cluster_name, namespace, object_name, object_kind, event_type, reason, message, first_ts_str, last_ts_str, count)
+    except Exception as e:
+        logger.error("%s: Error processing event: %s", cluster_name, e)
+        return None
 
 def should_include_event(event_type, reason):
     """Filter events to include only relevant ones"""
@@ -86,23 +137,17 @@ def should_include_event(event_type, reason):
 
 def collect_all_cluster_events():
     """Collect events from all configured clusters"""
-    print("[EVENTS] Starting event collection from all clusters...")
-    
-    cluster_dir = "clusters"
-    if not os.path.exists(cluster_dir):
-        print(f"[EVENTS][ERROR] Cluster directory {cluster_dir} not found")
-        return
+    logger.info("Starting event collection from all clusters...")
     
-    for file in os.listdir(cluster_dir):
-        if file.endswith(".conf"):
-            cluster_name = file.replace("admin-", "").replace(".conf", "").lower()
-            path = os.path.join(cluster_dir, file)
-            print(f"[EVENTS] Processing cluster: {cluster_name}")
-            
-            try:
-                collect_events_from_cluster(path, cluster_name)
-            except Exception as e:
-                print(f"[EVENTS][ERROR] {cluster_name} event collection failed: {e}")
+    for cluster_name, cluster in list_clusters().items():
+        logger.info("Processing cluster: %s", cluster_name)
+        
+        try:
+            collect_events_from_cluster(cluster["path"], cluster_name)
+        except Exception as e:
+            logger.error("%s event collection failed: %s", cluster_name, e)
 
 if __name__ == "__main__":
+    from logging_config import setup_logging
+    setup_logging("events")
     collect_all_cluster_events()
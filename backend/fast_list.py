@@ -0,0 +1,307 @@
+"""Compact pod, event and pod metrics listing for the collectors.
+
+The collectors only need a handful of fields per object, but the default
+client turns every list response into full V1Pod / CoreV1Event object
+graphs. With KUBEMON_FAST_LIST enabled (the default) the list calls are made
+with _preload_content=False and the raw JSON body is streamed through ijson,
+keeping only the fields below. Without ijson, or with KUBEMON_FAST_LIST=0,
+the model-based client is used and converted into the same records.
+"""
+import logging
+import os
+import re
+from collections import namedtuple
+
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+FAST_LIST = os.environ.get("KUBEMON_FAST_LIST", "1") != "0" and IJSON_AVAILABLE
+# Event listesi bu boyutta sayfalarla çekilir (limit/_continue)
+EVENT_PAGE_SIZE = int(os.environ.get("KUBEMON_EVENT_PAGE_SIZE", 500))
+
+# memory_limit: container limit'lerinin toplamı (byte), limitsiz container varsa None
+PodRecord = namedtuple("PodRecord", "namespace name phase restarts waiting_reasons memory_limit")
+
+EventRecord = namedtuple(
+    "EventRecord",
+    "uid namespace object_name object_kind event_type reason message count first_timestamp last_timestamp",
+)
+
+# cpu millicore, memory byte (tüm container'ların toplamı)
+PodMetricsRecord = namedtuple("PodMetricsRecord", "namespace name cpu memory")
+
+_QUANTITY_SUFFIXES = {
+    "n": 1e-9, "u": 1e-6, "m": 1e-3, "": 1.0, "k": 1e3, "M": 1e6, "G": 1e9, "T": 1e12, "P": 1e15, "E": 1e18,
+    "Ki": 2.0 ** 10, "Mi": 2.0 ** 20, "Gi": 2.0 ** 30, "Ti": 2.0 ** 40, "Pi": 2.0 ** 50, "Ei": 2.0 ** 60,
+}
+_QUANTITY = re.compile(r"^([+-]?[0-9.]+(?:[eE][+-]?[0-9]+)?)([a-zA-Z]*)$")
+
+
+def parse_quantity(value):
+    """Kubernetes quantity ('250m', '128Mi', '1.5', '1e3') -> float; None if it can't be parsed"""
+    if value is None:
+        return None
+    match = _QUANTITY.match(str(value).strip())
+    if not match or match.group(2) not in _QUANTITY_SUFFIXES:
+        return None
+    return float(match.group(1)) * _QUANTITY_SUFFIXES[match.group(2)]
+
+
+def _db_timestamp(value):
+    """'2024-05-01T10:00:00Z' (or a datetime) -> '2024-05-01 10:00:00'"""
+    if not value:
+        return None
+    if isinstance(value, str):
+        return value[:19].replace("T", " ")
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+
+# --- Pods -------------------------------------------------------------------
+
+_POD_PREFIX = "items.item"
+_POD_FIELDS = {
+    "items.item.metadata.name": "name",
+    "items.item.metadata.namespace": "namespace",
+    "items.item.status.phase": "phase",
+}
+_RESTART_COUNT = "items.item.status.containerStatuses.item.restartCount"
+_WAITING_REASON = "items.item.status.containerStatuses.item.state.waiting.reason"
+_CONTAINER = "items.item.spec.containers.item"
+_MEMORY_LIMIT = "items.item.spec.containers.item.resources.limits.memory"
+
+
+def _memory_limit(containers, limits):
+    # Bir container bile limitsizse pod'un limiti yok
+    if not containers or len(limits) != containers or None in limits:
+        return None
+    return sum(limits)
+
+
+def iter_pods_raw(stream):
+    """Yield PodRecords from a raw PodList JSON stream"""
+    fields = {}
+    restarts = 0
+    waiting = []
+    containers = 0
+    limits = []
+    for prefix, event, value in ijson.parse(stream):
+        if prefix == _POD_PREFIX:
+            if event == "start_map":
+                fields = {}
+                restarts = 0
+                waiting = []
+                containers = 0
+                limits = []
+            elif event == "end_map":
+                yield PodRecord(fields.get("namespace"), fields.get("name"), fields.get("phase"),
+                                restarts, tuple(waiting), _memory_limit(containers, limits))
+        elif prefix in _POD_FIELDS:
+            fields[_POD_FIELDS[prefix]] = value
+        elif prefix == _RESTART_COUNT:
+            restarts += int(value)
+        elif prefix == _WAITING_REASON and value:
+            waiting.append(value)
+        elif prefix == _CONTAINER and event == "start_map":
+            containers += 1
+        elif prefix == _MEMORY_LIMIT:
+            limits.append(parse_quantity(value))
+
+
+def pod_record_from_model(pod):
+    statuses = (pod.status.container_statuses or []) if pod.status else []
+    containers = (pod.spec.containers or []) if pod.spec else []
+    return PodRecord(
+        pod.metadata.namespace,
+        pod.metadata.name,
+        pod.status.phase if pod.status else None,
+        sum(cs.restart_count or 0 for cs in statuses),
+        tuple(cs.state.waiting.reason for cs in statuses
+              if cs.state and cs.state.waiting and cs.state.waiting.reason),
+        _memory_limit(len(containers), [parse_quantity((c.resources.limits or {}).get("memory"))
+                                        for c in containers if c.resources and c.resources.limits
+                                        and "memory" in c.resources.limits]),
+    )
+
+
+def list_pods(v1, fast=None):
+    """Return PodRecords for every pod in the cluster"""
+    if fast is None:
+        fast = FAST_LIST
+    if fast:
+        response = v1.list_pod_for_all_namespaces(_preload_content=False)
+        try:
+            return list(iter_pods_raw(response))
+        finally:
+            response.release_conn()
+    return [pod_record_from_model(pod) for pod in v1.list_pod_for_all_namespaces().items]
+
+
+# --- Events -----------------------------------------------------------------
+
+_EVENT_PREFIX = "items.item"
+_EVENT_FIELDS = {
+    "items.item.metadata.uid": "uid",
+    "items.item.metadata.creationTimestamp": "created",
+    "items.item.involvedObject.namespace": "namespace",
+    "items.item.involvedObject.name": "object_name",
+    "items.item.involvedObject.kind": "object_kind",
+    "items.item.type": "event_type",
+    "items.item.reason": "reason",
+    "items.item.message": "message",
+    "items.item.count": "count",
+    "items.item.firstTimestamp": "first_timestamp",
+    "items.item.lastTimestamp": "last_timestamp",
+}
+
+
+def _event_record(fields):
+    created = fields.get("created")
+    return EventRecord(
+        fields.get("uid"),
+        fields.get("namespace"),
+        fields.get("object_name"),
+        fields.get("object_kind"),
+        fields.get("event_type"),
+        fields.get("reason"),
+        fields.get("message"),
+        int(fields["count"]) if fields.get("count") is not None else None,
+        _db_timestamp(fields.get("first_timestamp") or created),
+        _db_timestamp(fields.get("last_timestamp") or created),
+    )
+
+
+def iter_events_raw(stream, page_info=None):
+    """Yield EventRecords from a raw EventList JSON stream.
+
+    If `page_info` is a dict, the list's continue token is stored in it.
+    """
+    fields = {}
+    for prefix, event, value in ijson.parse(stream):
+        if prefix == "metadata.continue" and page_info is not None:
+            page_info["continue"] = value
+        elif prefix == _EVENT_PREFIX:
+            if event == "start_map":
+                fields = {}
+            elif event == "end_map":
+                yield _event_record(fields)
+        elif prefix in _EVENT_FIELDS:
+            fields[_EVENT_FIELDS[prefix]] = value
+
+
+def event_record_from_model(event):
+    involved = event.involved_object
+    return EventRecord(
+        event.metadata.uid if event.metadata else None,
+        involved.namespace if involved else None,
+        involved.name if involved else None,
+        involved.kind if involved else None,
+        event.type,
+        event.reason,
+        event.message,
+        event.count,
+        _db_timestamp(event.first_timestamp or event.metadata.creation_timestamp),
+        _db_timestamp(event.last_timestamp or event.metadata.creation_timestamp),
+    )
+
+
+def list_events(v1, fast=None):
+    """Return EventRecords for every event in the cluster"""
+    if fast is None:
+        fast = FAST_LIST
+    if fast:
+        response = v1.list_event_for_all_namespaces(_preload_content=False)
+        try:
+            return list(iter_events_raw(response))
+        finally:
+            response.release_conn()
+    return [event_record_from_model(event) for event in v1.list_event_for_all_namespaces().items]
+
+
+def iter_event_pages(v1, limit=None, fast=None):
+    """Yield lists of EventRecords, one list per API page.
+
+    Only one page is held in memory at a time, so peak memory depends on the
+    page size and not on how many events the cluster retains.
+    """
+    if fast is None:
+        fast = FAST_LIST
+    limit = limit or EVENT_PAGE_SIZE
+    token = None
+    while True:
+        kwargs = {"limit": limit}
+        if token:
+            kwargs["_continue"] = token
+        if fast:
+            page_info = {}
+            response = v1.list_event_for_all_namespaces(_preload_content=False, **kwargs)
+            try:
+                page = list(iter_events_raw(response, page_info))
+            finally:
+                response.release_conn()
+            token = page_info.get("continue")
+        else:
+            result = v1.list_event_for_all_namespaces(**kwargs)
+            page = [event_record_from_model(event) for event in result.items]
+            token = result.metadata._continue if result.metadata else None
+        yield page
+        if not token:
+            return
+
+
+# --- Pod metrics (metrics.k8s.io) ---------------------------------------------
+
+METRICS_GROUP = ("metrics.k8s.io", "v1beta1", "pods")
+_METRICS_PREFIX = "items.item"
+_METRICS_NAME = "items.item.metadata.name"
+_METRICS_NAMESPACE = "items.item.metadata.namespace"
+_METRICS_CPU = "items.item.containers.item.usage.cpu"
+_METRICS_MEMORY = "items.item.containers.item.usage.memory"
+
+
+def iter_pod_metrics_raw(stream):
+    """Yield PodMetricsRecords from a raw PodMetricsList JSON stream"""
+    namespace = name = None
+    cpu = memory = 0.0
+    for prefix, event, value in ijson.parse(stream):
+        if prefix == _METRICS_PREFIX:
+            if event == "start_map":
+                namespace = name = None
+                cpu = memory = 0.0
+            elif event == "end_map":
+                yield PodMetricsRecord(namespace, name, cpu, memory)
+        elif prefix == _METRICS_NAMESPACE:
+            namespace = value
+        elif prefix == _METRICS_NAME:
+            name = value
+        elif prefix == _METRICS_CPU:
+            cpu += (parse_quantity(value) or 0.0) * 1000
+        elif prefix == _METRICS_MEMORY:
+            memory += parse_quantity(value) or 0.0
+
+
+def pod_metrics_record(item):
+    containers = item.get("containers") or []
+    return PodMetricsRecord(
+        item["metadata"].get("namespace"),
+        item["metadata"].get("name"),
+        sum((parse_quantity(c.get("usage", {}).get("cpu")) or 0.0) * 1000 for c in containers),
+        sum(parse_quantity(c.get("usage", {}).get("memory")) or 0.0 for c in containers),
+    )
+
+
+def list_pod_metrics(custom_api, fast=None):
+    """Return PodMetricsRecords for every pod the metrics API reports"""
+    if fast is None:
+        fast = FAST_LIST
+    if fast:
+        response = custom_api.list_cluster_custom_object(*METRICS_GROUP, _preload_content=False)
+        try:
+            return list(iter_pod_metrics_raw(response))
+        finally:
+            response.release_conn()
+    return [pod_metrics_record(item) for item in custom_api.list_cluster_custom_object(*METRICS_GROUP).get("items", [])]
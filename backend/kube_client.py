@@ -1,48 +1,60 @@
+import logging
 import os
-from kubernetes import client, config
-from database import save_pod_status
+from client_registry import get_core_v1
+from database import save_pod_status, save_restart_samples
+from fast_list import list_pods
+from metrics import CLUSTER_LIST_SECONDS, ROWS_WRITTEN
+from usage import update_limits
+
+logger = logging.getLogger(__name__)
 
 def load_and_process_cluster(kubeconfig_path, cluster_name):
-    print(f"[INFO] Processing cluster: {cluster_name} with kubeconfig: {kubeconfig_path}")
+    logger.info("Processing cluster: %s with kubeconfig: %s", cluster_name, kubeconfig_path)
     try:
-        config.load_kube_config(config_file=kubeconfig_path)
-        v1 = client.CoreV1Api()
+        # Cluster'a özel, cycle'lar arasında yeniden kullanılan ApiClient (keep-alive bağlantılar)
+        v1 = get_core_v1(kubeconfig_path)
+        saved_count = 0
         try:
-            namespaces = v1.list_namespace().items
+            with CLUSTER_LIST_SECONDS.labels(cluster_name, "pods").time():
+                pods = list_pods(v1)
         except Exception as e:
-            print(f"[ERROR] {cluster_name}: Namespace list error: {e}")
-            return
-        if not namespaces:
-            print(f"[WARN] {cluster_name}: No namespaces found!")
-        for ns_obj in namespaces:
-            ns = ns_obj.metadata.name
+            logger.error("%s: Pod list error: %s", cluster_name, e)
+            return False
+        if not pods:
+            logger.warning("%s: No pods found!", cluster_name)
+        debug = logger.isEnabledFor(logging.DEBUG)
+        restart_samples = []
+        memory_limits = {}
+        for pod in pods:
+            restart_samples.append((pod.namespace, pod.name, pod.restarts))
+            if pod.memory_limit:
+                memory_limits[(pod.namespace, pod.name)] = pod.memory_limit
             try:
-                pods = v1.list_namespaced_pod(ns)
+                # Waiting reason'ları detaylı logla (sadece DEBUG seviyesinde)
+                if debug and pod.waiting_reasons:
+                    logger.debug("%s waiting reasons: %s", pod.name, ", ".join(pod.waiting_reasons))
+                # CrashLoopBackOff tespitini güçlendir
+                crashloop = any(reason.startswith("CrashLoopBackOff") for reason in pod.waiting_reasons)
+                # Bazı durumlarda pod.status.phase de CrashLoopBackOff olabilir
+                phase_crashloop = pod.phase == "CrashLoopBackOff"
+                if pod.restarts > 0 or crashloop or phase_crashloop:
+                    status = "CrashLoopBackOff" if (crashloop or phase_crashloop) else pod.phase
+                    logger.debug("Saving pod: %s ns: %s status: %s restarts: %s", pod.name, pod.namespace, status, pod.restarts)
+                    save_pod_status(cluster_name, pod.namespace, pod.name, status, pod.restarts)
+                    saved_count += 1
             except Exception as e:
-                print(f"[ERROR] {cluster_name}: Pod list error in ns {ns}: {e}")
-                continue
-            if not pods.items:
-                print(f"[INFO] {cluster_name}: No pods in ns {ns}")
-            for pod in pods.items:
-                try:
-                    restart_count = sum([cs.restart_count for cs in pod.status.container_statuses or []])
-                    # Her container'ın state'ini ve waiting reason'larını detaylı logla
-                    for cs in (pod.status.container_statuses or []):
-                        print(f"[DEBUG] {pod.metadata.name} container: {cs.name} state: {cs.state}")
-                        if cs.state and cs.state.waiting:
-                            print(f"[DEBUG] {pod.metadata.name} container: {cs.name} waiting reason: {cs.state.waiting.reason}")
-                    # CrashLoopBackOff tespitini güçlendir
-                    crashloop = any(
-                        cs.state and cs.state.waiting and cs.state.waiting.reason and cs.state.waiting.reason.startswith("CrashLoopBackOff")
-                        for cs in pod.status.container_statuses or []
-                    )
-                    # Bazı durumlarda pod.status.phase de CrashLoopBackOff olabilir
-                    phase_crashloop = hasattr(pod.status, 'phase') and pod.status.phase == "CrashLoopBackOff"
-                    if restart_count > 0 or crashloop or phase_crashloop:
-                        status = "CrashLoopBackOff" if (crashloop or phase_crashloop) else pod.status.phase
-                        print(f"[INFO] Saving pod: {pod.metadata.name} ns: {ns} status: {status} restarts: {restart_count}")
-                        save_pod_status(cluster_name, ns, pod.metadata.name, status, restart_count)
-                except Exception as e:
-                    print(f"[ERROR] {cluster_name}: Error processing pod in ns {ns}: {e}")
+                logger.error("%s: Error processing pod in ns %s: %s", cluster_name, pod.namespace, e)
+        ROWS_WRITTEN.labels(cluster_name, "pod_status").observe(saved_count)
+        # OOM-risk kuralı kullanımı bu limitlerle karşılaştırır
+        update_limits(cluster_name, memory_limits)
+        logger.info("%s: Saved %d problematic pods", cluster_name, saved_count)
+        
+        # Kümülatif restart sayılarından pod başına artışlar
+        delta_count = save_restart_samples(cluster_name, restart_samples)
+        ROWS_WRITTEN.labels(cluster_name, "restart_deltas").observe(delta_count)
+        if delta_count:
+            logger.info("%s: %d pods restarted since last listing", cluster_name, delta_count)
+        return True
     except Exception as e:
-        print(f"[ERROR] Failed to process cluster {cluster_name}: {e}")
+        logger.error("Failed to process cluster %s: %s", cluster_name, e)
+        return False
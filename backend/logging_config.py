@@ -0,0 +1,154 @@
+"""Logging setup shared by the collector and the API.
+
+Environment variables:
+    KUBEMON_LOG_LEVEL    root level (default INFO)
+    KUBEMON_LOG_LEVELS   per-module levels, e.g. "kube_client=WARNING,database=DEBUG"
+    KUBEMON_LOG_FORMAT   "text" (default) or "json"
+    KUBEMON_LOG_SAMPLE   "<burst>/<seconds>" rate limit per DEBUG/INFO message template (default 20/60)
+
+Records are handed to a QueueHandler so the hot path never blocks on stdout;
+a QueueListener thread does the actual writing.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s [{process}:%(name)s] %(message)s"
+
+_listener = None
+
+
+class SamplingFilter(logging.Filter):
+    """Rate-limit repetitive DEBUG and INFO messages.
+
+    Records are grouped by logger, level and the unformatted message template,
+    so "Saving pod %s" is one key no matter which pod is logged. Each key may
+    emit `burst` records per `interval` seconds; the first record after a
+    window with drops carries the number of suppressed messages. WARNING and
+    above always pass: an error repeating for every cluster is not noise.
+    """
+
+    def __init__(self, burst=20, interval=60.0):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if self.burst <= 0 or record.levelno >= logging.WARNING:
+            return True
+        key = (record.name, record.levelno, record.msg if isinstance(record.msg, str) else type(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            if window[1] < self.burst:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        message = super().format(record)
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            message += f" ({suppressed} similar messages suppressed)"
+        return message
+
+
+class JsonFormatter(logging.Formatter):
+    def __init__(self, process_name):
+        super().__init__()
+        self.process_name = process_name
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "process": self.process_name,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            entry["suppressed"] = suppressed
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def _parse_sample(value):
+    try:
+        burst, interval = value.split("/")
+        return int(burst), float(interval)
+    except ValueError:
+        return 20, 60.0
+
+
+def _parse_module_levels(value):
+    levels = {}
+    for item in value.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging(process_name, stream=None):
+    """Configure root logging for a KubeMon process. Safe to call more than once."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    if os.environ.get("KUBEMON_LOG_FORMAT", "text").lower() == "json":
+        formatter = JsonFormatter(process_name)
+    else:
+        formatter = TextFormatter(TEXT_FORMAT.format(process=process_name))
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(*_parse_sample(os.environ.get("KUBEMON_LOG_SAMPLE", "20/60"))))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(os.environ.get("KUBEMON_LOG_LEVEL", "INFO").upper())
+
+    for name, level in _parse_module_levels(os.environ.get("KUBEMON_LOG_LEVELS", "")).items():
+        logging.getLogger(name).setLevel(level)
+    # kubernetes/urllib3 debug çıktısı çok gürültülü
+    logging.getLogger("urllib3").setLevel(logging.WARNING)
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging():
+    """Flush queued records; registered with atexit"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
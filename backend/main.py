@@ -1,51 +1,191 @@
-import os
+import logging
+import random
+import threading
 import time
-from database import init_db, cleanup_old_data
+from datetime import datetime
+from database import (bump_generations, init_db, cleanup_old_data, drop_old_partitions, get_cluster_health,
+                      get_clusters_with_active_alerts, record_collection_result)
+from archive import ARCHIVE_ENABLED, ARCHIVE_RETENTION_DAYS, TIME_COLUMNS, delete_segments_before, export_segment
+from client_registry import evict
+from cluster_registry import list_clusters
+from correlation import cleanup_correlations
+from events import collect_events_from_cluster
 from kube_client import load_and_process_cluster
+from logging_config import setup_logging
+from metrics import CYCLE_PHASE_SECONDS, register_process_exit, timed_query
+from notifications import start_dispatcher
+from usage import USAGE_CONFIG, collect_usage_from_cluster, drop_cluster
+from scheduler import SCHEDULER_CONFIG, Job, Scheduler
+from sharding import LEADER_KEY, create_coordinator
+from snapshot import SNAPSHOT_CONFIG, publish_snapshot
 
-print("[MAIN] KubeMon monitoring loop starting...")
+logger = logging.getLogger("main")
 
-def main_loop():
-    print("[MAIN] Starting main monitoring cycle...")
-    cluster_dir = "clusters"
+# Son alert kontrolünde aktif critical alert'i olan cluster'lar
+_critical_clusters = set()
+# Schedule edilmiş cluster -> kubeconfig path (silinen cluster'ın client'ını kapatmak için)
+_cluster_paths = {}
+# Sharded modda ShardCoordinator (bkz. sharding.py), tek replica'da None
+_coordinator = None
+# Discovery job'ı ve shard heartbeat thread'i job'ları aynı anda düzenlemesin
+_sync_lock = threading.Lock()
+# Son snapshot'tan sonra bir cluster toplandı; snapshot job'ı bir sonraki turda yayınlar
+_snapshot_dirty = threading.Event()
+
+def leased(key, func):
+    """Run func only while this replica holds the lease for `key` (always without sharding)"""
+    if _coordinator is None:
+        return func()
+    with _coordinator.holding(key) as held:
+        if not held:
+            logger.debug("Skipping %s, lease not held by this replica", key)
+            return None
+        return func()
+
+def collect_cluster(path, cluster_name):
+    """Collect pod status, events and usage for one cluster; False if the pod or event collector failed.
+
+    When sharded, each write phase first checks that no other replica has
+    taken the cluster's lease since the collection started; if one has, the
+    rest is skipped and None is returned.
+    """
+    logger.info("Processing cluster: %s", cluster_name)
+    start = time.monotonic()
+    still_owned = _coordinator.fence(cluster_name) if _coordinator is not None else lambda: True
     
-    if not os.path.exists(cluster_dir):
-        print(f"[MAIN][ERROR] Cluster directory {cluster_dir} not found")
-        return
+    # Collect pod status (existing functionality)
+    with CYCLE_PHASE_SECONDS.labels("pods").time():
+        pods_ok = load_and_process_cluster(path, cluster_name) is not False
+    
+    # Collect events (new functionality)
+    if not still_owned():
+        return _lease_lost(cluster_name)
+    with CYCLE_PHASE_SECONDS.labels("events").time():
+        events_ok = collect_events_from_cluster(path, cluster_name) is not False
     
-    # Process each cluster
-    for file in os.listdir(cluster_dir):
-        if file.endswith(".conf"):
-            cluster_name = file.replace("admin-", "").replace(".conf", "").lower()
-            path = os.path.join(cluster_dir, file)
-            print(f"[MAIN] Processing cluster: {cluster_name}")
-            
-            try:
-                # Collect pod status (existing functionality)
-                load_and_process_cluster(path, cluster_name)
-                
-                # Collect events (new functionality)
-                from events import collect_events_from_cluster
-                collect_events_from_cluster(path, cluster_name)
-                
-            except Exception as e:
-                print(f"[MAIN][ERROR] Error processing cluster {cluster_name}: {e}")
+    # Pod CPU/memory kullanımı; metrics-server her cluster'da olmayabilir, hata sayılmaz
+    if USAGE_CONFIG['enabled'] and still_owned():
+        with CYCLE_PHASE_SECONDS.labels("usage").time():
+            collect_usage_from_cluster(path, cluster_name)
     
-    # Run alert checks
-    try:
-        print("[MAIN] Running alert checks...")
-        from alerts import run_alert_checks
+    if not still_owned():
+        return _lease_lost(cluster_name)
+    failed = [name for name, ok in (("pods", pods_ok), ("events", events_ok)) if not ok]
+    error = f"{' and '.join(failed)} collection failed" if failed else None
+    record_collection_result(cluster_name, not failed, time.monotonic() - start, error)
+    _snapshot_dirty.set()
+    return not failed
+
+def _lease_lost(cluster_name):
+    # Yeni sahip cluster'ı topluyor; sonuç ve health kaydı ona kalır
+    logger.warning("Lease for %s was taken over during collection, skipping the remaining writes", cluster_name)
+    return None
+
+def publish_state(force=False):
+    """Publish the current-state snapshot the API reads instead of SQLite (only the leader when sharded).
+
+    Without `force` nothing is written unless a cluster was collected since
+    the last snapshot; in sharded mode the leader cannot see the other
+    replicas' collections and always publishes.
+    """
+    if _coordinator is not None and not _coordinator.is_leader():
+        return
+    if not force and _coordinator is None and not _snapshot_dirty.is_set():
+        return
+    _snapshot_dirty.clear()
+    with CYCLE_PHASE_SECONDS.labels("snapshot").time():
+        publish_snapshot()
+
+def run_alerts(scheduler):
+    """Run alert checks and speed up polling for clusters with critical alerts"""
+    global _critical_clusters
+    from alerts import run_alert_checks
+    with CYCLE_PHASE_SECONDS.labels("alerts").time():
         run_alert_checks()
-    except Exception as e:
-        print(f"[MAIN][ERROR] Alert check failed: {e}")
+    publish_state(force=True)
     
-    # Cleanup old data
-    try:
+    critical = get_clusters_with_active_alerts('critical')
+    newly_critical = critical - _critical_clusters
+    _critical_clusters = critical
+    for cluster_name in newly_critical:
+        logger.info("Cluster %s has active critical alerts, polling every %ss", cluster_name, SCHEDULER_CONFIG['critical_interval'])
+        scheduler.reschedule(f"cluster:{cluster_name}", SCHEDULER_CONFIG['critical_interval'])
+
+def run_cleanup():
+    with CYCLE_PHASE_SECONDS.labels("cleanup").time():
         cleanup_old_data()
         cleanup_old_events()
-        print("[MAIN] Data cleanup completed")
-    except Exception as e:
-        print(f"[MAIN][ERROR] Data cleanup failed: {e}")
+        cleanup_correlations()
+    logger.info("Data cleanup completed")
+
+def cluster_interval(cluster_name):
+    if cluster_name in _critical_clusters:
+        return SCHEDULER_CONFIG['critical_interval']
+    return SCHEDULER_CONFIG['cluster_intervals'].get(cluster_name, SCHEDULER_CONFIG['default_interval'])
+
+def first_delay(cluster_name, interval):
+    """Delay before a newly scheduled cluster's first poll"""
+    # İlk turda tüm cluster'lar aynı anda başlamasın
+    delay = random.uniform(0, SCHEDULER_CONFIG['jitter'] * interval)
+    if _coordinator is None:
+        return delay
+    # Başka replica'dan devralınan cluster kendi aralığını korur, iki kez poll edilmez
+    last_attempt = get_cluster_health().get(cluster_name, {}).get('last_attempt')
+    if last_attempt:
+        elapsed = (datetime.utcnow() - datetime.fromisoformat(str(last_attempt))).total_seconds()
+        delay = max(delay, interval - elapsed)
+    return delay
+
+def sync_cluster_jobs(scheduler):
+    """Add jobs for new (or newly owned) kubeconfigs and drop jobs for removed (or handed off) ones"""
+    with _sync_lock:
+        clusters = {name: info["path"] for name, info in list_clusters().items()}
+        if _coordinator is not None:
+            owned = _coordinator.owned()
+            clusters = {name: path for name, path in clusters.items() if name in owned}
+        current = {name for name in scheduler.jobs if name.startswith("cluster:")}
+        for cluster_name, path in clusters.items():
+            job_name = f"cluster:{cluster_name}"
+            if job_name in current:
+                continue
+            logger.info("Scheduling cluster %s every %ss", cluster_name, cluster_interval(cluster_name))
+            _cluster_paths[cluster_name] = path
+            job = Job(job_name,
+                      lambda path=path, cluster_name=cluster_name: leased(cluster_name, lambda: collect_cluster(path, cluster_name)),
+                      lambda cluster_name=cluster_name: cluster_interval(cluster_name),
+                      jitter=SCHEDULER_CONFIG['jitter'],
+                      max_backoff=SCHEDULER_CONFIG['max_backoff'])
+            scheduler.add_job(job, delay=first_delay(cluster_name, job.base_interval()))
+        for job_name in current - {f"cluster:{name}" for name in clusters}:
+            cluster_name = job_name.split(":", 1)[1]
+            logger.info("Cluster %s removed or handed off, unscheduling", cluster_name)
+            scheduler.remove_job(job_name)
+            evict(_cluster_paths.pop(cluster_name))
+            drop_cluster(cluster_name)
+
+def build_scheduler(scheduler=None):
+    scheduler = scheduler or Scheduler()
+    scheduler.add_job(Job("discovery", lambda: sync_cluster_jobs(scheduler), SCHEDULER_CONFIG['discovery_interval']))
+    # Alert ve cleanup sharded modda sadece leader'da çalışır
+    scheduler.add_job(Job("alerts", lambda: leased(LEADER_KEY, lambda: run_alerts(scheduler)), SCHEDULER_CONFIG['alert_interval'],
+                          jitter=SCHEDULER_CONFIG['jitter']),
+                      delay=SCHEDULER_CONFIG['alert_interval'])
+    scheduler.add_job(Job("cleanup", lambda: leased(LEADER_KEY, run_cleanup), SCHEDULER_CONFIG['cleanup_interval']),
+                      delay=SCHEDULER_CONFIG['cleanup_interval'])
+    # Cluster toplamaları snapshot'ı her seferinde değil, turda bir kez yeniler
+    # (sharded modda diğer replica'ların topladığı veri de girer)
+    scheduler.add_job(Job("snapshot", publish_state, SNAPSHOT_CONFIG['interval']))
+    return scheduler
+
+def start_sharding(scheduler):
+    """Join the replica ring when KUBEMON_SHARDING is set; cluster jobs follow lease changes"""
+    global _coordinator
+    _coordinator = create_coordinator(lambda: [*list_clusters(), LEADER_KEY], on_change=lambda: sync_cluster_jobs(scheduler))
+    if _coordinator is not None:
+        # İlk lease'ler scheduler başlamadan alınır
+        _coordinator.tick()
+        _coordinator.start()
+    return _coordinator
 
 def cleanup_old_events(hours=168):  # Keep events for 7 days
     """Clean up old events and resolved alerts"""
@@ -53,41 +193,52 @@ def cleanup_old_events(hours=168):  # Keep events for 7 days
     import sqlite3
     from database import DB_PATH
     
-    threshold = datetime.utcnow() - timedelta(hours=hours)
+    # Clean old events - eski günlerin partition'ları arşive yazılıp komple silinir
+    partitions_dropped = len(drop_old_partitions("events", hours, archive=True))
     
     with sqlite3.connect(DB_PATH) as conn:
         c = conn.cursor()
         
-        # Clean old events
-        c.execute("DELETE FROM events WHERE timestamp < ?", (threshold,))
-        events_deleted = c.rowcount
-        
-        # Clean old resolved alerts (keep for 30 days)
-        alert_threshold = datetime.utcnow() - timedelta(days=30)
-        c.execute("DELETE FROM alerts WHERE status = 'resolved' AND resolved_at < ?", (alert_threshold,))
+        # Clean old resolved alerts (keep for 30 days), archived in whole days
+        alert_threshold = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=30)
+        if ARCHIVE_ENABLED:
+            export_segment(c, "alerts", "alerts", (alert_threshold - timedelta(days=1)).date(),
+                           "status = 'resolved' AND resolved_at < ?", (alert_threshold,))
+        timed_query(c, "alerts_cleanup", "DELETE FROM alerts WHERE status = 'resolved' AND resolved_at < ?", (alert_threshold,))
         alerts_deleted = c.rowcount
+        if alerts_deleted:
+            bump_generations(c, "alerts")
+        
+        # Anomaly penceresi dakikalar mertebesinde, rate satırlarının 1 günü yeter
+        timed_query(c, "event_rates_cleanup", "DELETE FROM event_rates WHERE timestamp < ?",
+                    (datetime.utcnow() - timedelta(days=1),))
+        
+        # Gönderilmiş / vazgeçilmiş bildirimler 7 gün tutulur
+        timed_query(c, "notification_outbox_cleanup", "DELETE FROM notification_outbox WHERE status != 'pending' AND created_at < ?",
+                    (datetime.utcnow() - timedelta(days=7),))
+        
+        if ARCHIVE_ENABLED and ARCHIVE_RETENTION_DAYS:
+            archive_threshold = datetime.utcnow() - timedelta(days=ARCHIVE_RETENTION_DAYS)
+            for table in TIME_COLUMNS:
+                delete_segments_before(c, table, archive_threshold)
         
         conn.commit()
         
-    if events_deleted > 0 or alerts_deleted > 0:
-        print(f"[MAIN] Cleaned up {events_deleted} old events and {alerts_deleted} old alerts")
+    if partitions_dropped > 0 or alerts_deleted > 0:
+        logger.info("Cleaned up %s old event partitions and %s old alerts", partitions_dropped, alerts_deleted)
 
 if __name__ == "__main__":
-    print("[MAIN] Initializing database...")
+    setup_logging("monitor")
+    register_process_exit()
+    logger.info("KubeMon monitoring loop starting...")
+    logger.info("Initializing database...")
     init_db()
+    scheduler = Scheduler()
+    start_sharding(scheduler)
+    publish_state(force=True)
     
-    print("[MAIN] Starting monitoring loop...")
-    cycle_count = 0
+    # Alert bildirimleri ayrı thread'de, alert döngüsünü bekletmez (sharded modda sadece leader gönderir)
+    start_dispatcher(active=lambda: _coordinator is None or _coordinator.is_leader())
     
-    while True:
-        cycle_count += 1
-        print(f"[MAIN] === Monitoring Cycle {cycle_count} ===")
-        
-        try:
-            main_loop()
-            print(f"[MAIN] Cycle {cycle_count} completed successfully")
-        except Exception as e:
-            print(f"[MAIN][ERROR] Cycle {cycle_count} failed: {e}")
-        
-        print("[MAIN] Waiting 5 minutes for next cycle...")
-        time.sleep(300)  # Poll every 5 minutes
+    logger.info("Starting scheduler...")
+    build_scheduler(scheduler).run_forever()
@@ -0,0 +1,161 @@
+"""Prometheus instrumentation shared by the collector and the API.
+
+The collector (main.py) and the API (api.py) run as separate processes under
+supervisord, so metrics are recorded in prometheus_client multiprocess mode.
+Both processes write their samples into PROMETHEUS_MULTIPROC_DIR and the
+/metrics endpoint aggregates every process' files into one registry.
+
+The directory is emptied once per container start, before the processes are
+started (the Dockerfile CMD and start.sh run `python3 backend/metrics.py`).
+When it does not exist, as in tests and ad-hoc runs, each process keeps its
+metrics in memory and /metrics shows only the API's own.
+"""
+import atexit
+import glob
+import os
+import signal
+import sys
+import time
+from contextlib import contextmanager
+
+METRICS_DIR = os.path.abspath(os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+                              or os.path.join(os.path.dirname(__file__), "..", "data", "metrics"))
+MULTIPROCESS = os.path.isdir(METRICS_DIR)
+# prometheus_client modu import anında bu değişkene göre seçer
+if MULTIPROCESS:
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = METRICS_DIR
+else:
+    os.environ.pop("PROMETHEUS_MULTIPROC_DIR", None)
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST,
+        CollectorRegistry,
+        Counter,
+        Histogram,
+        generate_latest,
+        multiprocess,
+    )
+    METRICS_ENABLED = True
+except ImportError:
+    METRICS_ENABLED = False
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+ROW_BUCKETS = (0, 1, 10, 50, 100, 500, 1000, 5000, 10000, 50000)
+
+
+class _NoopMetric:
+    """Stand-in used when prometheus_client is not installed"""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, value):
+        pass
+
+    def inc(self, amount=1):
+        pass
+
+    @contextmanager
+    def time(self):
+        yield
+
+
+def _histogram(name, documentation, labelnames, buckets):
+    if not METRICS_ENABLED:
+        return _NoopMetric()
+    return Histogram(name, documentation, labelnames, buckets=buckets)
+
+
+def _counter(name, documentation, labelnames):
+    if not METRICS_ENABLED:
+        return _NoopMetric()
+    return Counter(name, documentation, labelnames)
+
+
+CLUSTER_LIST_SECONDS = _histogram(
+    "kubemon_cluster_list_seconds",
+    "Latency of Kubernetes list calls per cluster",
+    ["cluster", "resource"], LATENCY_BUCKETS)
+
+CYCLE_PHASE_SECONDS = _histogram(
+    "kubemon_cycle_phase_seconds",
+    "Duration of each phase of the monitoring cycle",
+    ["phase"], LATENCY_BUCKETS)
+
+ROWS_WRITTEN = _histogram(
+    "kubemon_rows_written",
+    "Rows written per cluster collection",
+    ["cluster", "table"], ROW_BUCKETS)
+
+DB_QUERY_SECONDS = _histogram(
+    "kubemon_db_query_seconds",
+    "SQLite query time per named query",
+    ["query"], QUERY_BUCKETS)
+
+ALERT_CHECK_SECONDS = _histogram(
+    "kubemon_alert_check_seconds",
+    "Duration of each alert check",
+    ["check"], LATENCY_BUCKETS)
+
+NOTIFICATION_SEND_SECONDS = _histogram(
+    "kubemon_notification_send_seconds",
+    "Duration of batched notification requests per receiver",
+    ["receiver", "outcome"], LATENCY_BUCKETS)
+
+QUERY_CACHE_REQUESTS = _counter(
+    "kubemon_query_cache_requests",
+    "Query result cache lookups per cached function",
+    ["function", "result"])
+
+API_REQUEST_SECONDS = _histogram(
+    "kubemon_api_request_seconds",
+    "API request latency per route",
+    ["route", "method", "status"], QUERY_BUCKETS + (10, 30, 60))
+
+
+def timed_query(cursor, name, query, params=()):
+    """Execute a named query on cursor and record its duration"""
+    start = time.perf_counter()
+    try:
+        return cursor.execute(query, params)
+    finally:
+        DB_QUERY_SECONDS.labels(name).observe(time.perf_counter() - start)
+
+
+def render_latest():
+    """Render the metrics of every KubeMon process in Prometheus text format"""
+    if not METRICS_ENABLED:
+        return b"# prometheus_client not installed\n"
+    if not MULTIPROCESS:
+        return generate_latest()
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=METRICS_DIR)
+    return generate_latest(registry)
+
+
+def register_process_exit():
+    """Mark this process' metric files dead when it exits; call from a process entry point.
+
+    supervisord stops programs with SIGTERM, which skips atexit handlers
+    unless it is turned into a normal exit.
+    """
+    if not (METRICS_ENABLED and MULTIPROCESS):
+        return
+    atexit.register(multiprocess.mark_process_dead, os.getpid(), METRICS_DIR)
+    if signal.getsignal(signal.SIGTERM) is signal.SIG_DFL:
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+
+def reset_metrics_dir(path=METRICS_DIR):
+    """Create the multiprocess directory, removing files left by processes of an earlier start"""
+    os.makedirs(path, exist_ok=True)
+    for name in glob.glob(os.path.join(path, "*.db")):
+        os.remove(name)
+
+
+if __name__ == "__main__":
+    # Container entrypoint'i: process'ler başlamadan önce bir kez
+    reset_metrics_dir()
@@ -0,0 +1,177 @@
+"""Outbound alert notifications (webhook/chat receivers).
+
+The alert cycle never talks to a receiver: save_alert() queues one row per
+matching receiver in the `notification_outbox` table, in the alert's own
+transaction. A dispatcher thread in the collector runs an asyncio loop that
+polls the outbox and sends each receiver one batched JSON payload per
+coalescing window, over a pooled aiohttp session. Failed batches are retried
+with exponential backoff until NOTIFY_CONFIG['max_attempts'] is reached.
+
+Receivers come from KUBEMON_NOTIFY_RECEIVERS ("ops=https://...,chat=https://...").
+aiohttp is optional (imported when the dispatcher starts); without it alerts
+are queued but not sent.
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+from database import claim_notifications, mark_notifications_failed, mark_notifications_sent
+from encoding import dumps
+from metrics import NOTIFICATION_SEND_SECONDS
+from plugins import module_available
+
+NOTIFY_AVAILABLE = module_available("aiohttp")
+
+logger = logging.getLogger(__name__)
+
+SEVERITY_ORDER = {"info": 0, "warning": 1, "critical": 2}
+
+
+def _parse_receivers(value):
+    receivers = {}
+    for item in value.split(","):
+        if "=" in item:
+            name, url = item.split("=", 1)
+            receivers[name.strip()] = url.strip()
+    return receivers
+
+
+NOTIFY_CONFIG = {
+    # "ops=https://hooks.example/ops,chat=https://chat.example/hook"
+    'receivers': _parse_receivers(os.environ.get("KUBEMON_NOTIFY_RECEIVERS", "")),
+    'min_severity': os.environ.get("KUBEMON_NOTIFY_MIN_SEVERITY", "warning"),
+    # Bu süre içinde gelen alert'ler receiver başına tek istekte gider
+    'window': float(os.environ.get("KUBEMON_NOTIFY_WINDOW", 30)),
+    'batch_size': int(os.environ.get("KUBEMON_NOTIFY_BATCH_SIZE", 100)),
+    'poll_interval': float(os.environ.get("KUBEMON_NOTIFY_POLL_INTERVAL", 2)),
+    'timeout': float(os.environ.get("KUBEMON_NOTIFY_TIMEOUT", 10)),
+    'max_attempts': int(os.environ.get("KUBEMON_NOTIFY_MAX_ATTEMPTS", 8)),
+    'retry_base': float(os.environ.get("KUBEMON_NOTIFY_RETRY_BASE", 10)),
+    'retry_max': float(os.environ.get("KUBEMON_NOTIFY_RETRY_MAX", 900)),
+    'connections': int(os.environ.get("KUBEMON_NOTIFY_CONNECTIONS", 8)),
+}
+
+
+def receivers_for(severity):
+    """Names of the receivers that get alerts of this severity"""
+    if SEVERITY_ORDER.get(severity, 0) < SEVERITY_ORDER.get(NOTIFY_CONFIG['min_severity'], 0):
+        return ()
+    return tuple(NOTIFY_CONFIG['receivers'])
+
+
+def retry_delay(attempts, config=NOTIFY_CONFIG):
+    """Backoff before attempt number `attempts + 1`, with jitter"""
+    delay = min(config['retry_base'] * (2 ** max(attempts - 1, 0)), config['retry_max'])
+    return delay * random.uniform(0.8, 1.2)
+
+
+def build_payload(receiver, alerts):
+    counts = {}
+    for alert in alerts:
+        counts[alert['severity']] = counts.get(alert['severity'], 0) + 1
+    return {
+        'receiver': receiver,
+        'sent_at': datetime.utcnow().isoformat(),
+        'count': len(alerts),
+        'severities': counts,
+        'clusters': sorted({alert['cluster'] for alert in alerts}),
+        'alerts': alerts,
+    }
+
+
+class NotificationDispatcher:
+    """Background thread sending queued notifications; start() once per collector process.
+
+    With several collector replicas only the one for which `active()` is true
+    (the shard leader) claims the outbox.
+    """
+
+    def __init__(self, receivers=None, config=None, active=None):
+        self.receivers = dict(NOTIFY_CONFIG['receivers'] if receivers is None else receivers)
+        self.config = {**NOTIFY_CONFIG, **(config or {})}
+        self.active = active or (lambda: True)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._main()), name="notifications", daemon=True)
+        self._thread.start()
+        logger.info("Notification dispatcher started for %s", ", ".join(self.receivers))
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    async def _main(self):
+        import aiohttp
+        connector = aiohttp.TCPConnector(limit=self.config['connections'])
+        timeout = aiohttp.ClientTimeout(total=self.config['timeout'])
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            while not self._stop.is_set():
+                try:
+                    if self.active():
+                        await self.dispatch_once(session)
+                except Exception as e:
+                    logger.error("Notification dispatch failed: %s", e)
+                await asyncio.sleep(self.config['poll_interval'])
+
+    async def dispatch_once(self, session):
+        """Send every due batch once; returns the number of notifications delivered"""
+        # SQLite çağrıları event loop'u bloklamasın
+        rows = await asyncio.to_thread(claim_notifications, self.config['batch_size'] * max(len(self.receivers), 1))
+        batches = {}
+        for row in rows:
+            batches.setdefault(row[1], []).append(row)
+        sends = []
+        for receiver, receiver_rows in batches.items():
+            for start in range(0, len(receiver_rows), self.config['batch_size']):
+                sends.append(self._send(session, receiver, receiver_rows[start:start + self.config['batch_size']]))
+        return sum(await asyncio.gather(*sends))
+
+    async def _send(self, session, receiver, rows):
+        ids = [row[0] for row in rows]
+        attempts = max(row[2] for row in rows) + 1
+        url = self.receivers.get(receiver)
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            if url is None:
+                raise ValueError(f"receiver {receiver} is not configured")
+            body = dumps(build_payload(receiver, [json.loads(row[3]) for row in rows]))
+            async with session.post(url, data=body, headers={"Content-Type": "application/json"}) as response:
+                await response.read()
+                if response.status >= 300:
+                    raise RuntimeError(f"HTTP {response.status}")
+            outcome = "sent"
+        except Exception as e:
+            error = str(e) or e.__class__.__name__
+            if attempts >= self.config['max_attempts']:
+                logger.error("Giving up on %d notifications for %s after %d attempts: %s", len(ids), receiver, attempts, error)
+                await asyncio.to_thread(mark_notifications_failed, ids, error)
+            else:
+                retry_at = datetime.utcnow() + timedelta(seconds=retry_delay(attempts, self.config))
+                logger.warning("Notification batch for %s failed (attempt %d), retrying at %s: %s", receiver, attempts, retry_at, error)
+                await asyncio.to_thread(mark_notifications_failed, ids, error, retry_at)
+            return 0
+        finally:
+            NOTIFICATION_SEND_SECONDS.labels(receiver, outcome).observe(time.perf_counter() - start)
+        await asyncio.to_thread(mark_notifications_sent, ids)
+        logger.info("Sent %d alerts to %s in one batch", len(ids), receiver)
+        return len(ids)
+
+
+def start_dispatcher(active=None):
+    """Start the dispatcher if receivers are configured; returns it or None"""
+    if not NOTIFY_CONFIG['receivers']:
+        return None
+    if not NOTIFY_AVAILABLE:
+        logger.warning("aiohttp not installed, alert notifications stay queued in the outbox")
+        return None
+    return NotificationDispatcher(active=active).start()
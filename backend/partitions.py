@@ -0,0 +1,249 @@
+"""Day-partitioned storage for the high-volume tables (events, pod_status, restart_deltas, pod_usage).
+
+Rows live in one table per UTC day (`events_20240501`, ...), chosen by the
+row's `timestamp`. A view with the original table name unions every
+partition, so ad-hoc readers keep working; hot queries ask `source()` for
+only the partitions overlapping their time range. Retention drops whole
+partitions instead of running a bulk DELETE.
+
+Ids stay unique across partitions: each partition's AUTOINCREMENT sequence
+starts at day_number * ID_SPAN, so `partition_for_id()` can find a row's
+partition from its id alone.
+"""
+import logging
+import re
+from datetime import date, datetime, timedelta
+
+from metrics import timed_query
+
+logger = logging.getLogger(__name__)
+
+ID_SPAN = 10 ** 9
+_EPOCH = date(1970, 1, 1)
+
+PARTITIONED_TABLES = {
+    "events": {
+        "columns": """
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cluster TEXT,
+            namespace TEXT,
+            object_name TEXT,
+            object_kind TEXT,
+            event_type TEXT,
+            reason TEXT,
+            message TEXT,
+            count INTEGER DEFAULT 1,
+            first_timestamp DATETIME,
+            last_timestamp DATETIME,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        """,
+        "indexes": ["cluster, timestamp", "timestamp"],
+    },
+    "pod_status": {
+        "columns": """
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cluster TEXT,
+            namespace TEXT,
+            pod_name TEXT,
+            status TEXT,
+            restarts INTEGER,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        """,
+        "indexes": ["cluster, timestamp", "timestamp"],
+    },
+    # Sadece restart artışları (delta > 0), kümülatif sayaç pod_restart_state'te
+    "restart_deltas": {
+        "columns": """
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cluster TEXT,
+            namespace TEXT,
+            pod_name TEXT,
+            delta INTEGER,
+            restarts INTEGER,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        """,
+        "indexes": ["cluster, namespace, pod_name, timestamp", "timestamp"],
+    },
+    # Ring buffer'lardan (usage.py) periyodik olarak özetlenen kullanım: cpu millicore, memory byte
+    "pod_usage": {
+        "columns": """
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cluster TEXT,
+            namespace TEXT,
+            pod_name TEXT,
+            cpu_avg REAL,
+            cpu_max REAL,
+            memory_avg REAL,
+            memory_max REAL,
+            memory_limit REAL,
+            samples INTEGER,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        """,
+        "indexes": ["cluster, namespace, pod_name, timestamp", "timestamp"],
+    },
+}
+
+
+def day_number(day):
+    return (day - _EPOCH).days
+
+
+def partition_name(table, day):
+    return f"{table}_{day:%Y%m%d}"
+
+
+def partition_day(name):
+    """events_20240501 -> date(2024, 5, 1)"""
+    return datetime.strptime(name[-8:], "%Y%m%d").date()
+
+
+def partition_for_id(table, row_id):
+    return partition_name(table, _EPOCH + timedelta(days=row_id // ID_SPAN))
+
+
+def as_day(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+
+
+def list_partitions(c, table):
+    """Return [(day, partition name)] for a table, oldest first"""
+    pattern = re.compile(rf"^{table}_(\d{{8}})$")
+    timed_query(c, "partition_list", "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE ? ESCAPE '\\'", (f"{table}\\_%",))
+    partitions = []
+    for (name,) in c.fetchall():
+        match = pattern.match(name)
+        if match:
+            partitions.append((datetime.strptime(match.group(1), "%Y%m%d").date(), name))
+    return sorted(partitions)
+
+
+def _rebuild_view(c, table):
+    names = [name for _, name in list_partitions(c, table)]
+    c.execute(f"DROP VIEW IF EXISTS {table}")
+    if names:
+        c.execute(f"CREATE VIEW {table} AS " + " UNION ALL ".join(f"SELECT * FROM {name}" for name in names))
+
+
+def _create_indexes(c, table, name):
+    for i, columns in enumerate(PARTITIONED_TABLES[table]["indexes"]):
+        c.execute(f"CREATE INDEX IF NOT EXISTS idx_{name}_{i} ON {name} ({columns})")
+
+
+def ensure_indexes(c, table):
+    """Create missing indexes on every existing partition, e.g. ones added to the spec after a partition was created"""
+    for _, name in list_partitions(c, table):
+        _create_indexes(c, table, name)
+
+
+def ensure_partition(c, table, day=None):
+    """Create the partition for `day` (default: today, UTC) if needed and return its name.
+
+    Opens a write transaction on the cursor's connection when it creates
+    something; the caller commits it together with its own writes.
+    """
+    day = as_day(day) or datetime.utcnow().date()
+    name = partition_name(table, day)
+    timed_query(c, "partition_exists", "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,))
+    if c.fetchone():
+        return name
+
+    if not c.connection.in_transaction:
+        c.execute("BEGIN IMMEDIATE")
+    spec = PARTITIONED_TABLES[table]
+    c.execute(f"CREATE TABLE IF NOT EXISTS {name} ({spec['columns']})")
+    _create_indexes(c, table, name)
+    # Id aralığı gün numarasından başlar, partition'lar arasında çakışma olmaz
+    c.execute("""
+    INSERT INTO sqlite_sequence (name, seq) SELECT ?, ?
+    WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = ?)
+    """, (name, day_number(day) * ID_SPAN, name))
+    _rebuild_view(c, table)
+    logger.info("Created partition %s", name)
+    return name
+
+
+def partitions_for(c, table, since=None, until=None):
+    """Names of the partitions that can hold rows with since <= timestamp <= until"""
+    since_day, until_day = as_day(since), as_day(until)
+    return [name for day, name in list_partitions(c, table)
+            if (since_day is None or day >= since_day) and (until_day is None or day <= until_day)]
+
+
+def source(c, table, since=None, until=None):
+    """FROM clause fragment covering only the partitions in the time range.
+
+    The caller still filters on timestamp; this only prunes whole days.
+    """
+    names = partitions_for(c, table, since, until)
+    if len(names) == 1:
+        return names[0]
+    if not names:
+        return f"(SELECT * FROM {table} WHERE 0)"
+    return "(" + " UNION ALL ".join(f"SELECT * FROM {name}" for name in names) + ")"
+
+
+def expired_partitions(c, table, threshold):
+    """(day, name) of the partitions whose whole day is older than `threshold`.
+
+    Retention is day-granular: the partition holding `threshold` is kept,
+    and so is today's, so the union view always has at least one partition.
+    """
+    threshold_day = min(as_day(threshold), datetime.utcnow().date())
+    return [(day, name) for day, name in list_partitions(c, table) if day < threshold_day]
+
+
+def drop_partitions_before(c, table, threshold, on_drop=None):
+    """Drop every partition returned by expired_partitions(); returns dropped names.
+
+    `on_drop(c, day, name)` is called before each partition is dropped, in
+    the same transaction, so it should only do quick writes.
+    """
+    expired = expired_partitions(c, table, threshold)
+    if not expired:
+        return []
+    if not c.connection.in_transaction:
+        c.execute("BEGIN IMMEDIATE")
+    for day, name in expired:
+        if on_drop is not None:
+            on_drop(c, day, name)
+        c.execute(f"DROP TABLE IF EXISTS {name}")
+        c.execute("DELETE FROM sqlite_sequence WHERE name = ?", (name,))
+    _rebuild_view(c, table)
+    return [name for _, name in expired]
+
+
+def migrate_legacy_table(c, table):
+    """Move rows of a pre-partitioning table into day partitions and replace it with the view"""
+    timed_query(c, "partition_legacy_check", "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+    if not c.fetchone():
+        return 0
+    if not c.connection.in_transaction:
+        c.execute("BEGIN IMMEDIATE")
+    columns = [row[1] for row in c.execute(f"PRAGMA table_info({table})") if row[1] != "id"]
+    column_list = ", ".join(columns)
+    today = datetime.utcnow().date()
+    c.execute(f"SELECT DISTINCT date(timestamp) FROM {table}")
+    days = [row[0] for row in c.fetchall()]
+    moved = 0
+    # Legacy tablo adını view'a bırakmak için önce kenara al
+    c.execute(f"ALTER TABLE {table} RENAME TO {table}_legacy")
+    for day in days:
+        name = ensure_partition(c, table, as_day(day) if day else today)
+        if day:
+            c.execute(f"INSERT INTO {name} ({column_list}) SELECT {column_list} FROM {table}_legacy "
+                      f"WHERE date(timestamp) = ? ORDER BY id", (day,))
+        else:
+            c.execute(f"INSERT INTO {name} ({column_list}) SELECT {column_list} FROM {table}_legacy "
+                      f"WHERE timestamp IS NULL OR date(timestamp) IS NULL ORDER BY id")
+        moved += c.rowcount
+    c.execute(f"DROP TABLE {table}_legacy")
+    c.execute("DELETE FROM sqlite_sequence WHERE name IN (?, ?)", (table, f"{table}_legacy"))
+    _rebuild_view(c, table)
+    logger.info("Migrated %d %s rows into %d day partitions", moved, table, len(days))
+    return moved
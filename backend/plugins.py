@@ -0,0 +1,57 @@
+"""Optional subsystems loaded on first use.
+
+Heavy optional dependencies (openai, kubernetes, duckdb, pyarrow, aiohttp)
+must not be imported while the API or the collector starts: a health check
+should answer before any of them is loaded. Modules check availability with
+`module_available()`, which only looks the package up, and import it inside
+the function that needs it.
+
+Whole subsystems are registered in PLUGINS as "module:factory". `get_plugin()`
+imports the module and calls the factory once, on the first call; a plugin
+that fails to load is remembered as unavailable and not retried.
+"""
+import importlib
+import logging
+import threading
+from importlib.util import find_spec
+
+logger = logging.getLogger(__name__)
+
+PLUGINS = {
+    # OpenAI event analysis for /api/events/analyze
+    "ai": "ai_service:EventAnalyzer",
+}
+
+_loaded = {}  # name -> plugin object, or None if it failed to load
+_errors = {}
+_lock = threading.Lock()
+
+
+def module_available(*names):
+    """True if every top-level package in `names` is installed (without importing it)"""
+    return all(find_spec(name) is not None for name in names)
+
+
+def get_plugin(name):
+    """Load the plugin on first use; returns its object, or None if it cannot be loaded"""
+    if name in _loaded:
+        return _loaded[name]
+    with _lock:
+        if name not in _loaded:
+            module_name, factory = PLUGINS[name].split(":")
+            try:
+                _loaded[name] = getattr(importlib.import_module(module_name), factory)()
+                logger.info("Plugin %s loaded", name)
+            except Exception as e:
+                logger.warning("Plugin %s not available: %s", name, e)
+                _errors[name] = str(e)
+                _loaded[name] = None
+        return _loaded[name]
+
+
+def plugin_status():
+    """{name: 'not loaded' | 'loaded' | 'failed: <error>'} without loading anything"""
+    return {
+        name: "not loaded" if name not in _loaded else "loaded" if _loaded[name] is not None else f"failed: {_errors[name]}"
+        for name in PLUGINS
+    }
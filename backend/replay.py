@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""Record-and-replay of cluster API responses.
+
+A recording captures the raw responses to the requests the collector makes
+in each cycle (`list_pod_for_all_namespaces` and every page of
+`list_event_for_all_namespaces`). It does this at the urllib3 pool manager
+of a kubernetes ApiClient, so it holds the same bytes the client
+deserializes in production. Bodies are scrubbed before they are written:
+
+- names, namespaces, node names, labels and similar identifiers are replaced
+  with keyed pseudonyms. Each dash- or dot-separated part is replaced on its
+  own, and generated suffixes (ReplicaSet hashes, pod suffixes, ordinals)
+  are kept, so workload grouping still works on the replayed pods. The same
+  value gets the same pseudonym everywhere in one recording, including
+  inside event messages.
+- IP addresses are pseudonymized, and images, container IDs, env values
+  and command lines are replaced with opaque tokens.
+- in event messages, quoted strings (image references, secret names) and
+  URLs become opaque tokens, and lowercase identifiers with dots, dashes or
+  slashes (registry hosts, image paths, project names) are pseudonymized
+  like names, whether or not they appear anywhere else in the recording.
+- annotations and managedFields are dropped.
+
+A recording is gzip-compressed JSON lines: a header, then one line per
+response with its cycle number, its offset from the start of the recording,
+the request path and query, the status and the body.
+
+ReplayPoolManager stands in for urllib3.PoolManager and serves a recording
+in order. It is plugged into a kubernetes ApiClient, so kube_client and
+events run unchanged without a network. `speed=0` replays as fast as
+possible; `speed=N` keeps the recorded gaps between responses, divided by N.
+
+    python backend/replay.py --kubeconfig clusters/prod.conf --cycles 6 --interval 300 \\
+        --out data/recordings/prod.jsonl.gz
+
+bench_replay.py runs recordings through ingest and alerting.
+"""
+
+import argparse
+import gzip
+import hashlib
+import hmac
+import io
+import json
+import logging
+import os
+import re
+import sys
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import urllib3
+
+logger = logging.getLogger(__name__)
+
+RECORDING_FORMAT = "kubemon-recording"
+RECORDING_VERSION = 1
+RECORDING_DIR = os.path.join("data", "recordings")
+
+# Sayfa boyutu değişse de kayıt oynatılabilsin: eşleştirmede kullanılmayan parametreler
+_UNMATCHED_PARAMS = {"limit", "timeoutSeconds"}
+
+
+class ReplayError(Exception):
+    """A request the recording has no (more) responses for"""
+
+
+# --- Scrubbing ----------------------------------------------------------------
+
+# Bu değerlerde kimlik bilgisi yok, olduğu gibi kalır
+KEEP_NAMES = {"default", "kube-system", "kube-public", "kube-node-lease"}
+
+# Kimlik taşıyan alanlar parça parça takma adla değişir
+_NAME_KEYS = {"name", "generateName", "namespace", "nodeName", "host", "hostname", "subdomain",
+              "serviceAccount", "serviceAccountName", "reportingInstance", "claimName", "secretName"}
+# Değeri tamamen opak token olur
+_OPAQUE_KEYS = {"image", "imageID", "containerID", "value", "command", "args"}
+# Serbest metin: bilinen isimler ve IP'ler değişir
+_TEXT_KEYS = {"message", "note"}
+# Anahtarları ve değerleri isim gibi değişen map'ler
+_LABEL_KEYS = {"labels", "matchLabels", "nodeSelector"}
+_DROP_KEYS = {"annotations", "managedFields"}
+
+_IP = re.compile(r"\b(?:\d{1,3}\.){3}\d{1,3}\b")
+_QUOTED = re.compile(r'"[^"]*"|\'[^\']*\'')
+_URL = re.compile(r"\b[a-z][a-z0-9+.-]*://[^\s\"']+", re.I)
+# Mesajdaki host, image yolu, proje adı gibi küçük harfli, ayraçlı kelimeler
+_IDENTIFIER = re.compile(r"(?<![\w./:@-])[a-z0-9]+(?:[-./:@][a-z0-9]+)+(?!\w|[-./:@][A-Za-z0-9])")
+_HAS_LETTER = re.compile(r"[a-z]")
+# Kubelet/scheduler mesajlarının kendi kelimeleri, isim değil
+MESSAGE_WORDS = {"back-off", "i/o", "non-zero", "read-only", "re-run", "e.g", "k8s.io", "v1"}
+_NAME_SEPARATORS = re.compile(r"([-./:_@]+)")
+_WORD = re.compile(r"[A-Za-z0-9]+")
+# Kubernetes'in ürettiği suffix'ler (alerts.WORKLOAD_PATTERNS ile aynı alfabe) ve ordinal'ler kalır
+_GENERATED = re.compile(r"^(?:[bcdfghjklmnpqrstvwxz2456789]{5,10}|\d+)$")
+
+
+class Scrubber:
+    """Replaces identifying values in API objects with pseudonyms keyed by `key`.
+
+    Without a key a random one is used, so pseudonyms cannot be reversed by
+    hashing candidate names; pass KUBEMON_SCRUB_KEY to keep them stable
+    across recordings.
+    """
+
+    def __init__(self, key=None):
+        self._key = key.encode() if isinstance(key, str) else key or os.urandom(16)
+        self._words = {}  # gerçek kelime -> takma ad (mesajlarda da kullanılır)
+
+    def _digest(self, value, size=4):
+        return hmac.new(self._key, value.encode(), hashlib.blake2b).hexdigest()[:size * 2]
+
+    def _word(self, word):
+        if _GENERATED.match(word):
+            return word
+        pseudonym = self._words.get(word)
+        if pseudonym is None:
+            # "a" ile başlar: asla bir suffix ya da ordinal gibi görünmez
+            pseudonym = self._words[word] = "a" + self._digest(word)
+        return pseudonym
+
+    def name(self, value):
+        if value in KEEP_NAMES:
+            return value
+        return "".join(part if i % 2 else self._word(part) if part else part
+                       for i, part in enumerate(_NAME_SEPARATORS.split(value)))
+
+    def opaque(self, value):
+        return f"scrubbed-{self._digest(value, 6)}" if value else value
+
+    def ip(self, match):
+        # 198.18.0.0/15 (benchmark aralığı): gerçek cluster adresleriyle karışmaz
+        digest = bytes.fromhex(self._digest(match.group(0), 3))
+        return "198.%d.%d.%d" % (18 + digest[0] % 2, digest[1], digest[2])
+
+    def _identifier(self, match):
+        token = match.group(0)
+        # Önceki adımların opak token'ları tekrar değişmez
+        if token in MESSAGE_WORDS or token.startswith("scrubbed-") or not _HAS_LETTER.search(token):
+            return token
+        return self.name(token)
+
+    def text(self, value):
+        value = _QUOTED.sub(lambda m: m.group(0)[0] + self.opaque(m.group(0)[1:-1]) + m.group(0)[0], value)
+        value = _URL.sub(lambda m: self.opaque(m.group(0)), value)
+        value = _IP.sub(self.ip, value)
+        value = _IDENTIFIER.sub(self._identifier, value)
+        return _WORD.sub(lambda m: self._words.get(m.group(0), m.group(0)) if len(m.group(0)) > 2 else m.group(0), value)
+
+    def _learn(self, value, key=None):
+        """First pass: pseudonymize every name so messages mentioning them are scrubbed too"""
+        if isinstance(value, dict):
+            for k, v in value.items():
+                if k in _LABEL_KEYS and isinstance(v, dict):
+                    for label, label_value in v.items():
+                        self.name(label)
+                        self.name(str(label_value))
+                elif k not in _DROP_KEYS:
+                    self._learn(v, k)
+        elif isinstance(value, list):
+            for item in value:
+                self._learn(item, key)
+        elif isinstance(value, str) and key in _NAME_KEYS:
+            self.name(value)
+
+    def _scrub(self, value, key=None):
+        if isinstance(value, dict):
+            if key in _LABEL_KEYS:
+                return {self.name(k): self.name(str(v)) for k, v in value.items()}
+            return {k: self._scrub(v, k) for k, v in value.items() if k not in _DROP_KEYS}
+        if isinstance(value, list):
+            return [self._scrub(item, key) for item in value]
+        if not isinstance(value, str):
+            return value
+        if key in _NAME_KEYS:
+            return self.name(value)
+        if key in _OPAQUE_KEYS:
+            return self.opaque(value)
+        if key in _TEXT_KEYS:
+            return self.text(value)
+        return _IP.sub(self.ip, value)
+
+    def scrub(self, obj):
+        self._learn(obj)
+        return self._scrub(obj)
+
+    def scrub_body(self, body):
+        """Scrub a raw response body; non-JSON bodies are scrubbed as text"""
+        try:
+            obj = json.loads(body)
+        except ValueError:
+            return self.text(body.decode("utf-8", "replace")).encode()
+        return json.dumps(self.scrub(obj), separators=(",", ":")).encode()
+
+
+# --- Recording ----------------------------------------------------------------
+
+def _request_key(method, url):
+    parts = urlparse(url)
+    params = sorted((k, v) for k, v in parse_qsl(parts.query) if k not in _UNMATCHED_PARAMS)
+    return method, parts.path, urlencode(params)
+
+
+class Recorder:
+    """Writes responses to a recording file; `cycle` is set by the caller before each collection cycle"""
+
+    def __init__(self, path, cluster, scrubber=None):
+        self.path = path
+        self.scrubber = scrubber
+        self.cycle = 0
+        self.responses = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = gzip.open(path, "wt", encoding="utf-8")
+        self._start = time.monotonic()
+        self._write({"format": RECORDING_FORMAT, "version": RECORDING_VERSION, "cluster": cluster,
+                     "recorded_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                     "scrubbed": scrubber is not None})
+
+    def _write(self, entry):
+        self._file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+    def add(self, method, url, status, body):
+        if self.scrubber is not None:
+            body = self.scrubber.scrub_body(body)
+        method, path, query = _request_key(method, url)
+        self._write({"cycle": self.cycle, "t": round(time.monotonic() - self._start, 3), "method": method,
+                     "path": path, "query": query, "status": status, "body": body.decode("utf-8")})
+        self.responses += 1
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RecordingPoolManager:
+    """Wraps the client's pool manager and copies every response into a Recorder"""
+
+    def __init__(self, inner, recorder):
+        self.inner = inner
+        self.recorder = recorder
+
+    def request(self, method, url, **kwargs):
+        response = self.inner.request(method, url, **kwargs)
+        try:
+            body = response.read(decode_content=True)
+        finally:
+            response.release_conn()
+        self.recorder.add(method, url, response.status, body)
+        # İstemciye gerçek (scrub edilmemiş) yanıt döner
+        return urllib3.HTTPResponse(body=io.BytesIO(body), status=response.status, reason=response.reason,
+                                    headers={"Content-Type": response.headers.get("Content-Type", "application/json")},
+                                    preload_content=False)
+
+    def clear(self):
+        self.inner.clear()
+
+
+def record_cluster(kubeconfig_path, out, cycles, interval, cluster=None, scrub=True):
+    """Record `cycles` collection cycles, `interval` seconds apart; returns the number of responses"""
+    from client_registry import get_core_v1
+    from fast_list import iter_event_pages, list_pods
+
+    v1 = get_core_v1(kubeconfig_path)
+    rest_client = v1.api_client.rest_client
+    scrubber = Scrubber(os.environ.get("KUBEMON_SCRUB_KEY")) if scrub else None
+    cluster = cluster or os.path.splitext(os.path.basename(kubeconfig_path))[0]
+    with Recorder(out, scrubber.name(cluster) if scrubber else cluster, scrubber) as recorder:
+        original = rest_client.pool_manager
+        rest_client.pool_manager = RecordingPoolManager(original, recorder)
+        try:
+            for cycle in range(cycles):
+                if cycle:
+                    time.sleep(interval)
+                recorder.cycle = cycle
+                pods = list_pods(v1)
+                events = sum(len(page) for page in iter_event_pages(v1))
+                logger.info("Cycle %d: %d pods, %d events", cycle + 1, len(pods), events)
+        finally:
+            rest_client.pool_manager = original
+        return recorder.responses
+
+
+# --- Replay -------------------------------------------------------------------
+
+class Recording:
+    """A loaded recording: `header` and the response `entries` in recorded order"""
+
+    def __init__(self, header, entries):
+        self.header = header
+        self.entries = entries
+
+    @property
+    def cluster(self):
+        return self.header.get("cluster") or "replay"
+
+    @property
+    def cycles(self):
+        return max((entry["cycle"] for entry in self.entries), default=-1) + 1
+
+
+def load_recording(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        if header.get("format") != RECORDING_FORMAT or header.get("version") != RECORDING_VERSION:
+            raise ValueError(f"{path} is not a version {RECORDING_VERSION} recording")
+        return Recording(header, [json.loads(line) for line in f if line.strip()])
+
+
+class ReplayPoolManager:
+    """Stands in for urllib3.PoolManager and serves a recording's responses in order.
+
+    Each (method, path, query) has its own queue, so paged event lists follow
+    the recorded continue tokens. `speed` 0 serves immediately; otherwise the
+    recorded offsets are divided by `speed` and waited out.
+    """
+
+    def __init__(self, recording, speed=0):
+        self.speed = speed
+        self.served = 0
+        self.bytes = 0
+        self._pending = defaultdict(deque)
+        for entry in recording.entries:
+            self._pending[(entry["method"], entry["path"], entry["query"])].append(entry)
+        self._start = None
+
+    def request(self, method, url, **kwargs):
+        queue = self._pending.get(_request_key(method, url))
+        if not queue:
+            raise ReplayError(f"No recorded response left for {method} {url}")
+        entry = queue.popleft()
+        if self.speed:
+            if self._start is None:
+                self._start = time.monotonic() - entry["t"] / self.speed
+            delay = self._start + entry["t"] / self.speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        body = entry["body"].encode("utf-8")
+        self.served += 1
+        self.bytes += len(body)
+        return urllib3.HTTPResponse(body=io.BytesIO(body), status=entry["status"], headers={"Content-Type": "application/json"},
+                                    preload_content=False)
+
+    def remaining(self):
+        return sum(len(queue) for queue in self._pending.values())
+
+    def clear(self):
+        pass
+
+
+def replay_core_v1(pool_manager):
+    """CoreV1Api whose requests are answered by `pool_manager`"""
+    from kubernetes import client
+    api_client = client.ApiClient(client.Configuration(host="http://replay.local"))
+    api_client.rest_client.pool_manager = pool_manager
+    return client.CoreV1Api(api_client=api_client)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record a cluster's pod and event list responses for replay")
+    parser.add_argument("--kubeconfig", required=True)
+    parser.add_argument("--cluster", help="cluster name stored in the recording (default: kubeconfig file name)")
+    parser.add_argument("--cycles", type=int, default=3)
+    parser.add_argument("--interval", type=float, default=300, help="seconds between cycles, like the collector interval")
+    parser.add_argument("--out", help=f"recording file (default: {RECORDING_DIR}/<cluster>-<time>.jsonl.gz)")
+    parser.add_argument("--no-scrub", action="store_true", help="keep names, IPs and messages as they are")
+    args = parser.parse_args()
+
+    from logging_config import setup_logging
+    setup_logging("replay")
+    cluster = args.cluster or os.path.splitext(os.path.basename(args.kubeconfig))[0]
+    out = args.out or os.path.join(RECORDING_DIR, f"{cluster}-{datetime.now():%Y%m%d-%H%M%S}.jsonl.gz")
+    responses = record_cluster(args.kubeconfig, out, args.cycles, args.interval, cluster, scrub=not args.no_scrub)
+    print(f"{responses} responses recorded to {out} ({os.path.getsize(out) / 1024:.1f} KiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Per-cluster poll scheduler for the collector.
+
+Every job (one per cluster, plus alert checks, cleanup and cluster discovery)
+sits in a priority queue ordered by its next run time. Due jobs are handed to
+a small worker pool, so a slow or unreachable cluster only delays itself.
+A job is never queued again while it is still running.
+"""
+import heapq
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_intervals(value):
+    intervals = {}
+    for item in value.split(","):
+        if "=" in item:
+            name, seconds = item.split("=", 1)
+            intervals[name.strip().lower()] = float(seconds)
+    return intervals
+
+
+SCHEDULER_CONFIG = {
+    'default_interval': float(os.environ.get("KUBEMON_POLL_INTERVAL", 300)),
+    # "production=120,dev=900" gibi cluster bazlı poll aralıkları
+    'cluster_intervals': _parse_intervals(os.environ.get("KUBEMON_CLUSTER_INTERVALS", "")),
+    # Aktif critical alert'i olan cluster'lar bu aralıkla poll edilir
+    'critical_interval': float(os.environ.get("KUBEMON_CRITICAL_INTERVAL", 60)),
+    'jitter': float(os.environ.get("KUBEMON_POLL_JITTER", 0.1)),
+    'max_backoff': float(os.environ.get("KUBEMON_MAX_BACKOFF", 3600)),
+    'alert_interval': float(os.environ.get("KUBEMON_ALERT_INTERVAL", 60)),
+    'cleanup_interval': float(os.environ.get("KUBEMON_CLEANUP_INTERVAL", 3600)),
+    'discovery_interval': float(os.environ.get("KUBEMON_DISCOVERY_INTERVAL", 60)),
+    'workers': int(os.environ.get("KUBEMON_COLLECTOR_WORKERS", 4)),
+}
+
+
+class Job:
+    """A recurring unit of work.
+
+    `func` returns False (or raises) to report a failure; failing jobs back
+    off exponentially up to `max_backoff`.
+    """
+
+    def __init__(self, name, func, interval, jitter=0.0, max_backoff=None):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.max_backoff = max_backoff
+        self.failures = 0
+        self.running = False
+        self.cancelled = False
+        self.next_run = None
+        self.last_run = None
+        self.last_duration = None
+
+    def base_interval(self):
+        return self.interval() if callable(self.interval) else self.interval
+
+    def next_delay(self):
+        delay = self.base_interval()
+        if self.failures:
+            delay = delay * (2 ** min(self.failures, 16))
+            if self.max_backoff:
+                delay = min(delay, self.max_backoff)
+        if self.jitter:
+            delay += delay * random.uniform(-self.jitter, self.jitter)
+        return max(delay, 0.0)
+
+
+class Scheduler:
+    def __init__(self, workers=None):
+        self.jobs = {}
+        self._queue = []
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._executor = ThreadPoolExecutor(max_workers=workers or SCHEDULER_CONFIG['workers'],
+                                            thread_name_prefix="collector")
+
+    def add_job(self, job, delay=0.0):
+        with self._cond:
+            self.jobs[job.name] = job
+            self._push(job, time.monotonic() + delay)
+
+    def remove_job(self, name):
+        with self._cond:
+            job = self.jobs.pop(name, None)
+            if job:
+                job.cancelled = True
+
+    def reschedule(self, name, delay=0.0):
+        """Pull a job forward, e.g. when a cluster becomes critical"""
+        with self._cond:
+            job = self.jobs.get(name)
+            run_at = time.monotonic() + delay
+            if job and not job.running and (job.next_run is None or run_at < job.next_run):
+                self._push(job, run_at)
+
+    def _push(self, job, run_at):
+        job.next_run = run_at
+        self._seq += 1
+        heapq.heappush(self._queue, (run_at, self._seq, job))
+        self._cond.notify()
+
+    def _run(self, job):
+        start = time.monotonic()
+        ok = False
+        try:
+            ok = job.func() is not False
+        except Exception as e:
+            logger.error("Job %s failed: %s", job.name, e)
+        job.last_duration = time.monotonic() - start
+        job.last_run = time.time()
+        with self._cond:
+            job.running = False
+            job.failures = 0 if ok else job.failures + 1
+            if job.failures:
+                logger.warning("Job %s failed %d time(s) in a row, backing off", job.name, job.failures)
+            if not job.cancelled:
+                self._push(job, time.monotonic() + job.next_delay())
+
+    def run_forever(self):
+        logger.info("Scheduler started with %d jobs", len(self.jobs))
+        with self._cond:
+            while not self._stopped:
+                now = time.monotonic()
+                while self._queue and self._queue[0][0] <= now:
+                    run_at, _, job = heapq.heappop(self._queue)
+                    # İptal edilmiş, zaten çalışan veya öne çekilip eski kaydı kalan job'ları atla
+                    if job.cancelled or job.running or run_at != job.next_run:
+                        continue
+                    job.running = True
+                    self._executor.submit(self._run, job)
+                timeout = self._queue[0][0] - now if self._queue else None
+                self._cond.wait(timeout)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,348 @@
+"""Collector sharding across replicas.
+
+With KUBEMON_SHARDING set, every collector replica heartbeats into a shared
+membership list and places the live replicas on a consistent-hash ring
+(KUBEMON_SHARD_VNODES virtual nodes each). A replica polls only the clusters
+the ring maps to it, and only while it holds that cluster's lease:
+
+- "sqlite": leases and heartbeats live in the shared database
+  (`shard_leases`, `collector_replicas`). A lease is taken with one atomic
+  upsert that succeeds only if it is free, expired or already ours. It is
+  renewed on every heartbeat and expires KUBEMON_SHARD_LEASE_TTL seconds
+  after its holder stops. Every change of owner bumps the lease's epoch.
+  SQLite locking is only reliable when all replicas see the same local
+  file system, i.e. replicas on one node; not over NFS/SMB volumes.
+- "file": replicas on one host share KUBEMON_SHARD_LOCK_DIR. A lease is an
+  exclusive flock, released by the kernel if the process dies.
+
+When a replica joins or leaves, only the clusters whose ring position
+changes move. The old owner releases a lease only while that cluster's
+collection is not running, and the new owner takes it on its next
+heartbeat, so a cluster is never polled by two replicas at once. A replica
+that stalls past its TTL can still be mid-collection when another one takes
+over; `ShardCoordinator.fence()` captures the lease epoch when a collection
+starts and the collector checks it before each write phase. The
+LEADER_KEY lease goes through the same ring and picks the one replica
+that runs alert checks, cleanup, snapshot publishing and notifications.
+"""
+import bisect
+import fcntl
+import hashlib
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import database
+from metrics import timed_query
+
+logger = logging.getLogger(__name__)
+
+SHARD_CONFIG = {
+    # "none": tek replica her cluster'ı poll eder; "sqlite": ortak DB'de lease; "file": aynı host'ta flock
+    'mode': os.environ.get("KUBEMON_SHARDING", "none"),
+    # Pod adı (HOSTNAME) sabit kimlik verir; aynı host'ta birden fazla replica için env ile ayrıştırılmalı
+    'replica_id': os.environ.get("KUBEMON_REPLICA_ID") or socket.gethostname(),
+    'lease_ttl': float(os.environ.get("KUBEMON_SHARD_LEASE_TTL", 30)),
+    'heartbeat_interval': float(os.environ.get("KUBEMON_SHARD_HEARTBEAT", 10)),
+    'vnodes': int(os.environ.get("KUBEMON_SHARD_VNODES", 64)),
+    'lock_dir': os.environ.get("KUBEMON_SHARD_LOCK_DIR", os.path.join("data", "shards")),
+}
+
+# Alert, cleanup, snapshot ve bildirimleri çalıştıran replica bu lease'i tutar
+LEADER_KEY = "__leader__"
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent-hash ring: adding or removing a node only moves the keys next to its points"""
+
+    def __init__(self, nodes, vnodes=SHARD_CONFIG['vnodes']):
+        self._points = sorted((_hash(f"{node}#{i}"), node) for node in nodes for i in range(vnodes))
+        self._hashes = [point[0] for point in self._points]
+
+    def owner(self, key):
+        if not self._points:
+            return None
+        return self._points[bisect.bisect(self._hashes, _hash(key)) % len(self._points)][1]
+
+
+class SqliteLeases:
+    """Leases and replica heartbeats in the shared SQLite database (epoch seconds)"""
+
+    def __init__(self):
+        with sqlite3.connect(database.DB_PATH) as conn:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS collector_replicas (
+                replica_id TEXT PRIMARY KEY,
+                heartbeat_at REAL
+            ) WITHOUT ROWID
+            """)
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS shard_leases (
+                key TEXT PRIMARY KEY,
+                owner TEXT,
+                expires_at REAL,
+                epoch INTEGER DEFAULT 1
+            ) WITHOUT ROWID
+            """)
+
+    def heartbeat(self, replica_id, now):
+        with sqlite3.connect(database.DB_PATH) as conn:
+            timed_query(conn.cursor(), "shard_heartbeat", """
+            INSERT INTO collector_replicas (replica_id, heartbeat_at) VALUES (?, ?)
+            ON CONFLICT(replica_id) DO UPDATE SET heartbeat_at = excluded.heartbeat_at
+            """, (replica_id, now))
+
+    def live_replicas(self, since):
+        with sqlite3.connect(database.DB_PATH) as conn:
+            c = conn.cursor()
+            timed_query(c, "shard_live_replicas", "SELECT replica_id FROM collector_replicas WHERE heartbeat_at >= ?", (since,))
+            return {row[0] for row in c.fetchall()}
+
+    def acquire(self, key, replica_id, expires_at, now):
+        """Take the lease if it is free, expired or ours; returns its epoch, None if held by another replica"""
+        with sqlite3.connect(database.DB_PATH) as conn:
+            c = conn.cursor()
+            # Tek ifade: boşsa, süresi dolmuşsa ya da zaten bizimse alınır; epoch sahip değişince artar
+            timed_query(c, "shard_lease_acquire", """
+            INSERT INTO shard_leases (key, owner, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at,
+                epoch = shard_leases.epoch + (shard_leases.owner != excluded.owner)
+            WHERE shard_leases.owner = excluded.owner OR shard_leases.expires_at < ?
+            RETURNING epoch
+            """, (key, replica_id, expires_at, now))
+            row = c.fetchone()
+            return row[0] if row else None
+
+    def holder(self, key):
+        """(owner, epoch) of the lease row, None if nobody holds it"""
+        with sqlite3.connect(database.DB_PATH) as conn:
+            c = conn.cursor()
+            timed_query(c, "shard_lease_holder", "SELECT owner, epoch FROM shard_leases WHERE key = ?", (key,))
+            row = c.fetchone()
+        return tuple(row) if row else None
+
+    def renew(self, keys, replica_id, expires_at):
+        """Extend our leases; returns the keys still held"""
+        renewed = set()
+        with sqlite3.connect(database.DB_PATH) as conn:
+            c = conn.cursor()
+            for key in keys:
+                timed_query(c, "shard_lease_renew", "UPDATE shard_leases SET expires_at = ? WHERE key = ? AND owner = ?",
+                            (expires_at, key, replica_id))
+                if c.rowcount:
+                    renewed.add(key)
+        return renewed
+
+    def release(self, key, replica_id):
+        with sqlite3.connect(database.DB_PATH) as conn:
+            timed_query(conn.cursor(), "shard_lease_release", "DELETE FROM shard_leases WHERE key = ? AND owner = ?", (key, replica_id))
+
+    def leave(self, replica_id):
+        with sqlite3.connect(database.DB_PATH) as conn:
+            c = conn.cursor()
+            timed_query(c, "shard_leave_leases", "DELETE FROM shard_leases WHERE owner = ?", (replica_id,))
+            timed_query(c, "shard_leave_replica", "DELETE FROM collector_replicas WHERE replica_id = ?", (replica_id,))
+
+
+class FileLeases:
+    """Leases as flocks on files in a directory shared by replicas on one host"""
+
+    def __init__(self, directory=None):
+        self.directory = directory or SHARD_CONFIG['lock_dir']
+        os.makedirs(os.path.join(self.directory, "replicas"), exist_ok=True)
+        os.makedirs(os.path.join(self.directory, "leases"), exist_ok=True)
+        self._files = {}
+        self._owner = None
+
+    def heartbeat(self, replica_id, now):
+        path = os.path.join(self.directory, "replicas", replica_id)
+        with open(path, "a"):
+            pass
+        os.utime(path, (now, now))
+
+    def live_replicas(self, since):
+        replicas = set()
+        with os.scandir(os.path.join(self.directory, "replicas")) as entries:
+            for entry in entries:
+                try:
+                    if entry.stat().st_mtime >= since:
+                        replicas.add(entry.name)
+                except FileNotFoundError:
+                    continue
+        return replicas
+
+    def acquire(self, key, replica_id, expires_at, now):
+        # flock süreç yaşadıkça elde kalır, başkası alamaz: epoch hep 1
+        if key in self._files:
+            return 1
+        lock_file = open(os.path.join(self.directory, "leases", f"{key}.lock"), "a+")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return None
+        # Kimin tuttuğu dosyada görünsün (sadece bilgi amaçlı)
+        lock_file.truncate(0)
+        lock_file.write(replica_id)
+        lock_file.flush()
+        self._files[key] = lock_file
+        self._owner = replica_id
+        return 1
+
+    def holder(self, key):
+        return (self._owner, 1) if key in self._files else None
+
+    def renew(self, keys, replica_id, expires_at):
+        # flock süreç yaşadıkça düşmez
+        return {key for key in keys if key in self._files}
+
+    def release(self, key, replica_id):
+        lock_file = self._files.pop(key, None)
+        if lock_file is not None:
+            lock_file.close()
+
+    def leave(self, replica_id):
+        for key in list(self._files):
+            self.release(key, replica_id)
+        try:
+            os.remove(os.path.join(self.directory, "replicas", replica_id))
+        except FileNotFoundError:
+            pass
+
+
+BACKENDS = {"sqlite": SqliteLeases, "file": FileLeases}
+
+
+class ShardCoordinator:
+    """Keeps this replica's leases in line with the ring.
+
+    `keys()` returns every shardable key (cluster names plus LEADER_KEY);
+    `on_change()` is called from the heartbeat thread whenever the set of
+    held keys changes.
+    """
+
+    def __init__(self, backend, keys, replica_id=None, config=None, on_change=None):
+        self.backend = backend
+        self.keys = keys
+        self.config = {**SHARD_CONFIG, **(config or {})}
+        self.replica_id = replica_id or self.config['replica_id']
+        self.on_change = on_change
+        self._expires = {}  # key -> local lease expiry (epoch seconds)
+        self._epochs = {}   # key -> lease epoch when we acquired it
+        self._busy = {}     # key -> running holders
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def tick(self):
+        """One heartbeat: refresh membership, renew, release and acquire leases; True if ownership changed"""
+        now = time.time()
+        ttl = self.config['lease_ttl']
+        self.backend.heartbeat(self.replica_id, now)
+        live = self.backend.live_replicas(now - ttl) | {self.replica_id}
+        ring = HashRing(sorted(live), self.config['vnodes'])
+        desired = {key for key in self.keys() if ring.owner(key) == self.replica_id}
+
+        with self._lock:
+            held = set(self._expires)
+        expires_at = now + ttl
+        renewed = self.backend.renew(held, self.replica_id, expires_at)
+        epochs = {key: self.backend.acquire(key, self.replica_id, expires_at, now) for key in desired - held}
+        acquired = {key for key, epoch in epochs.items() if epoch is not None}
+        with self._lock:
+            lost = held - renewed
+            # Çalışan collection bitmeden lease bırakılmaz, bir sonraki heartbeat'e kalır
+            releasing = {key for key in renewed - desired if not self._busy.get(key)}
+            for key in lost | releasing:
+                self._expires.pop(key, None)
+                self._epochs.pop(key, None)
+            for key in (renewed - releasing) | acquired:
+                self._expires[key] = expires_at
+            for key in acquired:
+                self._epochs[key] = epochs[key]
+        for key in releasing:
+            self.backend.release(key, self.replica_id)
+
+        if lost:
+            logger.warning("Replica %s lost leases: %s", self.replica_id, ", ".join(sorted(lost)))
+        changed = bool(lost or releasing or acquired)
+        if changed:
+            logger.info("Replica %s (%d live): holds %d keys (+%d -%d), leader=%s", self.replica_id, len(live),
+                        len(self._expires), len(acquired), len(lost | releasing), self.is_leader())
+            if self.on_change is not None:
+                self.on_change()
+        return changed
+
+    def owns(self, key):
+        return self._expires.get(key, 0) > time.time()
+
+    def owned(self):
+        now = time.time()
+        return {key for key, expires_at in list(self._expires.items()) if expires_at > now}
+
+    def is_leader(self):
+        return self.owns(LEADER_KEY)
+
+    def fence(self, key):
+        """Check bound to our current lease of `key`: True while no other replica has taken it over.
+
+        Unlike owns() it reads the shared lease, so it also catches a takeover
+        after this replica stalled past its TTL.
+        """
+        epoch = self._epochs.get(key) if self.owns(key) else None
+        return lambda: epoch is not None and self.backend.holder(key) == (self.replica_id, epoch)
+
+    @contextmanager
+    def holding(self, key):
+        """Yields whether this replica holds `key`; while True the lease is not released"""
+        with self._lock:
+            held = self.owns(key)
+            if held:
+                self._busy[key] = self._busy.get(key, 0) + 1
+        try:
+            yield held
+        finally:
+            if held:
+                with self._lock:
+                    self._busy[key] -= 1
+
+    def start(self):
+        def loop():
+            while not self._stop.is_set():
+                try:
+                    self.tick()
+                except Exception as e:
+                    logger.error("Shard heartbeat failed: %s", e)
+                self._stop.wait(self.config['heartbeat_interval'])
+        # Heartbeat ayrı thread'de: worker pool yavaş cluster'larla dolsa da lease'ler yenilenir
+        self._thread = threading.Thread(target=loop, name="shard-heartbeat", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            self._expires.clear()
+            self._epochs.clear()
+        self.backend.leave(self.replica_id)
+
+
+def create_coordinator(keys, on_change=None):
+    """ShardCoordinator for KUBEMON_SHARDING, or None when sharding is off"""
+    mode = SHARD_CONFIG['mode']
+    if mode in ("", "none", "0"):
+        return None
+    if mode not in BACKENDS:
+        raise ValueError(f"Unknown KUBEMON_SHARDING mode: {mode}")
+    logger.info("Sharded collector: replica %s, %s leases, ttl %ss", SHARD_CONFIG['replica_id'], mode, SHARD_CONFIG['lease_ttl'])
+    return ShardCoordinator(BACKENDS[mode](), keys, on_change=on_change)
@@ -0,0 +1,333 @@
+"""Current-state snapshot shared by the collector and the API.
+
+After each alert cycle, and at most every SNAPSHOT_CONFIG['interval']
+seconds when cluster collections changed the data, the collector publishes
+one versioned binary file: the latest row of every pod seen in the last
+SNAPSHOT_CONFIG['hours'] (with its recent restarts), every active alert and
+the per-cluster collection counters. The API maps the file read-only and
+answers current-state queries (/api/summary, /api/clusters, active alerts,
+current pods) from it without touching SQLite.
+
+Layout (little-endian): a fixed header, a string table (u32 offsets + UTF-8
+blob, index 0 is None), then fixed-width record arrays for pods, alerts and
+clusters whose string fields are string table indexes. Records are read as
+numpy views over the mapping, so filters run on the mapped memory and only
+the strings of returned rows are decoded.
+
+A new version is written to a temporary file and renamed over the old one.
+Readers notice the new file by its inode/mtime and swap atomically; requests
+still holding the old mapping keep a consistent view. numpy is optional;
+without it nothing is published and the API reads SQLite as before.
+"""
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+try:
+    import numpy as np
+    SNAPSHOT_AVAILABLE = True
+except ImportError:
+    SNAPSHOT_AVAILABLE = False
+
+import database
+from database import get_active_alert_rows, get_cluster_health, summarize, summary_rows
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_CONFIG = {
+    'enabled': os.environ.get("KUBEMON_SNAPSHOT", "1") != "0" and SNAPSHOT_AVAILABLE,
+    # Boşsa veritabanının yanında snapshot.bin
+    'path': os.environ.get("KUBEMON_SNAPSHOT_PATH"),
+    # Snapshot'taki pod penceresi; /api/summary bu hours değeri için snapshot'tan cevaplanır
+    'hours': int(os.environ.get("KUBEMON_SNAPSHOT_HOURS", 24)),
+    # Collector değişen veriyi en fazla bu aralıkla yayınlar (her cluster toplamasında değil)
+    'interval': float(os.environ.get("KUBEMON_SNAPSHOT_INTERVAL", 15)),
+    # Bundan eski snapshot kullanılmaz (collector durmuş olabilir)
+    'max_age': float(os.environ.get("KUBEMON_SNAPSHOT_MAX_AGE", 300)),
+}
+
+MAGIC = b"KMSNAP01"
+# magic, version, generated_at (epoch), hours, strings, pods, alerts, clusters, reserved
+HEADER = struct.Struct("<8sQdIIIIII")
+
+if SNAPSHOT_AVAILABLE:
+    POD_DTYPE = np.dtype([("cluster", "<u4"), ("namespace", "<u4"), ("name", "<u4"), ("status", "<u4"),
+                          ("timestamp", "<u4"), ("restarts", "<i4"), ("recent", "<i4")])
+    # parent_id / member_count: -1 = NULL
+    ALERT_DTYPE = np.dtype([("id", "<i8"), ("parent_id", "<i8"), ("cluster", "<u4"), ("rule_name", "<u4"),
+                            ("severity", "<u4"), ("message", "<u4"), ("status", "<u4"), ("created_at", "<u4"),
+                            ("resolved_at", "<u4"), ("group_key", "<u4"), ("last_seen_at", "<u4"),
+                            ("namespace", "<u4"), ("member_count", "<i4")])
+    CLUSTER_DTYPE = np.dtype([("name", "<u4"), ("last_attempt", "<u4"), ("last_success", "<u4"), ("last_error", "<u4"),
+                              ("last_duration", "<f8"), ("consecutive_failures", "<i4")])
+
+
+def snapshot_path():
+    return SNAPSHOT_CONFIG['path'] or os.path.join(os.path.dirname(database.DB_PATH), "snapshot.bin")
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+class _StringTable:
+    def __init__(self):
+        self.index = {}
+        self.values = []
+
+    def __call__(self, value):
+        if value is None:
+            return 0
+        value = str(value)
+        i = self.index.get(value)
+        if i is None:
+            i = self.index[value] = len(self.values) + 1
+            self.values.append(value.encode())
+        return i
+
+    def encode(self):
+        lengths = np.fromiter((len(value) for value in self.values), dtype=np.uint32, count=len(self.values))
+        offsets = np.zeros(len(self.values) + 2, dtype="<u4")
+        np.cumsum(lengths, out=offsets[2:])
+        return offsets, b"".join(self.values)
+
+
+def _null(value):
+    return -1 if value is None else value
+
+
+def write_snapshot(path, version, hours, generated_at, pods, alerts, health):
+    """Write a snapshot file atomically.
+
+    `pods` are summary_rows() pod rows, `alerts` get_active_alert_rows()
+    rows and `health` the get_cluster_health() dict.
+    """
+    s = _StringTable()
+    pod_array = np.array([(s(row[0]), s(row[1]), s(row[2]), s(row[3]), s(row[5]), row[4] or 0, row[6] or 0) for row in pods],
+                         dtype=POD_DTYPE)
+    alert_array = np.array([
+        (row[0], _null(row[8]), s(row[1]), s(row[2]), s(row[3]), s(row[4]), s(row[5]), s(row[6]), s(row[7]),
+         s(row[10]), s(row[11]), s(row[12]), _null(row[9]))
+        for row in alerts], dtype=ALERT_DTYPE)
+    cluster_array = np.array([
+        (s(name), s(item['last_attempt']), s(item['last_success']), s(item['last_error']),
+         np.nan if item['last_duration'] is None else item['last_duration'], item['consecutive_failures'] or 0)
+        for name, item in sorted(health.items())], dtype=CLUSTER_DTYPE)
+    offsets, blob = s.encode()
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, version, generated_at.replace(tzinfo=timezone.utc).timestamp(), hours,
+                            len(offsets) - 1, len(pod_array), len(alert_array), len(cluster_array), 0))
+        for chunk in (offsets.tobytes(), blob, pod_array.tobytes(), alert_array.tobytes(), cluster_array.tobytes()):
+            f.write(b"\0" * (_align(f.tell()) - f.tell()))
+            f.write(chunk)
+    # Okuyucular ya eski ya yeni dosyayı görür, yarım yazılmış dosyayı asla
+    os.replace(tmp, path)
+
+
+class Snapshot:
+    """Read-only view of one snapshot file"""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.identity = (path, stat.st_ino, stat.st_mtime_ns)
+        magic, self.version, generated, self.hours, n_strings, n_pods, n_alerts, n_clusters, _ = HEADER.unpack_from(self._mm)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a KubeMon snapshot")
+        self.generated_at = datetime.fromtimestamp(generated, timezone.utc).replace(tzinfo=None)
+        offset = _align(HEADER.size)
+        self._offsets = np.frombuffer(self._mm, "<u4", n_strings + 1, offset)
+        self._blob = _align(offset + self._offsets.nbytes)
+        offset = _align(self._blob + int(self._offsets[-1]))
+        self.pods = np.frombuffer(self._mm, POD_DTYPE, n_pods, offset)
+        offset = _align(offset + self.pods.nbytes)
+        self.alerts = np.frombuffer(self._mm, ALERT_DTYPE, n_alerts, offset)
+        offset = _align(offset + self.alerts.nbytes)
+        self.clusters = np.frombuffer(self._mm, CLUSTER_DTYPE, n_clusters, offset)
+        self._strings = {}
+        self._summaries = {}
+        self._lock = threading.Lock()
+
+    def age(self):
+        return (datetime.utcnow() - self.generated_at).total_seconds()
+
+    def string(self, index):
+        index = int(index)
+        if index == 0:
+            return None
+        value = self._strings.get(index)
+        if value is None:
+            start = self._blob + int(self._offsets[index])
+            end = self._blob + int(self._offsets[index + 1])
+            value = self._strings[index] = self._mm[start:end].decode()
+        return value
+
+    def _string_id(self, value, ids):
+        """String table index of `value` among `ids` (-1 if absent), for vectorized filters"""
+        for i in np.unique(ids):
+            if self.string(i) == value:
+                return int(i)
+        return -1
+
+    def pod_rows(self, cluster=None):
+        """summary_rows()-style pod rows"""
+        pods = self.pods
+        if cluster:
+            pods = pods[pods["cluster"] == self._string_id(cluster, pods["cluster"])]
+        s = self.string
+        return [(s(p["cluster"]), s(p["namespace"]), s(p["name"]), s(p["status"]), int(p["restarts"]), s(p["timestamp"]),
+                 int(p["recent"])) for p in pods]
+
+    def current_pods(self, cluster=None):
+        """Same rows as database.get_current_pods(cluster, self.hours)"""
+        rows = [row[:6] for row in self.pod_rows(cluster)]
+        rows.sort(key=lambda row: row[5], reverse=True)
+        return rows
+
+    def alert_counts(self, cluster=None):
+        """[(cluster, severity, active alerts)] like the summary's alert query"""
+        alerts = self.alerts
+        if cluster:
+            alerts = alerts[alerts["cluster"] == self._string_id(cluster, alerts["cluster"])]
+        keys, counts = np.unique((alerts["cluster"].astype(np.uint64) << np.uint64(32)) | alerts["severity"], return_counts=True)
+        return [(self.string(int(key >> np.uint64(32))), self.string(int(key & np.uint64(0xFFFFFFFF))), int(count))
+                for key, count in zip(keys, counts)]
+
+    def summary(self, cluster=None, top=10, include=None):
+        """Same result as database.get_summary(cluster, self.hours, top, include)"""
+        key = (cluster, top, include)
+        summary = self._summaries.get(key)
+        if summary is None:
+            summary = summarize(self.pod_rows(cluster), self.alert_counts(cluster), cluster, self.hours, top, include,
+                                self.generated_at)
+            with self._lock:
+                self._summaries[key] = summary
+        return summary
+
+    def alert_rows(self, cluster=None, severity=None, hours=168, limit=100, parent_id=None, include_children=False):
+        """Active alerts like get_alerts(status='active', ..., as_rows=True)"""
+        alerts = self.alerts
+        mask = np.ones(len(alerts), dtype=bool)
+        if cluster and cluster != 'all':
+            mask &= alerts["cluster"] == self._string_id(cluster, alerts["cluster"])
+        if severity:
+            mask &= alerts["severity"] == self._string_id(severity, alerts["severity"])
+        if parent_id is not None:
+            mask &= alerts["parent_id"] == parent_id
+        elif not include_children:
+            mask &= alerts["parent_id"] == -1
+        # created_at metin olarak saklı; SQLite'taki gibi metin karşılaştırması
+        threshold = str(datetime.utcnow() - timedelta(hours=hours))
+        s = self.string
+        rows = []
+        for a in alerts[mask]:
+            created_at = s(a["created_at"])
+            if created_at is None or created_at < threshold:
+                continue
+            rows.append((int(a["id"]), s(a["cluster"]), s(a["rule_name"]), s(a["severity"]), s(a["message"]), s(a["status"]),
+                         created_at, s(a["resolved_at"]), None if a["parent_id"] == -1 else int(a["parent_id"]),
+                         None if a["member_count"] == -1 else int(a["member_count"]), s(a["group_key"]), s(a["last_seen_at"])))
+        rows.sort(key=lambda row: row[6], reverse=True)
+        return rows[:limit]
+
+    def cluster_health(self):
+        """Same shape as database.get_cluster_health()"""
+        s = self.string
+        return {
+            s(c["name"]): {
+                'last_attempt': s(c["last_attempt"]),
+                'last_success': s(c["last_success"]),
+                'last_duration': None if np.isnan(c["last_duration"]) else float(c["last_duration"]),
+                'consecutive_failures': int(c["consecutive_failures"]),
+                'last_error': s(c["last_error"]),
+            }
+            for c in self.clusters
+        }
+
+
+# --- Collector ---
+
+_publish_lock = threading.Lock()
+_version = None
+
+
+def _stored_version(path):
+    try:
+        with open(path, "rb") as f:
+            magic, version = HEADER.unpack(f.read(HEADER.size))[:2]
+        return version if magic == MAGIC else 0
+    except (OSError, struct.error):
+        return 0
+
+
+def publish_snapshot():
+    """Write a new snapshot version from the database; returns the version, None if disabled or failed"""
+    global _version
+    if not SNAPSHOT_CONFIG['enabled']:
+        return None
+    path = snapshot_path()
+    with _publish_lock:
+        try:
+            start = time.perf_counter()
+            if _version is None:
+                # Yeniden başlatmada sürüm geri gitmesin, API eski sürümü yeni sanmasın
+                _version = _stored_version(path)
+            generated_at = datetime.utcnow()
+            pods, _ = summary_rows(None, SNAPSHOT_CONFIG['hours'])
+            alerts = get_active_alert_rows()
+            health = get_cluster_health()
+            write_snapshot(path, _version + 1, SNAPSHOT_CONFIG['hours'], generated_at, pods, alerts, health)
+            _version += 1
+            logger.debug("Published snapshot v%d (%d pods, %d alerts) in %.3fs", _version, len(pods), len(alerts),
+                         time.perf_counter() - start)
+            return _version
+        except Exception as e:
+            logger.error("Snapshot publish failed: %s", e)
+            return None
+
+
+# --- API ---
+
+_current = None
+_min_version = 0
+_read_lock = threading.Lock()
+
+
+def current_snapshot():
+    """The latest snapshot, or None if there is none, it is too old or it was invalidated"""
+    global _current
+    if not SNAPSHOT_AVAILABLE:
+        return None
+    path = snapshot_path()
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    snapshot = _current
+    if snapshot is None or snapshot.identity != (path, stat.st_ino, stat.st_mtime_ns):
+        with _read_lock:
+            snapshot = _current
+            if snapshot is None or snapshot.identity != (path, stat.st_ino, stat.st_mtime_ns):
+                try:
+                    snapshot = Snapshot(path)
+                except (OSError, ValueError, struct.error) as e:
+                    logger.warning("Snapshot unreadable: %s", e)
+                    return None
+                # Eski mapping'i tutan istekler bitene kadar geçerli kalır
+                _current = snapshot
+    if snapshot.version < _min_version or snapshot.age() > SNAPSHOT_CONFIG['max_age']:
+        return None
+    return snapshot
+
+
+def invalidate_snapshot():
+    """Ignore the current snapshot until the collector publishes a newer one (e.g. after alerts were changed)"""
+    global _min_version
+    _min_version = max(_min_version, _stored_version(snapshot_path()) + 1)
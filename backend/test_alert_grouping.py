@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Alert grouping tests: pod names map to their Deployment, StatefulSet or
+DaemonSet, an object with an open alert is not alerted again, a workload
+reaching the storm threshold gets one aggregated alert that adopts the open
+per-pod alerts, later candidates update that storm, alerts past the rule's
+rate limit collapse into one alert per cluster, storms resolve after the
+quiet period, and every configured rule can raise alerts.
+"""
+
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+from unittest import mock
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import alerts
+import database
+from alerts import raise_alerts, workload_name
+from conftest import temp_database
+
+SUFFIXES = [f"x2k4{c}" for c in "bcdfghjklmnpqrst"]
+
+
+def crashloop(namespace, pod, cluster="prod"):
+    return (cluster, namespace, pod, 'critical', f"Pod {namespace}/{pod} is in CrashLoopBackOff state", f"pod={namespace}/{pod}")
+
+
+def alert_rows():
+    with sqlite3.connect(database.DB_PATH) as conn:
+        conn.row_factory = sqlite3.Row
+        return [dict(row) for row in conn.execute("SELECT * FROM alerts ORDER BY id")]
+
+
+def test_workload_name():
+    # Deployment: ReplicaSet hash + suffix
+    assert workload_name("api-7d9f8b6c5-x2k4p") == "api"
+    assert workload_name("payments-api-5d8f7c9b4-x7k2p") == "payments-api"
+    # StatefulSet: ordinal
+    assert workload_name("db-0") == "db"
+    assert workload_name("kafka-broker-12") == "kafka-broker"
+    # DaemonSet / Job: tek suffix
+    assert workload_name("node-exporter-x7k2p") == "node-exporter"
+    # Sesli harf içeren son parça üretilmiş suffix değildir
+    assert workload_name("web-proxy") == "web-proxy"
+    assert workload_name("standalone") == "standalone"
+
+
+def test_open_alert_is_not_repeated():
+    with temp_database("grouping.db"):
+        assert raise_alerts('pod_crashloop', [crashloop("shop", "api-0"), crashloop("shop", "web-0")]) == 2
+        assert raise_alerts('pod_crashloop', [crashloop("shop", "api-0"), crashloop("shop", "web-0"),
+                                              crashloop("shop", "cart-0")]) == 1
+        assert [row['message'] for row in alert_rows()] == [
+            "Pod shop/api-0 is in CrashLoopBackOff state",
+            "Pod shop/web-0 is in CrashLoopBackOff state",
+            "Pod shop/cart-0 is in CrashLoopBackOff state",
+        ]
+
+
+def test_every_rule_can_raise_alerts():
+    with temp_database("grouping.db"):
+        for rule_name in alerts.ALERT_RULES:
+            pod = f"{rule_name.replace('_', '-')}-0"
+            assert raise_alerts(rule_name, [("prod", "shop", pod, 'warning', f"Pod shop/{pod}: {rule_name}", f"pod=shop/{pod}")]) == 1, rule_name
+        assert len(alert_rows()) == len(alerts.ALERT_RULES)
+
+
+def test_storm_adopts_open_alerts_and_is_updated():
+    with temp_database("grouping.db"):
+        pods = [f"api-7d9f8b6c5-{suffix}" for suffix in SUFFIXES]
+        threshold = alerts.ALERT_RULES['pod_crashloop']['storm_threshold']
+        assert raise_alerts('pod_crashloop', [crashloop("shop", pods[0])]) == 1
+
+        # Eşikte: tek storm alert'i, açık pod alert'i onun çocuğu olur
+        assert raise_alerts('pod_crashloop', [crashloop("shop", pod) for pod in pods[:threshold]]) == 1
+        child, storm = alert_rows()
+        assert storm['group_key'] == "pod_crashloop/prod/shop/api" and storm['member_count'] == threshold
+        assert storm['message'] == f"Pod CrashLoopBackOff: {threshold} pods affected in prod shop/api"
+        assert child['parent_id'] == storm['id']
+        assert [alert['id'] for alert in database.get_alerts(status='active')] == [storm['id']]
+
+        # Storm modundaki gruba yeni pod'lar: yeni satır yok, üye listesi büyür
+        earlier = (datetime.utcnow() - timedelta(minutes=5)).strftime("%Y-%m-%d %H:%M:%S")
+        with sqlite3.connect(database.DB_PATH) as conn:
+            conn.execute("UPDATE alerts SET last_seen_at = ? WHERE id = ?", (earlier, storm['id']))
+        assert raise_alerts('pod_crashloop', [crashloop("shop", pod) for pod in pods[threshold - 2:threshold + 3]]) == 0
+        rows = alert_rows()
+        assert len(rows) == 2
+        updated = rows[1]
+        assert updated['member_count'] == threshold + 3 and updated['last_seen_at'] > earlier
+        assert json.loads(updated['metadata'])['members'] == sorted(f"shop/{pod}" for pod in pods[:threshold + 3])
+
+
+def test_overflow_collapses_per_cluster():
+    with temp_database("grouping.db"), mock.patch.dict(alerts.ALERT_RULES['pod_crashloop'], {'rate_limit': 3}):
+        candidates = [crashloop("shop", f"svc{i}-0") for i in range(5)] + [crashloop("shop", "svc9-0", cluster="edge")]
+        assert raise_alerts('pod_crashloop', candidates) == 5
+        rows = alert_rows()
+        assert [row['group_key'] for row in rows] == [None, None, None, "pod_crashloop/prod", "pod_crashloop/edge"]
+        overflow = rows[3]
+        assert overflow['member_count'] == 2 and overflow['message'] == "Pod CrashLoopBackOff: 2 pods affected in prod (rate limited)"
+        assert json.loads(overflow['metadata'])['members'] == ["shop/svc3-0", "shop/svc4-0"] and rows[4]['member_count'] == 1
+
+        # Bütçe hâlâ dolu: yeni pod'lar mevcut overflow alert'ine eklenir
+        assert raise_alerts('pod_crashloop', [crashloop("shop", "svc7-0")]) == 0
+        assert alert_rows()[3]['member_count'] == 3
+
+
+def test_storm_resolves_after_quiet_period():
+    with temp_database("grouping.db"):
+        for workload in ("api", "web"):
+            raise_alerts('pod_crashloop', [crashloop("shop", f"{workload}-7d9f8b6c5-{suffix}") for suffix in SUFFIXES[:10]])
+        quiet = alerts.ALERT_GROUPING['storm_quiet_minutes']
+        with sqlite3.connect(database.DB_PATH) as conn:
+            conn.execute("UPDATE alerts SET last_seen_at = ? WHERE group_key = 'pod_crashloop/prod/shop/api'",
+                         ((datetime.utcnow() - timedelta(minutes=quiet + 1)).strftime("%Y-%m-%d %H:%M:%S"),))
+        alerts.auto_resolve_alerts()
+        assert {row['group_key']: row['status'] for row in alert_rows()} == {
+            "pod_crashloop/prod/shop/api": "resolved",
+            "pod_crashloop/prod/shop/web": "active",
+        }
+
+
+if __name__ == "__main__":
+    test_workload_name()
+    print("✅ Pod names map to their Deployment, StatefulSet or DaemonSet")
+    test_open_alert_is_not_repeated()
+    print("✅ Objects with an open alert are not alerted again")
+    test_every_rule_can_raise_alerts()
+    print("✅ Every alert rule can raise alerts")
+    test_storm_adopts_open_alerts_and_is_updated()
+    print("✅ Storm alert opens at the threshold, adopts open alerts and is updated")
+    test_overflow_collapses_per_cluster()
+    print("✅ Alerts past the rate limit collapse into one alert per cluster")
+    test_storm_resolves_after_quiet_period()
+    print("✅ Storm alerts resolve after the quiet period")
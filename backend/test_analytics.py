@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Analytics tests: the event trend and top reasons endpoints aggregate the
+events table, and the DuckDB mirror's first full sync runs in the
+background while queries stay on SQLite, which switch to the mirror once it
+is ready.
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime, timedelta
+from unittest import mock
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import analytics
+import database
+from conftest import temp_database
+from partitions import ensure_partition
+
+
+def add_events(rows):
+    """rows: (cluster, object_name, event_type, reason, count, hours_ago)"""
+    with sqlite3.connect(database.DB_PATH) as conn:
+        c = conn.cursor()
+        for cluster, name, event_type, reason, count, hours_ago in rows:
+            timestamp = (datetime.utcnow() - timedelta(hours=hours_ago)).strftime("%Y-%m-%d %H:%M:%S")
+            partition = ensure_partition(c, "events", timestamp)
+            c.execute(f"""
+            INSERT INTO {partition} (cluster, namespace, object_name, object_kind, event_type, reason, message, count,
+                                     first_timestamp, last_timestamp, timestamp)
+            VALUES (?, 'shop', ?, 'Pod', ?, ?, 'message', ?, ?, ?, ?)
+            """, (cluster, name, event_type, reason, count, timestamp, timestamp, timestamp))
+
+
+EVENTS = [
+    ("prod", "api-0", "Warning", "BackOff", 4, 2),
+    ("prod", "api-1", "Warning", "BackOff", 3, 2),
+    ("prod", "api-0", "Normal", "Pulled", 1, 2),
+    ("edge", "web-0", "Warning", "Unhealthy", 5, 1),
+    ("edge", "web-0", "Warning", "BackOff", 1, 30),
+]
+
+
+def test_trend_and_top_reasons_endpoints():
+    import api
+    client = api.app.test_client()
+    with temp_database("analytics.db"):
+        add_events(EVENTS)
+        response = client.get("/api/events/trend?cluster=prod&hours=24")
+        assert response.status_code == 200
+        assert sorted((row["event_type"], row["count"]) for row in response.get_json()) == [("Normal", 1), ("Warning", 7)]
+
+        response = client.get("/api/events/top-reasons?hours=24&limit=2")
+        assert response.status_code == 200
+        assert response.get_json() == [
+            {'cluster': "prod", 'reason': "BackOff", 'count': 7, 'objects': 2},
+            {'cluster': "edge", 'reason': "Unhealthy", 'count': 5, 'objects': 1},
+        ]
+        assert len(client.get("/api/events/top-reasons?hours=48").get_json()) == 4
+
+        for query in ("trend?hours=0", "top-reasons?hours=-1", "top-reasons?limit=0", "top-reasons?limit=1000"):
+            assert client.get(f"/api/events/{query}").status_code == 400, query
+
+
+def test_mirror_warms_in_background():
+    if database.ANALYTICS_BACKEND != "duckdb" or not analytics.ANALYTICS_AVAILABLE:
+        return
+    with temp_database("analytics.db"):
+        add_events(EVENTS)
+        release = threading.Event()
+        sync = analytics.AnalyticsMirror.sync
+
+        def slow_sync(self, table, since=None):
+            release.wait(5)
+            return sync(self, table, since)
+
+        with mock.patch.object(analytics.AnalyticsMirror, "sync", slow_sync):
+            thread = database.warm_analytics()
+            mirror = database._analytics_mirrors[database.DB_PATH]
+            # Senkron sürerken sorgu beklemez, SQLite'ta çalışır
+            with mock.patch.object(mirror, "query") as query:
+                assert len(database.get_top_event_reasons(hours=48)) == 4
+            assert not query.called
+            assert not mirror.ready.is_set() and thread.is_alive()
+            release.set()
+            thread.join(5)
+        assert mirror.ready.is_set() and mirror.synced["events"]
+        assert database.warm_analytics() is thread
+
+        # Hazır olunca aggregate'ler mirror'dan gelir
+        with mock.patch.object(mirror, "query", wraps=mirror.query) as query:
+            assert len(database.get_top_event_reasons(hours=48)) == 4
+        assert query.called
+
+
+if __name__ == "__main__":
+    test_trend_and_top_reasons_endpoints()
+    print("✅ Event trend and top reasons endpoints aggregate events")
+    test_mirror_warms_in_background()
+    print("✅ DuckDB mirror warms up in the background, queries use SQLite until it is ready")
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Event-rate anomaly tests: tens of thousands of series are scored in one
+vectorized pass that flags spikes and not Poisson noise, idle series give up
+their columns when the baselines are full, and the event_rate_anomaly alert
+opens on a spike and resolves when the rate is back to normal.
+"""
+
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+from unittest import mock
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+import alerts
+import anomaly
+import database
+from anomaly import RateBaselines, window_counts
+from conftest import temp_database
+
+
+def test_vectorized_scoring():
+    rng = np.random.default_rng(7)
+    series = 20000
+    keys = [("prod", f"ns-{i % 400}", f"Reason{i}") for i in range(series)]
+    means = rng.uniform(0.2, 20, series)
+    baselines = RateBaselines(alpha=0.1, max_series=series)
+    for _ in range(20):
+        z, rate, baseline, samples = baselines.observe(dict(zip(keys, rng.poisson(means).astype(float))))
+    # Poisson gürültüsü alert açmaz
+    assert np.count_nonzero(z >= 4) < series * 0.001
+
+    rates = dict(zip(keys, rng.poisson(means).astype(float)))
+    spiking = [keys[10], keys[500], keys[7000]]
+    for key in spiking:
+        rates[key] = rates[key] * 10 + 30
+    start = time.perf_counter()
+    z, rate, baseline, samples = baselines.observe(rates)
+    elapsed = time.perf_counter() - start
+    flagged = {baselines.keys[i] for i in np.flatnonzero(z >= 4)}
+    assert set(spiking) <= flagged and len(flagged) < 25
+    assert samples.min() == 20 and len(baselines) == series
+    # Dict eşleştirmesi dahil milisaniyeler mertebesinde
+    assert elapsed < 0.25, f"scoring {series} series took {elapsed * 1000:.0f}ms"
+
+
+def test_idle_series_release_columns():
+    baselines = RateBaselines(alpha=0.5, max_series=2, capacity=1)
+    baselines.observe({"a": 5.0, "b": 5.0})
+    # Kapasite dolu, "c" için boşta column yok
+    baselines.observe({"a": 5.0, "b": 5.0, "c": 1.0})
+    assert "c" not in baselines.index
+    for _ in range(15):
+        baselines.observe({"a": 5.0})
+    baselines.observe({"a": 5.0, "c": 1.0})
+    assert set(baselines.index) == {"a", "c"} and baselines.index["c"] == 1
+    assert baselines.mean[baselines.index["a"]] == 5.0
+
+
+def test_window_counts_only_new_occurrences():
+    with temp_database("anomaly.db"):
+        backoff = ("prod", "web", "api-0", "Pod", "Warning", "BackOff", "back-off", None, None)
+        start = datetime.utcnow()
+        database.save_events([(*backoff, 4), ("prod", "web", "api-1", "Pod", "Warning", "BackOff", "back-off", None, None, 3)])
+        middle = datetime.utcnow()
+        # Aynı event tekrar geldi: events satırı dedupe'la kümülatif count'a güncellenir
+        database.save_events([(*backoff, 2), ("prod", "web", "api-0", "Pod", "Normal", "Pulled", "pulled", None, None, 1)])
+        database.save_event(*backoff, 1)
+        end = datetime.utcnow() + timedelta(seconds=1)
+
+        with sqlite3.connect(database.DB_PATH) as conn:
+            assert conn.execute("SELECT count FROM events WHERE object_name = 'api-0' AND reason = 'BackOff'").fetchone() == (7,)
+        assert window_counts(start, middle) == {("prod", "web", "BackOff"): 7}
+        assert window_counts(middle, end) == {("prod", "web", "BackOff"): 3, ("prod", "web", "Pulled"): 1}
+        assert window_counts(start, end)[("prod", "web", "BackOff")] == 10
+
+
+def test_event_rate_alert_opens_and_resolves():
+    with temp_database("anomaly.db"), mock.patch.object(anomaly, "_baselines", None), mock.patch.object(anomaly, "_window_start", None), \
+         mock.patch.object(anomaly, "_last_anomalies", set()):
+        now = datetime.utcnow().replace(microsecond=0)
+        # 5 dakikalık cycle'lar: ~2/dk BackOff, sonra 60/dk
+        cycles = [10, 11, 9, 10, 12, 10, 9, 11, 10, 300, 10]
+        clock = [now + timedelta(minutes=5 * i) for i in range(len(cycles) + 1)]
+        counts = [{("prod", "web", "BackOff"): count, ("prod", "web", "Pulled"): 5} for count in cycles]
+        with mock.patch("anomaly.datetime") as fake_datetime, mock.patch("anomaly.window_counts", side_effect=counts):
+            fake_datetime.utcnow.side_effect = clock
+            # İlk kontrol sadece pencereyi başlatır
+            for _ in range(len(cycles)):
+                alerts.check_event_rate_alerts()
+            open_alerts = database.get_alerts(status="active")
+            assert [(a['rule_name'], a['severity']) for a in open_alerts] == [("event_rate_anomaly", "critical")]
+            assert open_alerts[0]['message'].startswith("BackOff events in web at 60.0/min")
+
+            # Rate normale döndü: yeni alert açılmaz, mevcut olan çözülür
+            alerts.check_event_rate_alerts()
+            assert len(database.get_alerts(status="active")) == 1
+            alerts.auto_resolve_alerts()
+            assert database.get_alerts(status="active") == []
+
+
+if __name__ == "__main__":
+    test_vectorized_scoring()
+    print("✅ 20k event-rate series scored in one vectorized pass")
+    test_idle_series_release_columns()
+    print("✅ Idle series give up their columns when the baselines are full")
+    test_window_counts_only_new_occurrences()
+    print("✅ Window counts are the occurrences ingested in the window, not running totals")
+    test_event_rate_alert_opens_and_resolves()
+    print("✅ event_rate_anomaly alert opens on a spike and resolves after it")
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Archive tests: expired event partitions are written to Parquet segments
+without holding the write lock and registered in the same transaction that
+drops them, archived rows are read through by the event and alert queries
+(filters and limits pushed down into the segment scan), segments
+past the archive retention are removed, and a failed drop leaves no
+unregistered segment files behind.
+"""
+
+import glob
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+from unittest import mock
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import archive
+import database
+from archive import delete_segments_before, export_segment, read_through
+from conftest import temp_database
+from partitions import ensure_partition, list_partitions, partition_name
+
+
+def add_old_events(days_ago, count):
+    day = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0) - timedelta(days=days_ago)
+    with sqlite3.connect(database.DB_PATH) as conn:
+        c = conn.cursor()
+        partition = ensure_partition(c, "events", day)
+        for i in range(count):
+            timestamp = (day + timedelta(minutes=i)).strftime("%Y-%m-%d %H:%M:%S")
+            c.execute(f"""
+            INSERT INTO {partition} (cluster, namespace, object_name, object_kind, event_type, reason, message, count,
+                                     first_timestamp, last_timestamp, timestamp)
+            VALUES (?, 'shop', ?, 'Pod', 'Warning', 'BackOff', 'back-off', 1, ?, ?, ?)
+            """, ("prod" if i % 2 else "edge", f"api-{days_ago}-{i}", timestamp, timestamp, timestamp))
+        conn.commit()
+    return partition
+
+
+def segments():
+    with sqlite3.connect(database.DB_PATH) as conn:
+        return conn.execute("SELECT table_name, day, path, row_count FROM archive_segments ORDER BY day").fetchall()
+
+
+def test_drop_exports_outside_the_lock():
+    with temp_database("archive.db") as tmp, mock.patch.object(archive, "ARCHIVE_DIR", os.path.join(tmp, "archive")):
+        old = [add_old_events(10, 6), add_old_events(9, 4)]
+        database.save_event("prod", "shop", "api-now", "Pod", "Warning", "BackOff", "back-off", None, None)
+
+        write_segment = database.write_segment
+        locked = []
+
+        def unlocked_write(c, *args):
+            # Parquet yazılırken başka bir bağlantı yazma kilidini alabilmeli
+            with sqlite3.connect(database.DB_PATH, timeout=0) as other:
+                other.execute("BEGIN IMMEDIATE")
+                other.rollback()
+            locked.append(c.connection.in_transaction)
+            return write_segment(c, *args)
+
+        with mock.patch("database.write_segment", side_effect=unlocked_write):
+            assert database.drop_old_partitions("events", 24 * 7, archive=True) == old
+        assert locked == [False, False]
+        assert [(table, rows) for table, _, _, rows in segments()] == [("events", 6), ("events", 4)]
+        assert all(os.path.exists(path) for _, _, path, _ in segments())
+        with sqlite3.connect(database.DB_PATH) as conn:
+            assert [name for _, name in list_partitions(conn.cursor(), "events")] == [partition_name("events", datetime.utcnow())]
+
+        # Arşivdeki satırlar sorguya dahil, cluster filtresi segment okumasına da iner
+        recent = database.get_events(hours=24 * 11, limit=100)
+        assert len(recent) == 11 and recent[0]['object_name'] == "api-now"
+        assert len(database.get_events(cluster="prod", hours=24 * 11, limit=100)) == 3 + 2 + 1
+        assert len(database.get_events(hours=24 * 8, limit=100)) == 1
+
+
+def test_segment_expiry():
+    with temp_database("archive.db") as tmp, mock.patch.object(archive, "ARCHIVE_DIR", os.path.join(tmp, "archive")):
+        add_old_events(10, 6)
+        add_old_events(9, 4)
+        database.drop_old_partitions("events", 24 * 7, archive=True)
+        oldest = segments()[0][2]
+
+        with sqlite3.connect(database.DB_PATH) as conn:
+            assert delete_segments_before(conn.cursor(), "events", datetime.utcnow() - timedelta(days=9, hours=6)) == 1
+        assert not os.path.exists(oldest) and [rows for *_, rows in segments()] == [4]
+        assert len(database.get_events(hours=24 * 11, limit=100)) == 4
+
+
+def test_export_segment_with_filter():
+    with temp_database("archive.db") as tmp, mock.patch.object(archive, "ARCHIVE_DIR", os.path.join(tmp, "archive")):
+        for i in range(5):
+            alert_id = database.save_alert("prod", "pod_crashloop", "critical", f"Pod shop/api-{i} is in CrashLoopBackOff state")
+            if i < 3:
+                database.resolve_alert(alert_id)
+        day = datetime.utcnow().date()
+        with sqlite3.connect(database.DB_PATH) as conn:
+            c = conn.cursor()
+            assert export_segment(c, "alerts", "alerts", day, "status = ?", ("resolved",)) == 3
+            # Eşleşen satır yoksa dosya ve kayıt oluşmaz
+            assert export_segment(c, "alerts", "alerts", day, "status = ?", ("acknowledged",)) == 0
+            conn.commit()
+            since = datetime.utcnow() - timedelta(hours=1)
+            fragment = read_through(c, "alerts", "(SELECT * FROM alerts WHERE 0)", ["id", "status", "message"], since)
+            rows = c.execute(f"SELECT status, message FROM {fragment} ORDER BY id").fetchall()
+        assert [status for status, _ in rows] == ["resolved"] * 3
+        assert len(glob.glob(os.path.join(tmp, "archive", "alerts", "*.parquet"))) == 1
+
+
+def test_limit_is_pushed_down():
+    with temp_database("archive.db") as tmp, mock.patch.object(archive, "ARCHIVE_DIR", os.path.join(tmp, "archive")):
+        add_old_events(10, 40)
+        add_old_events(9, 30)
+        database.drop_old_partitions("events", 24 * 7, archive=True)
+        database.save_event("prod", "shop", "api-now", "Pod", "Warning", "BackOff", "back-off", None, None)
+
+        since = datetime.utcnow() - timedelta(days=11)
+        with sqlite3.connect(database.DB_PATH) as conn:
+            c = conn.cursor()
+            fragment = read_through(c, "events", "events", database.EVENT_COLUMNS, since, equals={"cluster": "prod"}, limit=5)
+            archived = c.execute("SELECT object_name FROM temp.archived_events ORDER BY timestamp DESC").fetchall()
+            assert [name for name, in archived] == [f"api-9-{i}" for i in (29, 27, 25, 23, 21)]
+            assert len(c.execute(f"SELECT * FROM {fragment}").fetchall()) == 6
+
+        # Limitli sorgu limitsiz sorgunun ilk satırlarını verir
+        everything = database.get_events(hours=24 * 11, limit=1000)
+        assert len(everything) == 71
+        assert database.get_events(hours=24 * 11, limit=10) == everything[:10]
+        assert database.get_events(cluster="edge", hours=24 * 11, limit=3) == [e for e in everything if e['cluster'] == "edge"][:3]
+        assert database.get_events(event_type="Normal", hours=24 * 11, limit=3) == []
+        assert len(database.get_events_by_category(category="pod-issues", hours=24 * 11, limit=50)) == 50
+
+
+def test_alert_filters_are_pushed_down():
+    with temp_database("archive.db") as tmp, mock.patch.object(archive, "ARCHIVE_DIR", os.path.join(tmp, "archive")):
+        parent = database.save_alert("prod", "pod_crashloop", "critical", "Pod CrashLoopBackOff: 2 pods affected in prod shop/api",
+                                     group_key="pod_crashloop/prod/shop/api", member_count=2)
+        children = [database.save_alert("prod", "pod_crashloop", "critical", f"Pod shop/api-{i} is in CrashLoopBackOff state")
+                    for i in range(2)]
+        warning = database.save_alert("prod", "pod_pending_long", "warning", "Pod shop/job-0 pending")
+        with sqlite3.connect(database.DB_PATH) as conn:
+            conn.execute(f"UPDATE alerts SET parent_id = ? WHERE id IN ({children[0]}, {children[1]})", (parent,))
+        database.resolve_alert(parent)
+        database.resolve_alert(warning)
+        with sqlite3.connect(database.DB_PATH) as conn:
+            c = conn.cursor()
+            c.execute("UPDATE alerts SET created_at = datetime('now', printf('-%d minutes', 10 - id))")
+            export_segment(c, "alerts", "alerts", datetime.utcnow().date(), "status = 'resolved'")
+            c.execute("DELETE FROM alerts")
+            conn.commit()
+
+        # Çocuklar ve filtreler arşivden okunurken de uygulanır
+        assert [alert['id'] for alert in database.get_alerts(limit=1)] == [warning]
+        assert sorted(alert['id'] for alert in database.get_alerts()) == [parent, warning]
+        assert [alert['id'] for alert in database.get_alerts(severity="critical", limit=1)] == [parent]
+        assert sorted(alert['id'] for alert in database.get_alerts(parent_id=parent)) == children
+        assert len(database.get_alerts(include_children=True, limit=10)) == 4
+        assert database.get_alerts(status="active") == []
+
+
+def test_failed_drop_discards_segments():
+    with temp_database("archive.db") as tmp, mock.patch.object(archive, "ARCHIVE_DIR", os.path.join(tmp, "archive")):
+        old = add_old_events(10, 6)
+        with mock.patch("partitions._rebuild_view", side_effect=sqlite3.OperationalError("disk I/O error")):
+            try:
+                database.drop_old_partitions("events", 24 * 7, archive=True)
+                assert False, "drop should fail"
+            except sqlite3.OperationalError:
+                pass
+        assert segments() == [] and glob.glob(os.path.join(tmp, "archive", "events", "*")) == []
+        with sqlite3.connect(database.DB_PATH) as conn:
+            assert conn.execute(f"SELECT COUNT(*) FROM {old}").fetchone() == (6,)
+
+
+if __name__ == "__main__":
+    test_drop_exports_outside_the_lock()
+    print("✅ Expired partitions are archived outside the write lock and read through")
+    test_segment_expiry()
+    print("✅ Segments past the archive retention are removed")
+    test_export_segment_with_filter()
+    print("✅ export_segment archives only the matching rows")
+    test_limit_is_pushed_down()
+    print("✅ Limited event queries load only the newest archived rows")
+    test_alert_filters_are_pushed_down()
+    print("✅ Alert filters and storm children are applied to the segment scan")
+    test_failed_drop_discards_segments()
+    print("✅ A failed drop leaves no unregistered segment files")
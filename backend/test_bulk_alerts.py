@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Bulk alert action tests: id lists longer than one chunk are updated in one
+transaction, resolve and acknowledge only move alerts along the allowed
+transitions, a storm alert's children follow it, unknown filters and
+empty criteria are rejected, and ids combined with filters select only the
+alerts matching both.
+"""
+
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+from unittest import mock
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import database
+from conftest import temp_database
+from database import update_alerts
+
+
+def add_alerts(count, cluster="prod", severity="critical", hours_ago=0):
+    created_at = (datetime.utcnow() - timedelta(hours=hours_ago)).strftime("%Y-%m-%d %H:%M:%S")
+    with sqlite3.connect(database.DB_PATH) as conn:
+        c = conn.cursor()
+        first = c.execute("SELECT COALESCE(MAX(id), 0) FROM alerts").fetchone()[0] + 1
+        c.executemany("""
+        INSERT INTO alerts (cluster, rule_name, severity, message, namespace, created_at) VALUES (?, 'pod_crashloop', ?, ?, 'shop', ?)
+        """, [(cluster, severity, f"Pod shop/api-{i} is in CrashLoopBackOff state", created_at) for i in range(count)])
+    return list(range(first, first + count))
+
+
+def statuses(ids=None):
+    with sqlite3.connect(database.DB_PATH) as conn:
+        rows = conn.execute("SELECT id, status FROM alerts ORDER BY id").fetchall()
+    return {alert_id: status for alert_id, status in rows if ids is None or alert_id in ids}
+
+
+def test_ids_are_chunked_in_one_transaction():
+    with temp_database("bulk.db"):
+        ids = add_alerts(1203)
+        with mock.patch("database.timed_query", wraps=database.timed_query) as query:
+            # Bilinmeyen id'ler sayılmaz
+            assert update_alerts("resolve", ids=ids + [999999]) == 1203
+        assert [call.args[1] for call in query.call_args_list].count("alerts_bulk_resolve") == 3
+        assert set(statuses().values()) == {"resolved"}
+
+        # Parçalardan biri hata verirse hiçbir parça yazılmaz
+        more = add_alerts(600)
+        timed_query = database.timed_query
+        calls = []
+
+        def failing(c, name, sql, params=()):
+            calls.append(name)
+            if name == "alerts_bulk_acknowledge" and calls.count(name) == 2:
+                raise sqlite3.OperationalError("disk I/O error")
+            return timed_query(c, name, sql, params)
+
+        with mock.patch("database.timed_query", side_effect=failing):
+            try:
+                update_alerts("acknowledge", ids=more)
+                assert False, "update should fail"
+            except sqlite3.OperationalError:
+                pass
+        assert set(statuses(more).values()) == {"active"}
+
+
+def test_status_transitions():
+    with temp_database("bulk.db"):
+        active, acknowledged, resolved = add_alerts(1), add_alerts(1), add_alerts(1)
+        update_alerts("acknowledge", ids=acknowledged)
+        update_alerts("resolve", ids=resolved)
+
+        # Acknowledge sadece aktif alert'leri, resolve aktif ve acknowledged olanları değiştirir
+        assert update_alerts("acknowledge", ids=active + acknowledged + resolved) == 1
+        assert statuses() == {active[0]: "acknowledged", acknowledged[0]: "acknowledged", resolved[0]: "resolved"}
+        assert update_alerts("resolve", ids=active + acknowledged + resolved) == 2
+        assert set(statuses().values()) == {"resolved"}
+        with sqlite3.connect(database.DB_PATH) as conn:
+            rows = conn.execute("SELECT acknowledged_at IS NOT NULL, resolved_at IS NOT NULL FROM alerts ORDER BY id").fetchall()
+        assert rows == [(1, 1), (1, 1), (0, 1)]
+
+
+def test_storm_children_follow_parent():
+    with temp_database("bulk.db"):
+        parent = database.save_alert("prod", "pod_crashloop", "critical", "Pod CrashLoopBackOff: 3 pods affected in prod shop/api",
+                                     group_key="pod_crashloop/prod/shop/api", member_count=3)
+        children, other = add_alerts(3), add_alerts(1)
+        with sqlite3.connect(database.DB_PATH) as conn:
+            conn.execute(f"UPDATE alerts SET parent_id = ? WHERE id IN ({', '.join(map(str, children))})", (parent,))
+            conn.execute("UPDATE alerts SET status = 'resolved' WHERE id = ?", (children[2],))
+
+        # Sadece seçilen alert sayılır; çözülmüş çocuk acknowledged olmaz
+        assert database.acknowledge_alert(parent)
+        assert statuses([parent] + children + other) == {parent: "acknowledged", children[0]: "acknowledged",
+                                                         children[1]: "acknowledged", children[2]: "resolved", other[0]: "active"}
+        assert update_alerts("resolve", cluster="prod", rule_name="pod_crashloop", severity="critical", ids=[parent]) == 1
+        assert set(statuses(children).values()) == {"resolved"} and statuses(other) == {other[0]: "active"}
+        assert database.get_clusters_with_active_alerts('critical') == {"prod"}
+        database.resolve_alert(other[0])
+        assert database.get_clusters_with_active_alerts('critical') == set()
+
+
+def test_criteria_validation():
+    with temp_database("bulk.db"):
+        add_alerts(3)
+        for kwargs in ({}, {"ids": []}, {"ids": [], "cluster": "prod"}, {"cluster": None}, {"status": "active"}):
+            try:
+                update_alerts("resolve", **kwargs)
+                assert False, kwargs
+            except ValueError:
+                pass
+        assert set(statuses().values()) == {"active"}
+
+
+def test_ids_combined_with_filters():
+    with temp_database("bulk.db"):
+        prod = add_alerts(3)
+        edge = add_alerts(3, cluster="edge")
+        old_warning = add_alerts(2, severity="warning", hours_ago=5)
+        assert update_alerts("resolve", ids=prod + edge, cluster="edge") == 3
+        assert set(statuses(prod).values()) == {"active"} and set(statuses(edge).values()) == {"resolved"}
+        assert update_alerts("acknowledge", ids=prod + old_warning, severity="warning", older_than_hours=4) == 2
+        assert update_alerts("acknowledge", cluster="prod", older_than_hours=6) == 0
+        assert set(statuses(old_warning).values()) == {"acknowledged"} and set(statuses(prod).values()) == {"active"}
+
+
+def test_bulk_endpoints():
+    import api
+    client = api.app.test_client()
+    with temp_database("bulk.db"):
+        ids = add_alerts(4)
+        add_alerts(2, cluster="edge")
+        response = client.post("/api/alerts/acknowledge", json={"ids": ids[:2] + [999999]})
+        assert response.status_code == 200 and response.get_json() == {"action": "acknowledge", "requested": 3, "affected": 2}
+        response = client.post("/api/alerts/resolve", json={"cluster": "edge"})
+        assert response.get_json() == {"action": "resolve", "requested": None, "affected": 2}
+
+        for body in ({}, {"ids": []}, {"ids": "1,2"}, {"ids": [1, "2"]}, {"ids": [True]}, {"older_than_hours": "2"},
+                     {"unknown": "x"}):
+            assert client.post("/api/alerts/resolve", json=body).status_code == 400, body
+        assert client.post("/api/alerts/resolve", data="not json").status_code == 400
+        assert set(statuses(ids[2:]).values()) == {"active"}
+
+
+if __name__ == "__main__":
+    test_ids_are_chunked_in_one_transaction()
+    print("✅ Long id lists are updated in chunks within one transaction")
+    test_status_transitions()
+    print("✅ Resolve and acknowledge follow the allowed status transitions")
+    test_storm_children_follow_parent()
+    print("✅ A storm alert's children follow its resolve and acknowledge")
+    test_criteria_validation()
+    print("✅ Unknown filters, empty ids and missing criteria are rejected")
+    test_ids_combined_with_filters()
+    print("✅ ids combined with filters select alerts matching both")
+    test_bulk_endpoints()
+    print("✅ Bulk endpoints validate their body and report affected alerts")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Client registry tests: collectors share one ApiClient per kubeconfig across
+cycles, a touched but unchanged file keeps it, a rewritten file rebuilds it
+(closing the old one), and evict and close_all drop and close clients.
+"""
+
+import os
+import sys
+import tempfile
+from unittest import mock
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import client_registry
+from client_registry import close_all, evict, get_api_client, get_core_v1, get_custom_objects
+
+KUBECONFIG = """apiVersion: v1
+kind: Config
+clusters:
+- name: {name}
+  cluster:
+    server: https://{name}.example.com:6443
+    insecure-skip-tls-verify: true
+contexts:
+- name: {name}
+  context:
+    cluster: {name}
+    user: {name}
+current-context: {name}
+users:
+- name: {name}
+  user:
+    token: secret
+"""
+
+
+def write_kubeconfig(path, name, mtime_ns=None):
+    with open(path, "w") as f:
+        f.write(KUBECONFIG.format(name=name))
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def host(api_client):
+    return api_client.configuration.host
+
+
+def test_client_reuse_and_rebuild():
+    with tempfile.TemporaryDirectory() as tmp, mock.patch.dict(client_registry._clients, clear=True), \
+         mock.patch("kubernetes.client.ApiClient.close", autospec=True) as close:
+        path = os.path.join(tmp, "prod.yaml")
+        write_kubeconfig(path, "prod", mtime_ns=1_000_000_000)
+
+        # Pod, event ve metrics collector'ları her cycle'da aynı client'ı alır
+        api_client = get_api_client(path)
+        assert host(api_client) == "https://prod.example.com:6443"
+        assert api_client.configuration.connection_pool_maxsize == client_registry.CLIENT_POOL_MAXSIZE
+        for _ in range(3):
+            assert get_core_v1(path).api_client is api_client
+            assert get_custom_objects(path).api_client is api_client
+        assert get_api_client(os.path.join(tmp, ".", "prod.yaml")) is api_client
+
+        # mtime değişti ama içerik aynı: client korunur, sonraki çağrılar hash okumaz
+        write_kubeconfig(path, "prod", mtime_ns=2_000_000_000)
+        assert get_api_client(path) is api_client
+        with mock.patch("client_registry._file_digest") as digest:
+            assert get_api_client(path) is api_client
+        assert not digest.called and not close.called
+
+        # İçerik değişti: client yeniden kurulur, eskisi kapanır
+        write_kubeconfig(path, "prod-new", mtime_ns=3_000_000_000)
+        rebuilt = get_api_client(path)
+        assert rebuilt is not api_client and host(rebuilt) == "https://prod-new.example.com:6443"
+        assert [call.args[0] for call in close.call_args_list] == [api_client]
+        assert get_core_v1(path).api_client is rebuilt
+
+
+def test_evict_and_close_all():
+    with tempfile.TemporaryDirectory() as tmp, mock.patch.dict(client_registry._clients, clear=True), \
+         mock.patch("kubernetes.client.ApiClient.close", autospec=True) as close:
+        prod, edge = os.path.join(tmp, "prod.yaml"), os.path.join(tmp, "edge.yaml")
+        write_kubeconfig(prod, "prod")
+        write_kubeconfig(edge, "edge")
+        prod_client, edge_client = get_api_client(prod), get_api_client(edge)
+
+        evict(prod)
+        evict(os.path.join(tmp, "missing.yaml"))
+        assert [call.args[0] for call in close.call_args_list] == [prod_client]
+        assert set(client_registry._clients) == {os.path.abspath(edge)}
+        assert get_api_client(prod) is not prod_client
+
+        close.reset_mock()
+        close_all()
+        assert client_registry._clients == {} and len(close.call_args_list) == 2
+        assert edge_client in [call.args[0] for call in close.call_args_list]
+        assert get_api_client(edge) is not edge_client
+
+
+if __name__ == "__main__":
+    test_client_reuse_and_rebuild()
+    print("✅ One ApiClient is shared across collectors and cycles, rebuilt when the kubeconfig changes")
+    test_evict_and_close_all()
+    print("✅ evict and close_all drop and close clients")
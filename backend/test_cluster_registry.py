@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Cluster registry tests: kubeconfig file names map to lowercase cluster
+names without the admin- prefix, the first file wins for a duplicate name,
+and the scan is cached until the directory's mtime changes.
+"""
+
+import os
+import sys
+import tempfile
+from unittest import mock
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import cluster_registry
+from cluster_registry import cluster_name_from_file, get_cluster, list_clusters
+
+
+def touch(directory, *filenames):
+    for filename in filenames:
+        open(os.path.join(directory, filename), "w").close()
+
+
+def set_mtime(directory, seconds):
+    os.utime(directory, ns=(seconds * 10 ** 9, seconds * 10 ** 9))
+
+
+def test_cluster_names():
+    assert cluster_name_from_file("admin-Prod.conf") == "prod"
+    assert cluster_name_from_file("EDGE.conf") == "edge"
+    assert cluster_name_from_file("staging-admin-1.conf") == "staging-admin-1"
+    assert cluster_name_from_file("admin-admin-x.conf") == "admin-x"
+
+
+def test_list_clusters():
+    with tempfile.TemporaryDirectory() as tmp, mock.patch.object(cluster_registry, "CLUSTER_DIR", tmp), \
+         mock.patch.dict(cluster_registry._cache, {"mtime": None, "clusters": {}}):
+        # admin-prod.conf ve Prod.conf aynı cluster: sıralamada ilk gelen kazanır
+        touch(tmp, "admin-Prod.conf", "Prod.conf", "edge.conf", "notes.txt", "edge.conf.bak")
+        clusters = list_clusters()
+        assert sorted(clusters) == ["edge", "prod"]
+        assert clusters["prod"] == {"name": "prod", "label": "Prod", "file": "Prod.conf", "path": os.path.join(tmp, "Prod.conf")}
+        assert get_cluster("PROD") is clusters["prod"] and get_cluster("dev") is None and get_cluster(None) is None
+
+
+def test_scan_is_cached_until_mtime_changes():
+    with tempfile.TemporaryDirectory() as tmp, mock.patch.object(cluster_registry, "CLUSTER_DIR", tmp), \
+         mock.patch.dict(cluster_registry._cache, {"mtime": None, "clusters": {}}):
+        touch(tmp, "prod.conf")
+        set_mtime(tmp, 1000)
+        clusters = list_clusters()
+        with mock.patch("cluster_registry._scan") as scan:
+            for _ in range(5):
+                assert list_clusters() is clusters
+        assert not scan.called
+
+        # Dizine dosya eklenmesi mtime'ı değiştirir; aynı mtime'da yeni dosya görülmez
+        touch(tmp, "edge.conf")
+        set_mtime(tmp, 1000)
+        assert list_clusters() is clusters and sorted(clusters) == ["prod"]
+        set_mtime(tmp, 2000)
+        assert sorted(list_clusters()) == ["edge", "prod"]
+
+    with mock.patch.object(cluster_registry, "CLUSTER_DIR", os.path.join(tmp, "missing")):
+        assert list_clusters() == {}
+
+
+if __name__ == "__main__":
+    test_cluster_names()
+    print("✅ Kubeconfig file names map to lowercase cluster names without admin-")
+    test_list_clusters()
+    print("✅ Duplicate cluster names keep the first kubeconfig")
+    test_scan_is_cached_until_mtime_changes()
+    print("✅ The directory scan is cached until its mtime changes")
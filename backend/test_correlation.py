@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Correlation tests: messages that differ only in cluster-specific names, IPs
+and numbers share a signature, the same warning arriving from several
+clusters opens one incident at ingest (without reading the events table)
+that /api/incidents serves, alert candidates are correlated the same way,
+a signature seen again after the window opens a new incident, and members
+in namespaces the cluster filter hides are left out of /api/incidents.
+"""
+
+import os
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from unittest import mock
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import alerts
+import correlation
+import events
+from bench_cycle import event_list_json, synthetic_core_v1
+from conftest import temp_database
+from correlation import correlate, get_incidents, message_template
+
+
+@contextmanager
+def correlation_db():
+    with temp_database("correlation.db"):
+        yield
+
+
+def test_message_templates():
+    pull = 'Failed to pull image "{}": dial tcp {}:443: i/o timeout after 30s'
+    assert message_template(pull.format("registry.corp/api:1.4.2", "10.2.3.4")) == \
+        message_template(pull.format("registry.corp/cart:2.0.0", "10.9.8.7")) == \
+        'Failed to pull image <quoted>: dial tcp <ip>: i/o timeout after <n>'
+    assert message_template("Pod web/api-7d9f8b6c5-x2k4p is in CrashLoopBackOff state") == \
+        message_template("Pod shop/cart-0 is in CrashLoopBackOff state") == "Pod <object> is in CrashLoopBackOff state"
+    assert message_template("MountVolume.SetUp failed for volume pvc-0f8e7a1c-3b2d-4c5e-9f60-1a2b3c4d5e6f") == \
+        "MountVolume.SetUp failed for volume pvc-<uid>"
+    assert message_template("Back-off restarting failed container") == "Back-off restarting failed container"
+
+
+def test_incident_opens_across_clusters_at_ingest():
+    with correlation_db():
+        queries = []
+        timed_query = correlation.timed_query
+        with mock.patch("correlation.timed_query", side_effect=lambda c, name, sql, params=(): (queries.append(sql), timed_query(c, name, sql, params))):
+            for i, cluster in enumerate(("prod-eu", "prod-us", "prod-ap")):
+                v1 = synthetic_core_v1({"/api/v1/events": event_list_json(30)})
+                with mock.patch("events.get_core_v1", return_value=v1), mock.patch.dict(events._event_index, clear=True):
+                    assert events.collect_events_from_cluster(f"{cluster}.conf", cluster)
+                incidents = get_incidents()
+                # BackOff, Unhealthy, FailedMount (Warning); ilk cluster tek başına incident açmaz
+                assert len(incidents) == (0 if i == 0 else 3)
+        assert not any("FROM events" in sql or "{events}" in sql for sql in queries)
+
+        incidents = {incident['reason']: incident for incident in get_incidents(status="active")}
+        assert set(incidents) == {"BackOff", "Unhealthy", "FailedMount"}
+        mount = incidents["FailedMount"]
+        assert mount['clusters'] == ["prod-ap", "prod-eu", "prod-us"] and mount['cluster_count'] == 3
+        assert mount['template'] == "FailedMount for container c0 in pod <pod>" and mount['source'] == "event"
+
+        import api
+        client = api.app.test_client()
+        listed = client.get("/api/incidents?status=active&min_clusters=3").get_json()
+        assert {incident['id'] for incident in listed} == {incident['id'] for incident in incidents.values()}
+        detail = client.get(f"/api/incidents/{mount['id']}").get_json()
+        assert [member['cluster'] for member in detail['members']] == ["prod-ap", "prod-eu", "prod-us"]
+        assert client.get("/api/incidents/999").status_code == 404
+        assert client.get("/api/incidents?status=bogus").status_code == 400
+
+
+def test_alerts_and_new_episode():
+    with correlation_db():
+        alerts.raise_alerts('pod_crashloop', [
+            (cluster, "web", f"api-{cluster}-0", 'critical', f"Pod web/api-{cluster}-0 is in CrashLoopBackOff state", f"pod=web/api-{cluster}-0")
+            for cluster in ("prod-eu", "prod-us")
+        ])
+        incident, = get_incidents()
+        assert (incident['source'], incident['reason'], incident['clusters']) == ("alert", "pod_crashloop", ["prod-eu", "prod-us"])
+
+        # Pencere geçtikten sonra aynı imza yeni bir incident'tir
+        later = datetime.utcnow() + timedelta(minutes=correlation.CORRELATION_CONFIG['window_minutes'] + 5)
+        sightings = [(cluster, "pod_crashloop", "Pod web/api-1 is in CrashLoopBackOff state", 1, "web/api-1") for cluster in ("prod-eu", "prod-ap")]
+        new_id, = correlate("alert", sightings, now=later)
+        assert new_id != incident['id']
+        assert correlate("alert", sightings[:1], now=later + timedelta(minutes=1)) == [new_id]
+        incidents = {i['id']: i for i in get_incidents()}
+        assert set(incidents) == {incident['id'], new_id}
+        assert incidents[new_id]['occurrences'] == 3 and incidents[new_id]['clusters'] == ["prod-ap", "prod-eu"]
+
+
+def test_incidents_follow_namespace_filter():
+    import api
+    client = api.app.test_client()
+    with correlation_db():
+        # demo1/demo2 sadece kendi namespace'lerini gösterir (cluster_config)
+        message = "Pod {}/api-0 is in CrashLoopBackOff state"
+        shared, = correlate("alert", [("demo1", "pod_crashloop", message.format("demo1"), 1, "demo1/api-0"),
+                                      ("demo2", "pod_crashloop", message.format("kube-system"), 1, "kube-system/api-0"),
+                                      ("prod-eu", "pod_crashloop", message.format("web"), 1, "web/api-0")])
+        hidden, = correlate("event", [("demo1", "BackOff", "Back-off restarting failed container", 1, "kube-system/dns-0"),
+                                      ("demo2", "BackOff", "Back-off restarting failed container", 1, "kube-system/dns-0")])
+        assert {incident['id'] for incident in get_incidents()} == {shared, hidden}
+
+        listed = client.get("/api/incidents").get_json()
+        assert [(incident['id'], incident['clusters'], incident['cluster_count']) for incident in listed] == \
+            [(shared, ["demo1", "prod-eu"], 2)]
+        detail = client.get(f"/api/incidents/{shared}").get_json()
+        assert [(member['cluster'], member['sample']) for member in detail['members']] == [("demo1", "demo1/api-0"), ("prod-eu", "web/api-0")]
+        assert client.get(f"/api/incidents/{hidden}").status_code == 404
+
+
+if __name__ == "__main__":
+    test_message_templates()
+    print("✅ Cluster-specific parts are normalized out of signatures")
+    test_incident_opens_across_clusters_at_ingest()
+    print("✅ Same warning across clusters opens one incident at ingest")
+    test_alerts_and_new_episode()
+    print("✅ Alerts are correlated and a later episode opens a new incident")
+    test_incidents_follow_namespace_filter()
+    print("✅ /api/incidents hides members in filtered namespaces")
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Response encoding tests: the list endpoints negotiate JSON, columnar JSON
+and MessagePack from ?format= and the Accept header (400 for an unknown
+format, 406 for one that cannot be served), responses are compressed with
+brotli or gzip by Accept-Encoding, and small, streamed or already encoded
+responses are left alone without reading their body.
+"""
+
+import gzip
+import json
+import os
+import sys
+from unittest import mock
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import database
+import encoding
+from conftest import temp_database
+from encoding import compress_response, columnar, msgpack
+from flask import Response
+
+EVENTS = 40
+
+
+def add_events():
+    database.save_events([("prod" if i % 2 else "edge", "shop", f"api-{i}", "Pod", "Warning", "BackOff",
+                           f"Back-off restarting failed container {i}", None, None, 1) for i in range(EVENTS)])
+
+
+def get(client, query="", **headers):
+    return client.get(f"/api/events?hours=1{query}", headers=headers)
+
+
+def accept(header):
+    """Parsed Accept-Encoding header"""
+    from werkzeug.datastructures import Accept
+    from werkzeug.http import parse_accept_header
+    return parse_accept_header(header, Accept)
+
+
+def test_formats():
+    import api
+    client = api.app.test_client()
+    with temp_database("encoding.db"):
+        add_events()
+        rows = get(client).get_json()
+        assert len(rows) == EVENTS and set(rows[0]) == set(database.EVENT_COLUMNS)
+
+        for response in (get(client, "&format=columnar"), get(client, Accept="application/json")):
+            assert response.status_code == 200 and response.mimetype == "application/json"
+        document = get(client, "&format=columnar").get_json()
+        assert document["columns"] == list(database.EVENT_COLUMNS) and document["length"] == EVENTS
+        assert sorted(document["dictionaries"]["cluster"]) == ["edge", "prod"]
+        assert [document["dictionaries"]["cluster"][i] for i in document["data"]["cluster"]] == [row["cluster"] for row in rows]
+
+        if msgpack is not None:
+            for response in (get(client, "&format=msgpack"), get(client, Accept="application/x-msgpack"),
+                             get(client, Accept="application/msgpack, application/json;q=0.5")):
+                assert response.status_code == 200 and response.mimetype == encoding.MSGPACK_MIMETYPE
+                assert msgpack.unpackb(response.get_data(), raw=False) == json.loads(encoding.dumps(document))
+
+        # Tarayıcı ve */* JSON alır
+        assert isinstance(get(client, Accept="text/html,application/xml;q=0.9,*/*;q=0.8").get_json(), list)
+
+
+def test_unsupported_formats():
+    import api
+    client = api.app.test_client()
+    with temp_database("encoding.db"):
+        response = get(client, "&format=xml")
+        assert response.status_code == 400 and "format must be one of" in response.get_json()["error"]
+        assert get(client, Accept="text/csv").status_code == 406
+        with mock.patch.object(encoding, "msgpack", None):
+            assert get(client, Accept="application/x-msgpack").status_code == 406
+            assert get(client, "&format=msgpack").status_code == 406
+            assert get(client, Accept="application/x-msgpack, application/json;q=0.5").status_code == 406
+
+
+def test_compression():
+    import api
+    client = api.app.test_client()
+    with temp_database("encoding.db"):
+        add_events()
+        plain = get(client)
+        assert "Content-Encoding" not in plain.headers and len(plain.get_data()) >= encoding.COMPRESS_MIN_BYTES
+
+        response = get(client, **{"Accept-Encoding": "gzip"})
+        assert response.headers["Content-Encoding"] == "gzip" and "Accept-Encoding" in response.headers["Vary"]
+        assert gzip.decompress(response.get_data()) == plain.get_data()
+
+        if encoding.brotli is not None:
+            response = get(client, **{"Accept-Encoding": "gzip, deflate, br"})
+            assert response.headers["Content-Encoding"] == "br"
+            assert encoding.brotli.decompress(response.get_data()) == plain.get_data()
+            # q-değerleri sırayı belirler
+            assert get(client, **{"Accept-Encoding": "br;q=0.5, gzip"}).headers["Content-Encoding"] == "gzip"
+        with mock.patch.object(encoding, "brotli", None):
+            assert get(client, **{"Accept-Encoding": "br, gzip;q=0.1"}).headers["Content-Encoding"] == "gzip"
+            assert "Content-Encoding" not in get(client, **{"Accept-Encoding": "br"}).headers
+        assert "Content-Encoding" not in get(client, **{"Accept-Encoding": "identity"}).headers
+
+        # Küçük cevap (format hatası) sıkıştırılmaz
+        response = get(client, "&format=xml", **{"Accept-Encoding": "gzip"})
+        assert response.status_code == 400 and "Content-Encoding" not in response.headers
+
+
+def test_compress_skips_without_reading_body():
+    with mock.patch.object(Response, "get_data", side_effect=AssertionError("body was read")):
+        small = Response(b"x" * (encoding.COMPRESS_MIN_BYTES - 1))
+        assert "Content-Encoding" not in compress_response(small, accept("gzip")).headers
+
+        encoded = Response(gzip.compress(b"x" * 4096), headers={"Content-Encoding": "gzip"})
+        assert compress_response(encoded, accept("br, gzip")).headers["Content-Encoding"] == "gzip"
+
+        streamed = Response(iter([b"x" * 4096]))
+        assert "Content-Encoding" not in compress_response(streamed, accept("gzip")).headers
+
+        failed = Response(b"x" * 4096, status=500)
+        assert "Content-Encoding" not in compress_response(failed, accept("gzip")).headers
+
+    large = compress_response(Response(json.dumps(columnar(["cluster"], [("prod",)] * 2000))), accept("gzip"))
+    assert large.headers["Content-Encoding"] == "gzip" and int(large.headers["Content-Length"]) == len(large.get_data())
+
+
+if __name__ == "__main__":
+    test_formats()
+    print("✅ JSON, columnar and MessagePack are negotiated from ?format= and Accept")
+    test_unsupported_formats()
+    print("✅ Unknown formats are a 400, formats that cannot be served a 406")
+    test_compression()
+    print("✅ Responses are compressed with brotli or gzip by Accept-Encoding")
+    test_compress_skips_without_reading_body()
+    print("✅ Small, streamed and already encoded responses are not read or recompressed")
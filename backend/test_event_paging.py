@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Memory test for paged event collection: apart from the compact UID index
+(a few hundred bytes per retained event), the peak while collecting must
+depend on the page size, not on how many events the cluster retains.
+"""
+
+import io
+import json
+import logging
+import os
+import sys
+import tracemalloc
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import urllib3
+
+import events
+from bench_cycle import build_event, synthetic_core_v1
+from conftest import temp_database
+
+PAGE_SIZE = 500
+
+
+class PagedEventPoolManager:
+    """Serves /api/v1/events in pages built on demand from limit/continue"""
+
+    def __init__(self, total):
+        self.total = total
+        self.requests = 0
+
+    def request(self, method, url, **kwargs):
+        self.requests += 1
+        query = parse_qs(urlparse(url).query)
+        limit = int(query.get("limit", [self.total])[0])
+        start = int(query.get("continue", [0])[0])
+        end = min(start + limit, self.total)
+        metadata = {"resourceVersion": "1"}
+        if end < self.total:
+            metadata["continue"] = str(end)
+        body = json.dumps({"kind": "EventList", "apiVersion": "v1", "metadata": metadata,
+                           "items": [build_event(i) for i in range(start, end)]}).encode()
+        return urllib3.HTTPResponse(body=io.BytesIO(body), status=200, headers={"Content-Type": "application/json"},
+                                    preload_content=False)
+
+    def clear(self):
+        pass
+
+
+def collect_peak(total):
+    """Collect `total` events into a fresh database and return (peak bytes, requests)"""
+    v1 = synthetic_core_v1({})
+    pool = PagedEventPoolManager(total)
+    v1.api_client.rest_client.pool_manager = pool
+    with temp_database("paging.db"), \
+         mock.patch("events.get_core_v1", return_value=v1), \
+         mock.patch("fast_list.EVENT_PAGE_SIZE", PAGE_SIZE):
+        # Warning event logları ölçümü etkilemesin
+        logging.disable(logging.WARNING)
+        tracemalloc.start()
+        try:
+            assert events.collect_events_from_cluster("paging.conf", "paging")
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+            logging.disable(logging.NOTSET)
+    return peak, pool.requests
+
+
+def test_event_paging_memory_is_bounded():
+    small_peak, small_requests = collect_peak(2000)
+    large_peak, large_requests = collect_peak(20000)
+    print(f"2000 events: {small_requests} pages, peak {small_peak / 1024 / 1024:.1f} MiB")
+    print(f"20000 events: {large_requests} pages, peak {large_peak / 1024 / 1024:.1f} MiB")
+
+    assert small_requests == 4
+    assert large_requests == 40
+    # 10x daha fazla event: sayfalar bellekte birikmemeli, sadece UID index büyür
+    # (tüm listeyi tek seferde parse etmek event başına ~750 byte tutuyordu)
+    per_event = (large_peak - small_peak) / (20000 - 2000)
+    print(f"growth: {per_event:.0f} bytes per retained event")
+    assert per_event < 400
+    assert large_peak < 16 * 1024 * 1024
+
+
+if __name__ == "__main__":
+    test_event_paging_memory_is_bounded()
+    print("✅ Event paging memory is bounded")
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+fast_list tests: the raw-JSON fast path and the model-based client produce
+the same pod and event records, including CrashLoopBackOff waiting reasons,
+restart sums, memory limits, missing fields and event timestamps.
+"""
+
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import fast_list
+from bench_cycle import build_event, build_pod, synthetic_core_v1
+from fast_list import PodRecord, list_events, list_pods
+
+
+def pod_list(items):
+    return json.dumps({"kind": "PodList", "apiVersion": "v1", "metadata": {"resourceVersion": "1"}, "items": items}).encode()
+
+
+def event_list(items):
+    return json.dumps({"kind": "EventList", "apiVersion": "v1", "metadata": {"resourceVersion": "1"}, "items": items}).encode()
+
+
+def container(name, memory=None):
+    return {"name": name, "image": "app:1", "resources": {"limits": {"cpu": "1", "memory": memory} if memory else {"cpu": "1"}}}
+
+
+def status(name, restarts, waiting=None):
+    return {"name": name, "image": "app:1", "imageID": "", "ready": False, "restartCount": restarts,
+            "state": {"waiting": {"reason": waiting}} if waiting else {"running": {}}}
+
+
+EDGE_PODS = [
+    # İki container CrashLoopBackOff / ImagePullBackOff, restart'lar toplanır
+    {"metadata": {"name": "api-0", "namespace": "shop"},
+     "spec": {"containers": [container("app", "1Gi"), container("sidecar", "512Mi")]},
+     "status": {"phase": "Running", "containerStatuses": [status("app", 7, "CrashLoopBackOff"),
+                                                          status("sidecar", 2, "ImagePullBackOff")]}},
+    # Limitsiz container pod'un limitini yok eder
+    {"metadata": {"name": "api-1", "namespace": "shop"},
+     "spec": {"containers": [container("app", "256Mi"), container("sidecar")]},
+     "status": {"phase": "Running", "containerStatuses": [status("app", 0), status("sidecar", 1)]}},
+    # Henüz status'u olmayan pod
+    {"metadata": {"name": "pending-0", "namespace": "batch"}, "spec": {"containers": [container("job", "64Mi")]}},
+    {"metadata": {"name": "bare-0"}},
+]
+
+EDGE_EVENTS = [
+    {"metadata": {"name": "api-0.1", "namespace": "shop", "uid": "ev-1", "creationTimestamp": "2024-05-01T09:00:00Z"},
+     "involvedObject": {"kind": "Pod", "namespace": "shop", "name": "api-0"},
+     "reason": "BackOff", "message": "Back-off restarting failed container", "type": "Warning", "count": 12,
+     "firstTimestamp": "2024-05-01T10:00:00Z", "lastTimestamp": "2024-05-01T10:15:30Z"},
+    # first/lastTimestamp yok: creationTimestamp kullanılır
+    {"metadata": {"name": "api-0.2", "namespace": "shop", "uid": "ev-2", "creationTimestamp": "2024-05-01T11:00:00Z"},
+     "involvedObject": {"kind": "Pod", "name": "api-0"}, "reason": "Scheduled", "type": "Normal"},
+    # Hiç zaman damgası, reason ve mesaj yok
+    {"metadata": {"name": "node.3", "uid": "ev-3"}, "involvedObject": {"kind": "Node", "name": "node-1"}},
+    {"metadata": {"name": "api-1.4", "namespace": "shop", "uid": "ev-4", "creationTimestamp": "2024-05-01T12:00:00Z"},
+     "involvedObject": {"kind": "Pod", "namespace": "shop", "name": "api-1"}, "reason": "Unhealthy",
+     "type": "Warning", "count": 1, "firstTimestamp": None, "lastTimestamp": "2024-05-01T12:30:00Z"},
+]
+
+
+def test_pods_match_model():
+    if not fast_list.IJSON_AVAILABLE:
+        return
+    items = [build_pod(f"ns-{n}", i) for n in range(2) for i in range(30)] + EDGE_PODS
+    v1 = synthetic_core_v1({"/api/v1/pods": pod_list(items)})
+    fast, model = list_pods(v1, fast=True), list_pods(v1, fast=False)
+    assert fast == model and len(fast) == len(items)
+
+    records = {record.name: record for record in fast}
+    assert records["api-0"] == PodRecord("shop", "api-0", "Running", 9, ("CrashLoopBackOff", "ImagePullBackOff"), 1.5 * 2 ** 30)
+    assert records["api-1"] == PodRecord("shop", "api-1", "Running", 1, (), None)
+    assert records["pending-0"] == PodRecord("batch", "pending-0", None, 0, (), 64 * 2 ** 20)
+    assert records["bare-0"] == PodRecord(None, "bare-0", None, 0, (), None)
+    crashlooping = records["app-ns-0-0"]
+    assert crashlooping.waiting_reasons == ("CrashLoopBackOff",) * 2 and crashlooping.restarts == 6
+
+
+def test_events_match_model():
+    if not fast_list.IJSON_AVAILABLE:
+        return
+    items = [build_event(i) for i in range(40)] + EDGE_EVENTS
+    v1 = synthetic_core_v1({"/api/v1/events": event_list(items)})
+    fast, model = list_events(v1, fast=True), list_events(v1, fast=False)
+    assert fast == model and len(fast) == len(items)
+
+    records = {record.uid: record for record in fast}
+    assert records["ev-1"].count == 12
+    assert (records["ev-1"].first_timestamp, records["ev-1"].last_timestamp) == ("2024-05-01 10:00:00", "2024-05-01 10:15:30")
+    assert (records["ev-2"].first_timestamp, records["ev-2"].last_timestamp) == ("2024-05-01 11:00:00", "2024-05-01 11:00:00")
+    assert records["ev-2"].namespace is None and records["ev-2"].count is None
+    assert records["ev-3"][1:] == (None, "node-1", "Node", None, None, None, None, None, None)
+    assert (records["ev-4"].first_timestamp, records["ev-4"].last_timestamp) == ("2024-05-01 12:00:00", "2024-05-01 12:30:00")
+
+
+def test_event_pages_match_model():
+    if not fast_list.IJSON_AVAILABLE:
+        return
+    items = [build_event(i) for i in range(7)] + EDGE_EVENTS
+    v1 = synthetic_core_v1({"/api/v1/events": event_list(items)})
+    fast = [record for page in fast_list.iter_event_pages(v1, limit=100, fast=True) for record in page]
+    assert fast == [record for page in fast_list.iter_event_pages(v1, limit=100, fast=False) for record in page]
+    assert fast == list_events(v1, fast=False)
+
+
+if __name__ == "__main__":
+    test_pods_match_model()
+    print("✅ Fast and model pod listings produce the same records")
+    test_events_match_model()
+    print("✅ Fast and model event listings produce the same records")
+    test_event_pages_match_model()
+    print("✅ Paged event listings match the model path")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Logging tests: the sampling filter rate-limits repeated DEBUG/INFO templates
+and reports the suppressed count, never drops warnings or errors, and the
+JSON formatter writes one parseable object per record.
+"""
+
+import io
+import json
+import logging
+import os
+import sys
+from unittest import mock
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import logging_config
+from logging_config import JsonFormatter, SamplingFilter, TextFormatter
+
+
+def make_record(msg, *args, level=logging.INFO, name="kube_client", exc_info=None):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, exc_info)
+
+
+def test_sampling_filter_limits_info():
+    sampler = SamplingFilter(burst=3, interval=60)
+    with mock.patch("logging_config.time.monotonic", return_value=100.0):
+        # Aynı şablon, farklı argümanlar: tek anahtar
+        passed = [sampler.filter(make_record("Saving pod %s", f"api-{i}")) for i in range(10)]
+        assert passed == [True] * 3 + [False] * 7
+        # Farklı şablon ve logger ayrı sayılır
+        assert sampler.filter(make_record("Saving event %s", "x"))
+        assert sampler.filter(make_record("Saving pod %s", "x", name="database"))
+    with mock.patch("logging_config.time.monotonic", return_value=161.0):
+        record = make_record("Saving pod %s", "api-10")
+        assert sampler.filter(record) and record.suppressed == 7
+        follow_up = make_record("Saving pod %s", "api-11")
+        assert sampler.filter(follow_up) and not hasattr(follow_up, "suppressed")
+
+    assert all(SamplingFilter(burst=0).filter(make_record("Saving pod %s", i)) for i in range(50))
+
+
+def test_sampling_filter_keeps_warnings():
+    sampler = SamplingFilter(burst=2, interval=60)
+    for level in (logging.WARNING, logging.ERROR, logging.CRITICAL):
+        assert all(sampler.filter(make_record("Failed to collect %s", i, level=level)) for i in range(20))
+    assert [sampler.filter(make_record("Collected %s", i)) for i in range(3)] == [True, True, False]
+
+
+def test_json_formatter():
+    formatter = JsonFormatter("monitor")
+    record = make_record("Collected %d pods from %s", 12, "prod", level=logging.WARNING)
+    record.suppressed = 4
+    entry = json.loads(formatter.format(record))
+    assert entry["level"] == "WARNING" and entry["process"] == "monitor" and entry["logger"] == "kube_client"
+    assert entry["message"] == "Collected 12 pods from prod" and entry["suppressed"] == 4
+    assert entry["ts"].endswith("+00:00")
+
+    try:
+        raise ValueError("bad kubeconfig ğ")
+    except ValueError:
+        record = make_record("Load failed", level=logging.ERROR, exc_info=sys.exc_info())
+    line = formatter.format(record)
+    entry = json.loads(line)
+    assert "suppressed" not in entry and "ValueError: bad kubeconfig ğ" in entry["exc_info"]
+    assert "\n" not in line and "ğ" in line
+
+    record = make_record("Saving pod %s", "api-0")
+    record.suppressed = 2
+    assert TextFormatter("%(message)s").format(record) == "Saving pod api-0 (2 similar messages suppressed)"
+
+
+def test_setup_logging_end_to_end():
+    stream = io.StringIO()
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    try:
+        with mock.patch.dict(os.environ, {"KUBEMON_LOG_FORMAT": "json", "KUBEMON_LOG_SAMPLE": "2/60"}):
+            logging_config.setup_logging("api", stream)
+        logger = logging.getLogger("test_logging")
+        for i in range(5):
+            logger.info("Request %s", i)
+            logger.error("Request %s failed", i)
+        logging_config.shutdown_logging()
+    finally:
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        for handler in handlers:
+            root.addHandler(handler)
+        root.setLevel(level)
+    messages = [json.loads(line)["message"] for line in stream.getvalue().splitlines()]
+    assert [m for m in messages if not m.endswith("failed")] == ["Request 0", "Request 1"]
+    assert [m for m in messages if m.endswith("failed")] == [f"Request {i} failed" for i in range(5)]
+
+
+if __name__ == "__main__":
+    test_sampling_filter_limits_info()
+    print("✅ Repeated DEBUG/INFO templates are rate limited with a suppressed count")
+    test_sampling_filter_keeps_warnings()
+    print("✅ Warnings and errors are never sampled")
+    test_json_formatter()
+    print("✅ JSON formatter writes one object per record")
+    test_setup_logging_end_to_end()
+    print("✅ setup_logging samples INFO but keeps every error")
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Metrics tests: /metrics serves the API's metrics, importing metrics.py does
+not create the multiprocess directory, and once the entrypoint has reset it
+the samples of every process (including exited ones) are aggregated while
+files from an earlier start are gone.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from conftest import temp_database
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_python(code, metrics_dir):
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=metrics_dir)
+    return subprocess.run([sys.executable, "-c", f"import sys; sys.path.insert(0, {BACKEND_DIR!r})\n{code}"],
+                          env=env, capture_output=True, text=True, check=True).stdout
+
+
+def test_metrics_endpoint():
+    import api
+    client = api.app.test_client()
+    with temp_database("metrics.db"):
+        assert client.get("/api/alerts").status_code == 200
+    response = client.get("/metrics")
+    assert response.status_code == 200 and response.content_type.startswith("text/plain")
+    assert 'kubemon_api_request_seconds_count{method="GET",route="/api/alerts",status="200"}' in response.get_data(as_text=True)
+
+
+def test_multiprocess_directory():
+    with tempfile.TemporaryDirectory() as tmp:
+        metrics_dir = os.path.join(tmp, "metrics")
+        # Import dizini oluşturmaz, metrikler process içinde kalır
+        output = run_python("import os, metrics\n"
+                            "metrics.DB_QUERY_SECONDS.labels('probe').observe(0.1)\n"
+                            "print(metrics.MULTIPROCESS, os.path.exists(metrics.METRICS_DIR))", metrics_dir)
+        assert output.split() == ["False", "False"]
+
+        run_python("import metrics; metrics.reset_metrics_dir()", metrics_dir)
+        assert os.listdir(metrics_dir) == []
+        # Collector gibi: yazar, çıkışta ölü işaretlenir; API onun örneklerini de görür
+        run_python("import metrics\n"
+                   "metrics.register_process_exit()\n"
+                   "metrics.DB_QUERY_SECONDS.labels('collector_probe').observe(0.1)", metrics_dir)
+        assert os.listdir(metrics_dir)
+        rendered = run_python("import metrics; print(metrics.render_latest().decode())", metrics_dir)
+        assert 'kubemon_db_query_seconds_count{query="collector_probe"} 1.0' in rendered
+
+        # Yeni start: önceki process'lerin dosyaları silinir
+        run_python("import metrics; metrics.reset_metrics_dir()", metrics_dir)
+        rendered = run_python("import metrics; print(metrics.render_latest().decode())", metrics_dir)
+        assert "collector_probe" not in rendered
+
+
+if __name__ == "__main__":
+    test_metrics_endpoint()
+    print("✅ /metrics serves the API's request metrics")
+    test_multiprocess_directory()
+    print("✅ Multiprocess directory is reset at startup and aggregates every process")
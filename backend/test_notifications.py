@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Notification dispatcher tests against a local HTTP sink: alert storms go out
+as batched payloads per receiver, queued alerts wait for the coalescing
+window, and failed batches are retried with backoff until they are delivered
+or given up.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import database
+from conftest import temp_database
+from notifications import NotificationDispatcher
+
+
+class HTTPSink:
+    """Records POSTed JSON payloads per path; the first `failures` requests get HTTP 500"""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.requests = []
+        self.lock = threading.Lock()
+        sink = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                with sink.lock:
+                    sink.requests.append((self.path, json.loads(body)))
+                    fail = sink.failures > 0
+                    sink.failures -= 1
+                self.send_response(500 if fail else 200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server.server_port}{path}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def outbox_statuses():
+    with sqlite3.connect(database.DB_PATH) as conn:
+        return dict(conn.execute("SELECT status, COUNT(*) FROM notification_outbox GROUP BY status").fetchall())
+
+
+def raise_alerts(count, receivers, notify_delay=0, cluster="prod"):
+    for i in range(count):
+        database.save_alert(cluster, "pod_crashloop", "critical", f"Pod team-a/app-{i} is in CrashLoopBackOff state",
+                            f"pod=team-a/app-{i}", "team-a", receivers, notify_delay)
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+CONFIG = {"poll_interval": 0.02, "batch_size": 100, "retry_base": 0.05, "retry_max": 0.2, "max_attempts": 3}
+
+
+def test_storm_is_batched_per_receiver():
+    with temp_database(), HTTPSink() as sink:
+        raise_alerts(250, ("ops", "chat"))
+        dispatcher = NotificationDispatcher({"ops": sink.url("/ops"), "chat": sink.url("/chat")}, CONFIG).start()
+        try:
+            assert wait_for(lambda: outbox_statuses() == {"sent": 500})
+        finally:
+            dispatcher.stop()
+
+        for path in ("/ops", "/chat"):
+            batches = [payload for request_path, payload in sink.requests if request_path == path]
+            # 250 alert -> batch_size 100 ile 3 istek, tek tek 250 değil
+            assert [batch["count"] for batch in batches] == [100, 100, 50]
+            ids = [alert["id"] for batch in batches for alert in batch["alerts"]]
+            assert sorted(ids) == list(range(1, 251))
+            assert batches[0]["severities"] == {"critical": 100}
+            assert batches[0]["alerts"][0]["namespace"] == "team-a"
+
+
+def test_alerts_wait_for_the_coalescing_window():
+    with temp_database(), HTTPSink() as sink:
+        raise_alerts(5, ("ops",), notify_delay=0.5)
+        dispatcher = NotificationDispatcher({"ops": sink.url("/ops")}, CONFIG).start()
+        try:
+            time.sleep(0.2)
+            assert sink.requests == []
+            # Pencere dolmadan gelen alert'ler de aynı batch'e katılır
+            raise_alerts(3, ("ops",), notify_delay=30)
+            assert wait_for(lambda: outbox_statuses() == {"sent": 8})
+        finally:
+            dispatcher.stop()
+        assert [payload["count"] for _, payload in sink.requests] == [8]
+
+
+def test_failed_batches_are_retried_then_given_up():
+    logging.disable(logging.ERROR)
+    try:
+        with temp_database(), HTTPSink(failures=2) as sink:
+            raise_alerts(10, ("ops",))
+            dispatcher = NotificationDispatcher({"ops": sink.url("/ops")}, CONFIG).start()
+            try:
+                assert wait_for(lambda: outbox_statuses() == {"sent": 10})
+            finally:
+                dispatcher.stop()
+            assert len(sink.requests) == 3
+            with sqlite3.connect(database.DB_PATH) as conn:
+                assert conn.execute("SELECT DISTINCT attempts, last_error FROM notification_outbox").fetchall() == [(3, None)]
+
+        with temp_database(), HTTPSink(failures=100) as sink:
+            raise_alerts(10, ("ops",))
+            dispatcher = NotificationDispatcher({"ops": sink.url("/ops")}, CONFIG).start()
+            try:
+                assert wait_for(lambda: outbox_statuses() == {"failed": 10})
+            finally:
+                dispatcher.stop()
+            assert len(sink.requests) == CONFIG["max_attempts"]
+            with sqlite3.connect(database.DB_PATH) as conn:
+                assert conn.execute("SELECT DISTINCT attempts, last_error FROM notification_outbox").fetchall() == [(3, "HTTP 500")]
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+if __name__ == "__main__":
+    test_storm_is_batched_per_receiver()
+    print("✅ Alert storms are batched per receiver")
+    test_alerts_wait_for_the_coalescing_window()
+    print("✅ Alerts wait for the coalescing window")
+    test_failed_batches_are_retried_then_given_up()
+    print("✅ Failed batches are retried with backoff")
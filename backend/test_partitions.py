@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Partition tests: a populated pre-partitioning table is moved into day
+partitions with ids in each day's range and replaced by the union view,
+retention drops whole days and rebuilds the view, indexes added to the spec
+reach existing partitions, and an event deduplicated across midnight moves
+to today's partition.
+"""
+
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+from unittest import mock
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import database
+from conftest import temp_database
+from partitions import (ID_SPAN, PARTITIONED_TABLES, day_number, drop_partitions_before, ensure_partition,
+                        list_partitions, partition_name)
+
+EVENT_INSERT = """
+INSERT INTO {table} (cluster, namespace, object_name, object_kind, event_type, reason, message, count,
+                     first_timestamp, last_timestamp, timestamp)
+VALUES ('prod', 'shop', ?, 'Pod', 'Warning', 'BackOff', 'back-off', ?, ?, ?, ?)
+"""
+
+
+def partition_counts(c, table):
+    return {day: c.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0] for day, name in list_partitions(c, table)}
+
+
+def test_migrate_legacy_table():
+    today = datetime.utcnow().date()
+    days = [today - timedelta(days=2), today - timedelta(days=1), today]
+    with temp_database("legacy.db", init=False):
+        with sqlite3.connect(database.DB_PATH) as conn:
+            conn.execute(f"CREATE TABLE events ({PARTITIONED_TABLES['events']['columns']})")
+            for n, day in enumerate(days):
+                for i in range(n + 2):
+                    timestamp = f"{day} 12:{i:02d}:00"
+                    conn.execute(EVENT_INSERT.format(table="events"), (f"api-{i}", i + 1, timestamp, timestamp, timestamp))
+            # Timestamp'i olmayan satır bugünün partition'ına gider
+            conn.execute(EVENT_INSERT.format(table="events"), ("orphan", 1, None, None, None))
+
+        database.init_db()
+        with sqlite3.connect(database.DB_PATH) as conn:
+            c = conn.cursor()
+            assert partition_counts(c, "events") == {days[0]: 2, days[1]: 3, today: 4 + 1}
+            assert c.execute("SELECT type FROM sqlite_master WHERE name = 'events'").fetchone() == ("view",)
+            assert c.execute("SELECT COUNT(*), SUM(count) FROM events").fetchone() == (10, 3 + 6 + 10 + 1)
+            for day, name in list_partitions(c, "events"):
+                ids = [row[0] for row in c.execute(f"SELECT id FROM {name}")]
+                assert all(row_id // ID_SPAN == day_number(day) for row_id in ids), (name, ids)
+            assert not c.execute("SELECT 1 FROM sqlite_master WHERE name = 'events_legacy'").fetchone()
+
+        # Migrasyon sonrası yazılar bugünün partition'ına, id aralığı devam eder
+        database.save_event("prod", "shop", "new-0", "Pod", "Warning", "Failed", "failed", None, None)
+        with sqlite3.connect(database.DB_PATH) as conn:
+            assert conn.execute("SELECT MAX(id) FROM events").fetchone()[0] // ID_SPAN == day_number(today)
+
+
+def test_drop_partitions_before():
+    today = datetime.utcnow().date()
+    with temp_database("drop.db"):
+        with sqlite3.connect(database.DB_PATH) as conn:
+            c = conn.cursor()
+            for days_ago in (3, 2, 1):
+                day = today - timedelta(days=days_ago)
+                name = ensure_partition(c, "events", day)
+                c.execute(EVENT_INSERT.format(table=name), ("api-0", 1, f"{day} 08:00:00", f"{day} 08:00:00", f"{day} 08:00:00"))
+            conn.commit()
+
+            threshold = datetime.combine(today - timedelta(days=1), datetime.min.time()) + timedelta(hours=6)
+            assert drop_partitions_before(c, "events", threshold) == [partition_name("events", today - timedelta(days=d)) for d in (3, 2)]
+            conn.commit()
+            assert list(partition_counts(c, "events")) == [today - timedelta(days=1), today]
+            assert c.execute("SELECT COUNT(*) FROM events").fetchone() == (1,)
+            assert not c.execute("SELECT 1 FROM sqlite_sequence WHERE name = ?",
+                                 (partition_name("events", today - timedelta(days=3)),)).fetchone()
+
+            # Gelecekteki eşik de bugünün partition'ını silmez, view hep en az bir partition içerir
+            assert drop_partitions_before(c, "events", datetime.utcnow() + timedelta(days=2)) == \
+                [partition_name("events", today - timedelta(days=1))]
+            conn.commit()
+            assert list(partition_counts(c, "events")) == [today]
+            assert c.execute("SELECT COUNT(*) FROM events").fetchone() == (0,)
+
+
+def test_indexes_reach_existing_partitions():
+    with temp_database("indexes.db"):
+        yesterday = partition_name("events", datetime.utcnow() - timedelta(days=1))
+        with sqlite3.connect(database.DB_PATH) as conn:
+            ensure_partition(conn.cursor(), "events", datetime.utcnow() - timedelta(days=1))
+            conn.commit()
+            # Spec'e sonradan eklenmiş index: eski partition'da yok
+            conn.execute(f"DROP INDEX idx_{yesterday}_1")
+        database.init_db()
+        with sqlite3.connect(database.DB_PATH) as conn:
+            indexes = {row[1] for row in conn.execute(f"PRAGMA index_list({yesterday})")}
+        assert {f"idx_{yesterday}_0", f"idx_{yesterday}_1"} <= indexes
+
+
+def test_event_moves_across_midnight():
+    midnight = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+
+    class AfterMidnight(datetime):
+        @classmethod
+        def utcnow(cls):
+            return midnight + timedelta(minutes=2)
+
+    with temp_database("midnight.db"):
+        yesterday = midnight - timedelta(minutes=1)
+        with sqlite3.connect(database.DB_PATH) as conn:
+            name = ensure_partition(conn.cursor(), "events", yesterday)
+            conn.execute(EVENT_INSERT.format(table=name), ("api-0", 3, str(yesterday), str(yesterday), str(yesterday)))
+        # Dedupe penceresi gece yarısını kapsıyor: dünkü satır bugüne taşınır
+        with mock.patch.object(database, "datetime", AfterMidnight):
+            database.save_event("prod", "shop", "api-0", "Pod", "Warning", "BackOff", "back-off", None, "now", 2)
+        with sqlite3.connect(database.DB_PATH) as conn:
+            c = conn.cursor()
+            assert partition_counts(c, "events") == {yesterday.date(): 0, midnight.date(): 1}
+            row_id, count, last_timestamp, timestamp = c.execute("SELECT id, count, last_timestamp, timestamp FROM events").fetchone()
+        assert count == 5 and last_timestamp == "now" and timestamp.startswith(str(midnight.date()))
+        assert row_id // ID_SPAN == day_number(midnight.date())
+
+
+if __name__ == "__main__":
+    test_migrate_legacy_table()
+    print("✅ Legacy table is moved into day partitions behind the union view")
+    test_drop_partitions_before()
+    print("✅ Retention drops whole days and rebuilds the view")
+    test_indexes_reach_existing_partitions()
+    print("✅ Indexes added to the spec are created on existing partitions")
+    test_event_moves_across_midnight()
+    print("✅ Events deduplicated across midnight move to today's partition")
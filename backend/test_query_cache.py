@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Query result cache tests: repeated reads are served from the cache, writes
+from this or another process (the collector) invalidate only the tables
+they touch, relative windows roll over every minute, and the cache stays
+under its memory cap.
+"""
+
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from unittest import mock
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import database
+from conftest import temp_database
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+@contextmanager
+def cached_db():
+    with temp_database("cache.db"):
+        database.save_pod_status("prod", "shop", "api-0", "CrashLoopBackOff", 3)
+        database.save_alert("prod", "pod_crashloop", "critical", "Pod shop/api-0 is in CrashLoopBackOff state")
+        yield
+
+
+def counts(name):
+    return database.query_cache_stats()['functions'].get(name, {'hits': 0, 'misses': 0})
+
+
+def test_hits_and_invalidation():
+    with cached_db():
+        first = database.get_alerts(status="active")
+        # Pozisyonel ve keyword çağrı aynı anahtar
+        assert database.get_alerts(None, "active") is first
+        assert database.get_alerts(status="active", hours=168) is first
+        assert counts("get_alerts") == {'hits': 2, 'misses': 1}
+
+        pods = database.get_problem_pods(cluster="prod")
+        assert [row[2] for row in pods] == ["api-0"]
+
+        # Alert yazmak pod cache'ini bozmaz
+        database.save_alert("prod", "pod_restart_high", "warning", "Pod shop/api-0 has restarted 5 times in the last hour")
+        assert len(database.get_alerts(status="active")) == 2
+        assert database.get_problem_pods(cluster="prod") is pods
+
+        database.resolve_alert(first[0]['id'])
+        assert [alert['rule_name'] for alert in database.get_alerts(status="active")] == ["pod_restart_high"]
+        database.save_pod_status("prod", "shop", "api-1", "CrashLoopBackOff", 1)
+        assert len(database.get_problem_pods(cluster="prod")) == 2
+
+        stats = database.query_cache_stats()
+        assert stats['hits'] == 3 and stats['misses'] == 5 and stats['hit_rate'] == 0.375
+        assert stats['entries'] == 2 and stats['bytes'] > 0
+
+
+def test_writes_from_another_process():
+    with cached_db():
+        assert len(database.get_alerts()) == 1
+        # Collector ayrı süreç: generation SQLite'ta olduğu için API cache'i de geçersizlenir
+        subprocess.run([sys.executable, "-c", (
+            "import database; database.DB_PATH = %r; "
+            "database.save_alert('edge', 'pod_crashloop', 'critical', 'Pod shop/web-0 is in CrashLoopBackOff state')"
+        ) % database.DB_PATH], cwd=BACKEND_DIR, check=True)
+        assert {alert['cluster'] for alert in database.get_alerts()} == {"prod", "edge"}
+        assert counts("get_alerts") == {'hits': 0, 'misses': 2}
+
+
+def test_minute_buckets():
+    with cached_db():
+        now = time.time()
+        with mock.patch("time.time", return_value=now - now % 60):
+            summary = database.get_summary("prod")
+            assert database.get_summary(cluster="prod") is summary
+        # Pencere kaydı: bir sonraki dakika yeniden hesaplanır
+        with mock.patch("time.time", return_value=now - now % 60 + 60):
+            assert database.get_summary("prod") is not summary
+        assert counts("get_summary") == {'hits': 1, 'misses': 2}
+
+
+def test_memory_cap():
+    cache = database.QueryCache({'max_bytes': 20000, 'max_entry_fraction': 0.5})
+    rows = [("prod", "shop", f"api-{i}", "Running", i) for i in range(20)]
+    size = database._result_size(rows)
+    for i in range(10):
+        cache.put(("rows", i), (1,), list(rows))
+    stats = cache.stats()
+    assert stats['bytes'] <= 20000 and stats['entries'] == 20000 // size
+    assert stats['evictions'] == 10 - stats['entries']
+    # En eski girdiler atılır, son kullanılan kalır
+    assert cache.get("rows", ("rows", 0), (1,)) == (False, None)
+    assert cache.get("rows", ("rows", 9), (1,))[0]
+    # Sınırın yarısından büyük tek sonuç cache'lenmez
+    cache.put(("big",), (1,), rows * 20)
+    assert cache.get("rows", ("big",), (1,)) == (False, None)
+
+
+if __name__ == "__main__":
+    test_hits_and_invalidation()
+    print("✅ Repeated reads hit the cache, writes invalidate their tables")
+    test_writes_from_another_process()
+    print("✅ Collector writes invalidate the API's cache")
+    test_minute_buckets()
+    print("✅ Relative windows roll over every minute")
+    test_memory_cap()
+    print("✅ Cache stays under its memory cap")
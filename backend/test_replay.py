@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Record-and-replay tests: a recording keeps no cluster names, IPs or images
+but stays consistent (pod names in events and messages, workload suffixes),
+replaying it through ingest and alerting gives the same alerts every time,
+and the replay transport follows the recorded order and time warp.
+"""
+
+import gzip
+import io
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from unittest import mock
+from urllib.parse import urlparse
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import urllib3
+
+from bench_cycle import build_event, build_pod, synthetic_core_v1
+from bench_replay import replay_recording
+from replay import Recording, ReplayError, ReplayPoolManager, Scrubber, load_recording, record_cluster
+
+DEPLOYMENT_POD = "payments-api-5d8f7c9b4-x7k2p"
+
+
+def cluster_state(cycle):
+    pods = [build_pod(f"ns-{n}", i) for n in range(3) for i in range(30)]
+    pods[1]["metadata"]["name"] = DEPLOYMENT_POD
+    pods.append(build_pod("kube-system", 1))
+    for pod in pods:
+        for status in pod["status"]["containerStatuses"]:
+            # İkinci cycle'da her beşinci pod 6 kez daha restart etmiş
+            status["restartCount"] += 6 * cycle if pod["metadata"]["name"].endswith("5") else 0
+    pod_list = {"kind": "PodList", "apiVersion": "v1", "metadata": {"resourceVersion": str(cycle)}, "items": pods}
+    event_list = {"kind": "EventList", "apiVersion": "v1", "metadata": {"resourceVersion": str(cycle)},
+                  "items": [build_event(i) for i in range(40 + cycle * 10)]}
+    return {"/api/v1/pods": json.dumps(pod_list).encode(), "/api/v1/events": json.dumps(event_list).encode()}
+
+
+class CyclingPoolManager:
+    """Synthetic cluster whose state moves to the next cycle on every pod listing"""
+
+    def __init__(self):
+        self.cycle = -1
+
+    def request(self, method, url, **kwargs):
+        path = urlparse(url).path
+        if path == "/api/v1/pods":
+            self.cycle += 1
+        body = cluster_state(self.cycle)[path]
+        return urllib3.HTTPResponse(body=io.BytesIO(body), status=200, headers={"Content-Type": "application/json"},
+                                    preload_content=False)
+
+    def clear(self):
+        pass
+
+
+def record(tmp, cycles=2):
+    path = os.path.join(tmp, "synthetic.jsonl.gz")
+    v1 = synthetic_core_v1({})
+    v1.api_client.rest_client.pool_manager = CyclingPoolManager()
+    with mock.patch("client_registry.get_core_v1", return_value=v1):
+        assert record_cluster("synthetic.conf", path, cycles, 0) == cycles * 2
+    return path
+
+
+def test_recording_is_scrubbed():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = record(tmp)
+        with gzip.open(path, "rt") as f:
+            raw = f.read()
+        for secret in ("app-ns-0-0", '"ns-1"', "node-3", "10.1.", "registry.local", "value-3", "synthetic", "payments"):
+            assert secret not in raw, secret
+        assert "CrashLoopBackOff" in raw and '\\"kube-system\\"' in raw
+        # Takma IP'ler benchmark aralığında
+        assert all(ip.startswith(("198.18.", "198.19.")) for ip in re.findall(r"\b(?:\d{1,3}\.){3}\d{1,3}\b", raw))
+
+        recording = load_recording(path)
+        assert recording.cycles == 2 and recording.header["scrubbed"]
+        pods = json.loads(recording.entries[0]["body"])["items"]
+        events = json.loads(recording.entries[1]["body"])["items"]
+        # Üretilmiş suffix'ler kalır, workload gruplaması bozulmaz
+        assert pods[1]["metadata"]["name"].endswith("-5d8f7c9b4-x7k2p")
+        assert "annotations" not in pods[0]["metadata"] and pods[0]["spec"]["containers"][0]["env"][0]["value"].startswith("scrubbed-")
+        # Aynı isim her yerde aynı takma adı alır
+        event = events[0]
+        assert event["involvedObject"]["name"].split("-")[0] == pods[0]["metadata"]["name"].split("-")[0]
+        assert event["message"].endswith(event["involvedObject"]["name"])
+
+
+def test_image_pull_message_is_scrubbed():
+    scrubber = Scrubber("test-key")
+    pod = scrubber.scrub({"metadata": {"name": "web-7d9f8b6c5-x2k4p", "namespace": "payments"},
+                          "spec": {"containers": [{"name": "web", "image": "registry.corp.internal/payments/web:1.2"}]}})
+    message = scrubber.text('Failed to pull image "registry.corp.internal/payments/web:1.2": rpc error: code = NotFound '
+                            'desc = failed to resolve reference registry.corp.internal/payments/web:1.2 for acme-secret-proj: '
+                            'see https://registry.corp.internal/v2/payments/web/manifests/1.2 (10.4.5.6:443)')
+    for secret in ("registry", "corp", "internal", "payments", "web", "acme", "secret", "proj", "10.4.5.6"):
+        assert secret not in message, secret
+    # Tırnaklı image spec'teki image ile aynı token'ı alır
+    assert message.startswith(f'Failed to pull image "{pod["spec"]["containers"][0]["image"]}": rpc error: code = NotFound')
+    assert "failed to resolve reference" in message and ":443)" in message
+
+    message = scrubber.text("back-off 5m0s restarting failed container web in pod web-7d9f8b6c5-x2k4p, dial tcp: i/o timeout")
+    assert message == f"back-off 5m0s restarting failed container {pod['spec']['containers'][0]['name']} " \
+                      f"in pod {pod['metadata']['name']}, dial tcp: i/o timeout"
+
+
+def test_replay_is_deterministic():
+    with tempfile.TemporaryDirectory() as tmp:
+        recording = load_recording(record(tmp))
+        first = replay_recording(recording)
+        second = replay_recording(recording)
+        assert first["unused"] == 0
+        assert first["pods"] == 2 * 91 and first["events"] == 40 + 50
+        rules = {line.split("|")[1] for line in first["alerts"]}
+        assert {"pod_restart_high", "pod_crashloop", "pod_failed_event"} <= rules
+        assert first["alerts"] == second["alerts"] and first["fingerprint"] == second["fingerprint"]
+        assert not any("ns-0" in line for line in first["alerts"])
+
+
+def test_replay_transport_order_and_speed():
+    entries = [
+        {"cycle": 0, "t": 0.0, "method": "GET", "path": "/api/v1/events", "query": "", "status": 200, "body": '{"items":[],"metadata":{"continue":"abc"}}'},
+        {"cycle": 0, "t": 0.1, "method": "GET", "path": "/api/v1/events", "query": "continue=abc", "status": 200, "body": '{"items":[]}'},
+        {"cycle": 1, "t": 0.4, "method": "GET", "path": "/api/v1/events", "query": "", "status": 200, "body": '{"items":[1]}'},
+    ]
+    pool = ReplayPoolManager(Recording({}, entries), speed=2)
+    start = time.monotonic()
+    # limit eşleştirmede yok sayılır: sayfa boyutu değişse de kayıt oynar
+    assert pool.request("GET", "http://replay.local/api/v1/events?limit=500").read() == entries[0]["body"].encode()
+    pool.request("GET", "http://replay.local/api/v1/events?limit=100&continue=abc")
+    assert pool.request("GET", "http://replay.local/api/v1/events").read() == b'{"items":[1]}'
+    # 0.4s kayıt, 2x hızda ~0.2s
+    assert 0.18 < time.monotonic() - start < 0.35
+    assert pool.remaining() == 0
+    try:
+        pool.request("GET", "http://replay.local/api/v1/events")
+        assert False, "expected ReplayError"
+    except ReplayError:
+        pass
+
+
+if __name__ == "__main__":
+    test_recording_is_scrubbed()
+    print("✅ Recordings are scrubbed and stay consistent")
+    test_image_pull_message_is_scrubbed()
+    print("✅ Image references, hosts and names in messages are scrubbed")
+    test_replay_is_deterministic()
+    print("✅ Replays give the same alerts every run")
+    test_replay_transport_order_and_speed()
+    print("✅ Replay transport follows recorded order and time warp")
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Restart tests: the first listing of a cluster is only a baseline, later
+listings store the increases (a counter that went down counts in full, a pod
+that disappeared and came back is new), a cluster whose last listing was
+empty is not treated as new, and get_restart_series and /api/restarts roll
+the deltas up per cluster, namespace or pod.
+"""
+
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import database
+from conftest import temp_database
+from database import get_restart_series, save_restart_samples
+from partitions import ensure_partition
+
+
+def deltas():
+    with sqlite3.connect(database.DB_PATH) as conn:
+        return conn.execute("SELECT cluster, pod_name, delta, restarts FROM restart_deltas ORDER BY id").fetchall()
+
+
+def add_delta(cluster, namespace, pod, delta, hours_ago):
+    timestamp = datetime.utcnow().replace(minute=30, second=0, microsecond=0) - timedelta(hours=hours_ago)
+    with sqlite3.connect(database.DB_PATH) as conn:
+        c = conn.cursor()
+        partition = ensure_partition(c, "restart_deltas", timestamp)
+        c.execute(f"INSERT INTO {partition} (cluster, namespace, pod_name, delta, restarts, timestamp) VALUES (?, ?, ?, ?, ?, ?)",
+                  (cluster, namespace, pod, delta, delta, timestamp))
+
+
+def test_delta_math():
+    with temp_database("restarts.db"):
+        # İlk listing: sadece baseline
+        assert save_restart_samples("prod", [("shop", "api-0", 3), ("shop", "api-1", 0)]) == 0
+        assert save_restart_samples("prod", [("shop", "api-0", 5), ("shop", "api-1", 0), ("shop", "web-0", 2)]) == 2
+        assert deltas() == [("prod", "api-0", 2, 5), ("prod", "web-0", 2, 2)]
+
+        # Sayaç düştü (container yeniden oluştu): yeni değerin tamamı restart
+        assert save_restart_samples("prod", [("shop", "api-0", 1), ("shop", "api-1", 0), ("shop", "web-0", 2)]) == 1
+        # api-1 kayboldu, sonra aynı adla geri geldi: yeni pod sayılır
+        assert save_restart_samples("prod", [("shop", "api-0", 1), ("shop", "web-0", 2)]) == 0
+        assert save_restart_samples("prod", [("shop", "api-0", 1), ("shop", "api-1", 4), ("shop", "web-0", 2)]) == 1
+        assert deltas()[2:] == [("prod", "api-0", 1, 1), ("prod", "api-1", 4, 4)]
+
+        # Boş listing cluster'ı yeni yapmaz: sonraki pod'ların restart'ları sayılır
+        assert save_restart_samples("prod", []) == 0
+        assert save_restart_samples("prod", [("shop", "api-0", 2)]) == 1
+        assert deltas()[-1] == ("prod", "api-0", 2, 2)
+
+        # Başka bir cluster'ın ilk listing'i yine baseline
+        assert save_restart_samples("edge", [("shop", "api-0", 7)]) == 0
+
+
+def test_listed_clusters_survive_upgrade():
+    with temp_database("restarts.db"):
+        save_restart_samples("prod", [("shop", "api-0", 3)])
+        with sqlite3.connect(database.DB_PATH) as conn:
+            # restart_listings'ten önceki sürüm: sadece pod_restart_state var
+            conn.execute("DELETE FROM restart_listings")
+        database.init_db()
+        assert save_restart_samples("prod", [("shop", "api-0", 3), ("shop", "web-0", 2)]) == 1
+
+
+def test_restart_series():
+    with temp_database("restarts.db"):
+        for pod, delta, hours_ago in (("api-0", 2, 1), ("api-1", 3, 1), ("api-0", 1, 2), ("api-0", 9, 30)):
+            add_delta("prod", "shop", pod, delta, hours_ago)
+        add_delta("prod", "kube-system", "dns-0", 4, 1)
+        add_delta("edge", "shop", "web-0", 5, 2)
+        hour = lambda hours_ago: (datetime.utcnow() - timedelta(hours=hours_ago)).strftime("%Y-%m-%d %H:00")
+
+        by_cluster = get_restart_series()
+        assert [(row['cluster'], row['namespace'], row['pod']) for row in by_cluster] == [("edge", None, None), ("prod", None, None)]
+        assert by_cluster[1]['points'] == [{'time': hour(2), 'restarts': 1}, {'time': hour(1), 'restarts': 2 + 3 + 4}]
+
+        by_namespace = get_restart_series(cluster="prod", group_by="namespace", include=lambda cluster, ns: ns != "kube-system")
+        assert [(row['namespace'], [p['restarts'] for p in row['points']]) for row in by_namespace] == [("shop", [1, 5])]
+
+        by_pod = get_restart_series(cluster="prod", namespace="shop", pod="api-0", hours=48, bucket="day")
+        assert len(by_pod) == 1 and by_pod[0]['pod'] == "api-0"
+        assert sum(point['restarts'] for point in by_pod[0]['points']) == 12
+        assert all(len(point['time']) == 10 for point in by_pod[0]['points'])
+        assert get_restart_series(cluster="prod", bucket="minute")[0]['points'][0]['time'].endswith(":30")
+
+
+def test_restarts_endpoint():
+    import api
+    client = api.app.test_client()
+    with temp_database("restarts.db"):
+        add_delta("prod", "shop", "api-0", 2, 1)
+        add_delta("prod", "shop", "api-1", 3, 1)
+        response = client.get("/api/restarts?cluster=prod&group_by=pod")
+        assert response.status_code == 200
+        assert [(row['pod'], row['points'][0]['restarts']) for row in response.get_json()] == [("api-0", 2), ("api-1", 3)]
+        assert client.get("/api/restarts?hours=0").get_json() == []
+        assert client.get("/api/restarts?bucket=week").status_code == 400
+        assert client.get("/api/restarts?group_by=node").status_code == 400
+
+
+if __name__ == "__main__":
+    test_delta_math()
+    print("✅ Restart deltas: baseline, increases, counter resets and returning pods")
+    test_listed_clusters_survive_upgrade()
+    print("✅ Clusters listed before the upgrade are not baselined again")
+    test_restart_series()
+    print("✅ Restart series roll up per cluster, namespace and pod")
+    test_restarts_endpoint()
+    print("✅ /api/restarts serves the series and validates its parameters")
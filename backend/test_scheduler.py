@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Scheduler tests: failing jobs back off exponentially up to max_backoff,
+jitter stays within its bounds, a running job is never submitted again,
+reschedule pulls a job forward and its stale queue entry is skipped, and
+removed jobs do not run or get queued again.
+"""
+
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from unittest import mock
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from scheduler import Job, Scheduler
+
+
+class RecordingExecutor:
+    """Records submitted jobs; runs them inline when `inline` is set"""
+
+    def __init__(self, inline=False):
+        self.inline = inline
+        self.submitted = []
+
+    def submit(self, fn, job):
+        self.submitted.append(job.name)
+        if self.inline:
+            fn(job)
+
+    def shutdown(self, wait=True):
+        pass
+
+
+@contextmanager
+def running(scheduler, executor):
+    scheduler._executor = executor
+    thread = threading.Thread(target=scheduler.run_forever, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        scheduler.stop()
+        thread.join(2)
+        assert not thread.is_alive()
+
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_backoff():
+    job = Job("prod", lambda: True, 10, max_backoff=100)
+    delays = []
+    for failures in (0, 1, 2, 3, 4, 20):
+        job.failures = failures
+        delays.append(job.next_delay())
+    assert delays == [10, 20, 40, 80, 100, 100]
+
+    # max_backoff yoksa 2**16 ile sınırlı
+    unbounded = Job("prod", lambda: True, lambda: 2)
+    unbounded.failures = 40
+    assert unbounded.next_delay() == 2 * 2 ** 16
+
+
+def test_jitter_bounds():
+    job = Job("prod", lambda: True, 100, jitter=0.1, max_backoff=400)
+    delays = [job.next_delay() for _ in range(500)]
+    assert all(90 <= delay <= 110 for delay in delays) and len(set(delays)) > 1
+    with mock.patch("scheduler.random.uniform", side_effect=lambda low, high: low):
+        assert job.next_delay() == 90
+    # Jitter backoff sınırından sonra uygulanır
+    job.failures = 5
+    assert all(360 <= job.next_delay() <= 440 for _ in range(500))
+    assert Job("prod", lambda: True, 0.0, jitter=0.5).next_delay() == 0.0
+
+
+def test_running_job_is_not_submitted():
+    scheduler = Scheduler(workers=1)
+    job = Job("prod", lambda: True, 0.05)
+    executor = RecordingExecutor()
+    scheduler.add_job(job)
+    with running(scheduler, executor):
+        wait_for(lambda: executor.submitted)
+        assert job.running
+        # Çalışırken öne çekme ve kuyruktaki yeni kayıt job'ı tekrar göndermez
+        scheduler.reschedule("prod")
+        with scheduler._cond:
+            scheduler._push(job, time.monotonic())
+        time.sleep(0.2)
+        assert executor.submitted == ["prod"]
+
+        scheduler._run(job)
+        assert not job.running
+        wait_for(lambda: len(executor.submitted) == 2)
+
+
+def test_reschedule_skips_stale_entry():
+    scheduler = Scheduler(workers=1)
+    calls = []
+    job = Job("prod", lambda: calls.append(time.monotonic()), 60)
+    scheduler.add_job(job, delay=0.3)
+    first = job.next_run
+    scheduler.reschedule("prod", delay=0.5)
+    assert job.next_run == first and len(scheduler._queue) == 1
+
+    executor = RecordingExecutor(inline=True)
+    with running(scheduler, executor):
+        scheduler.reschedule("prod")
+        assert job.next_run < first and len(scheduler._queue) == 2
+        wait_for(lambda: calls)
+        # Eski kayıt (0.3s) zamanı gelince atlanır; sıradaki çalışma interval sonra
+        time.sleep(0.5)
+        assert executor.submitted == ["prod"] and len(calls) == 1
+        assert job.next_run - time.monotonic() > 50
+
+
+def test_remove_job():
+    scheduler = Scheduler(workers=1)
+    calls = []
+    removed = Job("edge", lambda: calls.append("edge"), 60)
+    kept = Job("prod", lambda: calls.append("prod"), 60)
+    scheduler.add_job(removed, delay=0.1)
+    scheduler.add_job(kept, delay=0.1)
+    scheduler.remove_job("edge")
+    scheduler.remove_job("unknown")
+    assert removed.cancelled and set(scheduler.jobs) == {"prod"}
+
+    executor = RecordingExecutor(inline=True)
+    with running(scheduler, executor):
+        wait_for(lambda: calls)
+        time.sleep(0.2)
+        assert calls == ["prod"]
+
+        # Çalışırken kaldırılan job tekrar kuyruğa girmez
+        scheduler.remove_job("prod")
+        queued = len(scheduler._queue)
+        kept.running = True
+        scheduler._run(kept)
+        assert len(scheduler._queue) == queued
+
+
+if __name__ == "__main__":
+    test_backoff()
+    print("✅ Failing jobs back off exponentially up to max_backoff")
+    test_jitter_bounds()
+    print("✅ Jitter stays within its bounds")
+    test_running_job_is_not_submitted()
+    print("✅ A running job is never submitted again")
+    test_reschedule_skips_stale_entry()
+    print("✅ reschedule pulls a job forward and the stale entry is skipped")
+    test_remove_job()
+    print("✅ Removed jobs do not run or get queued again")
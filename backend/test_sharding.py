@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Collector sharding tests: the hash ring moves only the joining or leaving
+replica's share, replicas split the clusters disjointly through leases
+(SQLite and flock), busy clusters are handed off only after their
+collection, a dead replica's clusters are taken over after the TTL, and a
+stalled replica's collection stops writing once its lease was taken over.
+"""
+
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from unittest import mock
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import database
+import main
+from conftest import temp_database
+from scheduler import Scheduler
+from sharding import LEADER_KEY, FileLeases, HashRing, ShardCoordinator, SqliteLeases
+
+CLUSTERS = [f"cluster-{i}" for i in range(24)]
+KEYS = CLUSTERS + [LEADER_KEY]
+
+
+@contextmanager
+def shared_db():
+    with temp_database("shard.db") as tmp:
+        yield tmp
+
+
+def replicas(backend_factory, *names, ttl=30):
+    return [ShardCoordinator(backend_factory(), lambda: KEYS, name, {'lease_ttl': ttl, 'vnodes': 64}) for name in names]
+
+
+def settle(coordinators, rounds=3):
+    for _ in range(rounds):
+        for coordinator in coordinators:
+            coordinator.tick()
+
+
+def assert_partitioned(coordinators):
+    owned = [coordinator.owned() for coordinator in coordinators]
+    assert set().union(*owned) == set(KEYS)
+    assert sum(len(keys) for keys in owned) == len(KEYS), "a key is held by two replicas"
+    assert sum(coordinator.is_leader() for coordinator in coordinators) == 1
+
+
+def test_ring_moves_minimal_keys():
+    keys = [f"cluster-{i}" for i in range(600)]
+    before = HashRing(["a", "b", "c"])
+    after = HashRing(["a", "b", "c", "d"])
+    moved = [key for key in keys if before.owner(key) != after.owner(key)]
+    # Sadece yeni replica'ya geçenler taşınır, payı ~1/4
+    assert all(after.owner(key) == "d" for key in moved)
+    assert 0.15 < len(moved) / len(keys) < 0.35
+    shrunk = HashRing(["a", "c"])
+    assert all(shrunk.owner(key) == before.owner(key) for key in keys if before.owner(key) != "b")
+    # Her replica aynı sonucu hesaplar
+    assert [HashRing(["c", "a", "b"]).owner(key) for key in keys] == [before.owner(key) for key in keys]
+
+
+def test_sqlite_leases_rebalance():
+    with shared_db():
+        a, b = replicas(SqliteLeases, "replica-a", "replica-b")
+        a.tick()
+        assert a.owned() == set(KEYS)
+
+        # B katılır: A'nın payından sadece B'ye düşenler, A bıraktıktan sonra geçer
+        moving = next(key for key in CLUSTERS if HashRing(["replica-a", "replica-b"]).owner(key) == "replica-b")
+        with a.holding(moving) as held:
+            assert held
+            settle([b, a, b])
+            # Collection sürerken lease bırakılmaz
+            assert a.owns(moving) and not b.owns(moving)
+        settle([a, b])
+        assert b.owns(moving)
+        assert_partitioned([a, b])
+        assert 6 < len(b.owned()) < 19
+
+        c, = replicas(SqliteLeases, "replica-c")
+        settle([c, a, b, c])
+        assert_partitioned([a, b, c])
+
+        # C düzgün kapanır: lease'leri hemen boşalır
+        c.stop()
+        settle([a, b], rounds=2)
+        assert_partitioned([a, b])
+
+
+def test_dead_replica_takeover():
+    with shared_db():
+        a, b = replicas(SqliteLeases, "replica-a", "replica-b", ttl=0.3)
+        settle([a, b, a, b])
+        assert_partitioned([a, b])
+        # A heartbeat atmayı bırakır (çöktü); TTL dolunca kendi de artık sahip değildir
+        time.sleep(0.4)
+        assert not a.owned()
+        b.tick()
+        assert b.owned() == set(KEYS)
+
+
+def test_takeover_fences_stalled_replica():
+    with shared_db():
+        a, b = replicas(SqliteLeases, "replica-a", "replica-b", ttl=0.3)
+        settle([a, b, a, b])
+        cluster = next(key for key in CLUSTERS if a.owns(key))
+        epoch = a.backend.holder(cluster)[1]
+        collected = []
+
+        def stalled_pods(path, cluster_name):
+            # A pod toplarken takılır, B lease'i devralır
+            time.sleep(0.4)
+            b.tick()
+            collected.append(cluster_name)
+
+        with mock.patch.object(main, "_coordinator", a), mock.patch("main.load_and_process_cluster", side_effect=stalled_pods), \
+             mock.patch("main.collect_events_from_cluster") as events, mock.patch("main.record_collection_result") as record:
+            assert main.collect_cluster("/dev/null", cluster) is None
+        assert collected == [cluster]
+        events.assert_not_called()
+        record.assert_not_called()
+        assert b.backend.holder(cluster) == ("replica-b", epoch + 1)
+        assert b.fence(cluster)() and not a.fence(cluster)()
+
+        # A geri döner: yeni lease yeni epoch ile, eski fence geçersiz kalır
+        fence = b.fence(cluster)
+        time.sleep(0.4)
+        settle([a])
+        assert a.owns(cluster) and a.backend.holder(cluster) == ("replica-a", epoch + 2)
+        assert a.fence(cluster)() and not fence()
+
+
+def test_file_leases():
+    with tempfile.TemporaryDirectory() as tmp:
+        a, b = replicas(lambda: FileLeases(tmp), "replica-a", "replica-b")
+        settle([a, b])
+        assert_partitioned([a, b])
+        # Aynı lock'u ikinci kez almak mümkün değil
+        taken = next(iter(a.owned()))
+        assert not FileLeases(tmp).acquire(taken, "intruder", 0, 0)
+        assert a.fence(taken)() and not b.fence(taken)()
+        a.stop()
+        b.tick()
+        assert b.owned() == set(KEYS)
+
+
+def test_collector_schedules_owned_clusters():
+    with shared_db(), tempfile.TemporaryDirectory() as cluster_dir:
+        for name in CLUSTERS:
+            open(os.path.join(cluster_dir, f"{name}.conf"), "w").close()
+        a, b = replicas(SqliteLeases, "replica-a", "replica-b")
+        settle([a, b, a, b])
+        # Az önce toplanmış cluster'ı devralan replica aralığın geri kalanını bekler
+        recent = next(name for name in CLUSTERS if a.owns(name))
+        database.record_collection_result(recent, True, 1.0)
+        scheduler = Scheduler(workers=1)
+        with mock.patch("cluster_registry.CLUSTER_DIR", cluster_dir), mock.patch.object(main, "_coordinator", a), \
+             mock.patch.dict(main._cluster_paths, clear=True), mock.patch("main.evict"):
+            main.sync_cluster_jobs(scheduler)
+            scheduled = {name.split(":", 1)[1] for name in scheduler.jobs}
+            assert scheduled == a.owned() - {LEADER_KEY}
+            assert scheduler.jobs[f"cluster:{recent}"].next_run - time.monotonic() > 250
+
+            # Sahip olunmayan cluster'ın job'ı çalışsa da collection yapılmaz
+            with mock.patch("main.collect_cluster") as collect:
+                other = next(name for name in CLUSTERS if b.owns(name))
+                assert main.leased(other, lambda: collect(other)) is None
+                collect.assert_not_called()
+            scheduler.stop()
+
+
+if __name__ == "__main__":
+    test_ring_moves_minimal_keys()
+    print("✅ Hash ring moves only the changed replica's share")
+    test_sqlite_leases_rebalance()
+    print("✅ SQLite leases partition clusters and rebalance on join/leave")
+    test_dead_replica_takeover()
+    print("✅ Dead replica's clusters are taken over after the TTL")
+    test_takeover_fences_stalled_replica()
+    print("✅ A stalled replica stops writing once its lease is taken over")
+    test_file_leases()
+    print("✅ File locks partition clusters on one host")
+    test_collector_schedules_owned_clusters()
+    print("✅ Collector schedules only its own clusters")
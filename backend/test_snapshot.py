@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Current-state snapshot tests: the snapshot answers summary, cluster health
+and active alert queries exactly like SQLite, the API serves them without
+opening the database, current pods fall back to the latest row per pod
+when there is no usable snapshot, readers swap to new versions atomically,
+and the collector publishes once per round instead of after every cluster.
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from unittest import mock
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import database
+import snapshot
+from conftest import temp_database
+
+
+@contextmanager
+def temp_state():
+    with temp_database("state.db"), mock.patch.object(snapshot, "_version", None), mock.patch.object(snapshot, "_current", None), \
+         mock.patch.object(snapshot, "_min_version", 0):
+        for cluster in ("prod", "edge"):
+            database.save_restart_samples(cluster, [("shop", f"api-{i}", 0) for i in range(4)])
+            for i in range(4):
+                status = "CrashLoopBackOff" if i % 2 else "Running"
+                database.save_pod_status(cluster, "shop", f"api-{i}", "Running", i)
+                database.save_pod_status(cluster, "shop", f"api-{i}", status, i + 1)
+            database.save_pod_status(cluster, "kube-system", "dns-0", "Running", 2)
+            database.save_restart_samples(cluster, [("shop", f"api-{i}", i + 1) for i in range(4)])
+            database.record_collection_result(cluster, cluster == "prod", 1.5, None if cluster == "prod" else "pods collection failed")
+        parent = database.save_alert("prod", "pod_crashloop", "critical", "Pod CrashLoopBackOff: 2 pods affected in prod shop/api",
+                                     group_key="pod_crashloop/prod/shop/api", member_count=2)
+        for i in (1, 3):
+            child = database.save_alert("prod", "pod_crashloop", "critical", f"Pod shop/api-{i} is in CrashLoopBackOff state",
+                                        f"pod=shop/api-{i}", "shop")
+            with sqlite3.connect(database.DB_PATH) as conn:
+                conn.execute("UPDATE alerts SET parent_id = ? WHERE id = ?", (parent, child))
+        database.save_alert("edge", "pod_restart_high", "warning", "Pod shop/api-3 has restarted 6 times in the last hour",
+                            "pod=shop/api-3,restarts=6", "shop")
+        resolved = database.save_alert("edge", "pod_restart_high", "warning", "Pod shop/api-2 has restarted 5 times in the last hour")
+        database.resolve_alert(resolved)
+        yield
+
+
+def without_generated_at(summary):
+    return {key: value for key, value in summary.items() if key != "generated_at"}
+
+
+def test_snapshot_matches_sqlite():
+    with temp_state():
+        assert snapshot.publish_snapshot() == 1
+        snap = snapshot.current_snapshot()
+        assert snap.version == 1 and snap.hours == 24
+
+        hide_system = lambda cluster, namespace: namespace != "kube-system"
+        for cluster, top, include in ((None, 10, None), ("prod", 2, None), ("edge", 10, hide_system), ("missing", 10, None)):
+            expected = database.get_summary(cluster, 24, top, include)
+            assert without_generated_at(snap.summary(cluster, top, include)) == without_generated_at(expected), cluster
+
+        assert snap.cluster_health() == database.get_cluster_health()
+        for kwargs in ({}, {"cluster": "prod"}, {"include_children": True}, {"severity": "warning"}, {"limit": 1},
+                       {"parent_id": 1}, {"hours": 0}):
+            assert snap.alert_rows(**kwargs) == database.get_alerts(status="active", as_rows=True, **kwargs), kwargs
+        assert [row[2] for row in snap.current_pods("prod")][:1] == ["dns-0"]
+
+
+def test_api_reads_snapshot_without_sqlite():
+    import api
+    with temp_state():
+        snapshot.publish_snapshot()
+        client = api.app.test_client()
+        expected = client.get("/api/summary").get_json()
+        with mock.patch("sqlite3.connect", side_effect=AssertionError("API touched SQLite")):
+            summary = client.get("/api/summary").get_json()
+            alerts = client.get("/api/alerts?status=active&include_children=true").get_json()
+            clusters = client.get("/api/alerts?status=active&cluster=edge").get_json()
+            pods = client.get("/api/pods?current=1&cluster=prod").get_json()
+        assert without_generated_at(summary) == without_generated_at(expected)
+        assert summary["alerts"] == {"total_active": 4, "critical": 3, "warning": 1, "info": 0}
+        assert len(alerts) == 4 and [alert["rule_name"] for alert in clusters] == ["pod_restart_high"]
+        assert {pod["name"]: pod["status"] for pod in pods}["api-1"] == "CrashLoopBackOff"
+
+        # Alert çözülünce snapshot yenisi yazılana kadar kullanılmaz
+        assert client.post("/api/alerts/resolve", json={"cluster": "edge"}).get_json()["affected"] == 1
+        assert snapshot.current_snapshot() is None
+        assert client.get("/api/summary").get_json()["alerts"]["warning"] == 0
+        snapshot.publish_snapshot()
+        assert snapshot.current_snapshot().version == 2
+
+
+def test_readers_swap_atomically():
+    with temp_state():
+        snapshot.publish_snapshot()
+        first = snapshot.current_snapshot()
+        database.save_pod_status("prod", "shop", "new-0", "CrashLoopBackOff", 9)
+        snapshot.publish_snapshot()
+        second = snapshot.current_snapshot()
+        assert second is not first and (first.version, second.version) == (1, 2)
+        # Eski mapping'i tutan okuyucu tutarlı eski veriyi görmeye devam eder
+        assert "new-0" not in {row[2] for row in first.pod_rows()}
+        assert "new-0" in {row[2] for row in second.pod_rows()}
+        assert snapshot.current_snapshot() is second
+
+        # Yeniden başlayan collector sürümü geri almaz
+        with mock.patch.object(snapshot, "_version", None):
+            assert snapshot.publish_snapshot() == 3
+
+        # Collector durduysa eski snapshot kullanılmaz
+        with mock.patch.dict(snapshot.SNAPSHOT_CONFIG, {"max_age": -1}):
+            assert snapshot.current_snapshot() is None
+
+
+def test_current_pods_without_snapshot():
+    import api
+    with temp_state():
+        client = api.app.test_client()
+        expected = [(pod[2], pod[3]) for pod in database.get_current_pods("prod", 24)]
+        assert len(expected) == 5
+        # Snapshot yok, bayat ya da farklı pencere: yine pod başına tek (son) satır
+        for query in ("", "&hours=24", "&hours=48"):
+            pods = client.get(f"/api/pods?current=1&cluster=prod{query}").get_json()
+            assert sorted((pod["name"], pod["status"]) for pod in pods) == sorted(expected), query
+        snapshot.publish_snapshot()
+        with mock.patch.dict(snapshot.SNAPSHOT_CONFIG, {"max_age": -1}):
+            pods = client.get("/api/pods?current=1&cluster=prod").get_json()
+        assert len(pods) == 5 and {pod["name"]: pod["status"] for pod in pods}["api-1"] == "CrashLoopBackOff"
+
+
+def test_collector_publishes_once_per_round():
+    import main
+    with temp_state(), mock.patch.object(main, "_coordinator", None), mock.patch.object(main, "_snapshot_dirty", threading.Event()), \
+         mock.patch("main.load_and_process_cluster"), mock.patch("main.collect_events_from_cluster"), \
+         mock.patch.dict(main.USAGE_CONFIG, {"enabled": False}), mock.patch("main.publish_snapshot") as publish:
+        for cluster in ("prod", "edge", "prod"):
+            assert main.collect_cluster("/dev/null", cluster)
+        publish.assert_not_called()
+        # Snapshot job'ı: toplanan cluster'lar için tek yayın, değişiklik yoksa hiç
+        main.publish_state()
+        main.publish_state()
+        assert publish.call_count == 1
+        # Alert döngüsü alert durumunu değiştirdiği için her zaman yayınlar
+        main.publish_state(force=True)
+        assert publish.call_count == 2
+        assert "snapshot" in main.build_scheduler(main.Scheduler(workers=1)).jobs
+
+
+if __name__ == "__main__":
+    test_snapshot_matches_sqlite()
+    print("✅ Snapshot answers current-state queries like SQLite")
+    test_api_reads_snapshot_without_sqlite()
+    print("✅ API serves summary, alerts and pods from the snapshot")
+    test_current_pods_without_snapshot()
+    print("✅ Current pods fall back to the latest row per pod without a snapshot")
+    test_readers_swap_atomically()
+    print("✅ Readers swap to new snapshot versions atomically")
+    test_collector_publishes_once_per_round()
+    print("✅ Collector publishes the snapshot once per round")
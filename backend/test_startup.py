@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Startup tests: the API and the collector start without importing the heavy
+optional dependencies, a freshly started API answers /healthz, and the AI
+analyzer plugin loads on its first use. Startup time thresholds are checked
+by bench_startup.py, not here.
+"""
+
+import os
+import sys
+from unittest import mock
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import plugins
+from bench_startup import measure_first_healthz, measure_import
+
+
+def test_startup_skips_heavy_modules():
+    for module in ("api", "main"):
+        _, loaded = measure_import(module)
+        assert loaded == [], f"import {module} loads {loaded}"
+
+
+def test_first_healthz():
+    # Süre bench_startup.py'de ölçülür; burada sadece api.py'nin ayağa kalkıp cevap verdiği
+    assert measure_first_healthz() > 0
+
+
+def test_ai_plugin_loads_on_first_use():
+    import api
+    with mock.patch.dict(plugins._loaded, clear=True), mock.patch.dict(os.environ, {"OPENAI_API_KEY": ""}):
+        assert plugins.plugin_status()["ai"] == "not loaded"
+        client = api.app.test_client()
+        assert client.get("/healthz").status_code == 200
+        assert plugins.plugin_status()["ai"] == "not loaded"
+
+        status = client.get("/api/events/ai-status").get_json()
+        assert status == {"available": False, "reason": "OpenAI API key missing", "service": "OpenAI GPT-4 Event Analyzer"}
+        assert plugins.plugin_status()["ai"] == "loaded"
+        assert client.post("/api/events/analyze", json={"cluster": "prod"}).status_code == 503
+
+    # Yüklenemeyen plugin bir kez denenir, endpoint 503 döner
+    with mock.patch.dict(plugins._loaded, clear=True), mock.patch.dict(plugins.PLUGINS, {"ai": "missing_module:Analyzer"}):
+        assert client.get("/api/events/ai-status").status_code == 503
+        assert plugins.plugin_status()["ai"].startswith("failed: No module named")
+
+
+if __name__ == "__main__":
+    test_startup_skips_heavy_modules()
+    print("✅ API and collector start without heavy optional modules")
+    test_first_healthz()
+    print("✅ A freshly started API answers /healthz")
+    test_ai_plugin_loads_on_first_use()
+    print("✅ AI analyzer plugin loads on first use")
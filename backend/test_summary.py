@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+/api/summary tests: pods are counted once by their latest row, `top`
+limits the top restarting pods the same way on SQLite and on the snapshot,
+and out-of-range `top` and `hours` values are rejected.
+"""
+
+import os
+import sys
+from unittest import mock
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import database
+import snapshot
+from conftest import temp_database
+
+
+def add_pods():
+    for i in range(6):
+        database.save_pod_status("prod", "shop", f"api-{i}", "Running", i)
+    database.save_pod_status("prod", "shop", "api-5", "CrashLoopBackOff", 9)
+    database.save_pod_status("edge", "shop", "web-0", "Running", 1)
+
+
+def test_summary_endpoint():
+    import api
+    client = api.app.test_client()
+    with temp_database("summary.db"), mock.patch.object(snapshot, "_current", None), mock.patch.object(snapshot, "_version", None), \
+         mock.patch.object(snapshot, "_min_version", 0):
+        add_pods()
+        summary = client.get("/api/summary?top=3").get_json()
+        assert summary["totals"] == {"pods": 7, "restarting": 6, "crashloop": 1, "recent_restarts": 0}
+        assert [pod["name"] for pod in summary["top_restarting"]] == ["api-5", "api-4", "api-3"]
+        assert [item["cluster"] for item in summary["clusters"]] == ["edge", "prod"]
+
+        prod = client.get("/api/summary?cluster=prod&top=1").get_json()
+        assert prod["cluster"] == "prod" and prod["totals"]["pods"] == 6
+        assert [pod["name"] for pod in prod["top_restarting"]] == ["api-5"]
+
+        # Snapshot'tan da aynı top sınırı
+        if snapshot.publish_snapshot() is not None:
+            assert snapshot.current_snapshot() is not None
+            assert [pod["name"] for pod in client.get("/api/summary?top=3").get_json()["top_restarting"]] == ["api-5", "api-4", "api-3"]
+        assert len(client.get("/api/summary?top=100").get_json()["top_restarting"]) == 7
+
+        for query in ("top=0", "top=-2", "top=101", "hours=0", "hours=-24"):
+            response = client.get(f"/api/summary?{query}")
+            assert response.status_code == 400 and "error" in response.get_json(), query
+
+
+if __name__ == "__main__":
+    test_summary_endpoint()
+    print("✅ /api/summary limits top restarting pods and rejects out-of-range parameters")
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Usage ring buffer tests against a local stub metrics API: scrapes land in
+the per-pod ring buffers and are read back through a separate read-only
+mapping (like the API process), flushes are downsampled into pod_usage, and
+the vectorized OOM-risk rule opens and resolves alerts.
+"""
+
+import io
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from kubernetes import client
+
+import alerts
+import database
+import usage
+from conftest import temp_database
+from fast_list import iter_pods_raw
+
+MiB = 2 ** 20
+
+
+class StubMetricsServer:
+    """Serves /apis/metrics.k8s.io/v1beta1/pods from `self.pods` {(namespace, name): (cpu, memory)}"""
+
+    def __init__(self):
+        self.pods = {}
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if not self.path.startswith("/apis/metrics.k8s.io/v1beta1/pods"):
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                server.requests += 1
+                body = json.dumps({
+                    "kind": "PodMetricsList",
+                    "apiVersion": "metrics.k8s.io/v1beta1",
+                    "items": [{
+                        "metadata": {"name": name, "namespace": namespace},
+                        "timestamp": "2024-05-01T10:00:00Z",
+                        "window": "15s",
+                        # İki container: değerler pod başına toplanır
+                        "containers": [{"name": "app", "usage": {"cpu": cpu, "memory": memory}},
+                                       {"name": "sidecar", "usage": {"cpu": "5000000n", "memory": "1Mi"}}],
+                    } for (namespace, name), (cpu, memory) in server.pods.items()],
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def custom_objects(self, path=None):
+        configuration = client.Configuration(host=f"http://127.0.0.1:{self.server.server_port}")
+        return client.CustomObjectsApi(api_client=client.ApiClient(configuration))
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@contextmanager
+def usage_environment(samples=4, max_pods=8, flush_interval=3600):
+    with temp_database("usage.db") as tmp, \
+         mock.patch.dict(usage.USAGE_CONFIG, {"dir": os.path.join(tmp, "usage"), "samples": samples, "max_pods": max_pods,
+                                              "flush_interval": flush_interval, "evict_after": 2, "enabled": True}), \
+         mock.patch.dict(usage._writers, clear=True), mock.patch.dict(usage._readers, clear=True), \
+         mock.patch.dict(usage._limits, clear=True):
+        yield
+
+
+def collect(stub, cluster="prod"):
+    with mock.patch("usage.get_custom_objects", stub.custom_objects):
+        return usage.collect_usage_from_cluster("prod.conf", cluster)
+
+
+def test_scrapes_fill_ring_buffers():
+    with usage_environment(), StubMetricsServer() as stub:
+        stub.pods = {("shop", "api-0"): ("250m", "100Mi"), ("shop", "worker-0"): ("1", "2Gi")}
+        for i in range(6):
+            stub.pods[("shop", "api-0")] = ("250m", f"{100 + i}Mi")
+            assert collect(stub)
+        assert stub.requests == 6
+
+        # Halka 4 örnek tutar: son 4 scrape, eskiden yeniye
+        series = {entry["pod"]: entry for entry in usage.get_usage_series(cluster="prod", namespace="shop")}
+        assert [point["memory"] for point in series["api-0"]["points"]] == [(101 + i) * MiB for i in range(2, 6)]
+        assert [point["cpu"] for point in series["worker-0"]["points"]] == [1005.0] * 4
+
+        # Kaybolan pod evict_after scrape sonra slot'unu bırakır, yeni pod'lar boş slot'ları alır
+        del stub.pods[("shop", "worker-0")]
+        stub.pods.update({("batch", f"job-{i}"): ("10m", "10Mi") for i in range(8)})
+        collect(stub)
+        assert {entry["pod"] for entry in usage.get_usage_series(cluster="prod", namespace="batch")} == {f"job-{i}" for i in range(6)}
+        collect(stub)
+        pods = {entry["pod"] for entry in usage.get_usage_series(cluster="prod")}
+        assert "worker-0" not in pods and {"job-6", "api-0"} <= pods and len(pods) == 8
+
+        top = usage.get_top_usage(cluster="prod", metric="memory", limit=1)
+        assert top[0]["pod"] == "api-0" and top[0]["memory"] == 106 * MiB
+
+        # cluster=all tüm cluster'lar demek, literal bir cluster değil
+        import api
+        client = api.app.test_client()
+        assert {entry["pod"] for entry in client.get("/api/usage?cluster=all").get_json()} == pods
+        assert client.get("/api/usage/top?cluster=all&limit=1").get_json() == top
+
+
+def test_downsampled_flush():
+    with usage_environment(samples=16, flush_interval=300), StubMetricsServer() as stub:
+        buffer = usage.get_writer("prod")
+        start = int(time.time()) - 600
+        for i in range(5):
+            buffer.record(start + 60 * i, [("shop", "api-0", 100.0 + 100 * i, (100 + i) * MiB), ("shop", "idle-0", 1.0, MiB)],
+                          {("shop", "api-0"): 512 * MiB})
+        rows = {row[1]: row for row in buffer.downsample(start, start + 240)}
+        assert rows["api-0"] == ("shop", "api-0", 350.0, 500.0, 102.5 * MiB, 104 * MiB, 512 * MiB, 4)
+        assert rows["idle-0"][6] is None
+
+        # Flush zamanı geldiğinde scrape, son flush'tan bu yana özetleri pod_usage'a yazar
+        buffer.flushed_at = start + 60
+        stub.pods = {("shop", "api-0"): ("100m", "200Mi")}
+        collect(stub)
+        assert buffer.flushed_at >= start + 600
+        with sqlite3.connect(database.DB_PATH) as conn:
+            stored = dict((row[0], row[1:]) for row in conn.execute(
+                "SELECT pod_name, samples, memory_max, cpu_max FROM pod_usage ORDER BY pod_name").fetchall())
+        assert stored["api-0"] == (4, 200 * MiB + MiB, 500.0)
+        assert stored["idle-0"] == (3, MiB, 1.0)
+
+
+def active_oom_alerts():
+    return [alert for alert in database.get_alerts(status="active") if alert["rule_name"] == "pod_oom_risk"]
+
+
+def test_oom_risk_alerts():
+    with usage_environment(samples=32):
+        buffer = usage.get_writer("prod")
+        start = int(time.time()) - 12 * 60
+        limit = 1000 * MiB
+        limits = {("shop", name): limit for name in ("steady-0", "growing-0", "idle-0", "full-0")}
+        for i in range(12):
+            buffer.record(start + 60 * i, [
+                ("shop", "steady-0", 50.0, 920 * MiB),             # limitin %92'si
+                ("shop", "growing-0", 50.0, (500 + 20 * i) * MiB),  # dakikada 20 MiB, ~14 dk'da limit
+                ("shop", "idle-0", 50.0, 300 * MiB),
+                ("shop", "full-0", 50.0, 990 * MiB),
+                ("shop", "nolimit-0", 50.0, 8000 * MiB),
+            ], limits)
+
+        # Tek vektör işlemi: oran ve trend
+        keys, times, memory, window_limits, _ = buffer.window(12)
+        ratio, eta, at_risk = usage.oom_risk(times, memory, window_limits, 0.9, 1800, 0.5)
+        risky = {keys[i][1]: (round(float(ratio[i]), 2), float(eta[i])) for i in at_risk.nonzero()[0]}
+        assert set(risky) == {"steady-0", "growing-0", "full-0"}
+        assert 13 * 60 < risky["growing-0"][1] < 15 * 60
+
+        alerts.check_oom_risk_alerts()
+        active = {alert["message"].split()[1]: alert for alert in active_oom_alerts()}
+        assert set(active) == {"shop/steady-0", "shop/growing-0", "shop/full-0"}
+        assert active["shop/full-0"]["severity"] == "critical"
+        assert active["shop/steady-0"]["severity"] == "warning"
+        assert "limit reached in" in active["shop/growing-0"]["message"]
+
+        # Tekrar kontrol yeni alert açmaz; kullanım düşünce alert'ler çözülür
+        alerts.check_oom_risk_alerts()
+        assert len(active_oom_alerts()) == 3
+        buffer.record(start + 60 * 12, [("shop", name, 50.0, 200 * MiB) for _, name in limits], limits)
+        alerts.auto_resolve_alerts()
+        assert active_oom_alerts() == []
+
+
+def test_pod_memory_limits():
+    def pod(name, *limits):
+        return {"metadata": {"name": name, "namespace": "shop"}, "status": {"phase": "Running"},
+                "spec": {"containers": [{"name": f"c{i}", "resources": {"limits": {"memory": limit}} if limit else {}}
+                                        for i, limit in enumerate(limits)]}}
+    body = json.dumps({"items": [pod("a", "256Mi", "0.5Gi"), pod("b", "256Mi", None), pod("c")]}).encode()
+    limits = {record.name: record.memory_limit for record in iter_pods_raw(io.BytesIO(body))}
+    # Limitsiz container varsa pod'un limiti yok
+    assert limits == {"a": 768 * MiB, "b": None, "c": None}
+
+
+if __name__ == "__main__":
+    test_scrapes_fill_ring_buffers()
+    print("✅ Metrics API scrapes fill the ring buffers")
+    test_downsampled_flush()
+    print("✅ Flushes are downsampled into pod_usage")
+    test_oom_risk_alerts()
+    print("✅ OOM-risk rule opens and resolves alerts")
+    test_pod_memory_limits()
+    print("✅ Pod memory limits are parsed from the listing")
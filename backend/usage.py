@@ -0,0 +1,494 @@
+"""Per-pod CPU and memory usage from the metrics API, kept in fixed-size ring buffers.
+
+Every cluster collection scrapes metrics.k8s.io once and appends one sample
+per pod to array-backed ring buffers: a shared ring of sample times and
+(samples, max_pods) float32 arrays for CPU (millicores) and memory (bytes).
+A pod owns one column ("slot") while it is listed; its memory limit comes
+from the pod listing (kube_client calls update_limits()).
+
+The arrays are numpy memmaps of .npy files under USAGE_CONFIG['dir']. The
+collector writes them and the API process maps the same files read-only, so
+recent series are served straight from the buffers without a query. Slot
+assignments are published in index.json, which is replaced atomically
+whenever a pod gets or loses a slot.
+
+Every USAGE_CONFIG['flush_interval'] seconds the samples since the last flush
+are downsampled (avg/max per pod) into the day-partitioned `pod_usage` table,
+so history outlives the ring.
+
+numpy is optional; without it usage is not collected.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime, timezone
+
+try:
+    import numpy as np
+    USAGE_AVAILABLE = True
+except ImportError:
+    USAGE_AVAILABLE = False
+
+from client_registry import get_custom_objects
+from database import save_pod_usage
+from fast_list import list_pod_metrics
+from metrics import CLUSTER_LIST_SECONDS, ROWS_WRITTEN
+
+logger = logging.getLogger(__name__)
+
+USAGE_CONFIG = {
+    'enabled': os.environ.get("KUBEMON_USAGE", "1") != "0" and USAGE_AVAILABLE,
+    'dir': os.environ.get("KUBEMON_USAGE_DIR", os.path.join("data", "usage")),
+    'max_pods': int(os.environ.get("KUBEMON_USAGE_MAX_PODS", 5000)),
+    # Pod başına tutulan örnek sayısı (5 dakikalık poll ile 24 saat)
+    'samples': int(os.environ.get("KUBEMON_USAGE_SAMPLES", 288)),
+    'flush_interval': float(os.environ.get("KUBEMON_USAGE_FLUSH_INTERVAL", 900)),
+    # Bu kadar scrape'te görünmeyen pod'un slot'u boşaltılır
+    'evict_after': int(os.environ.get("KUBEMON_USAGE_EVICT_AFTER", 3)),
+}
+
+USAGE_METRICS = ("cpu", "memory", "memory_ratio")
+
+# Collector'daki yazıcılar ve API'deki okuyucular, cluster başına bir tane
+_writers = {}
+_readers = {}
+_limits = {}
+_lock = threading.Lock()
+
+
+def _cluster_dir(cluster):
+    return os.path.join(USAGE_CONFIG['dir'], re.sub(r"[^A-Za-z0-9_.-]", "_", cluster))
+
+
+def _utc(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+
+
+def _float_or_none(value):
+    return None if np.isnan(value) else float(value)
+
+
+class UsageBuffer:
+    """Ring buffers of one cluster.
+
+    Opened writable by the collector (a single writer per cluster) or
+    read-only anywhere else; readers pick up slot changes with refresh().
+    """
+
+    def __init__(self, cluster, writable=False):
+        self.cluster = cluster
+        self.path = _cluster_dir(cluster)
+        self.writable = writable
+        self.generation = None
+        self.slots = {}
+        self.flushed_at = 0
+        self._index_mtime = None
+        self._missing = {}
+        self._free = []
+        if writable:
+            self._open_writer()
+
+    # --- Files ---
+
+    def _file(self, name):
+        return os.path.join(self.path, f"{name}.npy")
+
+    def _read_index(self):
+        try:
+            with open(os.path.join(self.path, "index.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_index(self):
+        path = os.path.join(self.path, "index.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump({'cluster': self.cluster, 'generation': self.generation, 'samples': self.samples,
+                       'max_pods': self.max_pods, 'slots': {f"{ns}/{pod}": slot for (ns, pod), slot in self.slots.items()}}, f)
+        os.replace(path + ".tmp", path)
+
+    def _map(self, mode):
+        self.times = np.load(self._file("times"), mmap_mode=mode)
+        self.cpu = np.load(self._file("cpu"), mmap_mode=mode)
+        self.memory = np.load(self._file("memory"), mmap_mode=mode)
+        self.limits = np.load(self._file("limits"), mmap_mode=mode)
+        # [head, count]: en son yazılan pozisyon ve dolu örnek sayısı
+        self.state = np.load(self._file("state"), mmap_mode=mode)
+        self.samples, self.max_pods = self.cpu.shape
+
+    def _load_slots(self, index):
+        self.slots = {tuple(key.split("/", 1)): slot for key, slot in index['slots'].items()}
+
+    def _create(self, samples, max_pods):
+        os.makedirs(self.path, exist_ok=True)
+        for name, dtype, shape, fill in (("times", np.int64, (samples,), 0),
+                                         ("cpu", np.float32, (samples, max_pods), np.nan),
+                                         ("memory", np.float32, (samples, max_pods), np.nan),
+                                         ("limits", np.float32, (max_pods,), np.nan),
+                                         ("state", np.int64, (2,), 0)):
+            # Yeni dosya yerine konur; eski dosyayı map etmiş okuyucular bozulmaz
+            array = np.lib.format.open_memmap(self._file(name) + ".tmp", mode="w+", dtype=dtype, shape=shape)
+            array[...] = fill
+            array.flush()
+            del array
+            os.replace(self._file(name) + ".tmp", self._file(name))
+        self._map("r+")
+        self.state[0] = samples - 1
+        self.generation = time.time_ns()
+        self.slots = {}
+        self._write_index()
+
+    def _open_writer(self):
+        samples, max_pods = USAGE_CONFIG['samples'], USAGE_CONFIG['max_pods']
+        index = self._read_index()
+        if index and index.get('samples') == samples and index.get('max_pods') == max_pods:
+            try:
+                self._map("r+")
+                self.generation = index['generation']
+                self._load_slots(index)
+            except (OSError, ValueError) as e:
+                logger.warning("%s: usage buffers unreadable, recreating: %s", self.cluster, e)
+                self._create(samples, max_pods)
+        else:
+            self._create(samples, max_pods)
+        used = set(self.slots.values())
+        self._free = [slot for slot in range(self.max_pods - 1, -1, -1) if slot not in used]
+        # Yeniden başlatmada halkadaki örnekler tekrar özetlenmesin
+        self.flushed_at = int(self.times.max()) or int(time.time())
+
+    def refresh(self):
+        """Reload the slot index, and the arrays if they were recreated; False if the buffer doesn't exist"""
+        try:
+            mtime = os.stat(os.path.join(self.path, "index.json")).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self._index_mtime:
+            return True
+        index = self._read_index()
+        if index is None:
+            return self.generation is not None
+        if index['generation'] != self.generation:
+            self._map("r")
+            self.generation = index['generation']
+        self._load_slots(index)
+        self._index_mtime = mtime
+        return True
+
+    # --- Writing (collector) ---
+
+    def _assign(self, key):
+        if not self._free:
+            return None
+        slot = self._free.pop()
+        self.cpu[:, slot] = np.nan
+        self.memory[:, slot] = np.nan
+        self.limits[slot] = np.nan
+        self.slots[key] = slot
+        return slot
+
+    def _release(self, key):
+        slot = self.slots.pop(key)
+        self._missing.pop(key, None)
+        self._free.append(slot)
+
+    def record(self, timestamp, samples, limits=None):
+        """Append one scrape at epoch `timestamp`.
+
+        `samples` are (namespace, pod, cpu millicores, memory bytes) and
+        `limits` maps (namespace, pod) to the memory limit in bytes. Returns
+        the number of pods that got no slot because the buffer is full.
+        """
+        limits = limits or {}
+        samples = list(samples)
+        changed = False
+        # Önce kaybolan pod'ların slot'ları boşaltılır, yeni pod'lar aynı scrape'te kullanabilsin
+        seen = {(namespace, pod) for namespace, pod, _, _ in samples}
+        for key in [key for key in self.slots if key not in seen]:
+            misses = self._missing.get(key, 0) + 1
+            if misses >= USAGE_CONFIG['evict_after']:
+                self._release(key)
+                changed = True
+            else:
+                self._missing[key] = misses
+        for key in seen:
+            self._missing.pop(key, None)
+
+        keys, rows, cpu, memory = [], [], [], []
+        dropped = 0
+        for namespace, pod, pod_cpu, pod_memory in samples:
+            key = (namespace, pod)
+            slot = self.slots.get(key)
+            if slot is None:
+                slot = self._assign(key)
+                if slot is None:
+                    dropped += 1
+                    continue
+                changed = True
+            keys.append(key)
+            rows.append(slot)
+            cpu.append(pod_cpu)
+            memory.append(pod_memory)
+
+        head = (int(self.state[0]) + 1) % self.samples
+        rows = np.asarray(rows, dtype=np.intp)
+        self.cpu[head] = np.nan
+        self.memory[head] = np.nan
+        self.cpu[head, rows] = cpu
+        self.memory[head, rows] = memory
+        self.limits[rows] = [limits.get(key, np.nan) for key in keys]
+        # Zaman ve head en son yazılır: okuyucu yarım yazılmış örneği görmez
+        self.times[head] = timestamp
+        self.state[1] = min(int(self.state[1]) + 1, self.samples)
+        self.state[0] = head
+        if changed:
+            self._write_index()
+        return dropped
+
+    def downsample(self, since, until):
+        """Per-pod (namespace, pod, cpu_avg, cpu_max, memory_avg, memory_max, memory_limit, samples)
+        over the samples taken in (since, until]"""
+        positions, times = self._positions()
+        positions = positions[(times > since) & (times <= until)]
+        if not len(positions) or not self.slots:
+            return []
+        keys = list(self.slots)
+        slots = np.fromiter(self.slots.values(), dtype=np.intp, count=len(keys))
+        cpu = self.cpu[positions][:, slots]
+        memory = self.memory[positions][:, slots]
+        counts = np.count_nonzero(~np.isnan(memory), axis=0)
+        present = np.flatnonzero(counts)
+        if not len(present):
+            return []
+        cpu, memory = cpu[:, present], memory[:, present]
+        cpu_avg, cpu_max = np.nanmean(cpu, axis=0), np.nanmax(cpu, axis=0)
+        memory_avg, memory_max = np.nanmean(memory, axis=0), np.nanmax(memory, axis=0)
+        limits = self.limits[slots[present]]
+        return [(*keys[i], float(cpu_avg[j]), float(cpu_max[j]), float(memory_avg[j]), float(memory_max[j]),
+                 _float_or_none(limits[j]), int(counts[i]))
+                for j, i in enumerate(present)]
+
+    # --- Reading ---
+
+    def _positions(self, since=None):
+        """Ring positions (oldest first) and their times, optionally from epoch `since` on"""
+        head, count = int(self.state[0]), int(self.state[1])
+        positions = (head - np.arange(count - 1, -1, -1)) % self.samples
+        times = np.asarray(self.times[positions])
+        if count:
+            # Okuma sırasında yazılan örnek head'den yeni görünür, atlanır
+            keep = (times > 0) & (times <= times[-1])
+            if since is not None:
+                keep &= times >= since
+            positions, times = positions[keep], times[keep]
+        return positions, times
+
+    def series(self, namespace=None, pod=None, since=None, include=None):
+        """[(namespace, pod, memory limit, times, cpu, memory)] for the matching pods"""
+        positions, times = self._positions(since)
+        result = []
+        for (pod_namespace, pod_name), slot in self.slots.items():
+            if (namespace and pod_namespace != namespace) or (pod and pod_name != pod):
+                continue
+            if include is not None and not include(self.cluster, pod_namespace):
+                continue
+            cpu = self.cpu[positions, slot]
+            memory = self.memory[positions, slot]
+            valid = ~np.isnan(memory)
+            result.append((pod_namespace, pod_name, _float_or_none(self.limits[slot]),
+                           times[valid], cpu[valid], memory[valid]))
+        return result
+
+    def window(self, count):
+        """Last `count` samples of every pod: (keys, times (W,), memory (W, P), limits (P,), cpu (W, P))"""
+        positions, times = self._positions()
+        positions, times = positions[-count:], times[-count:]
+        keys = list(self.slots)
+        slots = np.fromiter(self.slots.values(), dtype=np.intp, count=len(keys))
+        return (keys, times, self.memory[positions][:, slots], np.asarray(self.limits[slots]),
+                self.cpu[positions][:, slots])
+
+
+# --- Vectorized rules ---
+
+def memory_trend(times, memory):
+    """Least-squares slope (bytes/s) of each column of `memory` (W, P) over `times` (W,), NaNs ignored.
+
+    Pods with fewer than 3 samples in the window get NaN.
+    """
+    valid = ~np.isnan(memory)
+    n = valid.sum(axis=0)
+    t = np.where(valid, (times - times[-1]).astype(np.float64)[:, None], 0.0)
+    m = np.where(valid, memory, 0.0).astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        dt = np.where(valid, t - t.sum(axis=0) / n, 0.0)
+        dm = np.where(valid, m - m.sum(axis=0) / n, 0.0)
+        variance = (dt * dt).sum(axis=0)
+        slope = (dt * dm).sum(axis=0) / variance
+    return np.where((n >= 3) & (variance > 0), slope, np.nan)
+
+
+def oom_risk(times, memory, limits, threshold, horizon, min_ratio=0.0):
+    """OOM-risk check for every pod of a window at once.
+
+    Returns (ratio, eta, at_risk): the latest memory/limit ratio, the seconds
+    until the limit at the current trend (inf if flat or shrinking) and a
+    mask of pods that are at `threshold` or would reach their limit within
+    `horizon` seconds (trend only counts from `min_ratio` up). Pods without a
+    limit or a current sample are never at risk.
+    """
+    latest = memory[-1].astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ratio = latest / limits
+        slope = memory_trend(times, memory)
+        eta = np.where(slope > 0, (limits - latest) / slope, np.inf)
+        at_risk = (limits > 0) & ~np.isnan(latest) & ((ratio >= threshold) | ((eta <= horizon) & (ratio >= min_ratio)))
+    return ratio, eta, at_risk
+
+
+# --- Collector ---
+
+def update_limits(cluster, limits):
+    """Memory limits {(namespace, pod): bytes} from the latest pod listing"""
+    _limits[cluster] = limits
+
+
+def get_writer(cluster):
+    with _lock:
+        buffer = _writers.get(cluster)
+        if buffer is None:
+            buffer = _writers[cluster] = UsageBuffer(cluster, writable=True)
+        return buffer
+
+
+def drop_cluster(cluster):
+    """Forget a removed cluster's writer and limits (its files stay until the directory is cleaned)"""
+    with _lock:
+        _writers.pop(cluster, None)
+        _limits.pop(cluster, None)
+
+
+def collect_usage_from_cluster(kubeconfig_path, cluster_name):
+    """Scrape pod metrics into the cluster's ring buffers; False if the metrics API failed"""
+    try:
+        api = get_custom_objects(kubeconfig_path)
+        with CLUSTER_LIST_SECONDS.labels(cluster_name, "pod_metrics").time():
+            pod_metrics = list_pod_metrics(api)
+    except Exception as e:
+        logger.warning("%s: Pod metrics unavailable (is metrics-server installed?): %s", cluster_name, e)
+        return False
+
+    now = int(time.time())
+    buffer = get_writer(cluster_name)
+    dropped = buffer.record(now, [(m.namespace, m.name, m.cpu, m.memory) for m in pod_metrics], _limits.get(cluster_name))
+    if dropped:
+        logger.warning("%s: usage buffers full, %d pods not tracked (KUBEMON_USAGE_MAX_PODS=%d)",
+                       cluster_name, dropped, buffer.max_pods)
+    if now - buffer.flushed_at >= USAGE_CONFIG['flush_interval']:
+        rows = buffer.downsample(buffer.flushed_at, now)
+        save_pod_usage(cluster_name, rows, _utc(now))
+        buffer.flushed_at = now
+        ROWS_WRITTEN.labels(cluster_name, "pod_usage").observe(len(rows))
+        logger.debug("%s: flushed usage of %d pods", cluster_name, len(rows))
+    return True
+
+
+# --- Readers (API, alert checks) ---
+
+def open_buffer(cluster):
+    """Read-only view of a cluster's buffers, None if nothing was collected for it"""
+    with _lock:
+        buffer = _readers.get(cluster)
+        if buffer is None:
+            buffer = UsageBuffer(cluster)
+        if not buffer.refresh():
+            _readers.pop(cluster, None)
+            return None
+        _readers[cluster] = buffer
+        return buffer
+
+
+def list_usage_clusters():
+    try:
+        names = os.listdir(USAGE_CONFIG['dir'])
+    except FileNotFoundError:
+        return []
+    return sorted(name for name in names if os.path.exists(os.path.join(USAGE_CONFIG['dir'], name, "index.json")))
+
+
+def _buffers(cluster=None):
+    # UI tüm cluster'lar için 'all' gönderir
+    for name in ([cluster] if cluster and cluster != 'all' else list_usage_clusters()):
+        buffer = open_buffer(name) if USAGE_AVAILABLE else None
+        if buffer is not None:
+            yield buffer
+
+
+def get_usage_series(cluster=None, namespace=None, pod=None, minutes=60, include=None):
+    """Recent usage per pod from the ring buffers.
+
+    Returns [{'cluster', 'namespace', 'pod', 'memory_limit', 'points': [{'time', 'cpu', 'memory'}]}]
+    with cpu in millicores and memory in bytes.
+    """
+    since = int(time.time() - minutes * 60)
+    result = []
+    for buffer in _buffers(cluster):
+        for pod_namespace, pod_name, limit, times, cpu, memory in buffer.series(namespace, pod, since, include):
+            result.append({
+                'cluster': buffer.cluster,
+                'namespace': pod_namespace,
+                'pod': pod_name,
+                'memory_limit': limit,
+                'points': [{'time': _utc(t).strftime("%Y-%m-%d %H:%M:%S"), 'cpu': round(float(c), 1), 'memory': int(m)}
+                           for t, c, m in zip(times.tolist(), cpu.tolist(), memory.tolist())],
+            })
+    return result
+
+
+def get_top_usage(cluster=None, metric="memory", limit=20, include=None):
+    """Pods with the highest latest cpu, memory or memory/limit ratio, across clusters"""
+    rows = []
+    for buffer in _buffers(cluster):
+        keys, times, memory, limits, cpu = buffer.window(1)
+        if not len(times) or not keys:
+            continue
+        with np.errstate(invalid="ignore", divide="ignore"):
+            values = {"cpu": cpu[-1], "memory": memory[-1], "memory_ratio": memory[-1] / limits}[metric]
+        order = np.argsort(np.where(np.isnan(values), -np.inf, values))[::-1]
+        taken = 0
+        for i in order:
+            if taken >= limit or np.isnan(values[i]):
+                break
+            namespace, pod = keys[i]
+            if include is not None and not include(buffer.cluster, namespace):
+                continue
+            rows.append({
+                'cluster': buffer.cluster,
+                'namespace': namespace,
+                'pod': pod,
+                'cpu': _float_or_none(cpu[-1][i]),
+                'memory': _float_or_none(memory[-1][i]),
+                'memory_limit': _float_or_none(limits[i]),
+                'memory_ratio': _float_or_none(memory[-1][i] / limits[i]) if limits[i] > 0 else None,
+                'time': _utc(int(times[-1])).strftime("%Y-%m-%d %H:%M:%S"),
+            })
+            taken += 1
+    rows.sort(key=lambda row: row[metric] if row[metric] is not None else -1, reverse=True)
+    return rows[:limit]
+
+
+def find_oom_risk(threshold, horizon, trend_samples, min_ratio=0.0):
+    """[(cluster, namespace, pod, ratio, eta seconds, memory bytes, limit bytes)] for every pod at OOM risk"""
+    result = []
+    if not USAGE_CONFIG['enabled']:
+        return result
+    for buffer in _buffers():
+        keys, times, memory, limits, _ = buffer.window(trend_samples)
+        if not len(times) or not keys:
+            continue
+        ratio, eta, at_risk = oom_risk(times, memory, limits, threshold, horizon, min_ratio)
+        for i in np.flatnonzero(at_risk):
+            result.append((buffer.cluster, *keys[i], float(ratio[i]), float(eta[i]), float(memory[-1][i]), float(limits[i])))
+    return result
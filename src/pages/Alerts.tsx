@@ -14,9 +14,12 @@ interface Alert {
   rule_name: string;
   severity: 'info' | 'warning' | 'critical';
   message: string;
-  status: 'active' | 'resolved';
+  status: 'active' | 'acknowledged' | 'resolved';
   created_at: string;
   resolved_at?: string;
+  parent_id?: number | null;
+  member_count?: number;
+  group_key?: string | null;
 }
 
 const Alerts = () => {
@@ -95,6 +98,7 @@ const Alerts = () => {
   const getStatusBadgeColor = (status: string) => {
     switch (status) {
       case 'active': return 'bg-red-100 text-red-800 dark:bg-red-900 dark:text-red-300';
+      case 'acknowledged': return 'bg-yellow-100 text-yellow-800 dark:bg-yellow-900 dark:text-yellow-300';
       case 'resolved': return 'bg-green-100 text-green-800 dark:bg-green-900 dark:text-green-300';
       default: return 'bg-gray-100 text-gray-800 dark:bg-gray-900 dark:text-gray-300';
     }
@@ -221,6 +225,7 @@ const Alerts = () => {
                 >
                   <option value="all">All Status</option>
                   <option value="active">Active</option>
+                  <option value="acknowledged">Acknowledged</option>
                   <option value="resolved">Resolved</option>
                 </select>
               </div>
@@ -295,6 +300,11 @@ const Alerts = () => {
                       <div className="text-sm text-gray-600 dark:text-gray-400 mt-1">
                         {alert.message}
                       </div>
+                      {alert.group_key && (
+                        <div className="text-xs text-gray-500 mt-1">
+                          Grouped alert: {alert.member_count} pods
+                        </div>
+                      )}
                       {alert.resolved_at && (
                         <div className="text-xs text-gray-500 mt-1 flex items-center gap-1">
                           <Clock className="w-3 h-3" />
@@ -12,7 +12,7 @@ const API_URL = import.meta.env.VITE_API_URL || '/api';
 const Index = () => {
   const [clusters, setClusters] = useState([]);
   const [selectedCluster, setSelectedCluster] = useState(null);
-  const [pods, setPods] = useState([]);
+  const [summary, setSummary] = useState(null);
   const [isLoading, setIsLoading] = useState(false);
   const [lastUpdate, setLastUpdate] = useState(new Date().toISOString());
   const [filterHours, setFilterHours] = useState(24); // 24 = 1 gün (default), 168 = 7 gün
@@ -39,17 +39,17 @@ const Index = () => {
     // eslint-disable-next-line
   }, []);
 
-  const fetchPods = async (clusterValue, hours = filterHours) => {
+  const fetchSummary = async (clusterValue, hours = filterHours) => {
     setIsLoading(true);
-    console.log(`Fetching pods for cluster: ${clusterValue}, hours: ${hours}`);
+    console.log(`Fetching summary for cluster: ${clusterValue}, hours: ${hours}`);
     try {
-      const res = await axios.get(`${API_URL}/pods?cluster=${clusterValue}&hours=${hours}`);
-      console.log(`Fetched ${res.data.length} pods for ${hours} hours`);
-      setPods(res.data);
+      const res = await axios.get(`${API_URL}/summary?cluster=${clusterValue}&hours=${hours}`);
+      console.log(`Fetched summary with ${res.data.pods.length} pods for ${hours} hours`);
+      setSummary(res.data);
       setLastUpdate(new Date().toISOString());
     } catch (e) {
-      console.error('Error fetching pods:', e);
-      setPods([]);
+      console.error('Error fetching summary:', e);
+      setSummary(null);
       setLastUpdate(new Date().toISOString());
     }
     setIsLoading(false);
@@ -58,13 +58,13 @@ const Index = () => {
   useEffect(() => {
     console.log(`Filter changed to: ${filterHours} hours`);
     if (selectedCluster) {
-      fetchPods(selectedCluster.value, filterHours);
+      fetchSummary(selectedCluster.value, filterHours);
     }
     // eslint-disable-next-line
   }, [selectedCluster, filterHours]);
 
   const handleRefresh = () => {
-    if (selectedCluster) fetchPods(selectedCluster.value, filterHours);
+    if (selectedCluster) fetchSummary(selectedCluster.value, filterHours);
   };
 
   const handleClusterChange = (cluster) => {
@@ -76,47 +76,14 @@ const Index = () => {
     setFilterHours(hours);
   };
 
-  // Benzersiz podları hesapla - useMemo ile optimize et
-  const uniquePods = useMemo(() => {
-    const uniquePodsMap = new Map();
-    pods.forEach((pod) => {
-      const key = `${pod.namespace}/${pod.name}`;
-      if (!uniquePodsMap.has(key)) {
-        uniquePodsMap.set(key, pod);
-      }
-    });
-    const result = Array.from(uniquePodsMap.values());
-    console.log(`Unique pods calculation: ${pods.length} total pods -> ${result.length} unique pods`);
-    return result;
-  }, [pods]);
-
-  // Dashboard stats - useMemo ile optimize et  
-  const dashboardStats = useMemo(() => {
-    const healthyPods = uniquePods.filter((pod) => pod.restarts > 0).length;
-    const unhealthyPods = uniquePods.filter((pod) => pod.status === 'CrashLoopBackOff').length;
-    const topRestartingPod = uniquePods.reduce((max, pod) => {
-      if (!max || (pod.restarts > (max.restarts || 0))) {
-        return pod;
-      }
-      return max;
-    }, null);
-
-    const stats = {
-      totalPods: uniquePods.length,
-      healthyPods,
-      unhealthyPods,
-      topRestartingPod
-    };
-
-    console.log(`Dashboard Stats - Filter: ${filterHours}h, Unique: ${uniquePods.length}, Total: ${stats.totalPods}, Restarts: ${stats.healthyPods}, CrashLoop: ${stats.unhealthyPods}`);
-    
-    return stats;
-  }, [uniquePods, filterHours]);
-
-  // pods state değişikliğini takip et
-  useEffect(() => {
-    console.log(`Pods state updated: ${pods.length} total pods`);
-  }, [pods]);
+  // Pod başına son durum ve sayılar backend'de (/api/summary) hesaplanıyor
+  const pods = summary ? summary.pods : [];
+  const dashboardStats = useMemo(() => ({
+    totalPods: summary ? summary.totals.pods : 0,
+    healthyPods: summary ? summary.totals.restarting : 0,
+    unhealthyPods: summary ? summary.totals.crashloop : 0,
+    topRestartingPod: summary && summary.top_restarting.length > 0 ? summary.top_restarting[0] : null
+  }), [summary]);
 
   return (
     <div className="min-h-screen bg-gradient-to-br from-slate-50 via-white to-blue-50 dark:from-gray-900 dark:via-gray-800 dark:to-blue-900 transition-colors duration-300">
@@ -214,11 +181,11 @@ const Index = () => {
               Pod Status Overview{selectedCluster ? ` - ${selectedCluster.label} Cluster` : ''}
             </CardTitle>
             <p className="text-sm text-gray-600 dark:text-gray-400 mt-2">
-              Showing {uniquePods.length} pods{selectedCluster ? ` from ${selectedCluster.label} cluster` : ''}
+              Showing {pods.length} pods{selectedCluster ? ` from ${selectedCluster.label} cluster` : ''}
             </p>
           </CardHeader>
           <CardContent>
-            <PodGrid pods={uniquePods} isLoading={isLoading} />
+            <PodGrid pods={pods} isLoading={isLoading} />
           </CardContent>
         </Card>
 
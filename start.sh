@@ -1,5 +1,7 @@
 #!/bin/bash
 set -e
+# Önceki çalıştırmadan kalan Prometheus metrik dosyalarını temizle
+python backend/metrics.py
 # Pod toplama döngüsünü başlat (logları stdout'a yönlendir)
 python backend/main.py &
 MAIN_PID=$!